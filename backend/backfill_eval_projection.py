@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Backfill the EVAL projection item for problems stored before it existed.
+
+put_problem now writes a compact evaluation view of each problem
+(PK PROBLEM#<id>, SK EVAL — see gcse_evaluator.evaluation_projection) so
+/homework/evaluate doesn't read the whole ai_response. Older problems
+still evaluate through the full item; this writes their projection.
+Problems that already have one are skipped (conditional put), so it is
+safe to re-run. Re-run with --overwrite after changing the projection
+shape to rebuild every item.
+
+Usage:
+    cd backend
+    source .venv/bin/activate
+    python backfill_eval_projection.py --dry-run   # report only
+    python backfill_eval_projection.py             # write missing projections
+"""
+import argparse
+import os
+
+import boto3
+from boto3.dynamodb.conditions import Attr
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import problem_cache  # noqa: E402
+from db import _floats_to_decimal  # noqa: E402
+from gcse_evaluator import evaluation_projection  # noqa: E402
+
+TABLE_NAME = os.getenv("DYNAMODB_TABLE_NAME", "gcse_app")
+AWS_REGION = os.getenv("AWS_REGION", "eu-west-2")
+ENDPOINT_URL = os.getenv("DYNAMODB_ENDPOINT_URL") or None
+
+
+def _table():
+    return boto3.resource("dynamodb", region_name=AWS_REGION, endpoint_url=ENDPOINT_URL).Table(TABLE_NAME)
+
+
+def _problems(table):
+    kwargs = {
+        "FilterExpression": Attr("PK").begins_with("PROBLEM#") & Attr("SK").eq("METADATA"),
+        "ProjectionExpression": "PK, problem_id, normalised_form, ai_response",
+    }
+    while True:
+        resp = table.scan(**kwargs)
+        yield from resp.get("Items", [])
+        if "LastEvaluatedKey" not in resp:
+            return
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+
+def backfill(table, *, dry_run: bool, overwrite: bool) -> None:
+    seen = written = skipped = 0
+    for item in _problems(table):
+        seen += 1
+        problem_id = item.get("problem_id") or item["PK"].split("#", 1)[1]
+        projection = evaluation_projection(
+            item.get("ai_response") or {}, normalised_form=item.get("normalised_form") or "",
+        )
+        if dry_run:
+            written += 1
+            continue
+        put = {
+            "Item": {
+                "PK": item["PK"],
+                "SK": "EVAL",
+                "Type": "ProblemEval",
+                "problem_id": problem_id,
+                "projection": _floats_to_decimal(projection),
+            },
+        }
+        if not overwrite:
+            put["ConditionExpression"] = "attribute_not_exists(PK)"
+        try:
+            table.put_item(**put)
+            problem_cache.invalidate(problem_id)  # reaches the workers only via Redis, if configured
+            written += 1
+        except table.meta.client.exceptions.ConditionalCheckFailedException:
+            skipped += 1
+    verb = "Would write" if dry_run else "Wrote"
+    print(f"{verb} {written} projections for {seen} problems ({skipped} already had one).")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    parser.add_argument("--overwrite", action="store_true", help="Rewrite projections that already exist")
+    args = parser.parse_args()
+    backfill(_table(), dry_run=args.dry_run, overwrite=args.overwrite)
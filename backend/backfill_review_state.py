@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Build spaced-repetition review state from existing quiz results.
+
+/quiz/submit now keeps a CardReview item per (user, card) — see srs.py —
+and /review/next reads the cards due now from GSI1 instead of the last ten
+quiz results. This replays every stored QuizResult through the scheduler
+in completion order, per user, and writes the resulting state. The replay
+is deterministic, so re-running rewrites the same items; run it once after
+deploying, before users see /review/next.
+
+Usage:
+    cd backend
+    source .venv/bin/activate
+    python backfill_review_state.py --dry-run   # report only
+    python backfill_review_state.py             # write review state
+"""
+import argparse
+import os
+from datetime import datetime
+
+import boto3
+from boto3.dynamodb.conditions import Attr
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from db import _card_review_updates  # noqa: E402
+
+TABLE_NAME = os.getenv("DYNAMODB_TABLE_NAME", "gcse_app")
+AWS_REGION = os.getenv("AWS_REGION", "eu-west-2")
+ENDPOINT_URL = os.getenv("DYNAMODB_ENDPOINT_URL") or None
+
+
+def _table():
+    return boto3.resource("dynamodb", region_name=AWS_REGION, endpoint_url=ENDPOINT_URL).Table(TABLE_NAME)
+
+
+def _quiz_results(table):
+    kwargs = {
+        "FilterExpression": Attr("Type").eq("QuizResult"),
+        "ProjectionExpression": "PK, topicId, completedAt, breakdown",
+    }
+    while True:
+        resp = table.scan(**kwargs)
+        yield from resp.get("Items", [])
+        if "LastEvaluatedKey" not in resp:
+            return
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+
+def replay(results) -> dict:
+    """{(PK, SK): CardReview item} after replaying results in completedAt order."""
+    states: dict = {}
+    for result in sorted(results, key=lambda r: (r["PK"], r.get("completedAt", ""))):
+        uid = result["PK"].split("#", 1)[1]
+        topic_id = result.get("topicId") or ""
+        breakdown = [b for b in result.get("breakdown", []) if b.get("questionId")]
+        if not topic_id or not breakdown:
+            continue
+        previous = [
+            states[key] for key in
+            ((result["PK"], f"SRS#{topic_id}#{b['questionId']}") for b in breakdown) if key in states
+        ]
+        completed_at = datetime.fromisoformat(result["completedAt"])
+        for item in _card_review_updates(uid, topic_id, breakdown, previous, completed_at):
+            states[(item["PK"], item["SK"])] = item
+    return states
+
+
+def backfill(table, *, dry_run: bool) -> None:
+    results = list(_quiz_results(table))
+    states = replay(results)
+    users = len({pk for pk, _sk in states})
+    if not dry_run:
+        with table.batch_writer() as batch:
+            for item in states.values():
+                batch.put_item(Item=item)
+    verb = "Would write" if dry_run else "Wrote"
+    print(f"{verb} {len(states)} card review states for {users} users from {len(results)} quiz results.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    args = parser.parse_args()
+    backfill(_table(), dry_run=args.dry_run)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Backfill simpler_version.milestone_answers on stored problems.
+
+Problems generated before the simpler version's final answer was stored
+only have its full solution text, so the evaluator's cheap path can't mark
+a correct warm-up answer without the LLM. This extracts the final answer
+(gcse_evaluator.extract_final_answer) and writes it onto each problem's
+ai_response. Problems that already have it, have no simpler version, or
+whose solution has no recognisable answer are left alone. Idempotent.
+
+The evaluator extracts the answer on the fly when it's missing, so running
+this is an optimisation, not a prerequisite for deploying.
+
+Usage:
+    cd backend
+    source .venv/bin/activate
+    python backfill_simpler_milestones.py --dry-run   # report only
+    python backfill_simpler_milestones.py             # write
+"""
+import argparse
+import os
+
+import boto3
+from boto3.dynamodb.conditions import Attr
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import problem_cache  # noqa: E402
+from gcse_help_generator import attach_simpler_milestones  # noqa: E402
+
+TABLE_NAME = os.getenv("DYNAMODB_TABLE_NAME", "gcse_app")
+AWS_REGION = os.getenv("AWS_REGION", "eu-west-2")
+ENDPOINT_URL = os.getenv("DYNAMODB_ENDPOINT_URL") or None
+
+
+def _table():
+    return boto3.resource("dynamodb", region_name=AWS_REGION, endpoint_url=ENDPOINT_URL).Table(TABLE_NAME)
+
+
+def _problems(table):
+    kwargs = {
+        "FilterExpression": Attr("PK").begins_with("PROBLEM#") & Attr("SK").eq("METADATA")
+        & Attr("ai_response.simpler_version").exists(),
+        "ProjectionExpression": "PK, SK, ai_response.simpler_version",
+    }
+    while True:
+        resp = table.scan(**kwargs)
+        yield from resp.get("Items", [])
+        if "LastEvaluatedKey" not in resp:
+            return
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+
+def backfill(table, *, dry_run: bool) -> None:
+    seen = updated = skipped = 0
+    for item in _problems(table):
+        seen += 1
+        ai_response = item.get("ai_response") or {}
+        if not attach_simpler_milestones(ai_response):
+            skipped += 1
+            continue
+        milestones = ai_response["simpler_version"]["milestone_answers"]
+        print(f"  {item['PK']}: {milestones[-1]!r}")
+        if dry_run:
+            updated += 1
+            continue
+        try:
+            table.update_item(
+                Key={"PK": item["PK"], "SK": item["SK"]},
+                UpdateExpression="SET ai_response.simpler_version.milestone_answers = :m",
+                ConditionExpression="attribute_not_exists(ai_response.simpler_version.milestone_answers)",
+                ExpressionAttributeValues={":m": milestones},
+            )
+            problem_cache.invalidate(item["PK"].split("#", 1)[1])  # shared tier, if configured
+            updated += 1
+        except table.meta.client.exceptions.ConditionalCheckFailedException:
+            skipped += 1  # written concurrently
+    verb = "Would update" if dry_run else "Updated"
+    print(f"{verb} {updated} of {seen} problems with a simpler version ({skipped} skipped).")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    args = parser.parse_args()
+    backfill(_table(), dry_run=args.dry_run)
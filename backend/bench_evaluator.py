@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Benchmark the evaluator pipeline against a recorded LLM corpus — no live calls.
+
+Record a corpus by running the backend with EVALUATOR_LLM_RECORD_PATH set
+(see llm_replay.py); every evaluation is appended as one JSONL line. This
+script replays those evaluations through `evaluate_submission` with the LLM
+answered from the corpus, and reports throughput, latency percentiles,
+cheap-path hit rate, markup-validation success rate and prose-fallback rate.
+
+Latency without --latency-scale is pipeline overhead only (parsing,
+validation, reconstruction). Use --latency-scale 1.0 to sleep for each
+recorded LLM latency and see realistic end-to-end numbers under concurrency.
+
+Usage:
+    cd backend
+    source .venv/bin/activate
+    python bench_evaluator.py corpus.jsonl
+    python bench_evaluator.py corpus.jsonl --concurrency 8 --repeat 3 --latency-scale 1.0
+    python bench_evaluator.py corpus.jsonl --json
+"""
+import argparse
+import json
+import logging
+import math
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import gcse_evaluator
+import llm_replay
+
+# Paths where the LLM answered and its markup could be rendered.
+MARKUP_PATHS = ("exact", "reconstructed", "aligned", "incremental")
+# Paths where the LLM answered at all (markup or not).
+LLM_ANSWERED_PATHS = MARKUP_PATHS + ("prose_fallback",)
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already-sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _rate(n: int, d: int) -> Optional[float]:
+    return round(n / d, 4) if d else None
+
+
+def workload(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """The evaluations in the corpus that can be replayed end to end.
+
+    Incremental calls are skipped: they only make sense after the attempt's
+    previous submission, and the full submission they belong to is recorded
+    as its own evaluation anyway. Escalated calls are skipped too — they
+    replay when their first-tier evaluation escalates again.
+    """
+    items = []
+    for entry in entries:
+        evaluation = entry.get("evaluation")
+        if not evaluation or evaluation.get("incremental") or evaluation.get("escalated"):
+            continue
+        items.append({**evaluation, "model": evaluation.get("model_tiers") or entry.get("model")})
+    return items
+
+
+def _default_prompt(items: List[Dict[str, Any]]) -> Optional[tuple]:
+    """Most common recorded prompt pair, for evaluations recorded without one
+    (cheap-path hits) that no longer hit the cheap path."""
+    pairs = Counter(
+        (i["system_prompt"], i["user_template"])
+        for i in items if i.get("system_prompt") is not None
+    )
+    return pairs.most_common(1)[0][0] if pairs else None
+
+
+def run(items: List[Dict[str, Any]], *, concurrency: int, repeat: int) -> Dict[str, Any]:
+    default_prompt = _default_prompt(items)
+    work = items * repeat
+
+    def _one(item: Dict[str, Any]) -> tuple:
+        prompt = (
+            (item["system_prompt"], item["user_template"])
+            if item.get("system_prompt") is not None else default_prompt
+        )
+        t0 = time.perf_counter()
+        outcome = gcse_evaluator.evaluate_submission(
+            submission=item["submission"],
+            ai_response=item["ai_response"],
+            question=item["question"],
+            mode=item.get("mode", "free"),
+            target=item.get("target", "main"),
+            model=item.get("model"),
+            prompt=prompt,
+        )
+        return (time.perf_counter() - t0) * 1000, outcome.path
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        results = list(pool.map(_one, work))
+    wall_s = time.perf_counter() - started
+
+    latencies = sorted(ms for ms, _ in results)
+    paths = Counter(path for _, path in results)
+    answered = sum(paths[p] for p in LLM_ANSWERED_PATHS)
+    return {
+        "evaluations": len(results),
+        "concurrency": concurrency,
+        "wall_seconds": round(wall_s, 3),
+        "throughput_per_second": round(len(results) / wall_s, 2) if wall_s else None,
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 50), 2),
+            "p95": round(_percentile(latencies, 95), 2),
+            "p99": round(_percentile(latencies, 99), 2),
+            "max": round(latencies[-1], 2) if latencies else 0.0,
+        },
+        "cheap_path_rate": _rate(paths["cheap_path"], len(results)),
+        "markup_success_rate": _rate(sum(paths[p] for p in MARKUP_PATHS), answered),
+        "prose_fallback_rate": _rate(paths["prose_fallback"], answered),
+        # Replay misses surface as llm_error: the corpus has no response for
+        # the rendered prompt (usually a prompt template change since recording).
+        "paths": dict(sorted(paths.items(), key=lambda kv: str(kv[0]))),
+    }
+
+
+def _print_report(report: Dict[str, Any]) -> None:
+    def pct(v):
+        return "n/a" if v is None else f"{v * 100:.1f}%"
+
+    lat = report["latency_ms"]
+    print(f"Evaluations:          {report['evaluations']} (concurrency {report['concurrency']})")
+    print(f"Wall time:            {report['wall_seconds']}s — {report['throughput_per_second']}/s")
+    print(f"Latency p50/p95/p99:  {lat['p50']} / {lat['p95']} / {lat['p99']} ms (max {lat['max']})")
+    print(f"Cheap-path hit rate:  {pct(report['cheap_path_rate'])}")
+    print(f"Markup valid rate:    {pct(report['markup_success_rate'])} of LLM responses")
+    print(f"Prose-fallback rate:  {pct(report['prose_fallback_rate'])} of LLM responses")
+    print("Paths:")
+    for path, n in report["paths"].items():
+        print(f"  {path}: {n}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("corpus", help="JSONL corpus written via EVALUATOR_LLM_RECORD_PATH")
+    parser.add_argument("--concurrency", type=int, default=4, help="Parallel evaluations (default 4)")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the corpus this many times")
+    parser.add_argument("--latency-scale", type=float, default=0.0,
+                        help="Sleep recorded LLM latency x this factor (0 = no sleep)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show evaluator logging")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR)
+
+    entries = llm_replay.load_corpus(args.corpus)
+    items = workload(entries)
+    if not items:
+        print(f"No replayable evaluations in {args.corpus}.")
+        return 1
+
+    llm_replay.configure(
+        replayer=llm_replay.CorpusReplayer(entries, latency_scale=args.latency_scale),
+    )
+    report = run(items, concurrency=args.concurrency, repeat=max(1, args.repeat))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark quiz assembly on large synthetic topics — no DynamoDB.
+
+Compares the per-request assembly /quiz/start used before quiz_index.py
+(rebuild every card's answer list and filter it for each question) with a
+QuizIndex: its one-off build cost per content version, then the cost of
+each quiz. Also reports how alike each method's distractors are to the
+right answer (token overlap and length ratio, 0–1; higher is harder to
+guess), a rough proxy for distractor quality.
+
+Usage:
+    cd backend
+    source .venv/bin/activate
+    python bench_quiz.py
+    python bench_quiz.py --cards 500 2000 10000 --questions 20 --quizzes 200
+    python bench_quiz.py --json
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from typing import Any, Dict, List
+
+from quiz_index import QuizIndex, _tokens
+
+_WORDS = [f"term{i}" for i in range(600)]
+
+
+def synthetic_topic(n: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """Cards with a GCSE-like mix of numeric, one-word and sentence answers."""
+    cards = []
+    for i in range(n):
+        kind = rng.random()
+        if kind < 0.3:
+            back = str(rng.randint(1, 500))
+        elif kind < 0.5:
+            back = rng.choice(_WORDS)
+        else:
+            back = " ".join(rng.sample(_WORDS, rng.randint(4, 14)))
+        cards.append({"id": f"c{i}", "front": f"Question {i}", "back": back, "tag": rng.choice(["core", "higher", None])})
+    return cards
+
+
+def baseline_quiz(cards: List[Dict[str, Any]], count: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """The assembly create_quiz_session used before quiz_index.py."""
+    selected = rng.sample(cards, min(count, len(cards)))
+    other_backs = [c["back"] for c in cards]
+    questions = []
+    for card in selected:
+        distractors = [b for b in other_backs if b != card["back"]]
+        distractors = rng.sample(distractors, k=min(3, len(distractors)))
+        choices = distractors + [card["back"]]
+        rng.shuffle(choices)
+        questions.append({"id": card["id"], "choices": choices, "correctIndex": choices.index(card["back"])})
+    return questions
+
+
+def similarity(questions: List[Dict[str, Any]]) -> Dict[str, float]:
+    overlaps, ratios = [], []
+    for q in questions:
+        answer = q["choices"][q["correctIndex"]]
+        for i, choice in enumerate(q["choices"]):
+            if i == q["correctIndex"]:
+                continue
+            a, b = _tokens(answer), _tokens(choice)
+            overlaps.append(len(a & b) / (len(a | b) or 1))
+            ratios.append(min(len(answer), len(choice)) / (max(len(answer), len(choice)) or 1))
+    return {"tokenOverlap": round(statistics.mean(overlaps), 3), "lengthRatio": round(statistics.mean(ratios), 3)}
+
+
+def run(n_cards: int, *, questions: int, quizzes: int, seed: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    cards = synthetic_topic(n_cards, rng)
+
+    started = time.perf_counter()
+    baseline = [baseline_quiz(cards, questions, rng) for _ in range(quizzes)]
+    baseline_ms = (time.perf_counter() - started) * 1000 / quizzes
+
+    started = time.perf_counter()
+    index = QuizIndex(cards)
+    build_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    indexed = [index.questions(questions, rng) for _ in range(quizzes)]
+    indexed_ms = (time.perf_counter() - started) * 1000 / quizzes
+
+    return {
+        "cards": n_cards,
+        "baseline": {"msPerQuiz": round(baseline_ms, 3), **similarity([q for quiz in baseline for q in quiz])},
+        "index": {
+            "buildMs": round(build_ms, 1),
+            "msPerQuiz": round(indexed_ms, 3),
+            **similarity([q for quiz in indexed for q in quiz]),
+        },
+        "speedup": round(baseline_ms / indexed_ms, 1) if indexed_ms else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cards", type=int, nargs="+", default=[200, 2000, 10000], help="Topic sizes to try")
+    parser.add_argument("--questions", type=int, default=10, help="Questions per quiz")
+    parser.add_argument("--quizzes", type=int, default=100, help="Quizzes assembled per method and size")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = [run(n, questions=args.questions, quizzes=args.quizzes, seed=args.seed) for n in args.cards]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for r in results:
+            b, i = r["baseline"], r["index"]
+            print(f"{r['cards']:>6} cards  baseline {b['msPerQuiz']:>8.3f} ms/quiz  "
+                  f"index {i['msPerQuiz']:>7.3f} ms/quiz (build {i['buildMs']:.0f} ms, x{r['speedup']})  "
+                  f"overlap {b['tokenOverlap']:.2f} -> {i['tokenOverlap']:.2f}  "
+                  f"length {b['lengthRatio']:.2f} -> {i['lengthRatio']:.2f}")
@@ -0,0 +1,259 @@
+"""Request-scoped cancellation of LLM work when the client goes away.
+
+Routes that make LLM calls run their (blocking) body through
+`run_until_disconnect`, which executes it in a worker thread under a
+`CancelToken` while polling `request.is_disconnected()`. When the client
+disconnects the token is cancelled, which
+
+- closes every OpenAI client registered with `guard(client)` — that aborts
+  the in-flight HTTP request, the same trick the evaluator's hedger uses on
+  a losing request — and
+- makes `check()` raise `Cancelled`, so follow-up calls (the next model
+  tier, a repair or follow-up prompt) are never started.
+
+Streaming routes iterate their (blocking) generator through
+`iterate_until_disconnect`, which does the same for each step; the client
+is polled while a step is waiting on the LLM, not only when an event is
+written.
+
+Callers that should finish anyway — help generation whose result will be
+cached, so the next student asking gets it for free — pass
+cancel_on_disconnect=False; the disconnect is still counted.
+
+Counters (in `metrics`, reported by /diagnostics):
+  cancel.<what>.disconnected   client went away while the work was running
+  cancel.<what>.aborted        ...and the work was cut short
+  cancel.<what>.finished       ...and the work ran to completion anyway
+"""
+from __future__ import annotations
+
+import contextvars
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Iterator, List, Optional, TypeVar
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_POLL_SECONDS = 0.25
+
+
+class Cancelled(Exception):
+    """The request this work belongs to was cancelled (client disconnected)."""
+
+
+class CancelToken:
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self._callbacks: List[Callable[[], Any]] = []
+        self._lock = threading.Lock()
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str) -> None:
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                logger.debug("cancellation: callback failed", exc_info=True)
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise Cancelled(self.reason or "cancelled")
+
+    @contextmanager
+    def closing(self, client: Any) -> Iterator[Any]:
+        """Close `client` if the token is cancelled while the block runs."""
+        with self._lock:
+            self.raise_if_cancelled()
+            self._callbacks.append(client.close)
+        try:
+            yield client
+        finally:
+            with self._lock:
+                if client.close in self._callbacks:
+                    self._callbacks.remove(client.close)
+
+
+_current: contextvars.ContextVar[Optional[CancelToken]] = contextvars.ContextVar(
+    "cancel_token", default=None,
+)
+
+
+def current() -> Optional[CancelToken]:
+    return _current.get()
+
+
+def check() -> None:
+    """Raise Cancelled if the current request has been cancelled."""
+    token = _current.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+@contextmanager
+def guard(client: Any) -> Iterator[Any]:
+    """Tie an OpenAI client to the current request: closed on cancellation.
+
+    A no-op outside a cancellable request (scripts, tests).
+    """
+    token = _current.get()
+    if token is None:
+        yield client
+        return
+    with token.closing(client):
+        yield client
+
+
+@contextmanager
+def scope(token: CancelToken) -> Iterator[CancelToken]:
+    reset = _current.set(token)
+    try:
+        yield token
+    finally:
+        _current.reset(reset)
+
+
+async def run_until_disconnect(
+    request: Any,
+    fn: Callable[[], T],
+    *,
+    what: str,
+    cancel_on_disconnect: bool = True,
+    poll_seconds: float = DEFAULT_POLL_SECONDS,
+) -> T:
+    """Run blocking `fn` in a worker thread, cancelling it if the client leaves.
+
+    Raises Cancelled when the work was cut short — whatever exception the
+    work itself ended with (a closed-connection error from the SDK, or the
+    route's own HTTPException wrapping one) is chained as the cause.
+    """
+    import anyio
+    from starlette.concurrency import run_in_threadpool
+
+    token = CancelToken()
+    disconnected = False
+
+    def work() -> T:
+        with scope(token):
+            return fn()
+
+    async def watch() -> None:
+        nonlocal disconnected
+        while True:
+            await anyio.sleep(poll_seconds)
+            if await request.is_disconnected():
+                disconnected = True
+                metrics.incr(f"cancel.{what}.disconnected")
+                if cancel_on_disconnect:
+                    logger.info("cancellation: client disconnected, cancelling %s", what)
+                    token.cancel("client disconnected")
+                return
+
+    # Errors are caught inside the task group so they propagate unwrapped
+    # rather than as an ExceptionGroup.
+    error: Optional[Exception] = None
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(watch)
+        try:
+            result = await run_in_threadpool(work)
+        except Exception as e:
+            error = e
+        finally:
+            tg.cancel_scope.cancel()
+
+    if error is not None:
+        if token.cancelled:
+            metrics.incr(f"cancel.{what}.aborted")
+            raise Cancelled(token.reason or "cancelled") from error
+        raise error
+
+    if token.cancelled:
+        # The work finished despite the cancel (e.g. it was past its last LLM call).
+        metrics.incr(f"cancel.{what}.aborted")
+        raise Cancelled(token.reason or "cancelled")
+    if disconnected:
+        metrics.incr(f"cancel.{what}.finished")
+    return result
+
+
+async def iterate_until_disconnect(
+    request: Any,
+    iterator: Iterator[T],
+    *,
+    what: str,
+    poll_seconds: float = DEFAULT_POLL_SECONDS,
+) -> AsyncIterator[T]:
+    """Iterate blocking `iterator` in worker threads, cancelling it if the client leaves.
+
+    The streaming counterpart of `run_until_disconnect`, for
+    StreamingResponse bodies. Every step runs under one CancelToken, with
+    the client polled while it runs. After a disconnect the iteration just
+    stops: nobody is reading the response. The token is also cancelled if
+    the response is torn down early, so the upstream request never outlives it.
+    """
+    import anyio
+    from starlette.concurrency import run_in_threadpool
+
+    token = CancelToken()
+    context = contextvars.copy_context()
+    context.run(_current.set, token)
+    finished = object()
+    stepping = False
+
+    async def watch() -> None:
+        try:
+            while True:
+                await anyio.sleep(poll_seconds)
+                if await request.is_disconnected():
+                    metrics.incr(f"cancel.{what}.disconnected")
+                    logger.info("cancellation: client disconnected, cancelling %s", what)
+                    token.cancel("client disconnected")
+                    return
+        except anyio.get_cancelled_exc_class():
+            # The response itself is being torn down mid-step: the step's
+            # thread can't be interrupted, but its LLM request can.
+            if stepping:
+                token.cancel("response closed")
+            raise
+
+    try:
+        while not token.cancelled:
+            error: Optional[Exception] = None
+            item: Any = finished
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(watch)
+                stepping = True
+                try:
+                    item = await run_in_threadpool(context.run, next, iterator, finished)
+                except Exception as e:
+                    error = e
+                finally:
+                    stepping = False
+                    tg.cancel_scope.cancel()
+            if token.cancelled:
+                metrics.incr(f"cancel.{what}.aborted")
+                return
+            if error is not None:
+                raise error
+            if item is finished:
+                return
+            yield item
+    finally:
+        # Run the generator's cleanup now, not at garbage collection.
+        if hasattr(iterator, "close"):
+            with anyio.CancelScope(shield=True):
+                await run_in_threadpool(context.run, iterator.close)
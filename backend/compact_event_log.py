@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Compact existing StepEvent items into per-attempt event-log chunks.
+
+With STEP_EVENT_STORAGE=log new events are appended to StepEventLog chunk
+items (PK ATTEMPT#<id>, SK EVENTLOG#<nnnnn>) instead of one item per
+event. Attempts recorded before the switch still have their EVENT# items;
+reads merge both layouts, so this can run at any time, in the background.
+For each attempt it appends the standalone events to the log, then deletes
+them. An interrupted run leaves duplicates that reads collapse, and
+re-running finishes the job.
+
+Usage:
+    cd backend
+    source .venv/bin/activate
+    python compact_event_log.py --dry-run          # report only
+    python compact_event_log.py                    # compact every attempt
+    python compact_event_log.py --attempt <id>     # compact one attempt
+"""
+import argparse
+from collections import Counter
+
+from boto3.dynamodb.conditions import Attr
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import db  # noqa: E402
+
+
+def _attempts_with_events(table):
+    """Count standalone StepEvent items per attempt id."""
+    counts = Counter()
+    kwargs = {
+        "FilterExpression": Attr("Type").eq("StepEvent"),
+        "ProjectionExpression": "attempt_id",
+    }
+    while True:
+        resp = table.scan(**kwargs)
+        counts.update(item["attempt_id"] for item in resp.get("Items", []))
+        if "LastEvaluatedKey" not in resp:
+            return counts
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+
+def compact(table, *, dry_run: bool, attempt_id: str = None) -> None:
+    counts = Counter({attempt_id: 0}) if attempt_id else _attempts_with_events(table)
+    moved = 0
+    for aid, n in counts.items():
+        if dry_run:
+            moved += n
+            continue
+        moved += db.compact_step_events(aid)
+    verb = "Would move" if dry_run else "Moved"
+    print(f"{verb} {moved} events into the event log for {len(counts)} attempts.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    parser.add_argument("--attempt", help="Compact only this attempt id")
+    args = parser.parse_args()
+    compact(db.table(), dry_run=args.dry_run, attempt_id=args.attempt)
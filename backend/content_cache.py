@@ -0,0 +1,151 @@
+"""In-memory cache for seeded revision content (topics and cards).
+
+/subjects, /topics/{id}/cards and /quiz/start each ran full paginated GSI1
+queries on every request, for content that only changes when
+seed/load_seed.py runs. The seeder now finishes by writing a version stamp
+(PK CONTENT, SK VERSION); this cache keeps the grouped topic list and each
+topic's cards per worker, and re-reads the stamp at most every
+CONTENT_CACHE_CHECK_SECONDS (default 30). A new stamp drops everything, so
+a re-seed is picked up within that interval without restarting workers.
+
+It also holds each topic's QuizIndex (quiz_index.py), built from the
+cached cards, for /quiz/start. Each served entry carries a strong ETag — a
+hash of its content, so every worker agrees on it and an unchanged re-seed
+keeps clients' copies valid — which the routes use to answer
+If-None-Match with 304 Not Modified.
+
+Empty results (an unknown topic id) are not cached. Values are shared
+between requests and must not be mutated. Hits, misses and refreshes are
+counted in `metrics` under content_cache.*.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+import metrics
+
+
+class Content(NamedTuple):
+    value: Any
+    etag: str
+
+
+def etag_for(value: Any) -> str:
+    body = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return '"%s"' % hashlib.sha256(body.encode("utf-8")).hexdigest()[:32]
+
+
+class ContentCache:
+    def __init__(self, *, check_seconds: float):
+        self.check_seconds = check_seconds
+        self._version: Optional[str] = None
+        self._checked_at: Optional[float] = None
+        self._entries: Dict[Tuple[str, ...], Content] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, ...], load: Callable[[], Any],
+            load_version: Callable[[], Optional[str]], *, tagged: bool = True) -> Content:
+        """Return the cached entry for key, else `load()` it. Untagged
+        entries (not served to clients) get an empty ETag."""
+        if self._due():
+            self._observe(load_version())
+        entry = self._lookup(key)
+        if entry is None:
+            entry = self._store(key, load(), tagged)
+        return entry
+
+    async def aget(self, key: Tuple[str, ...], load: Callable[[], Awaitable[Any]],
+                   load_version: Callable[[], Awaitable[Optional[str]]], *, tagged: bool = True) -> Content:
+        """`get` for async loaders (db_async)."""
+        if self._due():
+            self._observe(await load_version())
+        entry = self._lookup(key)
+        if entry is None:
+            entry = self._store(key, await load(), tagged)
+        return entry
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._version
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._checked_at = None
+
+    def _due(self) -> bool:
+        checked_at = self._checked_at
+        return checked_at is None or time.monotonic() - checked_at >= self.check_seconds
+
+    def _observe(self, version: Optional[str]) -> None:
+        with self._lock:
+            if version != self._version:
+                if self._checked_at is not None:
+                    metrics.incr("content_cache.refresh")
+                self._entries.clear()
+                self._version = version
+            self._checked_at = time.monotonic()
+
+    def _lookup(self, key: Tuple[str, ...]) -> Optional[Content]:
+        with self._lock:
+            entry = self._entries.get(key)
+        metrics.incr("content_cache.hit" if entry is not None else "content_cache.miss")
+        return entry
+
+    def _store(self, key: Tuple[str, ...], value: Any, tagged: bool) -> Content:
+        entry = Content(value, etag_for(value) if tagged else "")
+        if value:
+            with self._lock:
+                self._entries[key] = entry
+        return entry
+
+
+_cache: Optional[ContentCache] = None
+_cache_lock = threading.Lock()
+
+
+def cache() -> ContentCache:
+    """Return the process-wide cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ContentCache(check_seconds=float(os.getenv("CONTENT_CACHE_CHECK_SECONDS", "30")))
+    return _cache
+
+
+def subjects() -> Content:
+    """db.list_topics_grouped, cached."""
+    import db
+    return cache().get(("subjects",), db.list_topics_grouped, db.get_content_version)
+
+
+def cards(topic_id: str) -> Content:
+    """db.list_cards_for_topic, cached."""
+    import db
+    return cache().get(("cards", topic_id), lambda: db.list_cards_for_topic(topic_id), db.get_content_version)
+
+
+async def acards(topic_id: str) -> Content:
+    """db_async.list_cards_for_topic, cached (shares entries with `cards`)."""
+    import db_async
+    return await cache().aget(
+        ("cards", topic_id), lambda: db_async.list_cards_for_topic(topic_id), db_async.get_content_version,
+    )
+
+
+async def aquiz_index(topic_id: str) -> Content:
+    """The topic's QuizIndex, built from `acards` once per content version."""
+    import anyio
+    import db_async
+    from quiz_index import QuizIndex
+
+    async def load() -> QuizIndex:
+        cards = (await acards(topic_id)).value
+        return await anyio.to_thread.run_sync(QuizIndex, cards)
+    return await cache().aget(("quiz", topic_id), load, db_async.get_content_version, tagged=False)
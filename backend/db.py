@@ -1,28 +1,176 @@
+"""DynamoDB (single-table) and S3 access for the backend.
+
+The boto3 resource, table and S3 client are created on first use rather
+than at import, with an explicit botocore config: a connection pool sized
+to the request threadpool (DB_MAX_POOL_CONNECTIONS, default 40 — anyio's
+default thread limit, which is what FastAPI runs sync routes on), TCP
+keepalive, adaptive retries (DB_MAX_ATTEMPTS) and connect/read timeouts
+(DB_CONNECT_TIMEOUT_SECONDS / DB_READ_TIMEOUT_SECONDS).
+
+Every AWS call is timed: per-operation latency goes to `metrics` as
+db.<Operation> (errors as the db.<Operation>.error counter), and `stats()`
+reports calls in flight against the pool size for /diagnostics.
+"""
 import base64
+import logging
 import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone, timedelta
 from decimal import Decimal
-from typing import Any, List, Dict, Optional
+from typing import Any, Callable, List, Dict, Optional, Tuple
 from uuid import uuid4
 
 import boto3
 from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import ClientError
+
+import metrics
+import problem_cache
+import srs
+
+logger = logging.getLogger(__name__)
 
 AWS_REGION = os.getenv("AWS_REGION") or "eu-west-1"
 TABLE_NAME = os.getenv("DYNAMODB_TABLE_NAME", "gcse_app")
 ENDPOINT_URL = os.getenv("DYNAMODB_ENDPOINT_URL")  # optional local endpoint
 S3_IMAGES_BUCKET = os.getenv("S3_IMAGES_BUCKET")
 
-_dynamodb = boto3.resource("dynamodb", region_name=AWS_REGION, endpoint_url=ENDPOINT_URL)
-_table = _dynamodb.Table(TABLE_NAME)
-_s3 = boto3.client("s3", region_name=AWS_REGION) if S3_IMAGES_BUCKET else None
-
 GSI1_NAME = os.getenv("DYNAMODB_GSI1", "GSI1")
 GSI2_NAME = os.getenv("DYNAMODB_GSI2", "GSI2")
 
+MAX_POOL_CONNECTIONS = int(os.getenv("DB_MAX_POOL_CONNECTIONS", "40"))
+MAX_ATTEMPTS = int(os.getenv("DB_MAX_ATTEMPTS", "3"))
+CONNECT_TIMEOUT_SECONDS = float(os.getenv("DB_CONNECT_TIMEOUT_SECONDS", "2"))
+READ_TIMEOUT_SECONDS = float(os.getenv("DB_READ_TIMEOUT_SECONDS", "5"))
+# Keys/items a batch call leaves unprocessed are retried with exponential
+# backoff, as event_buffer does, for at most DB_BATCH_MAX_ATTEMPTS calls.
+BATCH_MAX_ATTEMPTS = int(os.getenv("DB_BATCH_MAX_ATTEMPTS", "5"))
+BATCH_BACKOFF_SECONDS = float(os.getenv("DB_BATCH_BACKOFF_SECONDS", "0.05"))
+
+
+def _batch_backoff(attempt: int) -> float:
+    """Seconds to wait before retry number `attempt` (1-based) of a batch call."""
+    return min(BATCH_BACKOFF_SECONDS * 2 ** (attempt - 1), 2.0)
+
+
+# ── Connections ───────────────────────────────────────────────────────────
+
+def _client_config_kwargs() -> Dict[str, Any]:
+    return {
+        "max_pool_connections": MAX_POOL_CONNECTIONS,
+        "tcp_keepalive": True,
+        "retries": {"mode": "adaptive", "max_attempts": MAX_ATTEMPTS},
+        "connect_timeout": CONNECT_TIMEOUT_SECONDS,
+        "read_timeout": READ_TIMEOUT_SECONDS,
+    }
+
+
+def _botocore_config():
+    from botocore.config import Config
+
+    return Config(**_client_config_kwargs())
+
+
+class _CallStats:
+    """Calls in flight (vs. the pool size) and per-operation latency, fed by
+    botocore's before-call / after-call events."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def attach(self, client) -> None:
+        events = client.meta.events
+        events.register_first("before-call.*.*", self._before)
+        events.register("after-call.*.*", self._after)
+        events.register("after-call-error.*.*", self._after_error)
+
+    def _before(self, model=None, context=None, **_kwargs) -> None:
+        if context is None or model is None:
+            return
+        context["db_stats"] = (model.name, time.perf_counter())
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _finish(self, context: Optional[dict], *, failed: bool) -> None:
+        started = (context or {}).pop("db_stats", None)
+        if started is None:
+            return
+        op, t0 = started
+        with self._lock:
+            self.in_flight -= 1
+        metrics.observe(f"db.{op}", (time.perf_counter() - t0) * 1000)
+        if failed:
+            metrics.incr(f"db.{op}.error")
+
+    def _after(self, http_response=None, context=None, **_kwargs) -> None:
+        failed = http_response is not None and http_response.status_code >= 300
+        self._finish(context, failed=failed)
+
+    def _after_error(self, context=None, **_kwargs) -> None:
+        self._finish(context, failed=True)
+
+
+_stats = _CallStats()
+_init_lock = threading.Lock()
+_clients: Dict[str, Any] = {}
+
+
+def _connect() -> Dict[str, Any]:
+    if not _clients:
+        with _init_lock:
+            if not _clients:
+                config = _botocore_config()
+                dynamodb = boto3.resource(
+                    "dynamodb", region_name=AWS_REGION, endpoint_url=ENDPOINT_URL, config=config,
+                )
+                _stats.attach(dynamodb.meta.client)
+                built: Dict[str, Any] = {"dynamodb": dynamodb, "table": dynamodb.Table(TABLE_NAME)}
+                if S3_IMAGES_BUCKET:
+                    s3 = boto3.client("s3", region_name=AWS_REGION, config=config)
+                    _stats.attach(s3)
+                    built["s3"] = s3
+                _clients.update(built)
+    return _clients
+
+
+class _Lazy:
+    """Stands in for a boto3 object until it is first used."""
+
+    def __init__(self, resolve: Callable[[], Any]):
+        self._resolve = resolve
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._resolve(), name)
+
+
+_dynamodb = _Lazy(lambda: _connect()["dynamodb"])
+_table = _Lazy(lambda: _connect()["table"])
+_s3 = _Lazy(lambda: _connect()["s3"]) if S3_IMAGES_BUCKET else None
+
 
 def table():
-    return _table
+    return _connect()["table"]
+
+
+def stats() -> dict:
+    """Pool utilisation and per-operation latency for this worker."""
+    snapshot = metrics.snapshot()
+    return {
+        "pool": {
+            "maxConnections": MAX_POOL_CONNECTIONS,
+            "inFlight": _stats.in_flight,
+            "peakInFlight": _stats.peak_in_flight,
+            "utilisation": round(_stats.in_flight / MAX_POOL_CONNECTIONS, 3) if MAX_POOL_CONNECTIONS else None,
+        },
+        "latencyMs": {k[3:]: v for k, v in snapshot["latencyMs"].items() if k.startswith("db.")},
+        "errors": {k[3:-6]: v for k, v in snapshot["counters"].items() if k.startswith("db.") and k.endswith(".error")},
+    }
 
 
 def now_iso() -> str:
@@ -92,11 +240,27 @@ def list_topics_grouped() -> List[dict]:
     return out
 
 
+# Written by seed/load_seed.py after every load; content_cache refreshes on change.
+_CONTENT_VERSION_KEY = {"PK": "CONTENT", "SK": "VERSION"}
+
+
+def get_content_version() -> str | None:
+    item = _table.get_item(Key=_CONTENT_VERSION_KEY).get("Item")
+    return item.get("versionId") if item else None
+
+
+def _cards_query(topic_id: str) -> Dict[str, Any]:
+    return {
+        "IndexName": GSI1_NAME,
+        "KeyConditionExpression": Key("GSI1PK").eq(f"TOPIC#{topic_id}") & Key("GSI1SK").begins_with("CARD#"),
+    }
+
+
 def list_cards_for_topic(topic_id: str) -> List[dict]:
-    items = _query_all(
-        IndexName=GSI1_NAME,
-        KeyConditionExpression=Key("GSI1PK").eq(f"TOPIC#{topic_id}") & Key("GSI1SK").begins_with("CARD#")
-    )
+    return _cards_from_items(_query_all(**_cards_query(topic_id)))
+
+
+def _cards_from_items(items: List[dict]) -> List[dict]:
     cards: List[dict] = []
     for it in items:
         if it.get("Type") != "RevCard":
@@ -112,8 +276,22 @@ def list_cards_for_topic(topic_id: str) -> List[dict]:
 
 
 # Quiz sessions/results
+#
+# Sessions carry expiresAt (epoch seconds) for DynamoDB TTL — enable it with
+# db_enable_ttl.py. TTL deletes lag, so reads also treat expired items as gone.
+QUIZ_SESSION_TTL_SECONDS = int(os.getenv("QUIZ_SESSION_TTL_SECONDS", "86400"))
+
+
 def save_quiz_session(uid: str, quiz_id: str, topic_id: str, questions: List[dict]) -> None:
-    _table.put_item(Item={
+    _table.put_item(Item=_quiz_session_item(uid, quiz_id, topic_id, questions))
+
+
+def _quiz_session_key(uid: str, quiz_id: str) -> Dict[str, str]:
+    return {"PK": f"USER#{uid}", "SK": f"QUIZ#{quiz_id}#SESSION"}
+
+
+def _quiz_session_item(uid: str, quiz_id: str, topic_id: str, questions: List[dict]) -> dict:
+    return {
         "PK": f"USER#{uid}",
         "SK": f"QUIZ#{quiz_id}#SESSION",
         "Type": "QuizSession",
@@ -122,21 +300,45 @@ def save_quiz_session(uid: str, quiz_id: str, topic_id: str, questions: List[dic
         "questions": questions,
         "GSI1PK": f"QUIZ#{quiz_id}",
         "GSI1SK": f"USER#{uid}",
-    })
+        "expiresAt": int(time.time()) + QUIZ_SESSION_TTL_SECONDS,
+    }
+
+
+def _live_quiz_session(item: dict | None) -> dict | None:
+    """None for a missing session or one past expiresAt (older sessions have none)."""
+    if item is None:
+        return None
+    expires_at = item.get("expiresAt")
+    if expires_at is not None and int(expires_at) <= time.time():
+        return None
+    return item
 
 
 def get_quiz_session(uid: str, quiz_id: str) -> dict | None:
-    r = _table.get_item(Key={"PK": f"USER#{uid}", "SK": f"QUIZ#{quiz_id}#SESSION"})
-    return r.get("Item")
+    r = _table.get_item(Key=_quiz_session_key(uid, quiz_id))
+    return _live_quiz_session(r.get("Item"))
 
 
 def delete_quiz_session(uid: str, quiz_id: str) -> None:
-    _table.delete_item(Key={"PK": f"USER#{uid}", "SK": f"QUIZ#{quiz_id}#SESSION"})
+    _table.delete_item(Key=_quiz_session_key(uid, quiz_id))
 
 
 def save_quiz_result(uid: str, quiz_id: str, topic_id: str,
-                     breakdown: List[dict], score: int, answers: List[dict]) -> None:
-    _table.put_item(Item={
+                     breakdown: List[dict], score: int, answers: List[dict]) -> bool:
+    """Record a graded quiz once; False if the quiz already has a result."""
+    try:
+        _table.put_item(Item=_quiz_result_item(uid, quiz_id, topic_id, breakdown, score, answers),
+                        ConditionExpression="attribute_not_exists(PK)")
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+            raise
+        return False
+    return True
+
+
+def _quiz_result_item(uid: str, quiz_id: str, topic_id: str,
+                      breakdown: List[dict], score: int, answers: List[dict]) -> dict:
+    return {
         "PK": f"USER#{uid}",
         "SK": f"QUIZ#{quiz_id}",
         "Type": "QuizResult",
@@ -147,26 +349,68 @@ def save_quiz_result(uid: str, quiz_id: str, topic_id: str,
         "answers": answers,
         "GSI1PK": f"QUIZ#{quiz_id}",
         "GSI1SK": f"USER#{uid}",
-    })
+    }
 
 
-def recent_wrong_cards(uid: str, limit_results: int = 10) -> Dict[str, set]:
-    resp = _table.query(
-        KeyConditionExpression=Key("PK").eq(f"USER#{uid}") & Key("SK").begins_with("QUIZ#"),
-        ScanIndexForward=False,
-        Limit=limit_results,
-    )
-    topic_to_cards: Dict[str, set] = {}
-    for it in resp.get("Items", []):
-        if it.get("Type") != "QuizResult":
-            continue
-        topic_id = it.get("topicId")
-        for b in it.get("breakdown", []):
-            if not b.get("correct"):
-                qid = b.get("questionId")
-                if topic_id and qid:
-                    topic_to_cards.setdefault(topic_id, set()).add(qid)
-    return topic_to_cards
+# Card review state (spaced repetition; scheduling in srs.py)
+#
+# PK USER#<uid>, SK SRS#<topicId>#<cardId>, Type CardReview. GSI1 indexes
+# them by due date — GSI1PK SRS_DUE#<uid>, GSI1SK <dueAt>#<topicId>#<cardId>
+# — so a user's due cards are one bounded range query, most overdue first.
+# backfill_review_state.py builds the state from existing quiz results.
+
+def _card_review_key(uid: str, topic_id: str, card_id: str) -> Dict[str, str]:
+    return {"PK": f"USER#{uid}", "SK": f"SRS#{topic_id}#{card_id}"}
+
+
+def _card_review_item(uid: str, topic_id: str, card_id: str, state: Dict[str, Any]) -> dict:
+    return {
+        **_card_review_key(uid, topic_id, card_id),
+        "Type": "CardReview",
+        "topicId": topic_id,
+        "cardId": card_id,
+        **state,
+        "ease": Decimal(str(state["ease"])),
+        "GSI1PK": f"SRS_DUE#{uid}",
+        "GSI1SK": f"{state['dueAt']}#{topic_id}#{card_id}",
+    }
+
+
+def _card_review_updates(uid: str, topic_id: str, breakdown: List[dict],
+                         previous: List[dict], now: datetime) -> List[dict]:
+    """CardReview items after a graded quiz. `previous` holds whatever
+    CardReview items already exist for its cards."""
+    states = {it["cardId"]: it for it in previous}
+    for b in breakdown:
+        card_id = b["questionId"]
+        states[card_id] = srs.schedule(states.get(card_id), bool(b["correct"]), now)
+    return [_card_review_item(uid, topic_id, card_id, states[card_id])
+            for card_id in dict.fromkeys(b["questionId"] for b in breakdown)]
+
+
+def _due_cards_query(uid: str, now: datetime, limit: int) -> Dict[str, Any]:
+    return {
+        "IndexName": GSI1_NAME,
+        # '~' sorts after '#', so everything due up to and including now
+        "KeyConditionExpression": Key("GSI1PK").eq(f"SRS_DUE#{uid}") & Key("GSI1SK").lte(f"{srs.format_due(now)}~"),
+        "ScanIndexForward": True,
+        "Limit": limit,
+    }
+
+
+def _due_groups(items: List[dict]) -> Dict[str, List[str]]:
+    groups: Dict[str, List[str]] = {}
+    for it in items:
+        if it.get("Type") == "CardReview":
+            groups.setdefault(it["topicId"], []).append(it["cardId"])
+    return groups
+
+
+def due_cards(uid: str, *, limit: int = 50, now: Optional[datetime] = None) -> Dict[str, List[str]]:
+    """{topicId: [cardId, ...]} for up to `limit` cards due now, most overdue first."""
+    resp = _table.query(**_due_cards_query(uid, now or datetime.now(timezone.utc), limit))
+    return _due_groups(resp.get("Items", []))
+
 
 # Prompts
 KNOWN_PROMPT_IDS = ["ingestion", "similar", "score", "classify", "evaluation"]
@@ -182,16 +426,116 @@ def get_prompt_active(prompt_id: str) -> dict | None:
     return r.get("Item")
 
 
+def get_prompt_active_versions(prompt_ids: List[str]) -> Dict[str, int]:
+    """Return {prompt_id: active version} for every seeded prompt in one round trip.
+
+    Projects only the key and version so the prompt registry's poll stays a
+    single small `batch_get_item`. Prompts without an ACTIVE pointer are
+    simply absent from the result, as are any whose keys DynamoDB still
+    left unprocessed after BATCH_MAX_ATTEMPTS calls (logged); callers then
+    fall back to their built-in prompt and count it.
+    """
+    request: Dict[str, Any] = {
+        TABLE_NAME: {
+            "Keys": [{"PK": f"PROMPT#{pid}", "SK": "ACTIVE"} for pid in prompt_ids],
+            "ProjectionExpression": "#pk, #v",
+            "ExpressionAttributeNames": {"#pk": "PK", "#v": "version"},
+        }
+    }
+    out: Dict[str, int] = {}
+    for attempt in range(BATCH_MAX_ATTEMPTS):
+        if attempt:
+            time.sleep(_batch_backoff(attempt))
+        resp = _dynamodb.batch_get_item(RequestItems=request)
+        for it in resp.get("Responses", {}).get(TABLE_NAME, []):
+            out[it["PK"].split("#", 1)[-1]] = int(it["version"])
+        request = resp.get("UnprocessedKeys") or {}
+        if not request:
+            break
+    else:
+        logger.warning(
+            "get_prompt_active_versions: %d keys still unprocessed after %d attempts",
+            len(request[TABLE_NAME]["Keys"]), BATCH_MAX_ATTEMPTS,
+        )
+    return out
+
+
 def get_prompt_version(prompt_id: str, version: int) -> dict | None:
     r = _table.get_item(Key={"PK": f"PROMPT#{prompt_id}", "SK": _prompt_version_sk(version)})
     return r.get("Item")
 
 
-def list_prompt_versions(prompt_id: str) -> list[dict]:
-    items = _query_all(
-        KeyConditionExpression=Key("PK").eq(f"PROMPT#{prompt_id}") & Key("SK").begins_with("VERSION#")
+# Version numbers come from a counter item (SK COUNTER, latestVersion)
+# bumped with an atomic ADD, and each record is written only if its SK is
+# free, so concurrent saves can't overwrite each other. Prompts saved
+# before the counter existed have none: the first conditional put then
+# fails, _sync_prompt_counter catches the counter up and the save retries.
+_PROMPT_VERSION_WRITE_ATTEMPTS = 5
+_PROMPT_VERSION_SUMMARY_FIELDS = "promptId, #v, createdAt, createdBy, notes"
+
+
+def _prompt_counter_key(prompt_id: str) -> Dict[str, str]:
+    return {"PK": f"PROMPT#{prompt_id}", "SK": "COUNTER"}
+
+
+def latest_prompt_version(prompt_id: str) -> int:
+    """Highest stored version number (0 if none), from one keys-only item."""
+    resp = _table.query(
+        KeyConditionExpression=Key("PK").eq(f"PROMPT#{prompt_id}") & Key("SK").begins_with("VERSION#"),
+        ScanIndexForward=False,
+        Limit=1,
+        ProjectionExpression="SK",
+    )
+    items = resp.get("Items", [])
+    return int(items[0]["SK"].split("#", 1)[1]) if items else 0
+
+
+def list_prompt_versions(
+    prompt_id: str, *, limit: int = 20, before: Optional[int] = None,
+) -> Tuple[List[dict], Optional[int]]:
+    """One page of version metadata, newest first, without the prompt text
+    (get_prompt_version has that). Returns (items, cursor); pass the cursor
+    as `before` for the next page. It is None on the last page."""
+    sk = Key("SK").begins_with("VERSION#")
+    if before is not None:
+        sk = Key("SK").between(_prompt_version_sk(0), _prompt_version_sk(before - 1))
+    resp = _table.query(
+        KeyConditionExpression=Key("PK").eq(f"PROMPT#{prompt_id}") & sk,
+        ScanIndexForward=False,
+        Limit=limit,
+        ProjectionExpression=_PROMPT_VERSION_SUMMARY_FIELDS,
+        ExpressionAttributeNames={"#v": "version"},
+    )
+    items = resp.get("Items", [])
+    cursor = int(items[-1]["version"]) if items and "LastEvaluatedKey" in resp else None
+    return items, cursor
+
+
+def _allocate_prompt_version(prompt_id: str) -> int:
+    r = _table.update_item(
+        Key=_prompt_counter_key(prompt_id),
+        UpdateExpression="SET #type = :type, promptId = :pid ADD latestVersion :one",
+        ExpressionAttributeNames={"#type": "Type"},
+        ExpressionAttributeValues={":type": "PromptCounter", ":pid": prompt_id, ":one": 1},
+        ReturnValues="UPDATED_NEW",
     )
-    return sorted(items, key=lambda x: x["SK"])
+    return int(r["Attributes"]["latestVersion"])
+
+
+def _sync_prompt_counter(prompt_id: str) -> None:
+    """Raise the counter to the highest stored version, never lower it."""
+    latest = latest_prompt_version(prompt_id)
+    try:
+        _table.update_item(
+            Key=_prompt_counter_key(prompt_id),
+            UpdateExpression="SET #type = :type, promptId = :pid, latestVersion = :v",
+            ConditionExpression="attribute_not_exists(latestVersion) OR latestVersion < :v",
+            ExpressionAttributeNames={"#type": "Type"},
+            ExpressionAttributeValues={":type": "PromptCounter", ":pid": prompt_id, ":v": latest},
+        )
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+            raise
 
 
 def put_prompt_version(
@@ -204,21 +548,32 @@ def put_prompt_version(
     activate: bool = True,
 ) -> int:
     """Write a new version record and optionally set it as active. Returns the new version number."""
-    existing = list_prompt_versions(prompt_id)
-    new_version = len(existing) + 1
+    for _ in range(_PROMPT_VERSION_WRITE_ATTEMPTS):
+        new_version = _allocate_prompt_version(prompt_id)
+        try:
+            _table.put_item(
+                Item={
+                    "PK": f"PROMPT#{prompt_id}",
+                    "SK": _prompt_version_sk(new_version),
+                    "Type": "PromptVersion",
+                    "promptId": prompt_id,
+                    "version": new_version,
+                    "systemPrompt": system_prompt,
+                    "userPromptTemplate": user_prompt_template,
+                    "createdAt": now_iso(),
+                    "createdBy": created_by,
+                    "notes": notes,
+                },
+                ConditionExpression="attribute_not_exists(PK)",
+            )
+            break
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+                raise
+            _sync_prompt_counter(prompt_id)
+    else:
+        raise RuntimeError(f"Could not allocate a version for prompt {prompt_id!r}")
 
-    _table.put_item(Item={
-        "PK": f"PROMPT#{prompt_id}",
-        "SK": _prompt_version_sk(new_version),
-        "Type": "PromptVersion",
-        "promptId": prompt_id,
-        "version": new_version,
-        "systemPrompt": system_prompt,
-        "userPromptTemplate": user_prompt_template,
-        "createdAt": now_iso(),
-        "createdBy": created_by,
-        "notes": notes,
-    })
     if activate:
         _table.put_item(Item={
             "PK": f"PROMPT#{prompt_id}",
@@ -246,8 +601,13 @@ def list_prompts() -> list[dict]:
 
 # Progress helpers
 def save_progress(user_id: str, item: dict) -> dict:
-    import time as _time
-    now = int(_time.time())
+    put = _progress_item(user_id, item)
+    _table.put_item(Item=put)
+    return put
+
+
+def _progress_item(user_id: str, item: dict) -> dict:
+    now = int(time.time())
     pk = f"USER#{user_id}"
     sk = f"PROGRESS#{item['topicId']}#{item['exerciseId']}"
     put = {
@@ -263,23 +623,18 @@ def save_progress(user_id: str, item: dict) -> dict:
         "GSI1PK": f"PROGRESS#{item['topicId']}",
         "GSI1SK": now,
     }
-    _table.put_item(Item=put)
     return put
 
 def get_progress(user_id: str, topic_id: str | None = None) -> list[dict]:
-    pk = f"USER#{user_id}"
-    if topic_id:
-        prefix = f"PROGRESS#{topic_id}#"
-        resp = _table.query(
-            KeyConditionExpression=Key("PK").eq(pk) & Key("SK").begins_with(prefix)
-        )
-    else:
-        resp = _table.query(
-            KeyConditionExpression=Key("PK").eq(pk) & Key("SK").begins_with("PROGRESS#")
-        )
+    resp = _table.query(**_progress_query(user_id, topic_id))
     return resp.get("Items", [])
 
 
+def _progress_query(user_id: str, topic_id: str | None) -> Dict[str, Any]:
+    prefix = f"PROGRESS#{topic_id}#" if topic_id else "PROGRESS#"
+    return {"KeyConditionExpression": Key("PK").eq(f"USER#{user_id}") & Key("SK").begins_with(prefix)}
+
+
 # ── Utility ───────────────────────────────────────────────────────────────
 
 def _floats_to_decimal(obj: Any) -> Any:
@@ -299,29 +654,44 @@ def upload_problem_image(problem_id: str, data_url: str) -> Optional[str]:
     """Upload a base64 Data URL image to S3. Returns the S3 key, or None if S3 is not configured."""
     if not _s3 or not S3_IMAGES_BUCKET:
         return None
+    put = _problem_image_object(problem_id, data_url)
+    _s3.put_object(**put)
+    return put["Key"]
+
+
+def delete_problem_image(s3_key: str) -> None:
+    """Remove an uploaded image whose problem was never stored."""
+    if _s3 and S3_IMAGES_BUCKET:
+        _s3.delete_object(Bucket=S3_IMAGES_BUCKET, Key=s3_key)
+
+
+def _problem_image_object(problem_id: str, data_url: str) -> Dict[str, Any]:
+    """put_object arguments for a base64 Data URL image."""
     if "," in data_url:
         header, b64 = data_url.split(",", 1)
         mime = header.split(":")[1].split(";")[0] if ":" in header else "image/png"
     else:
         b64, mime = data_url, "image/png"
     ext = mime.split("/")[-1] if "/" in mime else "png"
-    key = f"problem-images/{problem_id}.{ext}"
-    _s3.put_object(
-        Bucket=S3_IMAGES_BUCKET,
-        Key=key,
-        Body=base64.b64decode(b64),
-        ContentType=mime,
-    )
-    return key
+    return {
+        "Bucket": S3_IMAGES_BUCKET,
+        "Key": f"problem-images/{problem_id}.{ext}",
+        "Body": base64.b64decode(b64),
+        "ContentType": mime,
+    }
+
+
+def _problem_image_url_params(s3_key: str, expires_in: int) -> Dict[str, Any]:
+    return {
+        "ClientMethod": "get_object",
+        "Params": {"Bucket": S3_IMAGES_BUCKET, "Key": s3_key},
+        "ExpiresIn": expires_in,
+    }
 
 
 def get_problem_image_url(s3_key: str, expires_in: int = 3600) -> str:
     """Generate a presigned URL for a stored problem image."""
-    return _s3.generate_presigned_url(
-        "get_object",
-        Params={"Bucket": S3_IMAGES_BUCKET, "Key": s3_key},
-        ExpiresIn=expires_in,
-    )
+    return _s3.generate_presigned_url(**_problem_image_url_params(s3_key, expires_in))
 
 
 # ── Problems ──────────────────────────────────────────────────────────────
@@ -336,7 +706,32 @@ def put_problem(
     difficulty: int,
     ai_response: dict,
     image_s3_key: Optional[str] = None,
+    eval_projection: Optional[dict] = None,
 ) -> dict:
+    """Store a problem. `eval_projection` (gcse_evaluator.evaluation_projection)
+    is written alongside as the problem's EVAL item — see get_problem_projection."""
+    item = _problem_item(
+        problem_id=problem_id, user_id=user_id, raw_input=raw_input, normalised_form=normalised_form,
+        topic_tags=topic_tags, difficulty=difficulty, ai_response=ai_response, image_s3_key=image_s3_key,
+    )
+    _table.put_item(Item=item)
+    problem_cache.cache().put(problem_id, "METADATA", item)
+    if eval_projection is not None:
+        put_problem_projection(problem_id, eval_projection)
+    return item
+
+
+def _problem_item(
+    *,
+    problem_id: str,
+    user_id: str,
+    raw_input: str,
+    normalised_form: str,
+    topic_tags: List[str],
+    difficulty: int,
+    ai_response: dict,
+    image_s3_key: Optional[str],
+) -> Dict[str, Any]:
     item: Dict[str, Any] = {
         "PK": f"PROBLEM#{problem_id}",
         "SK": "METADATA",
@@ -355,18 +750,127 @@ def put_problem(
     }
     if image_s3_key:
         item["image_s3_key"] = image_s3_key
-    _table.put_item(Item=item)
     return item
 
 
+def create_problem_with_attempt(
+    *,
+    problem_id: str,
+    attempt_id: str,
+    user_id: str,
+    raw_input: str,
+    normalised_form: str,
+    topic_tags: List[str],
+    difficulty: int,
+    ai_response: dict,
+    eval_projection: dict,
+    image_s3_key: Optional[str] = None,
+    defer: Optional[Callable[[Callable[[], None]], Any]] = None,
+) -> dict:
+    """Store a new problem, its EVAL projection and the student's first
+    attempt in one TransactWriteItems — all three or none, in one round trip.
+
+    The problem cache is warmed before the write, so this worker can serve
+    the problem straight away. With `defer` (e.g. BackgroundTasks.add_task)
+    the write itself is handed over to run later; if it then fails, the
+    cached entries are dropped again and the failure is logged and counted
+    (db.create_problem.deferred_failed). Returns the problem item.
+    """
+    problem = _problem_item(
+        problem_id=problem_id, user_id=user_id, raw_input=raw_input, normalised_form=normalised_form,
+        topic_tags=topic_tags, difficulty=difficulty, ai_response=ai_response, image_s3_key=image_s3_key,
+    )
+    projection = _problem_projection_item(problem_id, eval_projection)
+    attempt = _attempt_item(attempt_id=attempt_id, problem_id=problem_id, user_id=user_id)
+    cache = problem_cache.cache()
+    cache.put(problem_id, "METADATA", problem)
+    cache.put(problem_id, "EVAL", projection["projection"])
+
+    def write() -> None:
+        serialize = TypeSerializer().serialize
+        _dynamodb.meta.client.transact_write_items(TransactItems=[
+            {"Put": {
+                "TableName": TABLE_NAME,
+                "Item": {k: serialize(v) for k, v in item.items()},
+                "ConditionExpression": "attribute_not_exists(PK)",
+            }}
+            for item in (problem, projection, attempt)
+        ])
+
+    if defer is None:
+        try:
+            write()
+        except Exception:
+            cache.invalidate(problem_id)
+            raise
+        return problem
+
+    def deferred_write() -> None:
+        try:
+            write()
+        except Exception:
+            cache.invalidate(problem_id)
+            metrics.incr("db.create_problem.deferred_failed")
+            logger.exception("create_problem_with_attempt deferred write failed problem=%s", problem_id)
+
+    defer(deferred_write)
+    return problem
+
+
+def _problem_key(problem_id: str, sort_key: str = "METADATA") -> Dict[str, str]:
+    return {"PK": f"PROBLEM#{problem_id}", "SK": sort_key}
+
+
 def get_problem(problem_id: str) -> dict | None:
-    r = _table.get_item(Key={"PK": f"PROBLEM#{problem_id}", "SK": "METADATA"})
-    return r.get("Item")
+    """Read through problem_cache — problems are write-once."""
+    def load() -> dict | None:
+        r = _table.get_item(Key=_problem_key(problem_id))
+        return r.get("Item")
+    return problem_cache.cache().get_or_load(problem_id, "METADATA", load)
+
+
+def put_problem_projection(problem_id: str, projection: dict) -> None:
+    """Write the compact evaluation view of a problem (PK PROBLEM#id, SK EVAL)."""
+    item = _problem_projection_item(problem_id, projection)
+    _table.put_item(Item=item)
+    problem_cache.cache().put(problem_id, "EVAL", item["projection"])
+
+
+def _problem_projection_item(problem_id: str, projection: dict) -> Dict[str, Any]:
+    return {
+        "PK": f"PROBLEM#{problem_id}",
+        "SK": "EVAL",
+        "Type": "ProblemEval",
+        "problem_id": problem_id,
+        "projection": _floats_to_decimal(projection),
+    }
+
+
+def get_problem_projection(problem_id: str) -> dict | None:
+    """The evaluator's view of a problem, or None for problems stored before
+    projections existed (fall back to get_problem)."""
+    def load() -> dict | None:
+        r = _table.get_item(Key=_problem_key(problem_id, "EVAL"), ProjectionExpression="projection")
+        item = r.get("Item")
+        return item.get("projection") if item else None
+    return problem_cache.cache().get_or_load(problem_id, "EVAL", load)
+
+
+def invalidate_problem(problem_id: str) -> None:
+    """Drop a problem's cached items. Call after rewriting any PROBLEM# item
+    outside put_problem / put_problem_projection."""
+    problem_cache.invalidate(problem_id)
 
 
 # ── Attempts ──────────────────────────────────────────────────────────────
 
 def put_attempt(*, attempt_id: str, problem_id: str, user_id: str) -> dict:
+    item = _attempt_item(attempt_id=attempt_id, problem_id=problem_id, user_id=user_id)
+    _table.put_item(Item=item)
+    return item
+
+
+def _attempt_item(*, attempt_id: str, problem_id: str, user_id: str) -> Dict[str, Any]:
     started_at = now_iso()
     item: Dict[str, Any] = {
         "PK": f"ATTEMPT#{attempt_id}",
@@ -390,7 +894,6 @@ def put_attempt(*, attempt_id: str, problem_id: str, user_id: str) -> dict:
         "GSI2PK": f"PROBLEM#{problem_id}#USER#{user_id}",
         "GSI2SK": f"ATTEMPT#{started_at}",
     }
-    _table.put_item(Item=item)
     return item
 
 
@@ -457,6 +960,20 @@ def get_latest_attempt_for_problem(problem_id: str, user_id: str) -> dict | None
 
 
 # ── Step events ───────────────────────────────────────────────────────────
+#
+# Two storage layouts, chosen by STEP_EVENT_STORAGE:
+#   items (default) — one StepEvent item per event, SK EVENT#<created_at>#<id>.
+#   log             — events appended to StepEventLog chunk items,
+#                     SK EVENTLOG#<nnnnn>, up to EVENT_LOG_CHUNK_EVENTS each;
+#                     a full chunk rolls over to the next. Reading an attempt
+#                     is then a few items rather than one per event.
+# get_step_events_for_attempt reads both, so the layout can be switched at
+# any time; compact_event_log.py moves existing items into chunks.
+
+STEP_EVENT_STORAGE = os.getenv("STEP_EVENT_STORAGE", "items").strip().lower()
+EVENT_LOG_CHUNK_EVENTS = int(os.getenv("EVENT_LOG_CHUNK_EVENTS", "25"))
+_EVENT_LOG_HEADS_MAX = 10_000
+
 
 def put_step_event(
     *,
@@ -465,6 +982,15 @@ def put_step_event(
     step_number: int,
     payload: dict,
 ) -> dict:
+    item = _step_event_item(attempt_id=attempt_id, event_type=event_type, step_number=step_number, payload=payload)
+    if STEP_EVENT_STORAGE == "log":
+        append_step_events(attempt_id, [item])
+    else:
+        _table.put_item(Item=item)
+    return item
+
+
+def _step_event_item(*, attempt_id: str, event_type: str, step_number: int, payload: dict) -> Dict[str, Any]:
     event_id = str(uuid4())
     created_at = now_iso()
     item: Dict[str, Any] = {
@@ -476,16 +1002,213 @@ def put_step_event(
         "event_type": event_type,
         "step_number": step_number,
         "created_at": created_at,
-        "payload": payload,
+        "payload": _floats_to_decimal(payload),
     }
-    _table.put_item(Item=item)
     return item
 
 
+def batch_write_items(items: List[dict]) -> List[dict]:
+    """One BatchWriteItem call (at most 25 puts). Returns the items DynamoDB
+    left unprocessed; retrying them is the caller's job (see event_buffer)."""
+    resp = _dynamodb.batch_write_item(
+        RequestItems={TABLE_NAME: [{"PutRequest": {"Item": item}} for item in items]},
+    )
+    return [r["PutRequest"]["Item"] for r in (resp.get("UnprocessedItems") or {}).get(TABLE_NAME, [])]
+
+
+def write_step_events(items: List[dict]) -> List[dict]:
+    """Store StepEvent items (from _step_event_item) in the configured layout.
+    Returns the items that weren't stored, for the caller to retry."""
+    if STEP_EVENT_STORAGE != "log":
+        return batch_write_items(items)
+    failed: List[dict] = []
+    for attempt_id, group in _group_by_attempt(items).items():
+        try:
+            append_step_events(attempt_id, group)
+        except Exception:
+            logger.warning("write_step_events append failed attempt=%s", attempt_id, exc_info=True)
+            failed.extend(group)
+    return failed
+
+
 def get_step_events_for_attempt(attempt_id: str) -> List[dict]:
-    return _query_all(
+    """Every event for the attempt in time order, whichever layout stored it."""
+    return _merge_step_events(attempt_id, _query_all(
         KeyConditionExpression=(
             Key("PK").eq(f"ATTEMPT#{attempt_id}") &
-            Key("SK").begins_with("EVENT#")
+            Key("SK").begins_with("EVENT")  # EVENT# items and EVENTLOG# chunks
+        ),
+    ))
+
+
+def _group_by_attempt(items: List[dict]) -> Dict[str, List[dict]]:
+    groups: Dict[str, List[dict]] = {}
+    for item in items:
+        groups.setdefault(item["attempt_id"], []).append(item)
+    return groups
+
+
+def _merge_step_events(attempt_id: str, items: List[dict]) -> List[dict]:
+    """Expand log chunks back into StepEvent items and order everything by
+    time. An event present in both layouts (a compaction interrupted before
+    deleting the originals) is returned once."""
+    events: Dict[str, dict] = {}
+    for item in items:
+        if item.get("Type") == "StepEventLog":
+            for entry in item.get("events", []):
+                events.setdefault(entry["event_id"], _step_event_from_log(attempt_id, entry))
+        elif item.get("Type") == "StepEvent":
+            events.setdefault(item["event_id"], item)
+    return sorted(events.values(), key=lambda e: (e["created_at"], e["event_id"]))
+
+
+def _step_event_from_log(attempt_id: str, entry: dict) -> dict:
+    return {
+        "PK": f"ATTEMPT#{attempt_id}",
+        "SK": f"EVENT#{entry['created_at']}#{entry['event_id']}",
+        "Type": "StepEvent",
+        "attempt_id": attempt_id,
+        **entry,
+    }
+
+
+# Event-log chunks
+
+_event_log_heads: "OrderedDict[str, int]" = OrderedDict()
+_event_log_heads_lock = threading.Lock()
+
+
+def _event_log_sk(chunk: int) -> str:
+    return f"EVENTLOG#{chunk:05d}"
+
+
+def _event_log_entry(item: dict) -> Dict[str, Any]:
+    return {k: item[k] for k in ("event_id", "event_type", "step_number", "created_at", "payload")}
+
+
+def _event_log_head_query(attempt_id: str) -> Dict[str, Any]:
+    return {
+        "KeyConditionExpression": Key("PK").eq(f"ATTEMPT#{attempt_id}") & Key("SK").begins_with("EVENTLOG#"),
+        "ScanIndexForward": False,
+        "Limit": 1,
+        "ProjectionExpression": "SK",
+    }
+
+
+def _event_log_head_from(resp: dict) -> int:
+    items = resp.get("Items", [])
+    return int(items[0]["SK"].split("#", 1)[1]) if items else 0
+
+
+def _cached_event_log_head(attempt_id: str) -> Optional[int]:
+    with _event_log_heads_lock:
+        return _event_log_heads.get(attempt_id)
+
+
+def _remember_event_log_head(attempt_id: str, chunk: int) -> None:
+    with _event_log_heads_lock:
+        _event_log_heads[attempt_id] = chunk
+        _event_log_heads.move_to_end(attempt_id)
+        while len(_event_log_heads) > _EVENT_LOG_HEADS_MAX:
+            _event_log_heads.popitem(last=False)
+
+
+def _event_log_append(attempt_id: str, chunk: int, entries: List[dict]) -> Dict[str, Any]:
+    """update_item kwargs appending entries to one chunk, only if they fit."""
+    return {
+        "Key": {"PK": f"ATTEMPT#{attempt_id}", "SK": _event_log_sk(chunk)},
+        "UpdateExpression": (
+            "SET #type = :type, attempt_id = :aid, "
+            "events = list_append(if_not_exists(events, :empty), :new) "
+            "ADD event_count :n"
         ),
+        "ConditionExpression": "attribute_not_exists(event_count) OR event_count <= :room",
+        "ExpressionAttributeNames": {"#type": "Type"},
+        "ExpressionAttributeValues": {
+            ":type": "StepEventLog",
+            ":aid": attempt_id,
+            ":empty": [],
+            ":new": entries,
+            ":n": len(entries),
+            ":room": EVENT_LOG_CHUNK_EVENTS - len(entries),
+        },
+    }
+
+
+def _event_log_chunks(items: List[dict]) -> List[List[dict]]:
+    entries = [_event_log_entry(item) for item in items]
+    return [entries[i:i + EVENT_LOG_CHUNK_EVENTS] for i in range(0, len(entries), EVENT_LOG_CHUNK_EVENTS)]
+
+
+def _event_log_refusal(error: ClientError) -> str:
+    """Why an append was refused: "full" (the chunk has no room by count) or
+    "too_large" (it would pass DynamoDB's item size limit). Re-raises
+    anything else."""
+    err = error.response.get("Error", {})
+    if err.get("Code") == "ConditionalCheckFailedException":
+        return "full"
+    if err.get("Code") == "ValidationException" and "size" in err.get("Message", "").lower():
+        return "too_large"
+    raise error
+
+
+def append_step_events(attempt_id: str, items: List[dict]) -> None:
+    """Append StepEvent items to the attempt's event log, rolling over to a
+    new chunk whenever the current one is full.
+
+    A batch too large for the chunk is split in half and retried; a single
+    event too large gets one fresh chunk, and if it still doesn't fit the
+    error is raised (no chunk would take it).
+    """
+    pending = _event_log_chunks(items)
+    chunk = _cached_event_log_head(attempt_id)
+    if chunk is None:
+        chunk = _event_log_head_from(_table.query(**_event_log_head_query(attempt_id)))
+    oversized = False
+    while pending:
+        entries = pending.pop(0)
+        try:
+            _table.update_item(**_event_log_append(attempt_id, chunk, entries))
+        except ClientError as e:
+            if _event_log_refusal(e) == "too_large":
+                if len(entries) > 1:
+                    pending[:0] = [entries[:len(entries) // 2], entries[len(entries) // 2:]]
+                    continue
+                if oversized:
+                    raise
+                oversized = True
+            chunk += 1
+            pending.insert(0, entries)
+            continue
+        oversized = False
+        _remember_event_log_head(attempt_id, chunk)
+
+
+def compact_step_events(attempt_id: str) -> int:
+    """Move an attempt's standalone StepEvent items into its event log.
+
+    Appends first and deletes after, so an interruption leaves duplicates
+    (which get_step_events_for_attempt collapses), never gaps. Returns the
+    number of events moved; raises RuntimeError if deletes are still
+    unprocessed after BATCH_MAX_ATTEMPTS calls (a rerun finishes them).
+    """
+    items = sorted(
+        _query_all(KeyConditionExpression=Key("PK").eq(f"ATTEMPT#{attempt_id}") & Key("SK").begins_with("EVENT#")),
+        key=lambda it: it["SK"],
     )
+    if not items:
+        return 0
+    append_step_events(attempt_id, items)
+    requests = [{"DeleteRequest": {"Key": {"PK": it["PK"], "SK": it["SK"]}}} for it in items]
+    for start in range(0, len(requests), 25):
+        pending: Dict[str, Any] = {TABLE_NAME: requests[start:start + 25]}
+        for attempt in range(BATCH_MAX_ATTEMPTS):
+            if attempt:
+                time.sleep(_batch_backoff(attempt))
+            pending = _dynamodb.batch_write_item(RequestItems=pending).get("UnprocessedItems") or {}
+            if not pending:
+                break
+        else:
+            # The events are in the log already; a rerun deletes the leftovers.
+            raise RuntimeError(f"compact_step_events: deletes still unprocessed after {BATCH_MAX_ATTEMPTS} attempts")
+    return len(items)
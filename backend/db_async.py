@@ -0,0 +1,340 @@
+"""Async twin of db.py for the routes that run on the event loop.
+
+db.py's helpers are blocking boto3 calls, so a sync route holds a
+threadpool thread for every DynamoDB round trip. The hot routes
+(/problems/{id}, /homework/evaluate, /homework/log-event, /quiz/*,
+/progress) await these instead. Items, keys and queries come from the same
+builders db.py uses, so both modules read and write identical records, and
+problem reads go through the same problem_cache.
+
+Backed by aioboto3 (a declared dependency) with db.py's client config and
+call stats. If it is missing from an environment, the same calls run on
+db.py's boto3 objects in a worker thread — correct, just not thread-free,
+and logged as a warning at startup; /diagnostics reports which
+backend is in use under db.asyncBackend. Clients are bound to the event
+loop that first uses them and closed by `close()` on app shutdown.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import weakref
+from contextlib import AsyncExitStack
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+import anyio
+from botocore.exceptions import ClientError
+
+import db
+import problem_cache
+
+logger = logging.getLogger(__name__)
+
+# BatchWriteItem / BatchGetItem request limits.
+_BATCH_WRITE_MAX = 25
+_BATCH_GET_MAX = 100
+
+
+class _Threaded:
+    """Fallback without aioboto3: awaitable calls on a db.py boto3 object,
+    each run in a worker thread. Resolved per call so tests can patch db."""
+
+    def __init__(self, resolve: Callable[[], Any]):
+        self._resolve = resolve
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            fn = getattr(self._resolve(), name)
+            return await anyio.to_thread.run_sync(functools.partial(fn, *args, **kwargs))
+        return call
+
+
+class _Connection:
+    def __init__(self, *, backend: str, dynamodb: Any, table: Any, s3: Any, stack: Optional[AsyncExitStack]):
+        self.backend = backend
+        self.dynamodb = dynamodb
+        self.table = table
+        self.s3 = s3
+        self.stack = stack
+        self.loop = asyncio.get_running_loop()
+
+
+_conn: Optional[_Connection] = None
+_connect_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+
+
+def _open_threaded() -> _Connection:
+    return _Connection(
+        backend="threaded",
+        dynamodb=_Threaded(lambda: db._dynamodb),
+        table=_Threaded(lambda: db._table),
+        s3=_Threaded(lambda: db._s3) if db.S3_IMAGES_BUCKET else None,
+        stack=None,
+    )
+
+
+async def _open() -> _Connection:
+    try:
+        import aioboto3  # type: ignore
+        from aiobotocore.config import AioConfig  # type: ignore
+    except ImportError:
+        logger.warning("db_async: aioboto3 not installed; running DynamoDB/S3 calls in the threadpool")
+        return _open_threaded()
+
+    session = aioboto3.Session()
+    config = AioConfig(**db._client_config_kwargs())
+    stack = AsyncExitStack()
+    dynamodb = await stack.enter_async_context(
+        session.resource("dynamodb", region_name=db.AWS_REGION, endpoint_url=db.ENDPOINT_URL, config=config)
+    )
+    db._stats.attach(dynamodb.meta.client)
+    s3 = None
+    if db.S3_IMAGES_BUCKET:
+        s3 = await stack.enter_async_context(session.client("s3", region_name=db.AWS_REGION, config=config))
+        db._stats.attach(s3)
+    return _Connection(
+        backend="aioboto3", dynamodb=dynamodb, table=await dynamodb.Table(db.TABLE_NAME), s3=s3, stack=stack,
+    )
+
+
+async def _connect() -> _Connection:
+    global _conn
+    loop = asyncio.get_running_loop()
+    conn = _conn
+    if conn is not None and conn.loop is loop:
+        return conn
+    lock = _connect_locks.setdefault(loop, asyncio.Lock())
+    async with lock:
+        if _conn is None or _conn.loop is not loop:
+            _conn = await _open()
+        return _conn
+
+
+async def close() -> None:
+    """Close the async clients (app shutdown). The next call reconnects."""
+    global _conn
+    conn, _conn = _conn, None
+    if conn is not None and conn.stack is not None:
+        await conn.stack.aclose()
+
+
+def backend() -> Optional[str]:
+    """"aioboto3", "threaded", or None before the first call."""
+    return _conn.backend if _conn is not None else None
+
+
+# ── Table operations ──────────────────────────────────────────────────────
+
+async def get_item(key: Dict[str, str], **kwargs: Any) -> Optional[dict]:
+    conn = await _connect()
+    r = await conn.table.get_item(Key=key, **kwargs)
+    return r.get("Item")
+
+
+async def put_item(item: dict, **kwargs: Any) -> None:
+    conn = await _connect()
+    await conn.table.put_item(Item=item, **kwargs)
+
+
+async def update_item(**kwargs: Any) -> dict:
+    conn = await _connect()
+    return await conn.table.update_item(**kwargs)
+
+
+async def delete_item(key: Dict[str, str], **kwargs: Any) -> None:
+    conn = await _connect()
+    await conn.table.delete_item(Key=key, **kwargs)
+
+
+async def query(**kwargs: Any) -> dict:
+    conn = await _connect()
+    return await conn.table.query(**kwargs)
+
+
+async def query_all(**kwargs: Any) -> AsyncIterator[dict]:
+    """Every item matching the query, following LastEvaluatedKey page by page."""
+    conn = await _connect()
+    resp = await conn.table.query(**kwargs)
+    for item in resp.get("Items", []):
+        yield item
+    while "LastEvaluatedKey" in resp:
+        resp = await conn.table.query(ExclusiveStartKey=resp["LastEvaluatedKey"], **kwargs)
+        for item in resp.get("Items", []):
+            yield item
+
+
+async def batch_get(keys: List[Dict[str, str]], *, projection: Optional[str] = None) -> List[dict]:
+    """Fetch items by key (any number; chunked and UnprocessedKeys retried
+    with backoff). Missing items are simply absent; order is not preserved.
+    Raises RuntimeError if keys are still unprocessed after
+    db.BATCH_MAX_ATTEMPTS calls."""
+    conn = await _connect()
+    out: List[dict] = []
+    for start in range(0, len(keys), _BATCH_GET_MAX):
+        spec: Dict[str, Any] = {"Keys": keys[start:start + _BATCH_GET_MAX]}
+        if projection:
+            spec["ProjectionExpression"] = projection
+        request: Dict[str, Any] = {db.TABLE_NAME: spec}
+        for attempt in range(db.BATCH_MAX_ATTEMPTS):
+            if attempt:
+                await anyio.sleep(db._batch_backoff(attempt))
+            resp = await conn.dynamodb.batch_get_item(RequestItems=request)
+            out.extend(resp.get("Responses", {}).get(db.TABLE_NAME, []))
+            request = resp.get("UnprocessedKeys") or {}
+            if not request:
+                break
+        else:
+            raise RuntimeError(f"batch_get: keys still unprocessed after {db.BATCH_MAX_ATTEMPTS} attempts")
+    return out
+
+
+async def batch_write(items: List[dict]) -> None:
+    """Put items 25 at a time, retrying UnprocessedItems with backoff.
+    Raises RuntimeError if items are still unprocessed after
+    db.BATCH_MAX_ATTEMPTS calls."""
+    conn = await _connect()
+    for start in range(0, len(items), _BATCH_WRITE_MAX):
+        request: Dict[str, Any] = {
+            db.TABLE_NAME: [{"PutRequest": {"Item": it}} for it in items[start:start + _BATCH_WRITE_MAX]],
+        }
+        for attempt in range(db.BATCH_MAX_ATTEMPTS):
+            if attempt:
+                await anyio.sleep(db._batch_backoff(attempt))
+            resp = await conn.dynamodb.batch_write_item(RequestItems=request)
+            request = resp.get("UnprocessedItems") or {}
+            if not request:
+                break
+        else:
+            raise RuntimeError(f"batch_write: items still unprocessed after {db.BATCH_MAX_ATTEMPTS} attempts")
+
+
+# ── Users, cards, quizzes ─────────────────────────────────────────────────
+
+async def get_user_profile(uid: str) -> dict | None:
+    return await get_item({"PK": f"USER#{uid}", "SK": "PROFILE"})
+
+
+async def get_content_version() -> str | None:
+    item = await get_item(db._CONTENT_VERSION_KEY)
+    return item.get("versionId") if item else None
+
+
+async def list_cards_for_topic(topic_id: str) -> List[dict]:
+    return db._cards_from_items([it async for it in query_all(**db._cards_query(topic_id))])
+
+
+async def save_quiz_session(uid: str, quiz_id: str, topic_id: str, questions: List[dict]) -> None:
+    await put_item(db._quiz_session_item(uid, quiz_id, topic_id, questions))
+
+
+async def get_quiz_session(uid: str, quiz_id: str) -> dict | None:
+    return db._live_quiz_session(await get_item(db._quiz_session_key(uid, quiz_id)))
+
+
+async def delete_quiz_session(uid: str, quiz_id: str) -> None:
+    await delete_item(db._quiz_session_key(uid, quiz_id))
+
+
+async def save_quiz_result(uid: str, quiz_id: str, topic_id: str,
+                           breakdown: List[dict], score: int, answers: List[dict]) -> bool:
+    """Record a graded quiz once; False if the quiz already has a result."""
+    try:
+        await put_item(db._quiz_result_item(uid, quiz_id, topic_id, breakdown, score, answers),
+                       ConditionExpression="attribute_not_exists(PK)")
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+            raise
+        return False
+    return True
+
+
+async def record_card_reviews(uid: str, topic_id: str, breakdown: List[dict]) -> List[dict]:
+    """Reschedule every card in a graded quiz (srs.py); returns the new CardReview items."""
+    card_ids = list(dict.fromkeys(b["questionId"] for b in breakdown))
+    previous = await batch_get([db._card_review_key(uid, topic_id, c) for c in card_ids])
+    items = db._card_review_updates(uid, topic_id, breakdown, previous, datetime.now(timezone.utc))
+    await batch_write(items)
+    return items
+
+
+# ── Progress ──────────────────────────────────────────────────────────────
+
+async def save_progress(user_id: str, item: dict) -> dict:
+    put = db._progress_item(user_id, item)
+    await put_item(put)
+    return put
+
+
+async def get_progress(user_id: str, topic_id: str | None = None) -> list[dict]:
+    resp = await query(**db._progress_query(user_id, topic_id))
+    return resp.get("Items", [])
+
+
+# ── Problems and images ───────────────────────────────────────────────────
+
+async def get_problem(problem_id: str) -> dict | None:
+    """Read through problem_cache, like db.get_problem."""
+    return await problem_cache.cache().aget_or_load(
+        problem_id, "METADATA", lambda: get_item(db._problem_key(problem_id)),
+    )
+
+
+async def get_problem_projection(problem_id: str) -> dict | None:
+    async def load() -> dict | None:
+        item = await get_item(db._problem_key(problem_id, "EVAL"), ProjectionExpression="projection")
+        return item.get("projection") if item else None
+    return await problem_cache.cache().aget_or_load(problem_id, "EVAL", load)
+
+
+async def upload_problem_image(problem_id: str, data_url: str) -> Optional[str]:
+    """Upload a base64 Data URL image to S3. Returns the key, or None if S3 is not configured."""
+    conn = await _connect()
+    if conn.s3 is None:
+        return None
+    put = db._problem_image_object(problem_id, data_url)
+    await conn.s3.put_object(**put)
+    return put["Key"]
+
+
+async def get_problem_image_url(s3_key: str, expires_in: int = 3600) -> str:
+    conn = await _connect()
+    return await conn.s3.generate_presigned_url(**db._problem_image_url_params(s3_key, expires_in))
+
+
+# ── Step events ───────────────────────────────────────────────────────────
+
+async def put_step_event(*, attempt_id: str, event_type: str, step_number: int, payload: dict) -> dict:
+    item = db._step_event_item(attempt_id=attempt_id, event_type=event_type, step_number=step_number, payload=payload)
+    if db.STEP_EVENT_STORAGE == "log":
+        await append_step_events(attempt_id, [item])
+    else:
+        await put_item(item)
+    return item
+
+
+async def append_step_events(attempt_id: str, items: List[dict]) -> None:
+    """Async db.append_step_events: same chunks, same rollover and splitting."""
+    pending = db._event_log_chunks(items)
+    chunk = db._cached_event_log_head(attempt_id)
+    if chunk is None:
+        chunk = db._event_log_head_from(await query(**db._event_log_head_query(attempt_id)))
+    oversized = False
+    while pending:
+        entries = pending.pop(0)
+        try:
+            await update_item(**db._event_log_append(attempt_id, chunk, entries))
+        except ClientError as e:
+            if db._event_log_refusal(e) == "too_large":
+                if len(entries) > 1:
+                    pending[:0] = [entries[:len(entries) // 2], entries[len(entries) // 2:]]
+                    continue
+                if oversized:
+                    raise
+                oversized = True
+            chunk += 1
+            pending.insert(0, entries)
+            continue
+        oversized = False
+        db._remember_event_log_head(attempt_id, chunk)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Turn on DynamoDB TTL for the table, keyed on the expiresAt attribute.
+
+Quiz sessions (SK QUIZ#<id>#SESSION) carry expiresAt, epoch seconds, set
+QUIZ_SESSION_TTL_SECONDS after they're created. With TTL enabled DynamoDB
+deletes abandoned sessions itself, at no write cost. Items without
+expiresAt are never expired. db.get_quiz_session already ignores expired
+sessions, so this is safe to run at any time.
+
+Usage:
+    cd backend
+    source .venv/bin/activate
+    python db_enable_ttl.py            # enable TTL on expiresAt (idempotent)
+    python db_enable_ttl.py --disable  # turn it off again
+"""
+import argparse
+import os
+
+import boto3
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TABLE_NAME = os.getenv("DYNAMODB_TABLE_NAME", "gcse_app")
+AWS_REGION = os.getenv("AWS_REGION", "eu-west-2")
+ENDPOINT_URL = os.getenv("DYNAMODB_ENDPOINT_URL") or None
+TTL_ATTRIBUTE = "expiresAt"
+
+
+def _client():
+    return boto3.client("dynamodb", region_name=AWS_REGION, endpoint_url=ENDPOINT_URL)
+
+
+def _status(client) -> dict:
+    return client.describe_time_to_live(TableName=TABLE_NAME).get("TimeToLiveDescription", {})
+
+
+def set_ttl(client, *, enabled: bool) -> None:
+    current = _status(client)
+    is_on = current.get("TimeToLiveStatus") in {"ENABLED", "ENABLING"}
+    if is_on == enabled and (not enabled or current.get("AttributeName") == TTL_ATTRIBUTE):
+        print(f"TTL on '{TABLE_NAME}' is already {current.get('TimeToLiveStatus')}. Nothing to do.")
+        return
+    client.update_time_to_live(
+        TableName=TABLE_NAME,
+        TimeToLiveSpecification={"Enabled": enabled, "AttributeName": TTL_ATTRIBUTE},
+    )
+    print(f"TTL on '{TABLE_NAME}' ({TTL_ATTRIBUTE}): {_status(client).get('TimeToLiveStatus')}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--disable", action="store_true", help="Turn TTL off instead of on")
+    args = parser.parse_args()
+    set_ttl(_client(), enabled=not args.disable)
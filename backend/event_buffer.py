@@ -0,0 +1,184 @@
+"""Buffered StepEvent writer behind /homework/log-event.
+
+The ProblemPage logs an event for nearly every interaction, and a
+put_item per event made each of those requests wait on DynamoDB. Events
+are now built into StepEvent items at ingest (so created_at is the time
+the event arrived) and queued here; a background thread writes them with
+BatchWriteItem, 25 at a time, as soon as a full batch is queued or
+EVENT_BUFFER_FLUSH_SECONDS after the oldest queued event.
+
+- Backpressure: at most EVENT_BUFFER_MAX_PENDING events wait in memory.
+  `offer` refuses a request's events (all or none) beyond that, and the
+  endpoint answers 503 so the client retries later.
+- Retries: items DynamoDB leaves unprocessed — or a whole batch, if the
+  call fails — are retried with exponential backoff, up to
+  EVENT_BUFFER_MAX_ATTEMPTS writes, then dropped and counted.
+- Shutdown: `close()` (app shutdown) writes out everything still queued.
+
+Events are per worker and in memory until written, so a crash can lose up
+to a few seconds of them; they are analytics, not state. Counters live in
+`metrics` under event_buffer.*.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 25  # BatchWriteItem limit
+
+
+def _write_batch(items: List[dict]) -> List[dict]:
+    import db
+    return db.write_step_events(items)
+
+
+class EventBuffer:
+    def __init__(
+        self,
+        *,
+        max_pending: int,
+        flush_seconds: float,
+        max_attempts: int,
+        backoff_seconds: float = 0.05,
+        write: Callable[[List[dict]], List[dict]] = _write_batch,
+    ):
+        self.max_pending = max_pending
+        self.flush_seconds = flush_seconds
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self._write = write
+        self._pending: Deque[Tuple[float, dict]] = deque()
+        self._in_flight = 0
+        self._flush_requested = False
+        self._closing = False
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def offer(self, items: List[dict]) -> bool:
+        """Queue items for writing. False (nothing queued) if the buffer is full."""
+        with self._cond:
+            if self._closing or len(self._pending) + len(items) > self.max_pending:
+                metrics.incr("event_buffer.rejected", len(items))
+                return False
+            now = time.monotonic()
+            self._pending.extend((now, item) for item in items)
+            self._ensure_thread()
+            self._cond.notify_all()
+        metrics.incr("event_buffer.accepted", len(items))
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Write everything queued so far; True once it's all written (or dropped)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._pending or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            self._flush_requested = False
+            return True
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Stop accepting events, write out the rest and stop the writer thread."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is None:
+            return True
+        thread.join(timeout)
+        return not thread.is_alive()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            return {"pending": len(self._pending), "inFlight": self._in_flight, "maxPending": self.max_pending}
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="event-buffer", daemon=True)
+            self._thread.start()
+
+    def _next_batch(self) -> Optional[List[dict]]:
+        """Wait until a batch is due; None once closed and drained."""
+        with self._cond:
+            while True:
+                if self._pending:
+                    age = time.monotonic() - self._pending[0][0]
+                    if (len(self._pending) >= BATCH_SIZE or age >= self.flush_seconds
+                            or self._flush_requested or self._closing):
+                        batch = [self._pending.popleft()[1] for _ in range(min(BATCH_SIZE, len(self._pending)))]
+                        self._in_flight += len(batch)
+                        return batch
+                    self._cond.wait(self.flush_seconds - age)
+                elif self._closing:
+                    return None
+                else:
+                    self._cond.wait()
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                self._write_with_retries(batch)
+            finally:
+                with self._cond:
+                    self._in_flight -= len(batch)
+                    self._cond.notify_all()
+
+    def _write_with_retries(self, batch: List[dict]) -> None:
+        items = batch
+        for attempt in range(self.max_attempts):
+            if attempt:
+                metrics.incr("event_buffer.retried", len(items))
+                time.sleep(min(self.backoff_seconds * 2 ** (attempt - 1), 2.0))
+            try:
+                unprocessed = self._write(items)
+            except Exception:
+                logger.warning("event_buffer: batch write failed (%d items)", len(items), exc_info=True)
+                unprocessed = items
+            metrics.incr("event_buffer.written", len(items) - len(unprocessed))
+            if not unprocessed:
+                return
+            items = unprocessed
+        metrics.incr("event_buffer.dropped", len(items))
+        logger.error("event_buffer: dropped %d events after %d attempts", len(items), self.max_attempts)
+
+
+_buffer: Optional[EventBuffer] = None
+_buffer_lock = threading.Lock()
+
+
+def buffer() -> EventBuffer:
+    """Return the process-wide buffer, creating it on first use."""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = EventBuffer(
+                    max_pending=int(os.getenv("EVENT_BUFFER_MAX_PENDING", "5000")),
+                    flush_seconds=float(os.getenv("EVENT_BUFFER_FLUSH_SECONDS", "1")),
+                    max_attempts=int(os.getenv("EVENT_BUFFER_MAX_ATTEMPTS", "5")),
+                )
+    return _buffer
+
+
+def close(timeout: Optional[float] = None) -> bool:
+    """Drain and stop the process-wide buffer (app shutdown); the next
+    `buffer()` call starts a fresh one."""
+    global _buffer
+    with _buffer_lock:
+        current, _buffer = _buffer, None
+    return current.close(timeout) if current is not None else True
@@ -5,12 +5,16 @@ freeform student submission, this module:
 
 1. Tries cheap-first matching (exact normalised match against the canonical
    final answer). Returns immediately if it hits — no LLM call.
+   Junk, non-maths and question-echo submissions are marked 'unclear'
+   locally too (see "Local pre-check").
 2. Otherwise calls an LLM with the admin-managed `evaluation` prompt and
    asks it to mark up the submission as a list of segments, each tagged
    `correct` / `incomplete` / `wrong` / `unclear`.
 3. Validates that the segments concatenate back to the original submission
-   character-for-character. On mismatch, falls back to a plain-prose shape
-   so the frontend never renders misaligned markup.
+   character-for-character. On mismatch, repairs dropped whitespace or
+   small edits to the student's text where it safely can, and otherwise
+   falls back to a plain-prose shape so the frontend never renders
+   misaligned markup.
 
 Kept separate from `gcse_help_generator` to avoid coupling the at-creation
 generator workflow with the per-submission evaluation workflow — they have
@@ -22,8 +26,16 @@ import json
 import logging
 import os
 import re
+import threading
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar, copy_context
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
+
+import cancellation
+import metrics
+import model_routing
 
 logger = logging.getLogger(__name__)
 
@@ -69,6 +81,52 @@ def _final_answer_candidates(ai_response: Dict[str, Any]) -> List[str]:
     return candidates
 
 
+# Clause boundaries in a worked solution: line breaks, sentence ends,
+# "so"/"therefore"/arrows, and commas outside brackets.
+_CLAUSE_SPLIT_RE = re.compile(
+    r"\n|;|\.\s|→|=>|\b(?:so|therefore|hence|then)\b|,\s+(?![^()]*\))", re.IGNORECASE,
+)
+# Left-hand sides worth keeping in the answer: "x", "f(x)", "dy/dx".
+_ANSWER_LHS_RE = re.compile(r"[A-Za-z](?:\([A-Za-z]\))?|d[A-Za-z]/d[A-Za-z]")
+_NUMBER_RE = re.compile(r"-?\d+(?:[.,/]\d+)*")
+# Several roots on one line: "x = 2 or x = -3", "x = 2, y = 5".
+_SEVERAL_ROOTS_RE = re.compile(r"(?<![\w.])[A-Za-z]\s*=[^=]*?(?:,|\bor\b|\band\b)\s*[A-Za-z]\s*=", re.IGNORECASE)
+# Lines that verify an answer rather than state it: "Check: 4 + 3 = 7".
+_VERIFICATION_RE = re.compile(r"\W*(?:check(?:ing)?|verify(?:ing)?|verification|substitut\w*|sub\s+in)\b", re.IGNORECASE)
+
+
+def extract_final_answer(solution: str) -> Optional[str]:
+    """Best-effort final answer from a short worked solution.
+
+    Takes the last clause with an "=" in it and keeps the value after its
+    last "=", prefixed by the variable when the left-hand side is one
+    ("2x = 8, so x = 4." → "x = 4"; "Area = 5 × 3 = 15 cm²" → "15 cm²").
+    Without an equation, the last number in the text. None if neither, and
+    None when the last equation line states several roots ("x = 2 or
+    x = -3") or verifies rather than answers ("Check: 4 + 3 = 7") — those
+    are left to the LLM.
+    """
+    text = (solution or "").strip()
+    equations = [line for line in text.splitlines() if "=" in line]
+    if equations and (_SEVERAL_ROOTS_RE.search(equations[-1]) or _VERIFICATION_RE.match(equations[-1])):
+        return None
+    for clause in reversed(_CLAUSE_SPLIT_RE.split(text)):
+        clause = (clause or "").strip().rstrip(".")
+        if "=" not in clause:
+            continue
+        if _VERIFICATION_RE.match(clause):
+            return None
+        parts = [p.strip() for p in clause.split("=")]
+        lhs, rhs = parts[0].split(), parts[-1]
+        if not rhs:
+            continue
+        if lhs and _ANSWER_LHS_RE.fullmatch(lhs[-1]):
+            return f"{lhs[-1]} = {rhs}"
+        return rhs
+    numbers = _NUMBER_RE.findall(text)
+    return numbers[-1].rstrip(".,") if numbers else None
+
+
 def _build_simpler_payload(ai_response: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     """Synthesise a v3-shaped sub-payload from the simpler_version field.
 
@@ -76,11 +134,12 @@ def _build_simpler_payload(ai_response: Dict[str, Any]) -> Optional[Dict[str, An
     from the simpler problem, suitable for re-running the existing pipeline
     against. Returns None when simpler_version is absent or malformed.
 
-    `milestone_answers` for the simpler version isn't stored separately in
-    the schema — the simpler problem is short by design. We use the whole
-    solution string as the single milestone, which lets the cheap-path
-    catch full-answer submissions but won't catch intermediate ones. That's
-    acceptable because the simpler version is meant to be a quick warm-up.
+    The simpler version's final answer is stored as
+    `simpler_version.milestone_answers` at generation time (and backfilled
+    by backfill_simpler_milestones.py). Problems that predate that, or
+    whose solution had no recognisable answer, get it extracted here with
+    `extract_final_answer`; failing that the whole solution string is the
+    single milestone, which the cheap path will rarely match.
     """
     sv = ai_response.get("simpler_version")
     if not isinstance(sv, dict):
@@ -88,12 +147,52 @@ def _build_simpler_payload(ai_response: Dict[str, Any]) -> Optional[Dict[str, An
     solution = sv.get("solution")
     if not isinstance(solution, str) or not solution.strip():
         return None
-    return {
+    milestones = sv.get("milestone_answers")
+    if not (isinstance(milestones, list) and milestones and all(isinstance(m, str) and m.strip() for m in milestones)):
+        final = extract_final_answer(solution)
+        milestones = [final] if final else [solution.strip()]
+    payload = {
         "full_solution": solution,
-        "milestone_answers": [solution.strip()],
+        "milestone_answers": milestones,
         "normalised_form": sv.get("question") or "",
         "opening_prompt": sv.get("opening_prompt") or "",
     }
+    if isinstance(sv.get("final_answers_normalised"), list):
+        payload["final_answers_normalised"] = sv["final_answers_normalised"]
+    return payload
+
+
+def evaluation_projection(ai_response: Dict[str, Any], *, normalised_form: str = "") -> Dict[str, Any]:
+    """The slice of a stored ai_response the evaluator actually reads.
+
+    Stored next to each problem (db.put_problem's EVAL item) so evaluation
+    doesn't fetch the whole generated payload. The result is itself a valid
+    `ai_response` for this module: the v3 milestones (or the v2 step
+    answers), the solution text, the simpler version with its milestones
+    resolved, and the cheap-path answers already normalised.
+    """
+    projection: Dict[str, Any] = {
+        "normalised_form": ai_response.get("normalised_form") or normalised_form or "",
+        "full_solution": ai_response.get("full_solution") or "",
+        "final_answers_normalised": [_normalise(c) for c in _final_answer_candidates(ai_response)],
+    }
+    milestones = ai_response.get("milestone_answers")
+    if isinstance(milestones, list) and milestones:
+        projection["milestone_answers"] = [m for m in milestones if isinstance(m, str)]
+    else:
+        steps = [{"expected_answer": a} for a in _milestone_candidates(ai_response)]
+        if steps:
+            projection["steps"] = steps
+    simpler = _build_simpler_payload(ai_response)
+    if simpler is not None:
+        projection["simpler_version"] = {
+            "question": simpler["normalised_form"],
+            "solution": simpler["full_solution"],
+            "opening_prompt": simpler["opening_prompt"],
+            "milestone_answers": simpler["milestone_answers"],
+            "final_answers_normalised": [_normalise(c) for c in _final_answer_candidates(simpler)],
+        }
+    return projection
 
 
 def cheap_match_final_answer(submission: str, ai_response: Dict[str, Any]) -> bool:
@@ -102,17 +201,200 @@ def cheap_match_final_answer(submission: str, ai_response: Dict[str, Any]) -> bo
     Phase 1 keeps this conservative: exact normalised match. Substring
     matching is tempting but creates false positives (e.g. "x=6" matches
     inside "x=64"). We can loosen this once the markup path is proven and
-    we have data on the false-negative rate.
+    we have data on the false-negative rate. An evaluation projection
+    carries the candidates pre-normalised.
     """
     normalised_submission = _normalise(submission)
     if not normalised_submission:
         return False
+    precomputed = ai_response.get("final_answers_normalised")
+    if isinstance(precomputed, list):
+        return normalised_submission in precomputed
     for candidate in _final_answer_candidates(ai_response):
         if _normalise(candidate) == normalised_submission:
             return True
     return False
 
 
+# ── Local pre-check ─────────────────────────────────────────────────────────
+#
+# Some submissions aren't worth an LLM call: "idk", "?", a stray letter,
+# a sentence with no maths in it, or the question pasted back. The LLM only
+# ever marks those 'unclear', so the pre-check does it locally, returning
+# the same single-segment shape the prompt would.
+#
+# Rules run in order; EVALUATOR_PRECHECK_RULES picks which (comma-separated,
+# empty disables the pre-check). Each hit is counted as
+# evaluator.precheck.<rule> in `metrics`.
+#
+#   junk       nothing but punctuation, a lone non-digit character, or a
+#              "don't know" phrase (EVALUATOR_PRECHECK_JUNK_PHRASES)
+#   non_maths  no digits, operators, single-letter variables, number words
+#              or maths words
+#   echo       the submission is (nearly) the question itself — similarity
+#              of at least EVALUATOR_PRECHECK_ECHO_RATIO after normalising
+
+_PRECHECK_DEFAULT_RULES = "junk,non_maths,echo"
+_PRECHECK_DEFAULT_JUNK_PHRASES = (
+    "idk,i don't know,i dont know,dont know,don't know,dunno,no idea,"
+    "not sure,help,pass,skip"
+)
+_PRECHECK_MATHS_CHARS = set("0123456789=+-*/^<>()[]%.×÷√π²³½¼¾±≤≥≠")
+_PRECHECK_MATHS_WORDS = {
+    "add", "subtract", "minus", "plus", "times", "multiply", "divide", "divided",
+    "half", "double", "square", "squared", "cube", "cubed", "root", "power",
+    "factor", "factorise", "factorize", "expand", "simplify", "solve", "substitute",
+    "equation", "equals", "gradient", "angle", "area", "perimeter", "volume",
+    "ratio", "percent", "percentage", "fraction", "probability", "mean", "median",
+    "mode", "range", "sin", "cos", "tan", "pi", "quarter", "negative", "positive",
+    "sum", "product", "difference", "total", "prime", "multiple", "integer", "even", "odd", "triangle", "circle", "radius",
+    "diameter", "parallel", "perpendicular", "pythagoras", "hypotenuse",
+}
+# Number words, cardinal or ordinal: "seven", "eleven", "thirty", "million",
+# "fifth", "twentieth". Matched per word after the plural "s" is dropped.
+_PRECHECK_NUMBER_WORD_RE = re.compile(
+    r"(?:zero|one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve"
+    r"|(?:thir|four|fif|six|seven|eigh|nine)teen|(?:twen|thir|for|fif|six|seven|eigh|nine)t(?:y|ie)"
+    r"|hundred|thousand|million|billion)(?:th|h)?"
+    r"|first|second|third|fifth|ninth|twelfth"
+)
+
+_PRECHECK_COMMENTS = {
+    "junk": "There's nothing here to mark yet — have a go at the first step, even if you're not sure.",
+    "non_maths": "I can't see any maths here yet. Try writing down the first step of your working.",
+    "echo": "This looks like the question itself. Try writing down the first step towards solving it.",
+}
+
+
+def _precheck_rules() -> List[str]:
+    return [r.strip() for r in os.getenv("EVALUATOR_PRECHECK_RULES", _PRECHECK_DEFAULT_RULES).split(",") if r.strip()]
+
+
+def _precheck_junk(submission: str, question: str) -> bool:
+    stripped = submission.strip()
+    if not any(ch.isalnum() for ch in stripped):
+        return True
+    if len(stripped) == 1 and not stripped.isdigit():
+        return True
+    phrases = os.getenv("EVALUATOR_PRECHECK_JUNK_PHRASES", _PRECHECK_DEFAULT_JUNK_PHRASES)
+    canonical = " ".join(stripped.lower().rstrip(".!?").split())
+    return canonical in {p.strip().lower() for p in phrases.split(",") if p.strip()}
+
+
+def _precheck_non_maths(submission: str, question: str) -> bool:
+    if any(ch in _PRECHECK_MATHS_CHARS for ch in submission):
+        return False
+    # Keep contractions whole so the "t" of "don't" isn't read as a variable.
+    words = re.findall(r"[a-z]+(?:['’][a-z]+)*", submission.lower())
+    if any(len(w) == 1 and w not in ("i", "a") for w in words):  # a variable: "x", "y", ...
+        return False
+    return not any(_precheck_maths_word(w) or _precheck_maths_word(w.rstrip("s")) for w in words)
+
+
+def _precheck_maths_word(word: str) -> bool:
+    return word in _PRECHECK_MATHS_WORDS or _PRECHECK_NUMBER_WORD_RE.fullmatch(word) is not None
+
+
+def _precheck_echo(submission: str, question: str) -> bool:
+    import difflib
+
+    ours, theirs = _normalise(submission), _normalise(question)
+    if not ours or not theirs:
+        return False
+    ratio = float(os.getenv("EVALUATOR_PRECHECK_ECHO_RATIO", "0.9"))
+    return difflib.SequenceMatcher(None, ours, theirs, autojunk=False).ratio() >= ratio
+
+
+_PRECHECKS = {
+    "junk": _precheck_junk,
+    "non_maths": _precheck_non_maths,
+    "echo": _precheck_echo,
+}
+
+
+def precheck_submission(submission: str, question: str) -> Optional[str]:
+    """Name of the first pre-check rule the submission trips, or None.
+
+    Run after the cheap path, so a bare correct answer ("6") never gets
+    here. Unknown rule names in EVALUATOR_PRECHECK_RULES are ignored.
+    """
+    for rule in _precheck_rules():
+        check = _PRECHECKS.get(rule)
+        if check is not None and check(submission, question):
+            return rule
+    return None
+
+
+def _precheck_outcome(submission: str, rule: str) -> EvaluationOutcome:
+    metrics.incr(f"evaluator.precheck.{rule}")
+    return EvaluationOutcome(
+        is_correct=False,
+        segments=[{"text": submission, "status": "unclear", "comment": _PRECHECK_COMMENTS[rule]}],
+        prose_feedback=None,
+        path="precheck",
+    )
+
+
+# ── Brownout: local milestone matching ──────────────────────────────────────
+
+
+_BROWNOUT_LINE_COMMENT = "I'll check this line properly once feedback is back — try again shortly."
+_BROWNOUT_PROSE = (
+    "Detailed feedback is busy right now, so I can't mark this working yet. "
+    "Your working is fine to keep — try again in a minute."
+)
+
+
+def _milestone_candidates(ai_response: Dict[str, Any]) -> List[str]:
+    """Every intermediate answer we can recognise without the LLM.
+
+    v3 `milestone_answers` when present, otherwise the v2 per-step
+    `expected_answer`s.
+    """
+    milestones = ai_response.get("milestone_answers")
+    if isinstance(milestones, list) and milestones:
+        return [m for m in milestones if isinstance(m, str) and m.strip()]
+    return [
+        step["expected_answer"]
+        for step in ai_response.get("steps") or []
+        if isinstance(step, dict) and isinstance(step.get("expected_answer"), str)
+        and step["expected_answer"].strip()
+    ]
+
+
+def local_markup(submission: str, ai_response: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+    """Mark the submission line by line against the milestone answers.
+
+    Used instead of the LLM in brownout. A line whose normalised text equals
+    a milestone answer is 'correct'; any other non-blank line is 'unclear'
+    with a note that it'll be checked later. Returns None when no line
+    matched — there's nothing useful to show beyond a prose note.
+    """
+    known = {_normalise(m) for m in _milestone_candidates(ai_response)}
+    segments: List[Dict[str, Any]] = []
+    matched = False
+    for line in submission.splitlines(keepends=True):
+        body = _normalise(line)
+        if not body:
+            segments.append({"text": line, "status": "correct", "comment": None})
+        elif body in known:
+            matched = True
+            segments.append({"text": line, "status": "correct", "comment": None})
+        else:
+            segments.append({"text": line, "status": "unclear", "comment": _BROWNOUT_LINE_COMMENT})
+    return segments if matched else None
+
+
+def _brownout_outcome(submission: str, ai_response: Dict[str, Any]) -> EvaluationOutcome:
+    segments = local_markup(submission, ai_response)
+    return EvaluationOutcome(
+        is_correct=False,
+        segments=segments or [],
+        prose_feedback=None if segments else _BROWNOUT_PROSE,
+        path="brownout",
+    )
+
+
 # ── LLM evaluation ──────────────────────────────────────────────────────────
 
 
@@ -131,11 +413,21 @@ class EvaluationOutcome:
     reconstruct the original submission, or the JSON was malformed):
     is_correct=False, segments=[], prose_feedback set to a short note the
     frontend can render in plain prose. next_prompt is None.
+
+    `path` records how the outcome was produced, for metrics and the
+    benchmark: "cheap_path", "exact" / "reconstructed" / "aligned" (LLM
+    markup that validated as-is / after whitespace repair / after alignment
+    repair), "incremental", "reused", "precheck" (junk or non-maths
+    submission marked 'unclear' locally), "prose_fallback", "brownout" (LLM
+    skipped under overload; see `local_markup`), "llm_error", or
+    "unavailable" (no LLM attempted — missing solution, simpler version or
+    prompt).
     """
     is_correct: bool
     segments: List[Dict[str, Any]]
     prose_feedback: Optional[str]
     next_prompt: Optional[str] = None
+    path: Optional[str] = None
 
 
 class EvaluatorError(RuntimeError):
@@ -143,22 +435,20 @@ class EvaluatorError(RuntimeError):
 
 
 def _load_active_prompt() -> tuple[str, str]:
-    """Load the active evaluation prompt's system + user template from DynamoDB.
+    """Return the active evaluation prompt's system + user template.
 
+    Served from the process-wide prompt registry, which polls the ACTIVE
+    pointer on an interval rather than reading DynamoDB on every call.
     Imported inside the function so this module can be imported without a
     DB connection (e.g. for unit tests that stub the LLM call directly).
     """
-    import db
-    active = db.get_prompt_active("evaluation")
-    if not active:
+    from prompt_registry import get_registry
+    prompt = get_registry().get("evaluation")
+    if prompt is None:
         raise EvaluatorError(
             "evaluation prompt not seeded — restart the server or seed via admin UI"
         )
-    version = int(active["version"])
-    record = db.get_prompt_version("evaluation", version)
-    if not record:
-        raise EvaluatorError(f"evaluation prompt version {version} missing from DB")
-    return record["systemPrompt"], record["userPromptTemplate"]
+    return prompt.system_prompt, prompt.user_prompt_template
 
 
 def _segments_concatenate_to(segments: List[Dict[str, Any]], original: str) -> bool:
@@ -181,6 +471,21 @@ def _segments_concatenate_to(segments: List[Dict[str, Any]], original: str) -> b
     return "".join(pieces) == original
 
 
+def _locate_segment(text: str, original: str, pos: int) -> Optional[int]:
+    """Find where segment `text` resumes in `original`, starting at `pos`.
+
+    Returns the index of the match only if everything skipped between `pos`
+    and it is whitespace; None if the text doesn't appear (the LLM rewrote
+    it) or non-whitespace content would have to be dropped.
+    """
+    idx = original.find(text, pos)
+    if idx == -1:
+        return None
+    if original[pos:idx].strip() != "":
+        return None
+    return idx
+
+
 def _reconstruct_with_whitespace(
     segments: List[Dict[str, Any]],
     original: str,
@@ -208,18 +513,12 @@ def _reconstruct_with_whitespace(
         if not isinstance(text, str) or text == "":
             return None
 
-        idx = original.find(text, pos)
-        if idx == -1:
-            # Segment text doesn't appear in the remaining original at all
-            # — the LLM rewrote it, not just dropped whitespace.
+        idx = _locate_segment(text, original, pos)
+        if idx is None:
             return None
 
         if idx > pos:
-            gap = original[pos:idx]
-            if gap.strip() != "":
-                # Non-whitespace content was dropped — can't safely repair.
-                return None
-            patched.append({"text": gap, "status": "correct", "comment": None})
+            patched.append({"text": original[pos:idx], "status": "correct", "comment": None})
 
         patched.append(seg)
         pos = idx + len(text)
@@ -233,6 +532,87 @@ def _reconstruct_with_whitespace(
     return patched
 
 
+# Alignment repair: how close the LLM's text must stay to the student's for
+# its segment boundaries to be transplanted. Overall similarity is over the
+# whole submission; per-segment similarity stops one segment's feedback
+# landing on text it was never about.
+_ALIGN_MIN_RATIO = float(os.getenv("EVALUATOR_ALIGN_MIN_RATIO", "0.85"))
+_ALIGN_MIN_SEGMENT_RATIO = float(os.getenv("EVALUATOR_ALIGN_MIN_SEGMENT_RATIO", "0.5"))
+# SequenceMatcher is quadratic in the worst case; submissions this long are
+# not worth aligning.
+_ALIGN_MAX_CHARS = 8000
+
+
+def _align_segments(
+    segments: List[Dict[str, Any]],
+    original: str,
+) -> Optional[List[Dict[str, Any]]]:
+    """Repair segments whose text differs from the original by small edits.
+
+    Runs after `_reconstruct_with_whitespace` has given up — typically the
+    LLM normalised a symbol (× → *), fixed a typo, or dropped a trailing
+    period. Aligns the concatenated segment text against the original with
+    difflib, maps every segment boundary across to the original, and
+    re-slices the *original* at those points, keeping each segment's
+    status and comment. The result concatenates to the original exactly.
+
+    Returns None — prose fallback — when the texts are not close enough
+    overall, or any segment's slice no longer resembles what the LLM was
+    commenting on (i.e. the output was genuinely rewritten).
+    """
+    import difflib
+
+    if not isinstance(segments, list) or not segments:
+        return None
+    texts = [seg.get("text") if isinstance(seg, dict) else None for seg in segments]
+    if any(not isinstance(t, str) or t == "" for t in texts):
+        return None
+    llm_text = "".join(texts)
+    if max(len(llm_text), len(original)) > _ALIGN_MAX_CHARS:
+        return None
+
+    matcher = difflib.SequenceMatcher(None, llm_text, original, autojunk=False)
+    if matcher.ratio() < _ALIGN_MIN_RATIO:
+        return None
+    blocks = matcher.get_matching_blocks()  # ends with a (len_a, len_b, 0) sentinel
+
+    def _map(p: int) -> int:
+        """Position in llm_text → position in original."""
+        prev_a = prev_b = 0
+        for a, b, size in blocks:
+            if p == a:
+                # Start of a matched run: unmatched original text before it
+                # stays with the preceding segment.
+                return b
+            if a < p < a + size:
+                return b + (p - a)
+            if p < a:
+                # Inside an edited region: split it proportionally.
+                span_a, span_b = a - prev_a, b - prev_b
+                return prev_b + round((p - prev_a) * span_b / span_a) if span_a else b
+            prev_a, prev_b = a + size, b + size
+        return len(original)
+
+    bounds = [0]
+    offset = 0
+    for t in texts[:-1]:
+        offset += len(t)
+        bounds.append(max(bounds[-1], _map(offset)))
+    bounds.append(len(original))
+
+    aligned: List[Dict[str, Any]] = []
+    for seg, text, start, end in zip(segments, texts, bounds, bounds[1:]):
+        piece = original[start:end]
+        if piece == "":
+            return None  # segment has no counterpart in the original
+        if piece != text and text.strip():
+            similarity = difflib.SequenceMatcher(None, text, piece, autojunk=False).ratio()
+            if similarity < _ALIGN_MIN_SEGMENT_RATIO:
+                return None
+        aligned.append({**seg, "text": piece})
+    return aligned
+
+
 _VALID_STATUSES = {"correct", "incomplete", "wrong", "unclear"}
 
 # Phrases that strongly indicate the comment is correcting a mistake. If the
@@ -294,47 +674,340 @@ def _normalise_segments(raw_segments: Any) -> List[Dict[str, Any]]:
     return cleaned
 
 
+# Evaluation inputs of the call in flight, attached to recorded LLM calls
+# so the benchmark can replay them through the whole pipeline.
+_llm_call_context: ContextVar[Optional[Dict[str, Any]]] = ContextVar(
+    "_llm_call_context", default=None,
+)
+
+
+def _call_context(
+    request: "_LLMRequest", *, submission: str, ai_response: Dict[str, Any], question: str, target: str,
+) -> Dict[str, Any]:
+    """The evaluate_submission() arguments that reproduce `request`."""
+    return {
+        "submission": submission,
+        "ai_response": ai_response,
+        "question": question,
+        "mode": request.mode,
+        "target": target,
+        "system_prompt": request.system_prompt,
+        "user_template": request.user_template,
+        "model_tiers": model_routing.ladder_key(request.models),
+        "incremental": False,
+    }
+
+
+def _record_without_llm(
+    *, submission: str, ai_response: Dict[str, Any], question: str, mode: str, target: str,
+) -> None:
+    """Add an evaluation that never reached the LLM (e.g. a cheap-path hit) to
+    the recorded corpus, so replayed workloads keep the real cheap-path mix."""
+    import llm_replay
+
+    recorder = llm_replay.get_recorder()
+    if recorder is not None:
+        recorder.record_evaluation({
+            "submission": submission,
+            "ai_response": ai_response,
+            "question": question,
+            "mode": mode,
+            "target": target,
+            "system_prompt": None,
+            "user_template": None,
+            "incremental": False,
+        })
+
+
 def _call_llm(*, system_prompt: str, user_prompt: str, model: str) -> str:
     """Single LLM call returning the raw response content as a string.
 
-    Mirrors the OpenAI client usage in `gcse_help_generator` and the admin
-    try-prompt route — kept inline rather than refactored out because we
-    only have two callers and the signatures differ.
+    Goes through the record/replay layer in `llm_replay`: with
+    EVALUATOR_LLM_REPLAY_PATH set the response comes from the recorded
+    corpus (never OpenAI); with EVALUATOR_LLM_RECORD_PATH set live calls
+    are appended to the corpus.
     """
+    import llm_replay
+
+    # Don't start a call (or the next tier's) for a client that has gone.
+    cancellation.check()
+    replayer = llm_replay.get_replayer()
+    if replayer is not None:
+        return replayer.respond(system_prompt=system_prompt, user_prompt=user_prompt, model=model)
+
+    import overload
+
+    started = time.perf_counter()
+    with overload.controller().llm_call():
+        raw = _hedger.call(system_prompt=system_prompt, user_prompt=user_prompt, model=model)
+    recorder = llm_replay.get_recorder()
+    if recorder is not None:
+        recorder.record(
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            model=model,
+            response=raw,
+            latency_ms=int((time.perf_counter() - started) * 1000),
+            evaluation=_llm_call_context.get(),
+        )
+    return raw
+
+
+def _openai_client() -> Any:
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise EvaluatorError("OPENAI_API_KEY not set")
     import openai  # type: ignore
-    client = openai.OpenAI(api_key=api_key)
-    resp = client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
-        response_format={"type": "json_object"},
-        temperature=0.2,
-        max_tokens=2000,
-    )
+    return openai.OpenAI(api_key=api_key)
+
+
+def _call_openai(*, system_prompt: str, user_prompt: str, model: str, client: Any = None) -> str:
+    """The live OpenAI request behind `_call_llm`.
+
+    Mirrors the OpenAI client usage in `gcse_help_generator` and the admin
+    try-prompt route — kept inline rather than refactored out because we
+    only have two callers and the signatures differ. `client` lets the
+    hedger hold on to the client so it can close a losing request; the
+    client is also closed if the request is cancelled (see cancellation.py).
+    """
+    client = client or _openai_client()
+    with cancellation.guard(client):
+        resp = client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            response_format={"type": "json_object"},
+            temperature=0.2,
+            max_tokens=2000,
+        )
+    model_routing.record_tokens("evaluator", model, getattr(resp, "usage", None))
     return resp.choices[0].message.content or "{}"
 
 
-def evaluate_submission(
+# ── Hedged LLM requests ─────────────────────────────────────────────────────
+#
+# A few provider stragglers dominate evaluator p99. When hedging is on and
+# a request is still outstanding after the EVALUATOR_HEDGE_PERCENTILE of
+# recent call latency, an identical second request is fired and whichever
+# answers first wins; the other's client is closed, which aborts its HTTP
+# request. The primary runs on the caller's thread and only hedges use the
+# EVALUATOR_HEDGE_POOL_SIZE pool. At most EVALUATOR_HEDGE_MAX_RATE of recent
+# calls may hedge, so a provider-wide slowdown can't double our spend.
+
+
+class _Hedger:
+    """Runs live LLM calls, hedging stragglers. Counters live in `metrics`
+    under evaluator.hedge.* and call latency under evaluator.llm."""
+
+    def __init__(
+        self,
+        *,
+        enabled: bool,
+        percentile: float,
+        max_rate: float,
+        min_samples: int,
+        rate_window: int = 200,
+    ):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.max_rate = max_rate
+        self.min_samples = min_samples
+        self._recent: "deque[bool]" = deque(maxlen=rate_window)
+        self._lock = threading.Lock()
+        self._pool: Optional[Any] = None
+
+    def _latency(self):
+        return metrics.window("evaluator.llm")
+
+    def delay_seconds(self) -> Optional[float]:
+        """How long to wait before hedging, or None to not hedge at all."""
+        if not self.enabled:
+            return None
+        latency = self._latency()
+        if len(latency) < self.min_samples:
+            return None
+        delay_ms = latency.percentile(self.percentile)
+        return delay_ms / 1000 if delay_ms is not None else None
+
+    def _claim_hedge(self) -> bool:
+        """Count this call as hedged if that keeps us under max_rate."""
+        with self._lock:
+            hedged = sum(self._recent)
+            if (hedged + 1) / (len(self._recent) + 1) > self.max_rate:
+                self._recent.append(False)
+                return False
+            self._recent.append(True)
+            return True
+
+    def _record_unhedged(self) -> None:
+        with self._lock:
+            self._recent.append(False)
+
+    def _executor(self):
+        if self._pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=int(os.getenv("EVALUATOR_HEDGE_POOL_SIZE", "16")),
+                        thread_name_prefix="llm-hedge",
+                    )
+        return self._pool
+
+    def _timed(self, client: Any, **kwargs: str) -> str:
+        t0 = time.perf_counter()
+        raw = _call_openai(client=client, **kwargs)
+        self._latency().observe((time.perf_counter() - t0) * 1000)
+        return raw
+
+    def call(self, *, system_prompt: str, user_prompt: str, model: str) -> str:
+        kwargs = {"system_prompt": system_prompt, "user_prompt": user_prompt, "model": model}
+        delay = self.delay_seconds()
+        if delay is None:
+            self._record_unhedged()
+            return self._timed(None, **kwargs)
+
+        # The primary runs on the caller's thread, so pool queueing never
+        # counts against the hedge delay; only the hedge goes on the pool.
+        # The timer and the hedge run in copies of the caller's context so
+        # the request's cancel token (and replay context) follow the call.
+        race = _HedgeRace(_openai_client())
+        timer = threading.Timer(delay, copy_context().run, args=(self._fire_hedge, race, kwargs))
+        timer.daemon = True
+        timer.start()
+        try:
+            raw = self._timed(race.primary_client, **kwargs)
+        except BaseException as error:
+            hedge = race.finish_primary()
+            timer.cancel()
+            if hedge is None:
+                if not race.capped:
+                    self._record_unhedged()
+                raise
+            try:
+                raw = hedge.result()
+            except Exception:
+                metrics.incr("evaluator.hedge.failed")
+                raise error
+            metrics.incr("evaluator.hedge.won")
+            return raw
+
+        hedge = race.finish_primary()
+        timer.cancel()
+        if hedge is None:
+            if not race.capped:
+                self._record_unhedged()
+        else:
+            _close_quietly(race.hedge_client)
+            metrics.incr("evaluator.hedge.won" if race.hedge_won else "evaluator.hedge.lost")
+        return raw
+
+    def _fire_hedge(self, race: "_HedgeRace", kwargs: Dict[str, str]) -> None:
+        """Timer callback: start the hedge if the primary is still out."""
+        with race.lock:
+            if race.primary_done:
+                return
+            if not self._claim_hedge():
+                race.capped = True
+                metrics.incr("evaluator.hedge.capped")
+                return
+            metrics.incr("evaluator.hedge.fired")
+            race.hedge_client = _openai_client()
+            race.hedge = self._executor().submit(copy_context().run, self._run_hedge, race, kwargs)
+
+    def _run_hedge(self, race: "_HedgeRace", kwargs: Dict[str, str]) -> str:
+        raw = self._timed(race.hedge_client, **kwargs)
+        with race.lock:
+            if not race.primary_done:
+                # Aborts the primary's HTTP request; the caller then
+                # collects this result
+                race.hedge_won = True
+                _close_quietly(race.primary_client)
+        return raw
+
+
+class _HedgeRace:
+    """State shared by one hedged call's primary (caller thread) and hedge."""
+
+    def __init__(self, primary_client: Any):
+        self.primary_client = primary_client
+        self.hedge_client: Any = None
+        self.hedge: Optional[Any] = None
+        self.primary_done = False
+        self.hedge_won = False
+        self.capped = False
+        self.lock = threading.Lock()
+
+    def finish_primary(self) -> Optional[Any]:
+        """Mark the primary finished; the hedge's future if one was fired."""
+        with self.lock:
+            self.primary_done = True
+            return self.hedge
+
+
+def _close_quietly(client: Any) -> None:
+    try:
+        client.close()
+    except Exception:
+        logger.debug("hedge: closing losing client failed", exc_info=True)
+
+
+_hedger = _Hedger(
+    enabled=os.getenv("EVALUATOR_HEDGE_ENABLED", "").strip().lower() in ("1", "true", "yes"),
+    percentile=float(os.getenv("EVALUATOR_HEDGE_PERCENTILE", "95")),
+    max_rate=float(os.getenv("EVALUATOR_HEDGE_MAX_RATE", "0.1")),
+    min_samples=int(os.getenv("EVALUATOR_HEDGE_MIN_SAMPLES", "20")),
+)
+
+
+@dataclass
+class _LLMRequest:
+    """Everything needed to make the evaluator's LLM call for one problem.
+
+    Holds the unrendered template so the same request can be rendered for
+    a different slice of the submission (see incremental re-evaluation).
+    """
+    system_prompt: str
+    user_template: str
+    question: str
+    canonical_solution: str
+    mode: str
+    models: List[str]  # tier ladder, cheapest first (see model_routing)
+
+    @property
+    def model(self) -> str:
+        return self.models[0]
+
+    def user_prompt_for(self, submission: str) -> str:
+        from gcse_help_prompts import render_evaluation_prompt
+        return render_evaluation_prompt(
+            self.user_template,
+            question=self.question,
+            canonical_solution=self.canonical_solution,
+            submission=submission,
+            mode=self.mode,
+        )
+
+
+def _prepare_evaluation(
     *,
     submission: str,
     ai_response: Dict[str, Any],
     question: str,
-    mode: str = "free",
-    target: str = "main",
-    model: Optional[str] = None,
-) -> EvaluationOutcome:
-    """Run the full evaluation pipeline for one submission.
-
-    Cheap path → LLM path → markup-validate → prose fallback.
-    `mode` is "free" or "guided" — controls whether the LLM is asked
-    to suggest a next_prompt for the student.
-    `target` is "main" (default) or "simpler" — when "simpler", the canonical
-    solution and milestones are taken from `ai_response.simpler_version`.
+    mode: str,
+    target: str,
+    model: Optional[str],
+    prompt: Optional[tuple[str, str]] = None,
+) -> tuple[Optional[EvaluationOutcome], Optional[_LLMRequest]]:
+    """Run every step before the LLM call.
+
+    Returns (outcome, None) when the submission can be answered without the
+    LLM (cheap-path hit, missing simpler version, no reference solution,
+    prompt not loaded), otherwise (None, request) ready to send. `prompt`
+    lets a caller evaluating many submissions pass the (system, user
+    template) pair it already loaded.
     """
     # If target is simpler, swap in the simpler-version payload as the
     # canonical solution + milestones for this evaluation. The rest of the
@@ -349,7 +1022,8 @@ def evaluate_submission(
                     "This problem doesn't have a simpler version available. "
                     "Try the original instead."
                 ),
-            )
+                path="unavailable",
+            ), None
         ai_response = simpler
         question = simpler.get("normalised_form") or question
 
@@ -357,9 +1031,15 @@ def evaluate_submission(
     if cheap_match_final_answer(submission, ai_response):
         return EvaluationOutcome(
             is_correct=True, segments=[], prose_feedback=None, next_prompt=None,
-        )
+            path="cheap_path",
+        ), None
+
+    # 2. Local pre-check: junk, non-maths or the question pasted back
+    rule = precheck_submission(submission, question)
+    if rule is not None:
+        return _precheck_outcome(submission, rule), None
 
-    # 2. LLM path
+    # 3. LLM path
     canonical_solution = ai_response.get("full_solution") or ""
     if not isinstance(canonical_solution, str) or not canonical_solution.strip():
         # Without a canonical solution we have no grounding for the LLM.
@@ -372,42 +1052,310 @@ def evaluate_submission(
                 "for this problem yet, so I can't give detailed feedback. "
                 "Please flag this to your teacher."
             ),
-        )
+            path="unavailable",
+        ), None
+
+    # 4. Under overload, skip the LLM and mark what we can locally.
+    import overload
+    if overload.brownout_active():
+        overload.controller().record_shed("evaluate")
+        return _brownout_outcome(submission, ai_response), None
 
     try:
-        system_prompt, user_template = _load_active_prompt()
+        system_prompt, user_template = prompt or _load_active_prompt()
     except EvaluatorError:
         logger.exception("evaluate_submission: prompt load failed")
         return EvaluationOutcome(
             is_correct=False,
             segments=[],
             prose_feedback="The feedback service isn't fully set up yet. Please try again shortly.",
-        )
+            path="unavailable",
+        ), None
 
-    from gcse_help_prompts import render_evaluation_prompt
-    user_prompt = render_evaluation_prompt(
-        user_template,
+    return None, _LLMRequest(
+        system_prompt=system_prompt,
+        user_template=user_template,
         question=question,
         canonical_solution=canonical_solution,
-        submission=submission,
         mode=mode,
+        models=model_routing.parse_tiers(model) or model_routing.tiers("evaluator"),
     )
 
+
+_LLM_UNREACHABLE = "I couldn't reach the feedback service just now — please try again in a moment."
+
+
+def _mark(
+    request: _LLMRequest,
+    *,
+    user_prompt: str,
+    submission: str,
+    models: Optional[List[str]] = None,
+) -> tuple[EvaluationOutcome, str]:
+    """Send one rendered prompt up the model ladder and validate the markup.
+
+    A tier whose markup falls back to prose escalates to the next; the last
+    tier's outcome is returned as-is. Returns (outcome, integrity). An LLM
+    error becomes an "llm_error" outcome rather than an exception.
+    """
+    ladder = models or request.models
+
+    def attempt(model: str, last: bool) -> tuple[EvaluationOutcome, str]:
+        context = _llm_call_context.get()
+        token = None
+        if context and model != request.models[0]:
+            # Recorded escalations replay as part of their first-tier evaluation.
+            token = _llm_call_context.set({**context, "escalated": True})
+        try:
+            raw = _call_llm(system_prompt=request.system_prompt, user_prompt=user_prompt, model=model)
+        finally:
+            if token is not None:
+                _llm_call_context.reset(token)
+        outcome, integrity = _outcome_from_raw(raw, submission=submission, mode=request.mode)
+        if integrity == "prose_fallback" and not last:
+            raise model_routing.Escalate("markup failed validation")
+        return outcome, integrity
+
     try:
-        raw = _call_llm(
-            system_prompt=system_prompt,
-            user_prompt=user_prompt,
-            model=model or os.getenv("OPENAI_MODEL", "gpt-4.1-mini"),
-        )
+        return model_routing.run("evaluator", ladder, attempt)
     except Exception:
+        # A cancelled request has nobody to show the fallback to.
+        cancellation.check()
         logger.exception("evaluate_submission: LLM call failed")
         return EvaluationOutcome(
             is_correct=False,
             segments=[],
-            prose_feedback="I couldn't reach the feedback service just now — please try again in a moment.",
+            prose_feedback=_LLM_UNREACHABLE,
+            path="llm_error",
+        ), "prose_fallback"
+
+
+def evaluate_submission(
+    *,
+    submission: str,
+    ai_response: Dict[str, Any],
+    question: str,
+    mode: str = "free",
+    target: str = "main",
+    model: Optional[str] = None,
+    attempt_id: Optional[str] = None,
+    prompt: Optional[tuple[str, str]] = None,
+) -> EvaluationOutcome:
+    """Run the full evaluation pipeline for one submission.
+
+    Cheap path → pre-check → LLM path → markup-validate → prose fallback.
+    `mode` is "free" or "guided" — controls whether the LLM is asked
+    to suggest a next_prompt for the student.
+    `target` is "main" (default) or "simpler" — when "simpler", the canonical
+    solution and milestones are taken from `ai_response.simpler_version`.
+    `attempt_id`, when given, enables incremental re-evaluation: lines
+    unchanged since this attempt's previous marked submission keep their
+    segments and only the changed tail is sent to the LLM.
+    `prompt` is an optional (system, user template) pair to use instead of
+    the active admin-managed prompt (the benchmark replays recorded ones).
+    `model` overrides the configured tier ladder: one model name or a
+    comma-separated ladder, cheapest first (see model_routing).
+    """
+    outcome, request = _prepare_evaluation(
+        submission=submission, ai_response=ai_response, question=question,
+        mode=mode, target=target, model=model, prompt=prompt,
+    )
+    if outcome is not None:
+        _record_without_llm(submission=submission, ai_response=ai_response, question=question, mode=mode, target=target)
+        return outcome
+
+    token = _llm_call_context.set(_call_context(
+        request, submission=submission, ai_response=ai_response, question=question, target=target,
+    ))
+    try:
+        return _evaluate_with_llm(request, submission=submission, mode=mode, target=target, attempt_id=attempt_id)
+    finally:
+        _llm_call_context.reset(token)
+
+
+def _evaluate_with_llm(
+    request: _LLMRequest, *, submission: str, mode: str, target: str, attempt_id: Optional[str],
+) -> EvaluationOutcome:
+    """The LLM half of `evaluate_submission`: memo → incremental → full call."""
+    memo_key = (attempt_id, target) if attempt_id else None
+    previous = _previous_evaluations.get(memo_key) if memo_key else None
+    if previous is not None and previous.mode == mode:
+        if previous.submission == submission:
+            logger.info("evaluate_submission: unchanged resubmission — reusing previous markup")
+            return previous.outcome()
+        outcome = _evaluate_incrementally(request, previous, submission)
+    else:
+        outcome = None
+
+    if outcome is None:
+        outcome, _integrity = _mark(
+            request, user_prompt=request.user_prompt_for(submission), submission=submission,
+        )
+
+    if memo_key and outcome.segments:
+        _previous_evaluations.put(memo_key, _PreviousEvaluation(
+            submission=submission,
+            mode=mode,
+            segments=outcome.segments,
+            next_prompt=outcome.next_prompt,
+        ))
+    return outcome
+
+
+# ── Incremental re-evaluation ───────────────────────────────────────────────
+#
+# Students usually add a line of working and resubmit. Lines that haven't
+# changed since the attempt's previous marked submission keep their
+# segments; only the changed tail goes to the LLM, with the earlier lines
+# as read-only context, and the two halves are stitched back together.
+
+
+@dataclass(frozen=True)
+class _PreviousEvaluation:
+    submission: str
+    mode: str
+    segments: List[Dict[str, Any]]
+    next_prompt: Optional[str]
+
+    def outcome(self) -> EvaluationOutcome:
+        segments = [dict(s) for s in self.segments]
+        return EvaluationOutcome(
+            is_correct=all(s["status"] == "correct" for s in segments),
+            segments=segments,
+            prose_feedback=None,
+            next_prompt=self.next_prompt,
+            path="reused",
         )
 
-    # 3. Parse + validate
+
+class _PreviousEvaluations:
+    """Bounded LRU of the last marked submission per (attempt_id, target).
+
+    Per-process: a resubmission served by another worker just takes the
+    full-evaluation path.
+    """
+
+    def __init__(self, max_entries: int):
+        self._max_entries = max_entries
+        self._items: "OrderedDict[tuple[str, str], _PreviousEvaluation]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple[str, str]) -> Optional[_PreviousEvaluation]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+            return item
+
+    def put(self, key: tuple[str, str], item: _PreviousEvaluation) -> None:
+        with self._lock:
+            self._items[key] = item
+            self._items.move_to_end(key)
+            while len(self._items) > self._max_entries:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+_previous_evaluations = _PreviousEvaluations(
+    int(os.getenv("EVALUATOR_INCREMENTAL_MAX_ATTEMPTS", "2048"))
+)
+
+_INCREMENTAL_CONTEXT_NOTE = (
+    "\n\nFor context only, the student's submission above continues working "
+    "they already had marked. Their earlier lines were:\n{prefix}\n"
+    "Do NOT include those earlier lines in feedback_segments — segment only "
+    "the submission between <<< and >>>."
+)
+
+
+def _reusable_prefix(
+    previous: _PreviousEvaluation, submission: str,
+) -> tuple[List[Dict[str, Any]], int]:
+    """Return (segments, length) covering the unchanged leading lines.
+
+    Only complete lines (ending in a line break) identical in both
+    submissions count as unchanged — the previous last line may have been
+    edited. Segments are reused up to the first one that runs past the
+    unchanged text or is 'incomplete' (whose status depends on what
+    follows it, so it has to be re-marked once the student continues).
+    """
+    unchanged = 0
+    for old_line, new_line in zip(
+        previous.submission.splitlines(keepends=True),
+        submission.splitlines(keepends=True),
+    ):
+        if old_line != new_line or not old_line.endswith(("\n", "\r")):
+            break
+        unchanged += len(old_line)
+
+    reused: List[Dict[str, Any]] = []
+    end = 0
+    for seg in previous.segments:
+        if seg["status"] == "incomplete" or end + len(seg["text"]) > unchanged:
+            break
+        reused.append(dict(seg))
+        end += len(seg["text"])
+    return reused, end
+
+
+def _evaluate_incrementally(
+    request: _LLMRequest, previous: _PreviousEvaluation, submission: str,
+) -> Optional[EvaluationOutcome]:
+    """Mark only the changed tail of `submission`. None means "do a full evaluation"."""
+    reused, prefix_len = _reusable_prefix(previous, submission)
+    tail = submission[prefix_len:]
+    if not reused or not tail.strip():
+        return None
+
+    user_prompt = request.user_prompt_for(tail) + _INCREMENTAL_CONTEXT_NOTE.format(
+        prefix=submission[:prefix_len]
+    )
+    context = _llm_call_context.get()
+    token = _llm_call_context.set({**context, "incremental": True} if context else None)
+    try:
+        tail_outcome, _integrity = _mark(request, user_prompt=user_prompt, submission=tail)
+    finally:
+        _llm_call_context.reset(token)
+
+    if not tail_outcome.segments:
+        # The tail fell back to prose, which would drop the reused markup
+        # too; mark the whole submission instead.
+        logger.info("evaluate_submission: incremental tail fell back to prose — doing a full evaluation")
+        return None
+
+    stitched = reused + tail_outcome.segments
+    if not _segments_concatenate_to(stitched, submission):
+        # Can't happen if both halves passed their own integrity checks,
+        # but never render misaligned markup.
+        logger.warning("evaluate_submission: incremental stitch failed — falling back to full evaluation")
+        return None
+    logger.info(
+        "evaluate_submission: incremental re-evaluation reused=%d segments (%d chars), tail=%d chars",
+        len(reused), prefix_len, len(tail),
+    )
+    return EvaluationOutcome(
+        is_correct=all(s["status"] == "correct" for s in stitched),
+        segments=stitched,
+        prose_feedback=None,
+        next_prompt=tail_outcome.next_prompt,
+        path="incremental",
+    )
+
+
+def _outcome_from_raw(
+    raw: str, *, submission: str, mode: str,
+) -> tuple[EvaluationOutcome, str]:
+    """Parse + validate a complete LLM response into an outcome.
+
+    Also returns the integrity verdict: "exact" when the segments
+    concatenated to the submission as-is, "reconstructed" when dropped
+    whitespace had to be re-inserted, "aligned" when small edits to the
+    student's text were mapped back onto the original, "prose_fallback"
+    when markup could not be rendered.
+    """
     try:
         parsed = json.loads(raw)
     except json.JSONDecodeError:
@@ -416,7 +1364,8 @@ def evaluate_submission(
             is_correct=False,
             segments=[],
             prose_feedback="I couldn't read the feedback service's response. Please try again.",
-        )
+            path="prose_fallback",
+        ), "prose_fallback"
 
     raw_segments = parsed.get("feedback_segments") if isinstance(parsed, dict) else None
     cleaned = _normalise_segments(raw_segments)
@@ -427,8 +1376,9 @@ def evaluate_submission(
             raw_response=raw,
             submission=submission,
         )
-        return _prose_fallback_from(parsed)
+        return _prose_fallback_from(parsed), "prose_fallback"
 
+    integrity = "exact"
     if not _segments_concatenate_to(cleaned, submission):
         # Try reconstructing missing whitespace before giving up. The most
         # common LLM failure mode here is dropping a line break between two
@@ -439,13 +1389,21 @@ def evaluate_submission(
                 "evaluate_submission: reconstructed missing whitespace into segments"
             )
             cleaned = reconstructed
+            integrity = "reconstructed"
+        elif (aligned := _align_segments(cleaned, submission)) is not None:
+            # The LLM edited the student's text slightly (normalised a
+            # symbol, fixed a typo) — re-slice the original under its
+            # segment boundaries rather than discard the markup.
+            logger.info("evaluate_submission: aligned edited segment text back onto the submission")
+            cleaned = aligned
+            integrity = "aligned"
         else:
             _log_validation_failure(
                 reason="segments_dont_reconstruct",
                 raw_response=raw,
                 submission=submission,
             )
-            return _prose_fallback_from(parsed)
+            return _prose_fallback_from(parsed), "prose_fallback"
 
     # Pull the next_prompt out of the LLM response, but only honour it in
     # guided mode. In free mode the system prompt forbids it; even if the
@@ -462,7 +1420,554 @@ def evaluate_submission(
         segments=cleaned,
         prose_feedback=None,
         next_prompt=next_prompt,
+        path=integrity,
+    ), integrity
+
+
+# ── Streaming ───────────────────────────────────────────────────────────────
+
+
+class _SegmentStreamParser:
+    """Pull complete `feedback_segments` entries out of a partial JSON response.
+
+    Fed the LLM output chunk by chunk; each `feed()` returns the segment
+    objects that became complete in that chunk (None for one that didn't
+    parse). Tracks string/escape state and nesting depth the same way as
+    `GCSEHelpGenerator._extract_first_json_object`, so braces inside
+    comments don't confuse it. Only the top-level `feedback_segments` array
+    is recognised; everything else is left to the final full parse.
+    """
+
+    def __init__(self) -> None:
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_str = False
+        self._escape = False
+        self._str_start = 0
+        self._last_string: Optional[str] = None
+        self._awaiting_array = False
+        self._in_array = False
+        self._array_depth = 0
+        self._obj_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Any]:
+        self._text += chunk
+        found: List[Any] = []
+        text = self._text
+        while self._pos < len(text):
+            i = self._pos
+            ch = text[i]
+            self._pos += 1
+            if self._in_str:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_str = False
+                    if self._depth == 1:
+                        self._last_string = text[self._str_start + 1:i]
+                continue
+            if ch.isspace():
+                continue
+            if self._awaiting_array and not (ch == "[" and self._depth == 1):
+                self._awaiting_array = False
+            if ch == '"':
+                self._in_str = True
+                self._str_start = i
+            elif ch == ":" and self._depth == 1 and not self._in_array:
+                self._awaiting_array = self._last_string == "feedback_segments"
+            elif ch in "{[":
+                if ch == "[" and self._awaiting_array:
+                    self._awaiting_array = False
+                    self._in_array = True
+                    self._array_depth = self._depth + 1
+                elif ch == "{" and self._in_array and self._depth == self._array_depth:
+                    self._obj_start = i
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._in_array:
+                    if ch == "}" and self._depth == self._array_depth and self._obj_start is not None:
+                        try:
+                            found.append(json.loads(text[self._obj_start:i + 1]))
+                        except json.JSONDecodeError:
+                            found.append(None)
+                        self._obj_start = None
+                    elif ch == "]" and self._depth < self._array_depth:
+                        self._in_array = False
+        return found
+
+
+def _call_llm_stream(
+    *, system_prompt: str, user_prompt: str, model: str, evaluation: Optional[Dict[str, Any]] = None,
+) -> Iterator[str]:
+    """Streaming counterpart of `_call_llm`: yields content deltas as they arrive.
+
+    Goes through the same record/replay layer (a replayed response arrives
+    as one delta; `evaluation` is the call context to record, passed in
+    because a generator can't hold a ContextVar across yields) and the
+    client is closed if the request is cancelled, in which case Cancelled
+    is raised. Streams are never hedged: the deltas already sent to the
+    client can't be swapped for another request's.
+    """
+    import llm_replay
+    import overload
+
+    cancellation.check()
+    replayer = llm_replay.get_replayer()
+    if replayer is not None:
+        yield replayer.respond(system_prompt=system_prompt, user_prompt=user_prompt, model=model)
+        return
+
+    started = time.perf_counter()
+    pieces: List[str] = []
+    client = _openai_client()
+    with overload.controller().llm_call(), cancellation.guard(client):
+        try:
+            stream = client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ],
+                response_format={"type": "json_object"},
+                temperature=0.2,
+                max_tokens=2000,
+                stream=True,
+            )
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    pieces.append(delta)
+                    yield delta
+        except Exception:
+            cancellation.check()  # a closed client fails the read; report why
+            raise
+    recorder = llm_replay.get_recorder()
+    if recorder is not None:
+        recorder.record(
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            model=model,
+            response="".join(pieces),
+            latency_ms=int((time.perf_counter() - started) * 1000),
+            evaluation=evaluation,
+        )
+
+
+def evaluate_submission_stream(
+    *,
+    submission: str,
+    ai_response: Dict[str, Any],
+    question: str,
+    mode: str = "free",
+    target: str = "main",
+    model: Optional[str] = None,
+) -> Iterator[tuple[str, Any]]:
+    """Streaming variant of `evaluate_submission`.
+
+    Yields ("segment", segment_dict) for each feedback segment as soon as
+    the LLM has finished writing it and it lines up with the next slice of
+    the submission (dropped whitespace is emitted as its own segment, as in
+    `_reconstruct_with_whitespace`). Ends with exactly one
+    ("done", (outcome, integrity)) where outcome is the authoritative result
+    of the full parse + validation and integrity is "cheap_path", "exact",
+    "reconstructed", "aligned" or "prose_fallback".
+
+    Streamed segments are provisional: once one fails to line up, no more
+    are emitted, and the client should replace what it rendered with the
+    final outcome. Raises Cancelled if the request is cancelled (see
+    cancellation.iterate_until_disconnect).
+    """
+    outcome, request = _prepare_evaluation(
+        submission=submission, ai_response=ai_response, question=question,
+        mode=mode, target=target, model=model,
     )
+    if outcome is not None:
+        _record_without_llm(submission=submission, ai_response=ai_response, question=question, mode=mode, target=target)
+        if outcome.path == "precheck":
+            integrity = "exact"  # one local segment covering the whole submission
+        elif outcome.path in ("cheap_path", "brownout"):
+            integrity = outcome.path
+        else:
+            integrity = "prose_fallback"
+        yield "done", (outcome, integrity)
+        return
+
+    call_context = _call_context(
+        request, submission=submission, ai_response=ai_response, question=question, target=target,
+    )
+    parser = _SegmentStreamParser()
+    pieces: List[str] = []
+    pos = 0
+    aligned = True
+    try:
+        for delta in _call_llm_stream(
+            system_prompt=request.system_prompt,
+            user_prompt=request.user_prompt_for(submission),
+            model=request.model,
+            evaluation=call_context,
+        ):
+            pieces.append(delta)
+            for raw_seg in parser.feed(delta):
+                if not aligned:
+                    continue
+                cleaned = _normalise_segments([raw_seg])
+                idx = _locate_segment(cleaned[0]["text"], submission, pos) if cleaned else None
+                if idx is None:
+                    aligned = False
+                    continue
+                if idx > pos:
+                    yield "segment", {"text": submission[pos:idx], "status": "correct", "comment": None}
+                yield "segment", cleaned[0]
+                pos = idx + len(cleaned[0]["text"])
+    except cancellation.Cancelled:
+        raise
+    except Exception:
+        logger.exception("evaluate_submission_stream: LLM call failed")
+        yield "done", (
+            EvaluationOutcome(is_correct=False, segments=[], prose_feedback=_LLM_UNREACHABLE, path="llm_error"),
+            "prose_fallback",
+        )
+        return
+
+    outcome, integrity = _outcome_from_raw("".join(pieces) or "{}", submission=submission, mode=mode)
+    metrics.incr(f"evaluator.tier.{request.model}.calls")
+    if integrity == "prose_fallback" and len(request.models) > 1:
+        # The streamed tier's markup didn't validate: finish on the
+        # remaining tiers, unstreamed. The client renders `done` anyway.
+        metrics.incr(f"evaluator.tier.{request.model}.escalated")
+        token = _llm_call_context.set(call_context)
+        try:
+            outcome, integrity = _mark(
+                request, user_prompt=request.user_prompt_for(submission),
+                submission=submission, models=request.models[1:],
+            )
+        finally:
+            _llm_call_context.reset(token)
+    yield "done", (outcome, integrity)
+
+
+# ── Speculative draft evaluation ────────────────────────────────────────────
+#
+# While the student is still typing, the client can post their working as
+# a draft (debounced). Drafts are evaluated in the background through the
+# normal pipeline with the attempt_id set, so the result lands in the
+# incremental memo: a later real submission of the same text is "reused"
+# instantly, and a slightly longer one only sends the changed tail.
+#
+# Drafts only use spare capacity and always yield to real work:
+# - a few dedicated worker threads (EVALUATOR_DRAFT_WORKERS, default 2),
+# - refused outright in brownout or while EVALUATOR_DRAFT_MAX_IN_FLIGHT or
+#   more LLM calls are already in flight,
+# - one slot per (attempt, target): a newer draft replaces a queued one and
+#   cancels a running one (via its CancelToken, closing the LLM request),
+# - a real submission cancels any draft for its attempt with different
+#   text, and waits for a running draft with the same text rather than
+#   paying for it twice — but no longer than a fresh call would take (the
+#   median of recent LLM latency, at most EVALUATOR_DRAFT_SETTLE_MAX_SECONDS)
+#   and not past the request's cancellation; a draft that misses that is
+#   cancelled and the submission evaluated afresh,
+# - their LLM calls run under overload.speculative(), so they never count
+#   towards brownout's in-flight or latency triggers.
+#
+# Counters: evaluator.draft.queued/refused/superseded/started/completed/
+# cancelled/failed/hit/abandoned.
+
+
+@dataclass
+class _Draft:
+    key: tuple[str, str]
+    submission: str
+    ai_response: Dict[str, Any]
+    question: str
+    mode: str
+    target: str
+    token: Any  # cancellation.CancelToken
+    done: threading.Event
+
+
+class _DraftRunner:
+    def __init__(self, *, workers: int, max_in_flight: int, max_settle_seconds: float = 10.0,
+                 max_pending: int = 256):
+        self.workers = workers
+        self.max_in_flight = max_in_flight
+        self.max_settle_seconds = max_settle_seconds
+        self.max_pending = max_pending
+        self._pending: "OrderedDict[tuple[str, str], _Draft]" = OrderedDict()
+        self._running: Dict[tuple[str, str], _Draft] = {}
+        self._finished: "OrderedDict[tuple[str, str], str]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+
+    def busy_reason(self) -> Optional[str]:
+        """Why a draft can't run right now, or None if there's spare capacity."""
+        import overload
+
+        controller = overload.controller()
+        if controller.brownout_active():
+            return "brownout"
+        if controller.in_flight >= self.max_in_flight:
+            return "busy"
+        return None
+
+    def submit(
+        self,
+        *,
+        attempt_id: str,
+        submission: str,
+        ai_response: Dict[str, Any],
+        question: str,
+        mode: str = "guided",
+        target: str = "main",
+    ) -> Optional[str]:
+        """Queue a draft. Returns None if accepted, else the reason it was refused."""
+        reason = self.busy_reason()
+        if reason is not None:
+            metrics.incr("evaluator.draft.refused")
+            return reason
+        key = (attempt_id, target)
+        previous = _previous_evaluations.get(key)
+        if previous is not None and previous.submission == submission and previous.mode == mode:
+            return "cached"
+        draft = _Draft(
+            key=key, submission=submission, ai_response=ai_response, question=question,
+            mode=mode, target=target, token=cancellation.CancelToken(), done=threading.Event(),
+        )
+        with self._cond:
+            running = self._running.get(key)
+            if running is not None and running.submission == submission:
+                return "running"
+            self._supersede(key, "superseded by a newer draft")
+            self._pending[key] = draft
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)[1].done.set()
+            self._ensure_workers()
+            self._cond.notify()
+        metrics.incr("evaluator.draft.queued")
+        return None
+
+    def settle(self, *, attempt_id: str, target: str, submission: str, timeout: Optional[float] = None) -> None:
+        """Called before a real submission: clear the way for it.
+
+        Drafts for the attempt with other text are dropped or cancelled; a
+        running draft of exactly this text is waited for so its markup can
+        be reused, for at most `timeout` (default `settle_budget()`). If it
+        isn't done by then it is cancelled. Raises Cancelled if the request
+        is cancelled while waiting.
+        """
+        key = (attempt_id, target)
+        with self._cond:
+            self._pending.pop(key, None)
+            running = self._running.get(key)
+            if running is not None and running.submission != submission:
+                self._supersede(key, "superseded by a real submission")
+                running = None
+        if running is None:
+            return
+        deadline = time.monotonic() + (self.settle_budget() if timeout is None else timeout)
+        while not running.done.wait(min(cancellation.DEFAULT_POLL_SECONDS, max(0.0, deadline - time.monotonic()))):
+            cancellation.check()
+            if time.monotonic() >= deadline:
+                with self._cond:
+                    if self._running.get(key) is running:
+                        self._supersede(key, "real submission stopped waiting")
+                metrics.incr("evaluator.draft.abandoned")
+                return
+
+    def settle_budget(self) -> float:
+        """How long a real submission may wait for a draft: what a fresh LLM
+        call takes (median recent latency), capped at max_settle_seconds."""
+        median_ms = metrics.window("evaluator.llm").percentile(50)
+        if median_ms is None:
+            return self.max_settle_seconds
+        return min(self.max_settle_seconds, median_ms / 1000)
+
+    def record_hit(self, *, attempt_id: str, target: str, submission: str, outcome: EvaluationOutcome) -> None:
+        """Count a real submission answered from a draft's markup."""
+        with self._cond:
+            drafted = self._finished.get((attempt_id, target))
+        if outcome.path == "reused" and drafted == submission:
+            metrics.incr("evaluator.draft.hit")
+
+    def _supersede(self, key: tuple[str, str], reason: str) -> None:
+        # Caller holds self._cond.
+        if self._pending.pop(key, None) is not None:
+            metrics.incr("evaluator.draft.superseded")
+        running = self._running.get(key)
+        if running is not None and not running.token.cancelled:
+            running.token.cancel(reason)
+            metrics.incr("evaluator.draft.superseded")
+
+    def _ensure_workers(self) -> None:
+        # Caller holds self._cond.
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"eval-draft-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                key, draft = self._pending.popitem(last=False)
+                self._running[key] = draft
+            try:
+                self._run(draft)
+            finally:
+                with self._cond:
+                    if self._running.get(key) is draft:
+                        del self._running[key]
+                draft.done.set()
+
+    def _run(self, draft: _Draft) -> None:
+        if self.busy_reason() is not None:
+            # Capacity went while it was queued; real work comes first.
+            metrics.incr("evaluator.draft.refused")
+            return
+        import overload
+
+        metrics.incr("evaluator.draft.started")
+        try:
+            with cancellation.scope(draft.token), overload.speculative():
+                evaluate_submission(
+                    submission=draft.submission,
+                    ai_response=draft.ai_response,
+                    question=draft.question,
+                    mode=draft.mode,
+                    target=draft.target,
+                    attempt_id=draft.key[0],
+                )
+        except cancellation.Cancelled:
+            metrics.incr("evaluator.draft.cancelled")
+            return
+        except Exception:
+            logger.exception("draft evaluation failed attempt=%s", draft.key[0])
+            metrics.incr("evaluator.draft.failed")
+            return
+        metrics.incr("evaluator.draft.completed")
+        with self._cond:
+            self._finished[draft.key] = draft.submission
+            self._finished.move_to_end(draft.key)
+            while len(self._finished) > self.max_pending:
+                self._finished.popitem(last=False)
+
+
+drafts = _DraftRunner(
+    workers=int(os.getenv("EVALUATOR_DRAFT_WORKERS", "2")),
+    max_in_flight=int(os.getenv("EVALUATOR_DRAFT_MAX_IN_FLIGHT", "8")),
+    max_settle_seconds=float(os.getenv("EVALUATOR_DRAFT_SETTLE_MAX_SECONDS", "10")),
+)
+
+
+# ── Batch evaluation ────────────────────────────────────────────────────────
+
+
+@dataclass
+class BatchItemResult:
+    """One submission's result from `evaluate_batch`.
+
+    `duration_ms` is the time spent evaluating this submission (shared by
+    its duplicates); `elapsed_ms` is when it finished relative to the start
+    of the batch. `duplicate_of` is the index of the first identical
+    submission, whose evaluation this result reuses.
+    """
+    index: int
+    outcome: EvaluationOutcome
+    duration_ms: int
+    elapsed_ms: int
+    duplicate_of: Optional[int] = None
+
+
+def evaluate_batch(
+    *,
+    submissions: List[str],
+    ai_response: Dict[str, Any],
+    question: str,
+    mode: str = "free",
+    target: str = "main",
+    model: Optional[str] = None,
+    concurrency: Optional[int] = None,
+) -> Iterator[BatchItemResult]:
+    """Evaluate many submissions against one problem, yielding results as they finish.
+
+    Identical submissions are evaluated once. The prompt is loaded once for
+    the whole batch, every unique submission goes through the cheap path
+    first (those results are yielded straight away), and the remainder fan
+    out to the LLM on at most `concurrency` threads
+    (EVALUATOR_BATCH_CONCURRENCY, default 4). Closing the iterator early
+    cancels the submissions not yet started; under a cancellable request the
+    in-flight calls are aborted too.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    started = time.perf_counter()
+
+    def _ms(since: float) -> int:
+        return int((time.perf_counter() - since) * 1000)
+
+    groups: "OrderedDict[str, List[int]]" = OrderedDict()
+    for i, text in enumerate(submissions):
+        groups.setdefault(text, []).append(i)
+
+    def _results(indices: List[int], outcome: EvaluationOutcome, duration_ms: int) -> Iterator[BatchItemResult]:
+        elapsed = _ms(started)
+        for i in indices:
+            yield BatchItemResult(
+                index=i,
+                outcome=outcome,
+                duration_ms=duration_ms,
+                elapsed_ms=elapsed,
+                duplicate_of=indices[0] if i != indices[0] else None,
+            )
+
+    try:
+        prompt: Optional[tuple[str, str]] = _load_active_prompt()
+    except EvaluatorError:
+        prompt = None  # _prepare_evaluation reports it per submission
+
+    pending: List[tuple[str, _LLMRequest]] = []
+    for text, indices in groups.items():
+        t0 = time.perf_counter()
+        outcome, request = _prepare_evaluation(
+            submission=text, ai_response=ai_response, question=question,
+            mode=mode, target=target, model=model, prompt=prompt,
+        )
+        if outcome is not None:
+            yield from _results(indices, outcome, _ms(t0))
+        else:
+            pending.append((text, request))
+
+    if not pending:
+        return
+
+    def _run(text: str, request: _LLMRequest) -> tuple[EvaluationOutcome, int]:
+        cancellation.check()
+        t0 = time.perf_counter()
+        # Pool threads don't inherit context; set it so recordings are replayable.
+        _llm_call_context.set(_call_context(
+            request, submission=text, ai_response=ai_response, question=question, target=target,
+        ))
+        outcome, _integrity = _mark(request, user_prompt=request.user_prompt_for(text), submission=text)
+        return outcome, _ms(t0)
+
+    workers = concurrency or int(os.getenv("EVALUATOR_BATCH_CONCURRENCY", "4"))
+    pool = ThreadPoolExecutor(max_workers=max(1, workers))
+    try:
+        # copy_context carries the request's CancelToken into the pool threads.
+        futures = {pool.submit(copy_context().run, _run, text, request): text for text, request in pending}
+        for future in as_completed(futures):
+            outcome, duration_ms = future.result()
+            yield from _results(groups[futures[future]], outcome, duration_ms)
+    finally:
+        # Closed early (client gone, or a failure): drop the queued calls
+        # rather than waiting for every one of them.
+        pool.shutdown(wait=False, cancel_futures=True)
 
 
 def _log_validation_failure(*, reason: str, raw_response: str, submission: str) -> None:
@@ -504,4 +2009,5 @@ def _prose_fallback_from(parsed: Any) -> EvaluationOutcome:
         is_correct=False,
         segments=[],
         prose_feedback=fallback,
+        path="prose_fallback",
     )
@@ -16,6 +16,11 @@ from json import JSONDecodeError
 import time
 import boto3  # type: ignore
 
+import cancellation
+import metrics
+import model_routing
+import overload
+
 from gcse_help_template import create_gcse_help_base_structure
 from gcse_help_prompts import (
     get_system_prompt,
@@ -43,8 +48,11 @@ def normalize_exercise_text(text: str) -> str:
     return t
 
 
-def exercise_hash(normalized_text: str, *, schema_version: str, prompt_version: int) -> str:
-    payload = f"{schema_version}||{prompt_version}||{normalized_text}".encode("utf-8")
+def exercise_hash(normalized_text: str, *, schema_version: str, prompt_version: int, model: str) -> str:
+    """Cache key for generated help. `model` is the tier ladder (see
+    model_routing.ladder_key) so a routing change never serves output
+    generated under a different policy."""
+    payload = f"{schema_version}||{prompt_version}||{model}||{normalized_text}".encode("utf-8")
     return hashlib.sha256(payload).hexdigest()
 
 
@@ -52,9 +60,15 @@ class GCSEHelpError(RuntimeError):
     pass
 
 
+class GCSEHelpUnavailable(GCSEHelpError):
+    """Cache-only generation (brownout) missed the cache — retry later."""
+
+
 @dataclass(frozen=True)
 class GCSEHelpGeneratorConfig:
     model: str = "gpt-4.1-mini"
+    # Model ladder, cheapest first; empty means just `model`.
+    model_tiers: tuple[str, ...] = ()
     schema_version: str = "1.0.0"
     cache_backend: str = "dynamodb"  # dynamodb | json
     cache_path: Path = Path("./gcse_cache.json")
@@ -78,8 +92,10 @@ class GCSEHelpGenerator:
     """
 
     def __init__(self, config: GCSEHelpGeneratorConfig | None = None):
+        tiers = model_routing.tiers("gcse_help")
         self._config = config or GCSEHelpGeneratorConfig(
-            model=os.environ.get("OPENAI_MODEL", "gpt-4.1-mini"),
+            model=tiers[0],
+            model_tiers=tuple(tiers),
             schema_version=os.environ.get("GCSE_HELP_SCHEMA_VERSION", "1.0.0"),
             cache_backend=os.environ.get("GCSE_HELP_CACHE_BACKEND", "dynamodb"),
             cache_path=Path(os.environ.get("GCSE_HELP_CACHE_PATH", "./gcse_cache.json")),
@@ -105,9 +121,9 @@ class GCSEHelpGenerator:
         self._load_prompts()
 
         logger.info(
-            "gcse_help_generator.init cache_backend=%s model=%s schema_version=%s dynamo_table=%s dynamo_ready=%s",
+            "gcse_help_generator.init cache_backend=%s models=%s schema_version=%s dynamo_table=%s dynamo_ready=%s",
             self._config.cache_backend,
-            self._config.model,
+            model_routing.ladder_key(self._model_ladder()),
             self._config.schema_version,
             self._config.dynamodb_table_name,
             bool(self._dynamo_table) if self._config.cache_backend == "dynamodb" else False,
@@ -118,41 +134,41 @@ class GCSEHelpGenerator:
         return self._config
 
     def _load_prompts(self) -> None:
-        """Load the active ingestion prompt from DynamoDB into memory.
+        """Load the active ingestion prompt from the prompt registry.
 
-        Falls back to the module-level constants if DB is unavailable or not seeded.
-        Also seeds the prompt into DB on first run.
+        The registry holds the active version in memory for the whole process,
+        so constructing a generator per request costs no DynamoDB reads. Seeds
+        the prompt into DB on first run if the registry has nothing, and falls
+        back to the module-level constants if DB is unavailable or not seeded.
         """
         try:
-            seeded = seed_ingestion_prompt_if_missing()
-            if seeded:
-                logger.info("gcse_help_generator.prompt_seeded")
-        except Exception:
-            logger.exception("gcse_help_generator.prompt_seed_failed — using module defaults")
-
-        try:
-            import db as _db
-            active = _db.get_prompt_active("ingestion")
-            if active:
-                version = int(active["version"])
-                record = _db.get_prompt_version("ingestion", version)
-                if record:
-                    self._prompt_cache = (
-                        version,
-                        record["systemPrompt"],
-                        record["userPromptTemplate"],
-                    )
-                    logger.info("gcse_help_generator.prompt_loaded version=%d", version)
-                    return
+            from prompt_registry import get_registry
+            registry = get_registry()
+            prompt = registry.get("ingestion")
+            if prompt is None:
+                if seed_ingestion_prompt_if_missing():
+                    logger.info("gcse_help_generator.prompt_seeded")
+                registry.refresh(force=True)
+                prompt = registry.get("ingestion")
+            if prompt is not None:
+                self._prompt_cache = (
+                    prompt.version,
+                    prompt.system_prompt,
+                    prompt.user_prompt_template,
+                )
+                return
         except Exception:
             logger.exception("gcse_help_generator.prompt_load_failed — using module defaults")
 
         # Fallback to module constants (version 0 = not from DB)
         self._prompt_cache = (0, get_system_prompt(), get_user_prompt_template())
+        metrics.incr("prompts.fallback.ingestion")
         logger.warning("gcse_help_generator.prompt_using_fallback")
 
     def reload_prompt(self) -> int:
-        """Invalidate the in-memory prompt cache and reload from DB. Returns new version."""
+        """Force a registry poll and reload the ingestion prompt. Returns new version."""
+        from prompt_registry import get_registry
+        get_registry().refresh(force=True)
         self._prompt_cache = None
         self._load_prompts()
         return self._prompt_cache[0] if self._prompt_cache else 0
@@ -305,19 +321,20 @@ class GCSEHelpGenerator:
             if openai is None:
                 return None
             client = openai.OpenAI(api_key=api_key)  # type: ignore[attr-defined]
-            resp = client.chat.completions.create(
-                model=self._config.model,
-                messages=[
-                    {"role": "system", "content": SIMPLER_VERSION_SYSTEM_PROMPT},
-                    {
-                        "role": "user",
-                        "content": render_simpler_version_user_prompt(question, solution),
-                    },
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.2,
-                max_tokens=600,
-            )
+            with overload.controller().llm_call(), cancellation.guard(client):
+                resp = client.chat.completions.create(
+                    model=self._config.model,
+                    messages=[
+                        {"role": "system", "content": SIMPLER_VERSION_SYSTEM_PROMPT},
+                        {
+                            "role": "user",
+                            "content": render_simpler_version_user_prompt(question, solution),
+                        },
+                    ],
+                    response_format={"type": "json_object"},
+                    temperature=0.2,
+                    max_tokens=600,
+                )
             text = (resp.choices[0].message.content or "").strip()
             parsed = json.loads(text)
         except Exception:
@@ -496,6 +513,154 @@ class GCSEHelpGenerator:
 
         raise GCSEHelpError("Model output contained incomplete JSON")
 
+    def _model_ladder(self) -> list[str]:
+        return list(self._config.model_tiers) or [self._config.model]
+
+    def _generate_with_model(
+        self,
+        *,
+        model: str,
+        last: bool,
+        openai: Any,
+        api_key: str,
+        system: str,
+        prompt: str,
+        max_tokens: int,
+        schema_version: str,
+        key_short: str,
+    ) -> Dict[str, Any]:
+        """One tier of `generate`: LLM call, JSON parse, validation.
+
+        On a lower tier (`last` False) a parse or validation failure raises
+        model_routing.Escalate so the next model is tried; the last tier keeps
+        the original behaviour (one JSON-repair call, then raise).
+        """
+        # Support both new (OpenAI()) and legacy SDKs.
+        text: str
+        llm_start = time.perf_counter()
+        if hasattr(openai, "OpenAI"):
+            client = openai.OpenAI(api_key=api_key)  # type: ignore[attr-defined]
+            try:
+                with cancellation.guard(client):
+                    resp = client.chat.completions.create(
+                        model=model,
+                        messages=[
+                            {"role": "system", "content": system},
+                            {"role": "user", "content": prompt},
+                        ],
+                        # Ask the API to enforce JSON output.
+                        response_format={"type": "json_object"},
+                        temperature=0.2,
+                        # Avoid truncation that can produce incomplete JSON.
+                        max_tokens=max_tokens,
+                    )
+                text = (resp.choices[0].message.content or "").strip()
+                model_routing.record_tokens("gcse_help", model, getattr(resp, "usage", None))
+            except Exception:
+                logger.exception(
+                    "gcse_help_generator.llm_call_failed sdk=new key=%s model=%s",
+                    key_short,
+                    model,
+                )
+                raise
+        else:
+            openai.api_key = api_key  # type: ignore[attr-defined]
+            try:
+                resp = openai.ChatCompletion.create(  # type: ignore[attr-defined]
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system},
+                        {"role": "user", "content": prompt},
+                    ],
+                    temperature=0.2,
+                    max_tokens=max_tokens,
+                )
+                text = (resp["choices"][0]["message"]["content"] or "").strip()
+                model_routing.record_tokens("gcse_help", model, resp.get("usage"))
+            except Exception:
+                logger.exception(
+                    "gcse_help_generator.llm_call_failed sdk=legacy key=%s model=%s",
+                    key_short,
+                    model,
+                )
+                raise
+
+        logger.info(
+            "gcse_help_generator.llm_call_ok key=%s model=%s chars=%s ms=%d",
+            key_short,
+            model,
+            len(text),
+            int((time.perf_counter() - llm_start) * 1000),
+        )
+
+        try:
+            obj: Dict[str, Any] = json.loads(text)
+        except JSONDecodeError:
+            if not last:
+                logger.warning("gcse_help_generator.json_parse_failed key=%s model=%s escalating=true", key_short, model)
+                raise model_routing.Escalate("json_parse_failed")
+            logger.warning("gcse_help_generator.json_parse_failed key=%s attempting_repair=true", key_short)
+            # One repair attempt (strict: must return JSON, but we defensively
+            # extract the first JSON object if wrapped in code fences/text).
+            repaired_text: str
+            cancellation.check()
+            if hasattr(openai, "OpenAI"):
+                client = openai.OpenAI(api_key=api_key)  # type: ignore[attr-defined]
+                with cancellation.guard(client):
+                    repair = client.chat.completions.create(
+                        model=model,
+                        messages=[
+                            {"role": "system", "content": system},
+                            {
+                                "role": "user",
+                                "content": "Fix and return ONLY valid JSON for the following (no commentary, no markdown):\n" + text,
+                            },
+                        ],
+                        response_format={"type": "json_object"},
+                        temperature=0,
+                        max_tokens=2500,
+                    )
+                repaired_text = (repair.choices[0].message.content or "").strip()
+            else:
+                repair = openai.ChatCompletion.create(  # type: ignore[attr-defined]
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system},
+                        {
+                            "role": "user",
+                            "content": "Fix and return ONLY valid JSON for the following (no commentary, no markdown):\n" + text,
+                        },
+                    ],
+                    temperature=0,
+                    max_tokens=2500,
+                )
+                repaired_text = (repair["choices"][0]["message"]["content"] or "").strip()
+
+            try:
+                obj = json.loads(repaired_text)
+            except JSONDecodeError:
+                extracted = self._extract_first_json_object(repaired_text)
+                obj = json.loads(extracted)
+
+        logger.info(
+            "gcse_help_generator.json_parse_ok key=%s ms=%d",
+            key_short,
+            int((time.perf_counter() - llm_start) * 1000),
+        )
+
+        try:
+            self._light_validate_response(obj, schema_version=schema_version)
+        except Exception as e:
+            if not last:
+                logger.warning(
+                    "gcse_help_generator.validation_failed key=%s model=%s escalating=true error=%s",
+                    key_short, model, e,
+                )
+                raise model_routing.Escalate(f"validation_failed: {e}") from e
+            logger.exception("gcse_help_generator.validation_failed key=%s", key_short)
+            raise
+        return obj
+
     def generate(
         self,
         *,
@@ -507,8 +672,16 @@ class GCSEHelpGenerator:
         tier: str = "unknown",
         desired_help_level: str = "auto",
         use_cache: bool = True,
+        cache_only: bool = False,
     ) -> Dict[str, Any]:
+        """Return help for `raw_text`, from cache or a new LLM generation.
+
+        `cache_only` (used in brownout) reads the cache even when use_cache
+        is False, and raises GCSEHelpUnavailable on a miss instead of
+        calling the LLM.
+        """
         start = time.perf_counter()
+        use_cache = use_cache or cache_only
         normalized_text = normalize_exercise_text(raw_text)
         if not normalized_text:
             raise GCSEHelpError("No exercise text provided")
@@ -528,6 +701,7 @@ class GCSEHelpGenerator:
             normalized_text,
             schema_version=effective_schema_version,
             prompt_version=prompt_version,
+            model=model_routing.ladder_key(self._model_ladder()),
         )
         text_len = len(normalized_text)
         key_short = key[:12]
@@ -556,6 +730,7 @@ class GCSEHelpGenerator:
                     # (which gates problem/attempt persistence on this field)
                     # works for problems that were cached pre-fix.
                     cached.setdefault("_schema_version", effective_schema_version)
+                    attach_simpler_milestones(cached)
                     return cached
                 logger.info(
                     "gcse_help_generator.cache_miss backend=dynamodb key=%s ms=%d",
@@ -568,9 +743,14 @@ class GCSEHelpGenerator:
                     if isinstance(cached, dict):
                         logger.info("gcse_help_generator.cache_hit backend=json key=%s", key_short)
                         cached.setdefault("_schema_version", effective_schema_version)
+                        attach_simpler_milestones(cached)
                         return cached
                 logger.info("gcse_help_generator.cache_miss backend=json key=%s", key_short)
 
+        if cache_only:
+            logger.info("gcse_help_generator.cache_only_miss key=%s", key_short)
+            raise GCSEHelpUnavailable("Help is busy right now — please try again shortly.")
+
         api_key = os.environ.get("OPENAI_API_KEY")
         if not api_key:
             raise GCSEHelpError("OPENAI_API_KEY is not set")
@@ -599,123 +779,33 @@ class GCSEHelpGenerator:
         # v2 responses are richer (~2k–4k tokens); v1 fits in 2500
         max_tokens = 4000 if prompt_version >= 2 else 2500
 
-        # Support both new (OpenAI()) and legacy SDKs.
-        text: str
-        llm_start = time.perf_counter()
-        if hasattr(openai, "OpenAI"):
-            client = openai.OpenAI(api_key=api_key)  # type: ignore[attr-defined]
-            try:
-                resp = client.chat.completions.create(
-                    model=self._config.model,
-                    messages=[
-                        {"role": "system", "content": system},
-                        {"role": "user", "content": prompt},
-                    ],
-                    # Ask the API to enforce JSON output.
-                    response_format={"type": "json_object"},
-                    temperature=0.2,
-                    # Avoid truncation that can produce incomplete JSON.
+        def attempt(model: str, last: bool) -> Dict[str, Any]:
+            cancellation.check()
+            with overload.controller().llm_call():
+                return self._generate_with_model(
+                    model=model,
+                    last=last,
+                    openai=openai,
+                    api_key=api_key,
+                    system=system,
+                    prompt=prompt,
                     max_tokens=max_tokens,
+                    schema_version=effective_schema_version,
+                    key_short=key_short,
                 )
-                text = (resp.choices[0].message.content or "").strip()
-            except Exception:
-                logger.exception(
-                    "gcse_help_generator.llm_call_failed sdk=new key=%s model=%s",
-                    key_short,
-                    self._config.model,
-                )
-                raise
-        else:
-            openai.api_key = api_key  # type: ignore[attr-defined]
-            try:
-                resp = openai.ChatCompletion.create(  # type: ignore[attr-defined]
-                    model=self._config.model,
-                    messages=[
-                        {"role": "system", "content": system},
-                        {"role": "user", "content": prompt},
-                    ],
-                    temperature=0.2,
-                    max_tokens=max_tokens,
-                )
-                text = (resp["choices"][0]["message"]["content"] or "").strip()
-            except Exception:
-                logger.exception(
-                    "gcse_help_generator.llm_call_failed sdk=legacy key=%s model=%s",
-                    key_short,
-                    self._config.model,
-                )
-                raise
-
-        logger.info(
-            "gcse_help_generator.llm_call_ok key=%s model=%s chars=%s ms=%d",
-            key_short,
-            self._config.model,
-            len(text),
-            int((time.perf_counter() - llm_start) * 1000),
-        )
-
-        try:
-            obj: Dict[str, Any] = json.loads(text)
-        except JSONDecodeError:
-            logger.warning("gcse_help_generator.json_parse_failed key=%s attempting_repair=true", key_short)
-            # One repair attempt (strict: must return JSON, but we defensively
-            # extract the first JSON object if wrapped in code fences/text).
-            repaired_text: str
-            if hasattr(openai, "OpenAI"):
-                client = openai.OpenAI(api_key=api_key)  # type: ignore[attr-defined]
-                repair = client.chat.completions.create(
-                    model=self._config.model,
-                    messages=[
-                        {"role": "system", "content": system},
-                        {
-                            "role": "user",
-                            "content": "Fix and return ONLY valid JSON for the following (no commentary, no markdown):\n" + text,
-                        },
-                    ],
-                    response_format={"type": "json_object"},
-                    temperature=0,
-                    max_tokens=2500,
-                )
-                repaired_text = (repair.choices[0].message.content or "").strip()
-            else:
-                repair = openai.ChatCompletion.create(  # type: ignore[attr-defined]
-                    model=self._config.model,
-                    messages=[
-                        {"role": "system", "content": system},
-                        {
-                            "role": "user",
-                            "content": "Fix and return ONLY valid JSON for the following (no commentary, no markdown):\n" + text,
-                        },
-                    ],
-                    temperature=0,
-                    max_tokens=2500,
-                )
-                repaired_text = (repair["choices"][0]["message"]["content"] or "").strip()
-
-            try:
-                obj = json.loads(repaired_text)
-            except JSONDecodeError:
-                extracted = self._extract_first_json_object(repaired_text)
-                obj = json.loads(extracted)
 
-        logger.info(
-            "gcse_help_generator.json_parse_ok key=%s ms=%d",
-            key_short,
-            int((time.perf_counter() - llm_start) * 1000),
-        )
-
-        try:
-            self._light_validate_response(obj, schema_version=effective_schema_version)
-        except Exception:
-            logger.exception("gcse_help_generator.validation_failed key=%s", key_short)
-            raise
+        obj = model_routing.run("gcse_help", self._model_ladder(), attempt)
 
         # Repair: when the v3 main generation drops simpler_version, fire a
         # focused follow-up call to fill it in. Caching happens after the
         # repair so the merged response is what gets stored. See
         # known-issues/2026-05-02-v3-prompt-drops-milestone-answers.md.
         if effective_schema_version == "3.0.0" and not _has_valid_simpler_version(obj):
+            cancellation.check()
             filled = self._followup_simpler_version(obj, api_key=api_key)
+            # The follow-up swallows its errors, including a cancelled call —
+            # don't let that pass as "no simpler version" into the cache.
+            cancellation.check()
             if filled is not None:
                 obj["simpler_version"] = filled
                 logger.info(
@@ -723,6 +813,8 @@ class GCSEHelpGenerator:
                     key_short,
                 )
 
+        attach_simpler_milestones(obj)
+
         # Attach schema version BEFORE the cache write so cached entries
         # carry the field too — main.py's v2 dispatch (problem/attempt
         # persistence) reads this on every response, including cache hits.
@@ -755,6 +847,28 @@ def _has_valid_simpler_version(obj: Dict[str, Any]) -> bool:
     )
 
 
+def attach_simpler_milestones(obj: Dict[str, Any]) -> bool:
+    """Store the simpler version's final answer as simpler_version.milestone_answers.
+
+    The schema has no milestones for the simpler version, so the evaluator's
+    cheap path had nothing short to match warm-up answers against. The
+    answer is extracted locally from the solution text (see
+    gcse_evaluator.extract_final_answer). Returns True if obj was changed.
+    """
+    if not _has_valid_simpler_version(obj):
+        return False
+    sv = obj["simpler_version"]
+    if sv.get("milestone_answers"):
+        return False
+    from gcse_evaluator import extract_final_answer
+
+    final = extract_final_answer(sv["solution"])
+    if not final:
+        return False
+    sv["milestone_answers"] = [final]
+    return True
+
+
 def convert_floats_to_decimal(obj: Any) -> Any:
     """Recursively convert all float values to Decimal for DynamoDB compatibility."""
     if isinstance(obj, list):
@@ -316,8 +316,7 @@ def seed_v2_ingestion_prompt_if_missing() -> bool:
     Returns True if a seed was written, False if a v2+ version already exists.
     """
     import db
-    existing = db.list_prompt_versions("ingestion")
-    if len(existing) >= 2:
+    if db.latest_prompt_version("ingestion") >= 2:
         return False
     db.put_prompt_version(
         "ingestion",
@@ -486,8 +485,7 @@ def seed_v3_ingestion_prompt_if_missing() -> bool:
     Returns True if a seed was written, False if a v3+ version already exists.
     """
     import db
-    existing = db.list_prompt_versions("ingestion")
-    if len(existing) >= 3:
+    if db.latest_prompt_version("ingestion") >= 3:
         return False
     db.put_prompt_version(
         "ingestion",
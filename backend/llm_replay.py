@@ -0,0 +1,183 @@
+"""Record/replay of the evaluator's LLM calls.
+
+Set EVALUATOR_LLM_RECORD_PATH to append every live `_call_llm` request and
+response to a JSONL corpus. Set EVALUATOR_LLM_REPLAY_PATH to serve responses
+from such a corpus instead of calling OpenAI — a request that isn't in the
+corpus raises ReplayMiss rather than falling through to a paid call.
+
+Each corpus line holds the rendered prompts, the model, the raw response,
+the live latency and, when the call came from `evaluate_submission`, the
+evaluation inputs (submission, problem payload, mode, target and the prompt
+pair) so `bench_evaluator.py` can push the same work back through the
+whole pipeline. Evaluations answered without the LLM (cheap-path hits) are
+recorded too, with no response, so the replayed workload keeps its mix.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayMiss(RuntimeError):
+    """Raised in replay mode when a request has no recorded response."""
+
+
+def call_key(*, system_prompt: str, user_prompt: str, model: str) -> str:
+    """Stable identity of one LLM request."""
+    h = hashlib.sha256()
+    for part in (model, system_prompt, user_prompt):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def load_corpus(path: str) -> List[Dict[str, Any]]:
+    """Read a JSONL corpus, skipping blank or unparseable lines."""
+    entries: List[Dict[str, Any]] = []
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning("llm_replay: skipping malformed line %d in %s", lineno, path)
+    return entries
+
+
+class CorpusRecorder:
+    """Appends live request/response pairs to a JSONL file. Thread-safe."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        *,
+        system_prompt: str,
+        user_prompt: str,
+        model: str,
+        response: str,
+        latency_ms: int,
+        evaluation: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        entry = {
+            "key": call_key(system_prompt=system_prompt, user_prompt=user_prompt, model=model),
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "model": model,
+            "system_prompt": system_prompt,
+            "user_prompt": user_prompt,
+            "response": response,
+            "latency_ms": latency_ms,
+            "evaluation": evaluation,
+        }
+        self._append(entry)
+
+    def record_evaluation(self, evaluation: Dict[str, Any]) -> None:
+        """Record an evaluation that was answered without an LLM call."""
+        self._append({
+            "key": None,
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "response": None,
+            "evaluation": evaluation,
+        })
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry, ensure_ascii=False, default=str)
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError:
+            # Recording is a diagnostics aid — never fail the evaluation for it.
+            logger.exception("llm_replay: failed to append to %s", self.path)
+
+
+class CorpusReplayer:
+    """Serves recorded responses by request identity.
+
+    `latency_scale` > 0 sleeps for the recorded latency times the scale
+    before answering, so benchmarks see realistic overlap between calls.
+    """
+
+    def __init__(self, entries: List[Dict[str, Any]], *, latency_scale: float = 0.0):
+        self._responses: Dict[str, Dict[str, Any]] = {}
+        for entry in entries:
+            if entry.get("response") is None:
+                continue  # evaluation answered without the LLM
+            key = entry.get("key") or call_key(
+                system_prompt=entry["system_prompt"],
+                user_prompt=entry["user_prompt"],
+                model=entry["model"],
+            )
+            self._responses[key] = entry  # last recording wins
+        self.latency_scale = latency_scale
+
+    @classmethod
+    def from_path(cls, path: str, *, latency_scale: float = 0.0) -> "CorpusReplayer":
+        return cls(load_corpus(path), latency_scale=latency_scale)
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+    def respond(self, *, system_prompt: str, user_prompt: str, model: str) -> str:
+        key = call_key(system_prompt=system_prompt, user_prompt=user_prompt, model=model)
+        entry = self._responses.get(key)
+        if entry is None:
+            raise ReplayMiss(f"no recorded response for request {key[:12]}")
+        if self.latency_scale > 0:
+            time.sleep(max(0, entry.get("latency_ms") or 0) / 1000 * self.latency_scale)
+        return entry["response"]
+
+
+_recorder: Optional[CorpusRecorder] = None
+_replayer: Optional[CorpusReplayer] = None
+_configured = False
+_config_lock = threading.Lock()
+
+
+def configure(
+    *,
+    record_path: Optional[str] = None,
+    replay_path: Optional[str] = None,
+    replayer: Optional[CorpusReplayer] = None,
+) -> None:
+    """Set the record/replay mode explicitly (overrides the env vars).
+
+    Call with no arguments to turn both off.
+    """
+    global _recorder, _replayer, _configured
+    with _config_lock:
+        _recorder = CorpusRecorder(record_path) if record_path else None
+        _replayer = replayer or (CorpusReplayer.from_path(replay_path) if replay_path else None)
+        _configured = True
+
+
+def _configure_from_env() -> None:
+    if _configured:
+        return
+    replay_path = os.getenv("EVALUATOR_LLM_REPLAY_PATH", "").strip()
+    record_path = os.getenv("EVALUATOR_LLM_RECORD_PATH", "").strip()
+    configure(record_path=record_path or None, replay_path=replay_path or None)
+    if replay_path:
+        logger.info("llm_replay: serving evaluator LLM calls from %s (%d responses)", replay_path, len(_replayer))
+    if record_path:
+        logger.info("llm_replay: recording evaluator LLM calls to %s", record_path)
+
+
+def get_recorder() -> Optional[CorpusRecorder]:
+    _configure_from_env()
+    return _recorder
+
+
+def get_replayer() -> Optional[CorpusReplayer]:
+    _configure_from_env()
+    return _replayer
@@ -1,3 +1,4 @@
+import json
 import logging
 import os
 import random
@@ -5,7 +6,11 @@ from datetime import datetime, timezone
 from typing import List, Optional
 from uuid import uuid4
 from dotenv import load_dotenv
+import cancellation
+import content_cache
 import db
+import db_async
+import quiz_token
 import shutil
 import schemas
 from auth import get_default_verifier
@@ -13,15 +18,13 @@ from auth import get_current_principal
 
 from db import (
     get_user_profile, put_user_profile, get_uid_by_device,
-    list_topics_grouped, list_cards_for_topic,
-    save_quiz_session, get_quiz_session, delete_quiz_session,
-    save_quiz_result, recent_wrong_cards,
 )
 
-from fastapi import FastAPI, HTTPException, Request, UploadFile, File, Form, Depends, status
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Request, UploadFile, File, Form, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 
-from schemas import (BootstrapReq, BootstrapRes, BreakdownItem, Card,
+from schemas import (BootstrapReq, BootstrapRes, BreakdownItem,
                         NextSteps, Question, QuizStartReq, QuizStartRes, QuizSubmitReq,
                         QuizSubmitRes, ReviewDueGroup, ReviewNextRes,
                         SubjectWithTopics, TopicCardsRes, TopicStub,
@@ -29,8 +32,9 @@ from schemas import (BootstrapReq, BootstrapRes, BreakdownItem, Card,
                         PromptSummary, PromptVersion, PromptSaveReq, PromptSaveRes,
                         PromptTryReq, PromptTryRes,
                         AttemptSummary, UserAttemptsRes,
-                        LogEventReq, LogEventRes,
-                        EvaluateReq, EvaluateRes, FeedbackSegment, ProblemRes)
+                        LogEventReq, LogEventRes, LogEventBatchReq, LogEventBatchRes,
+                        EvaluateReq, EvaluateRes, FeedbackSegment, ProblemRes,
+                        EvaluateBatchReq, EvaluateDraftRes)
 
 
 
@@ -73,6 +77,26 @@ def _seed_prompts_on_startup():
     except Exception:
         logger.exception("startup: prompt seed failed — admin UI will show 'Not seeded' until resolved")
 
+    # Warm the prompt registry so the first request doesn't pay for the load.
+    try:
+        from prompt_registry import get_registry
+        versions = get_registry().refresh(force=True)
+        logger.info("startup: prompt registry loaded %s", versions)
+    except Exception:
+        logger.exception("startup: prompt registry warm-up failed — will load on first use")
+
+
+@app.on_event("shutdown")
+async def _close_async_db():
+    await db_async.close()
+
+
+@app.on_event("shutdown")
+def _flush_event_buffer():
+    import event_buffer
+    if not event_buffer.close(timeout=10):
+        logger.warning("shutdown: event buffer still writing after 10s; remaining events may be lost")
+
 # Allowed frontend origins
 ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -187,10 +211,54 @@ def diagnostics():
             "sdk": openai_ok,
             "model": os.getenv("OPENAI_MODEL"),
             "enabled": ai_enabled,
+            "modelRouting": _model_routing_snapshot(),
         },
+        "prompts": _prompt_registry_snapshot(),
+        "metrics": _metrics_snapshot(),
+        "overload": _overload_snapshot(),
+        "db": _db_snapshot(),
+        "eventBuffer": _event_buffer_snapshot(),
     }
 
 
+def _prompt_registry_snapshot() -> dict:
+    """Loaded prompt versions per worker — useful for checking an admin save has propagated."""
+    try:
+        from prompt_registry import get_registry
+        return get_registry().snapshot()
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def _model_routing_snapshot() -> dict:
+    """Tier ladder per LLM task with per-tier calls, escalation rate, tokens and latency."""
+    import model_routing
+    return model_routing.snapshot()
+
+
+def _metrics_snapshot() -> dict:
+    """This worker's in-process counters and latency percentiles (see metrics.py)."""
+    import metrics
+    return metrics.snapshot()
+
+
+def _overload_snapshot() -> dict:
+    """Brownout state for this worker (see overload.py)."""
+    import overload
+    return overload.controller().snapshot()
+
+
+def _db_snapshot() -> dict:
+    """DynamoDB/S3 pool utilisation and per-operation latency (see db.stats)."""
+    return {**db.stats(), "asyncBackend": db_async.backend()}
+
+
+def _event_buffer_snapshot() -> dict:
+    """Step events queued and being written on this worker (see event_buffer.py)."""
+    import event_buffer
+    return event_buffer.buffer().snapshot()
+
+
 def _get_claims_from_auth_header(request: Request):
     verifier = get_default_verifier()
     if not verifier:
@@ -222,7 +290,7 @@ def read_root():
     '''Root endpoint.'''
     return {"message": "Hello, World!", "table": TABLE_NAME}
 
-# No explicit startup/shutdown needed for boto3-backed database module
+# No explicit startup/shutdown needed: db connects lazily on first use
 
 # Simple message entity using single-table pattern
 # PK = MSG#demo, SK = WELCOME (static demo example)
@@ -268,44 +336,49 @@ def now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-# DynamoDB access is handled by the database module
+# DynamoDB access is handled by the db module
+
+# Stateless quiz sessions (see quiz_token.py): with a secret set, /quiz/start
+# returns a signed token instead of storing a session.
+_QUIZ_TOKEN_SECRET = os.getenv("QUIZ_TOKEN_SECRET", "").strip()
 
 
-def create_quiz_session(uid: str, topic_id: str, num_questions: int) -> QuizStartRes:
+_quiz_rng = random.Random()
+
+
+async def create_quiz_session(uid: str, topic_id: str, num_questions: int) -> QuizStartRes:
     '''Create a new quiz session for the user on the given topic.'''
-    # database.list_cards_for_topic returns list[dict]; convert to Card models
-    card_dicts = list_cards_for_topic(topic_id)
-    cards = [Card(**c) for c in card_dicts]
-    if not cards:
+    # Answer pool and distractor candidates are precomputed per topic (quiz_index)
+    index = (await content_cache.aquiz_index(topic_id)).value
+    if not index:
         raise HTTPException(status_code=404, detail="No cards for topic")
-    k = min(num_questions, len(cards))
-    selected = random.sample(cards, k)
-
-    # Build MCQs: stem = card.front, correct = card.back, distractors = other backs
-    other_backs = [c.back for c in cards]
-    questions: List[Question] = []
-    for card in selected:
-        distractors = [b for b in other_backs if b != card.back]
-        distractors = random.sample(distractors, k=min(3, len(distractors)))  # up to 3
-        choices = distractors + [card.back]
-        random.shuffle(choices)
-        correct_idx = choices.index(card.back)
-        questions.append(Question(
-            id=card.id,
-            stem=card.front,
-            choices=choices,
-            correctIndex=correct_idx,  # Client can ignore this field
-        ))
+    questions = [Question(**q) for q in index.questions(num_questions, _quiz_rng)]
 
     quiz_id = str(uuid4())
+    question_dicts = [q.dict() for q in questions]
+    if _QUIZ_TOKEN_SECRET:
+        token = quiz_token.sign(
+            secret=_QUIZ_TOKEN_SECRET, uid=uid, quiz_id=quiz_id, topic_id=topic_id,
+            questions=question_dicts, ttl_seconds=db.QUIZ_SESSION_TTL_SECONDS,
+        )
+        return QuizStartRes(quizId=quiz_id, topicId=topic_id, questions=questions, quizToken=token)
     # Persist session so grading uses the same choices/correctIndex
-    save_quiz_session(uid, quiz_id, topic_id, [q.dict() for q in questions])
+    await db_async.save_quiz_session(uid, quiz_id, topic_id, question_dicts)
     return QuizStartRes(quizId=quiz_id, topicId=topic_id, questions=questions)
 
 
-def load_quiz_session(uid: str, quiz_id: str) -> dict:
-    '''Load an existing quiz session for grading.'''
-    item = get_quiz_session(uid, quiz_id)
+async def load_quiz_session(uid: str, quiz_id: str, token: Optional[str] = None) -> dict:
+    '''Load an existing quiz session for grading, from its token if it has one.'''
+    if token:
+        if not _QUIZ_TOKEN_SECRET:
+            raise HTTPException(status_code=400, detail="Quiz tokens are not enabled")
+        try:
+            return quiz_token.verify(token, secret=_QUIZ_TOKEN_SECRET, uid=uid, quiz_id=quiz_id)
+        except quiz_token.QuizTokenExpired:
+            raise HTTPException(status_code=404, detail="Quiz session expired") from None
+        except quiz_token.QuizTokenError as e:
+            raise HTTPException(status_code=400, detail="Invalid quiz token") from e
+    item = await db_async.get_quiz_session(uid, quiz_id)
     if not item:
         raise HTTPException(status_code=404, detail="Quiz session not found")
     return item
@@ -328,22 +401,40 @@ def bootstrap_user(req: BootstrapReq):
     put_user_profile(uid, device_id)
     return BootstrapRes(uid=uid, isNew=True)
 
+def _not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    '''Set the ETag on a cached-content response; a 304 if the client has it.'''
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    sent = request.headers.get("if-none-match", "")
+    tags = {t.strip().removeprefix("W/") for t in sent.split(",")}
+    if etag in tags or "*" in tags:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
 @app.get("/api/v1/subjects", response_model=List[SubjectWithTopics])
-def get_subjects():
+def get_subjects(request: Request, response: Response):
     '''List all subjects with their topics.'''
     try:
-        grouped = list_topics_grouped()
+        content = content_cache.subjects()
+        cached = _not_modified(request, response, content.etag)
+        if cached is not None:
+            return cached
+        grouped = content.value
         return [SubjectWithTopics(subject=g["subject"], topics=[TopicStub(**t) for t in g["topics"]]) for g in grouped]
     except Exception as e:
         logger.exception("Failed to list subjects")
         raise HTTPException(status_code=500, detail="Failed to list subjects") from e
 
 @app.get("/api/v1/topics/{topic_id}/cards", response_model=TopicCardsRes)
-def get_topic_cards(topic_id: str):
+def get_topic_cards(topic_id: str, request: Request, response: Response):
     '''Get all cards for a given topic ID.'''
     try:
-        cards = list_cards_for_topic(topic_id)
-        return TopicCardsRes(topicId=topic_id, cards=cards)
+        content = content_cache.cards(topic_id)
+        cached = _not_modified(request, response, content.etag)
+        if cached is not None:
+            return cached
+        return TopicCardsRes(topicId=topic_id, cards=content.value)
     except HTTPException:
         raise
     except Exception as e:
@@ -351,12 +442,12 @@ def get_topic_cards(topic_id: str):
         raise HTTPException(status_code=500, detail="Failed to get topic cards") from e
 
 @app.post("/api/v1/quiz/start", response_model=QuizStartRes)
-def quiz_start(req: QuizStartReq):
+async def quiz_start(req: QuizStartReq):
     # Validate user exists
-    if not get_user_profile(req.uid):
+    if not await db_async.get_user_profile(req.uid):
         raise HTTPException(status_code=404, detail="User not found")
     try:
-        return create_quiz_session(req.uid, req.topicId, req.numQuestions)
+        return await create_quiz_session(req.uid, req.topicId, req.numQuestions)
     except HTTPException:
         raise
     except Exception as e:
@@ -364,27 +455,25 @@ def quiz_start(req: QuizStartReq):
         raise HTTPException(status_code=500, detail="Failed to start quiz") from e
 
 @app.post("/api/v1/quiz/submit", response_model=QuizSubmitRes)
-def quiz_submit(req: QuizSubmitReq):
+async def quiz_submit(req: QuizSubmitReq):
     '''Submit quiz answers and get results.'''
-    sess = load_quiz_session(req.uid, req.quizId)
-    q_by_id: dict[str, Question] = {}
-    for q in sess.get("questions", []):
-        # q may be dict; coerce
-        q_by_id[q["id"]] = Question(**q)
+    sess = await load_quiz_session(req.uid, req.quizId, req.quizToken)
+    # Stored sessions hold whole questions, tokens only ids and correctIndex
+    correct_by_id: dict[str, int] = {q["id"]: int(q.get("correctIndex") or 0) for q in sess.get("questions", [])}
 
     breakdown: List[BreakdownItem] = []
     correct_count = 0
     for ans in req.answers:
-        q = q_by_id.get(ans.questionId)
-        if not q:
+        correct_index = correct_by_id.get(ans.questionId)
+        if correct_index is None:
             raise HTTPException(status_code=400, detail=f"Unknown questionId {ans.questionId}")
-        is_correct = (ans.choiceIndex == (q.correctIndex or 0))
+        is_correct = (ans.choiceIndex == correct_index)
         if is_correct:
             correct_count += 1
         breakdown.append(BreakdownItem(
             questionId=ans.questionId,
             correct=is_correct,
-            correctIndex=(q.correctIndex or 0),
+            correctIndex=correct_index,
             explanation=None
         ))
     score = correct_count
@@ -392,7 +481,9 @@ def quiz_submit(req: QuizSubmitReq):
     # Persist final result (serialize Pydantic models to plain dicts for DynamoDB)
     breakdown_dicts = [b.dict() for b in breakdown]
     answers_dicts = [a.dict() for a in req.answers]
-    save_quiz_result(
+    # Each quiz is graded once: a replayed token (or a racing resubmit)
+    # must not overwrite the result or reschedule the cards again
+    recorded = await db_async.save_quiz_result(
         req.uid,
         req.quizId,
         sess.get("topicId", ""),
@@ -400,12 +491,22 @@ def quiz_submit(req: QuizSubmitReq):
         score,
         answers_dicts,
     )
+    if not recorded:
+        raise HTTPException(status_code=409, detail="Quiz already submitted")
 
-    # Optionally delete session (cleanup)
+    # Reschedule the quizzed cards; the result above is enough to rebuild
+    # this (backfill_review_state.py), so a failure doesn't fail the submit
     try:
-        delete_quiz_session(req.uid, req.quizId)
+        await db_async.record_card_reviews(req.uid, sess.get("topicId", ""), breakdown_dicts)
     except Exception:
-        pass
+        logger.warning("Failed to record card reviews uid=%s quiz=%s", req.uid, req.quizId, exc_info=True)
+
+    # Optionally delete session (cleanup); token quizzes have none
+    if not req.quizToken:
+        try:
+            await db_async.delete_quiz_session(req.uid, req.quizId)
+        except Exception:
+            pass
 
     # Next steps = revisit wrong answers
     wrong_card_ids = [b.questionId for b in breakdown if not b.correct]
@@ -416,13 +517,16 @@ def quiz_submit(req: QuizSubmitReq):
     )
 
 
+REVIEW_NEXT_MAX_CARDS = int(os.getenv("REVIEW_NEXT_MAX_CARDS", "50"))
+
+
 @app.get("/api/v1/review/next", response_model=ReviewNextRes)
 def review_next(uid: str):
-    '''Get next cards for review based on recent wrong answers.'''
+    '''Get the cards due for review now (spaced repetition, see srs.py).'''
     if not get_user_profile(uid):
         raise HTTPException(status_code=404, detail="User not found")
-    topic_to_cards = recent_wrong_cards(uid, limit_results=10)
-    due_list = [ReviewDueGroup(topicId=t, cardIds=sorted(list(cids))) for t, cids in topic_to_cards.items()]
+    topic_to_cards = db.due_cards(uid, limit=REVIEW_NEXT_MAX_CARDS)
+    due_list = [ReviewDueGroup(topicId=t, cardIds=cids) for t, cids in topic_to_cards.items()]
     # If nothing due, return empty list
     return ReviewNextRes(due=due_list)
 
@@ -470,23 +574,24 @@ def _extract_text_from_image(data_url: str) -> str:
     else:
         b64, mime = data_url, "image/png"
     client = openai.OpenAI(api_key=api_key)
-    resp = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {
-                "role": "system",
-                "content": "Extract the exact text of GCSE exam questions from screenshot images. Return only the question text as it appears. No commentary.",
-            },
-            {
-                "role": "user",
-                "content": [
-                    {"type": "image_url", "image_url": {"url": f"data:{mime};base64,{b64}"}},
-                    {"type": "text", "text": "Extract the GCSE question text from this image."},
-                ],
-            },
-        ],
-        max_tokens=1000,
-    )
+    with cancellation.guard(client):
+        resp = client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {
+                    "role": "system",
+                    "content": "Extract the exact text of GCSE exam questions from screenshot images. Return only the question text as it appears. No commentary.",
+                },
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "image_url", "image_url": {"url": f"data:{mime};base64,{b64}"}},
+                        {"type": "text", "text": "Extract the GCSE question text from this image."},
+                    ],
+                },
+            ],
+            max_tokens=1000,
+        )
     return (resp.choices[0].message.content or "").strip()
 
 
@@ -584,8 +689,76 @@ async def homework_submit(
     )
 
 
+_BROWNOUT_RETRY_AFTER_SECONDS = 30
+
+
+async def _run_cancellable(request: Request, fn, *, what: str, cancel_on_disconnect: bool = True):
+    """Run a blocking route body, aborting its LLM calls if the client disconnects.
+
+    See cancellation.py. Nobody is listening for the response by then, so
+    the 499 (nginx's "client closed request") only shows up in access logs.
+    """
+    try:
+        return await cancellation.run_until_disconnect(
+            request, fn, what=what, cancel_on_disconnect=cancel_on_disconnect,
+        )
+    except cancellation.Cancelled as e:
+        raise HTTPException(status_code=499, detail="Client closed request") from e
+
+
+# Store new problems after the response is sent (BackgroundTasks) instead of
+# before it. This worker serves the problem from problem_cache meanwhile;
+# other workers only see it once the write lands, so enable it together
+# with the shared cache tier when running more than one worker.
+_DEFER_PROBLEM_WRITES = os.getenv("HELP_DEFER_PROBLEM_WRITES", "").strip().lower() in {"1", "true", "yes"}
+
+_image_upload_pool = None
+
+
+def _start_image_upload(problem_id: str, data_url: str):
+    """Upload the problem image in the background while the help is generated.
+    Returns a Future of the S3 key (None if S3 isn't configured)."""
+    global _image_upload_pool
+    if _image_upload_pool is None:
+        from concurrent.futures import ThreadPoolExecutor
+        _image_upload_pool = ThreadPoolExecutor(
+            max_workers=int(os.getenv("HELP_IMAGE_UPLOAD_WORKERS", "4")), thread_name_prefix="image-upload",
+        )
+    return _image_upload_pool.submit(db.upload_problem_image, problem_id, data_url)
+
+
+def _finish_image_upload(upload) -> str | None:
+    try:
+        return upload.result()
+    except Exception as _e:
+        logger.warning("homework_help_json image_upload_failed: %s", _e)
+        return None
+
+
+def _discard_image_upload(upload) -> None:
+    """Delete an uploaded image whose problem won't be stored (best effort)."""
+    def _delete(done) -> None:
+        if done.exception() is not None or not done.result():
+            return
+        try:
+            db.delete_problem_image(done.result())
+        except Exception as _e:
+            logger.warning("homework_help_json orphan_image_delete_failed: %s", _e)
+    upload.add_done_callback(_delete)
+
+
 @app.post("/api/v1/homework/help-json", response_model=HomeworkHelpJsonRes)
-def homework_help_json(req: HomeworkHelpJsonReq):
+async def homework_help_json(req: HomeworkHelpJsonReq, request: Request, background_tasks: BackgroundTasks):
+    # A cacheable result is worth finishing even if the student has gone:
+    # the next request for the same problem is then a cache hit.
+    defer = background_tasks.add_task if _DEFER_PROBLEM_WRITES else None
+    return await _run_cancellable(
+        request, lambda: _homework_help_json(req, defer=defer),
+        what="help", cancel_on_disconnect=not req.useCache,
+    )
+
+
+def _homework_help_json(req: HomeworkHelpJsonReq, *, defer=None) -> HomeworkHelpJsonRes:
     # Ensure a profile exists for demo/local flows.
     # The frontend can send `uid="demo"` (or other local UID) before bootstrapping.
     try:
@@ -613,6 +786,22 @@ def homework_help_json(req: HomeworkHelpJsonReq):
             detail="Structured help not available: failed to import generator",
         )
 
+    # Under overload (brownout) serve cache hits only; misses get a 503. An
+    # image needs an OCR call before the cache can even be checked, so it is
+    # refused up front.
+    import overload
+    brownout = overload.brownout_active()
+    if brownout and req.image_data_url:
+        overload.controller().record_shed("help")
+        raise HTTPException(
+            status_code=503,
+            detail="Help is busy right now — please try again shortly.",
+            headers={"Retry-After": str(_BROWNOUT_RETRY_AFTER_SECONDS)},
+        )
+
+    new_problem_id = str(uuid4())
+    image_upload = _start_image_upload(new_problem_id, req.image_data_url) if req.image_data_url else None
+    problem_id: str | None = None
     try:
         gen = GCSEHelpGenerator()
         effective_text = req.text
@@ -630,47 +819,51 @@ def homework_help_json(req: HomeworkHelpJsonReq):
             tier=req.tier,
             desired_help_level=req.desiredHelpLevel,
             use_cache=req.useCache,
+            cache_only=brownout,
         )
 
-        problem_id: str | None = None
         attempt_id: str | None = None
         # v2 and v3 both go through the structured-problem storage path —
         # the new ProblemPage navigates by problem_id regardless of which
         # ingestion schema produced the response.
         if result.get("_schema_version") in ("2.0.0", "3.0.0"):
-            problem_id = str(uuid4())
+            from gcse_evaluator import evaluation_projection
+
             attempt_id = str(uuid4())
-            image_s3_key: str | None = None
-            if req.image_data_url:
-                try:
-                    image_s3_key = db.upload_problem_image(problem_id, req.image_data_url)
-                except Exception as _e:
-                    logger.warning("homework_help_json image_upload_failed: %s", _e)
-            db.put_problem(
-                problem_id=problem_id,
+            db.create_problem_with_attempt(
+                problem_id=new_problem_id,
+                attempt_id=attempt_id,
                 user_id=req.uid,
                 raw_input=effective_text,
                 normalised_form=result.get("normalised_form", effective_text),
                 topic_tags=result.get("topic_tags", []),
                 difficulty=int(result.get("difficulty", 3)),
                 ai_response=result,
-                image_s3_key=image_s3_key,
-            )
-            db.put_attempt(
-                attempt_id=attempt_id,
-                problem_id=problem_id,
-                user_id=req.uid,
+                image_s3_key=_finish_image_upload(image_upload) if image_upload else None,
+                eval_projection=evaluation_projection(
+                    result, normalised_form=result.get("normalised_form", effective_text),
+                ),
+                defer=defer,
             )
+            problem_id = new_problem_id
 
         return HomeworkHelpJsonRes(result=result, problem_id=problem_id, attempt_id=attempt_id)
     except GCSEHelpError as e:
+        from gcse_help_generator import GCSEHelpUnavailable
+        if isinstance(e, GCSEHelpUnavailable):
+            overload.controller().record_shed("help")
+            raise HTTPException(
+                status_code=503,
+                detail=str(e),
+                headers={"Retry-After": str(_BROWNOUT_RETRY_AFTER_SECONDS)},
+            ) from e
         logger.info(
             "homework_help_json bad_request uid=%s error=%s",
             req.uid,
             str(e),
         )
         raise HTTPException(status_code=400, detail=str(e)) from e
-    except HTTPException:
+    except (HTTPException, cancellation.Cancelled):
         raise
     except Exception as e:
         # Ensure stack traces make it into .dev-logs/backend.log
@@ -681,6 +874,9 @@ def homework_help_json(req: HomeworkHelpJsonReq):
             req.tier,
         )
         raise HTTPException(status_code=500, detail="Help generation failed") from e
+    finally:
+        if image_upload is not None and problem_id is None:
+            _discard_image_upload(image_upload)
 
 
 # =========================
@@ -691,28 +887,51 @@ def homework_help_json(req: HomeworkHelpJsonReq):
 # /homework/evaluate exclusively. See decisions/2026-05-02-phase3-*.md.)
 
 
-@app.post("/api/v1/homework/log-event", response_model=LogEventRes)
-def log_event(req: LogEventReq):
-    try:
-        db.put_step_event(
-            attempt_id=req.attempt_id,
-            event_type=req.event_type,
-            step_number=req.step_number,
-            payload=req.payload or {},
+_LOG_EVENT_BATCH_MAX_ITEMS = int(os.getenv("LOG_EVENT_BATCH_MAX_ITEMS", "100"))
+_EVENT_BUFFER_RETRY_AFTER_SECONDS = 2
+
+
+def _enqueue_events(events: List[LogEventReq]) -> None:
+    """Queue step events for the buffered writer (event_buffer.py), or 503 if it's full."""
+    import event_buffer
+
+    items = [
+        db._step_event_item(
+            attempt_id=e.attempt_id, event_type=e.event_type, step_number=e.step_number, payload=e.payload or {},
         )
-    except Exception:
-        logger.exception("log_event failed attempt=%s event=%s", req.attempt_id, req.event_type)
-        raise HTTPException(status_code=500, detail="Failed to log event")
+        for e in events
+    ]
+    if not event_buffer.buffer().offer(items):
+        raise HTTPException(
+            status_code=503,
+            detail="Event log is busy — please retry",
+            headers={"Retry-After": str(_EVENT_BUFFER_RETRY_AFTER_SECONDS)},
+        )
+
+
+@app.post("/api/v1/homework/log-event", response_model=LogEventRes, status_code=202)
+async def log_event(req: LogEventReq):
+    """Queue one step event; it is written to DynamoDB shortly after."""
+    _enqueue_events([req])
     return LogEventRes(ok=True)
 
 
+@app.post("/api/v1/homework/log-event/batch", response_model=LogEventBatchRes, status_code=202)
+async def log_event_batch(req: LogEventBatchReq):
+    """Queue several step events at once (the client's own batching)."""
+    if len(req.events) > _LOG_EVENT_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"at most {_LOG_EVENT_BATCH_MAX_ITEMS} events per batch")
+    _enqueue_events(req.events)
+    return LogEventBatchRes(ok=True, accepted=len(req.events))
+
+
 # =========================
 # Problems & evaluation (phase 1 of the rebuilt engine)
 # =========================
 
 
 @app.get("/api/v1/problems/{problem_id}", response_model=ProblemRes)
-def get_problem(problem_id: str):
+async def get_problem(problem_id: str):
     """Fetch a stored problem so the new free-mode route can render it.
 
     The existing /homework/help-json flow returns the AI response inline
@@ -720,13 +939,13 @@ def get_problem(problem_id: str):
     by id (e.g. when a route is opened directly, or when the free-mode
     view is reached via a link from elsewhere in the app).
     """
-    item = db.get_problem(problem_id)
+    item = await db_async.get_problem(problem_id)
     if not item:
         raise HTTPException(status_code=404, detail="Problem not found")
     image_url: str | None = None
     if item.get("image_s3_key"):
         try:
-            image_url = db.get_problem_image_url(item["image_s3_key"])
+            image_url = await db_async.get_problem_image_url(item["image_s3_key"])
         except Exception as _e:
             logger.warning("get_problem presign_failed problem_id=%s: %s", problem_id, _e)
     return ProblemRes(
@@ -742,15 +961,7 @@ def get_problem(problem_id: str):
     )
 
 
-@app.post("/api/v1/homework/evaluate", response_model=EvaluateRes)
-def evaluate(req: EvaluateReq):
-    """Evaluate a freeform student submission against a stored problem.
-
-    Cheap-path final-answer match → done. Otherwise call the LLM with the
-    admin-managed evaluation prompt and return either markup segments or a
-    prose fallback (depending on whether the LLM's segments reconstruct
-    the submission character-for-character).
-    """
+def _validate_evaluate_req(req: EvaluateReq) -> None:
     if not req.submission or not req.submission.strip():
         raise HTTPException(status_code=400, detail="submission is empty")
 
@@ -760,54 +971,281 @@ def evaluate(req: EvaluateReq):
     if req.target not in ("main", "simpler"):
         raise HTTPException(status_code=400, detail="target must be 'main' or 'simpler'")
 
-    problem = db.get_problem(req.problem_id)
+
+def _load_problem_for_evaluation(problem_id: str) -> tuple[dict, str]:
+    """Return (ai_response, question) for a stored problem, or 404.
+
+    Reads the slim EVAL projection when the problem has one; the full
+    ai_response is only fetched for problems stored before projections.
+    """
+    projection = db.get_problem_projection(problem_id)
+    if projection is not None:
+        return _evaluation_view(projection, None)
+    return _evaluation_view(None, db.get_problem(problem_id))
+
+
+async def _aload_problem_for_evaluation(problem_id: str) -> tuple[dict, str]:
+    """`_load_problem_for_evaluation` on the event loop (db_async)."""
+    projection = await db_async.get_problem_projection(problem_id)
+    if projection is not None:
+        return _evaluation_view(projection, None)
+    return _evaluation_view(None, await db_async.get_problem(problem_id))
+
+
+def _evaluation_view(projection: dict | None, problem: dict | None) -> tuple[dict, str]:
+    if projection is not None:
+        return dict(projection), projection.get("normalised_form") or ""
     if not problem:
         raise HTTPException(status_code=404, detail="Problem not found")
 
     ai_response = dict(problem.get("ai_response", {}) or {})
     question = ai_response.get("normalised_form") or problem.get("normalised_form") or ""
+    return ai_response, question
+
+
+def _attempt_submitted_event(req: EvaluateReq, outcome) -> dict:
+    """StepEvent item for an evaluated submission. We summarise the
+    segments in the payload rather than storing the full feedback — the
+    full markup can be regenerated from the submission if ever needed for
+    analysis."""
+    return db._step_event_item(
+        attempt_id=req.attempt_id,
+        event_type="attempt_submitted",
+        step_number=0,  # whole-submission events have no step number
+        payload={
+            "mode": req.mode,
+            "target": req.target,
+            "submission": req.submission,
+            "is_correct": outcome.is_correct,
+            "segment_statuses": [s.get("status") for s in outcome.segments],
+            "prose_feedback_used": outcome.prose_feedback is not None,
+            "next_prompt_emitted": outcome.next_prompt is not None,
+        },
+    )
+
+
+def _log_attempt_submitted(req: EvaluateReq, outcome) -> None:
+    """Queue the attempt_submitted event on the buffered writer
+    (event_buffer.py), like /log-event. The student already has their
+    feedback, so a full buffer drops the event (counted as
+    event_buffer.rejected) rather than failing the request."""
+    import event_buffer
+
+    if not event_buffer.buffer().offer([_attempt_submitted_event(req, outcome)]):
+        logger.warning("evaluate attempt_submitted event dropped (buffer full) attempt=%s", req.attempt_id)
+
+
+def _evaluate_res(outcome) -> EvaluateRes:
+    return EvaluateRes(
+        is_correct=outcome.is_correct,
+        feedback_segments=[FeedbackSegment(**s) for s in outcome.segments],
+        prose_feedback=outcome.prose_feedback,
+        next_prompt=outcome.next_prompt,
+    )
+
+
+@app.post("/api/v1/homework/evaluate", response_model=EvaluateRes)
+async def evaluate(req: EvaluateReq, request: Request):
+    """Evaluate a freeform student submission against a stored problem.
+
+    Cheap-path final-answer match → done. Otherwise call the LLM with the
+    admin-managed evaluation prompt and return either markup segments or a
+    prose fallback (depending on whether the LLM's segments reconstruct
+    the submission character-for-character). The LLM call is abandoned if
+    the client disconnects. Loading the problem and logging the attempt
+    happen on the event loop; only the evaluator itself uses a thread.
+    """
+    _validate_evaluate_req(req)
+    ai_response, question = await _aload_problem_for_evaluation(req.problem_id)
+    outcome = await _run_cancellable(
+        request, lambda: _evaluate(req, ai_response, question), what="evaluate",
+    )
+    _log_attempt_submitted(req, outcome)
+    return _evaluate_res(outcome)
 
-    from gcse_evaluator import evaluate_submission
+
+def _evaluate(req: EvaluateReq, ai_response: dict, question: str):
+    from gcse_evaluator import drafts, evaluate_submission
 
     try:
+        drafts.settle(attempt_id=req.attempt_id, target=req.target, submission=req.submission)
         outcome = evaluate_submission(
             submission=req.submission,
             ai_response=ai_response,
             question=question,
             mode=req.mode,
             target=req.target,
+            attempt_id=req.attempt_id,
         )
+    except cancellation.Cancelled:
+        raise
     except Exception:
         logger.exception("evaluate failed attempt=%s problem=%s", req.attempt_id, req.problem_id)
         raise HTTPException(status_code=500, detail="Evaluation failed")
 
-    # Log the attempt. We summarise the segments in the payload rather than
-    # storing the full feedback — the full markup can be regenerated from
-    # the submission if ever needed for analysis.
-    try:
-        status_summary = [s.get("status") for s in outcome.segments]
-        db.put_step_event(
-            attempt_id=req.attempt_id,
-            event_type="attempt_submitted",
-            step_number=0,  # whole-submission events have no step number
-            payload={
-                "mode": req.mode,
-                "target": req.target,
-                "submission": req.submission,
-                "is_correct": outcome.is_correct,
-                "segment_statuses": status_summary,
-                "prose_feedback_used": outcome.prose_feedback is not None,
-                "next_prompt_emitted": outcome.next_prompt is not None,
-            },
+    drafts.record_hit(attempt_id=req.attempt_id, target=req.target, submission=req.submission, outcome=outcome)
+    return outcome
+
+
+@app.post("/api/v1/homework/evaluate/draft", response_model=EvaluateDraftRes, status_code=202)
+async def evaluate_draft(req: EvaluateReq):
+    """Speculatively evaluate working the student is still typing.
+
+    Call it debounced as the student types, with the same body a submit
+    would send. The draft is marked in the background at low priority and
+    its markup kept for the attempt, so submitting the same text to
+    /homework/evaluate returns straight away. Nothing is logged and nothing
+    is returned but whether the draft was queued — drafts are refused when
+    the LLM is busy and superseded by newer drafts or a real submission.
+    """
+    _validate_evaluate_req(req)
+    ai_response, question = await _aload_problem_for_evaluation(req.problem_id)
+
+    from gcse_evaluator import drafts
+
+    reason = drafts.submit(
+        attempt_id=req.attempt_id,
+        submission=req.submission,
+        ai_response=ai_response,
+        question=question,
+        mode=req.mode,
+        target=req.target,
+    )
+    return EvaluateDraftRes(accepted=reason is None, reason=reason)
+
+
+def _sse(event: str, data: dict) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/api/v1/homework/evaluate/stream")
+def evaluate_stream(req: EvaluateReq, request: Request):
+    """Server-sent-events variant of /homework/evaluate.
+
+    Emits `segment` events as the LLM finishes each feedback segment, then a
+    single `done` event carrying the full EvaluateRes plus `integrity`
+    ("cheap_path" | "exact" | "reconstructed" | "aligned" | "prose_fallback").
+    Streamed segments are provisional — the client should render the `done`
+    payload as the final state, which matters when integrity is "aligned"
+    or "prose_fallback". The LLM stream is abandoned if the client
+    disconnects.
+    """
+    _validate_evaluate_req(req)
+    ai_response, question = _load_problem_for_evaluation(req.problem_id)
+
+    from gcse_evaluator import evaluate_submission_stream
+
+    def events():
+        try:
+            for kind, data in evaluate_submission_stream(
+                submission=req.submission,
+                ai_response=ai_response,
+                question=question,
+                mode=req.mode,
+                target=req.target,
+            ):
+                if kind == "segment":
+                    yield _sse("segment", FeedbackSegment(**data).dict())
+                    continue
+                outcome, integrity = data
+                _log_attempt_submitted(req, outcome)
+                yield _sse("done", {**_evaluate_res(outcome).dict(), "integrity": integrity})
+        except cancellation.Cancelled:
+            raise
+        except Exception:
+            logger.exception("evaluate_stream failed attempt=%s problem=%s", req.attempt_id, req.problem_id)
+            yield _sse("error", {"detail": "Evaluation failed"})
+
+    return StreamingResponse(
+        cancellation.iterate_until_disconnect(request, events(), what="evaluate_stream"),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+_EVALUATE_BATCH_MAX_ITEMS = int(os.getenv("EVALUATOR_BATCH_MAX_ITEMS", "100"))
+
+
+@app.post("/api/v1/homework/evaluate/batch")
+def evaluate_batch(req: EvaluateBatchReq, request: Request):
+    """Mark a whole class's submissions to one problem in a single request.
+
+    The problem and the evaluation prompt are loaded once. Identical
+    submissions are marked once and the result fanned out (`duplicate_of`
+    names the first item with the same text). Cheap-path matches come back
+    first; the rest go to the LLM with bounded concurrency. Streams one
+    `result` event per submission as it finishes, then a `done` summary.
+    Batch marking is not tied to a student attempt, so no step events are
+    written. Admin only (X-Admin-Key); the LLM calls still queued or in
+    flight are cancelled if the client disconnects.
+    """
+    _require_admin(request)
+    if not req.submissions:
+        raise HTTPException(status_code=400, detail="submissions is empty")
+    if len(req.submissions) > _EVALUATE_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"at most {_EVALUATE_BATCH_MAX_ITEMS} submissions per batch",
         )
-    except Exception:
-        logger.exception("evaluate put_step_event failed attempt=%s", req.attempt_id)
+    for item in req.submissions:
+        if not item.submission or not item.submission.strip():
+            raise HTTPException(status_code=400, detail=f"submission {item.item_id!r} is empty")
+    if req.mode not in ("free", "guided"):
+        raise HTTPException(status_code=400, detail="mode must be 'free' or 'guided'")
+    if req.target not in ("main", "simpler"):
+        raise HTTPException(status_code=400, detail="target must be 'main' or 'simpler'")
 
-    return EvaluateRes(
-        is_correct=outcome.is_correct,
-        feedback_segments=[FeedbackSegment(**s) for s in outcome.segments],
-        prose_feedback=outcome.prose_feedback,
-        next_prompt=outcome.next_prompt,
+    ai_response, question = _load_problem_for_evaluation(req.problem_id)
+
+    from gcse_evaluator import evaluate_batch as run_batch
+
+    items = req.submissions
+
+    def events():
+        done = 0
+        cheap_hits = 0
+        elapsed_ms = 0
+        try:
+            for result in run_batch(
+                submissions=[item.submission for item in items],
+                ai_response=ai_response,
+                question=question,
+                mode=req.mode,
+                target=req.target,
+            ):
+                done += 1
+                elapsed_ms = result.elapsed_ms
+                if result.outcome.path == "cheap_path":
+                    cheap_hits += 1
+                yield _sse("result", {
+                    "item_id": items[result.index].item_id,
+                    "index": result.index,
+                    "duration_ms": result.duration_ms,
+                    "elapsed_ms": result.elapsed_ms,
+                    "duplicate_of": (
+                        items[result.duplicate_of].item_id
+                        if result.duplicate_of is not None else None
+                    ),
+                    **_evaluate_res(result.outcome).dict(),
+                })
+        except cancellation.Cancelled:
+            raise
+        except Exception:
+            logger.exception("evaluate_batch failed problem=%s", req.problem_id)
+            yield _sse("error", {"detail": "Evaluation failed", "completed": done})
+            return
+        yield _sse("done", {
+            "total": len(items),
+            "unique": len({item.submission for item in items}),
+            "cheap_path": cheap_hits,
+            "elapsed_ms": elapsed_ms,
+        })
+
+    return StreamingResponse(
+        cancellation.iterate_until_disconnect(request, events(), what="evaluate_batch"),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
@@ -832,19 +1270,21 @@ def admin_list_prompts(request: Request):
     return [PromptSummary(**p) for p in db.list_prompts()]
 
 
-@app.get("/api/v1/admin/prompts/{prompt_id}/versions", response_model=List[PromptVersion])
-def admin_list_versions(prompt_id: str, request: Request):
+@app.get("/api/v1/admin/prompts/{prompt_id}/versions", response_model=schemas.PromptVersionPage)
+def admin_list_versions(prompt_id: str, request: Request, limit: int = 20, before: Optional[int] = None):
+    '''Version history, newest first, one page at a time; metadata only.'''
     _require_admin(request)
-    items = db.list_prompt_versions(prompt_id)
-    return [PromptVersion(
-        promptId=it["promptId"],
-        version=int(it["version"]),
-        systemPrompt=it["systemPrompt"],
-        userPromptTemplate=it["userPromptTemplate"],
-        createdAt=it["createdAt"],
-        createdBy=it["createdBy"],
-        notes=it.get("notes", ""),
-    ) for it in items]
+    items, next_before = db.list_prompt_versions(prompt_id, limit=max(1, min(limit, 100)), before=before)
+    return schemas.PromptVersionPage(
+        items=[schemas.PromptVersionSummary(
+            promptId=it["promptId"],
+            version=int(it["version"]),
+            createdAt=it["createdAt"],
+            createdBy=it["createdBy"],
+            notes=it.get("notes", ""),
+        ) for it in items],
+        nextBefore=next_before,
+    )
 
 
 @app.get("/api/v1/admin/prompts/{prompt_id}/versions/{version}", response_model=PromptVersion)
@@ -876,17 +1316,39 @@ def admin_save_prompt(prompt_id: str, req: PromptSaveReq, request: Request):
         created_by="admin",
         notes=req.notes,
     )
-    # Invalidate in-memory prompt cache in the generator singleton if it exists
+    # Refresh this worker's prompt registry now; other workers pick the new
+    # version up on their next poll (PROMPT_REGISTRY_POLL_SECONDS).
     try:
-        GCSEHelpGenerator, _ = _safe_import_gcse_help_generator()
-        if GCSEHelpGenerator is not None:
-            gen = GCSEHelpGenerator()
-            gen.reload_prompt()
+        from prompt_registry import get_registry
+        get_registry().refresh(force=True)
     except Exception:
-        logger.exception("admin_save_prompt reload_prompt failed — will pick up on next generator init")
+        logger.exception("admin_save_prompt registry refresh failed — will pick up on next poll")
     return PromptSaveRes(promptId=prompt_id, version=new_version)
 
 
+@app.get("/api/v1/admin/brownout")
+def admin_get_brownout(request: Request):
+    """This worker's overload state: whether brownout is on, why, and the thresholds."""
+    _require_admin(request)
+    import overload
+    return overload.controller().snapshot()
+
+
+@app.post("/api/v1/admin/brownout")
+def admin_set_brownout(req: schemas.BrownoutReq, request: Request):
+    """Force brownout on (for durationSeconds, or until cleared) or clear it.
+
+    Applies to the worker that serves the request, like the automatic
+    trigger — with several workers, repeat until each has picked it up or
+    use the env thresholds instead.
+    """
+    _require_admin(request)
+    import overload
+    controller = overload.controller()
+    controller.force(enabled=req.enabled, duration_seconds=req.durationSeconds)
+    return controller.snapshot()
+
+
 @app.get("/api/v1/admin/attempts", response_model=UserAttemptsRes)
 def admin_get_attempts(uid: str, days: int = 7, request: Request = None):
     """Return all attempts for a user in the last N days with outcome and max_rung_revealed."""
@@ -959,10 +1421,10 @@ def admin_try_prompt(prompt_id: str, req: PromptTryReq, request: Request):
 
 
 @app.post("/api/v1/progress", response_model=schemas.ProgressItem)
-def update_progress(req: schemas.ProgressUpdateReq, p = Depends(get_current_principal)):
+async def update_progress(req: schemas.ProgressUpdateReq, p = Depends(get_current_principal)):
     if not p:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-    saved = db.save_progress(p.sub, req.dict())
+    saved = await db_async.save_progress(p.sub, req.dict())
     return schemas.ProgressItem(
         topicId=saved["topicId"],
         exerciseId=saved["exerciseId"],
@@ -972,10 +1434,10 @@ def update_progress(req: schemas.ProgressUpdateReq, p = Depends(get_current_prin
     )
 
 @app.get("/api/v1/progress", response_model=schemas.ProgressGetRes)
-def list_progress(topicId: str | None = None, p = Depends(get_current_principal)):
+async def list_progress(topicId: str | None = None, p = Depends(get_current_principal)):
     if not p:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
-    items = db.get_progress(p.sub, topicId)
+    items = await db_async.get_progress(p.sub, topicId)
     return schemas.ProgressGetRes(items=[
         schemas.ProgressItem(
             topicId=i["topicId"],
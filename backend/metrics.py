@@ -0,0 +1,98 @@
+"""In-process counters and latency windows.
+
+Per-worker only — numbers are not aggregated across processes. They are
+exposed through `/api/v1/diagnostics` and are meant for spotting trends
+(hedge rates, escalation rates, latency percentiles) on a running worker,
+not as a replacement for proper monitoring.
+"""
+from __future__ import annotations
+
+import math
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+DEFAULT_WINDOW = 500
+
+
+class LatencyWindow:
+    """The last `size` latency samples (ms), with nearest-rank percentiles."""
+
+    def __init__(self, size: int = DEFAULT_WINDOW):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def observe(self, ms: float) -> None:
+        with self._lock:
+            self._samples.append(ms)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Nearest-rank percentile of the window, or None if it is empty."""
+        with self._lock:
+            ordered = sorted(self._samples)
+        if not ordered:
+            return None
+        rank = max(1, math.ceil(pct / 100 * len(ordered)))
+        return ordered[min(rank, len(ordered)) - 1]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            ordered = sorted(self._samples)
+        if not ordered:
+            return {"samples": 0}
+
+        def _p(pct: float) -> float:
+            return round(ordered[max(1, math.ceil(pct / 100 * len(ordered))) - 1], 1)
+
+        return {"samples": len(ordered), "p50": _p(50), "p95": _p(95), "p99": _p(99)}
+
+
+class _Registry:
+    def __init__(self) -> None:
+        self._counters: Dict[str, int] = {}
+        self._windows: Dict[str, LatencyWindow] = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def count(self, name: str) -> int:
+        return self._counters.get(name, 0)
+
+    def window(self, name: str, size: int = DEFAULT_WINDOW) -> LatencyWindow:
+        w = self._windows.get(name)
+        if w is None:
+            with self._lock:
+                w = self._windows.setdefault(name, LatencyWindow(size))
+        return w
+
+    def observe(self, name: str, ms: float) -> None:
+        self.window(name).observe(ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(sorted(self._counters.items()))
+            windows = dict(sorted(self._windows.items()))
+        return {
+            "counters": counters,
+            "latencyMs": {name: w.snapshot() for name, w in windows.items()},
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._windows.clear()
+
+
+_registry = _Registry()
+
+incr = _registry.incr
+count = _registry.count
+window = _registry.window
+observe = _registry.observe
+snapshot = _registry.snapshot
+reset = _registry.reset
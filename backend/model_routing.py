@@ -0,0 +1,118 @@
+"""Tiered model routing: try the cheap model first, escalate on bad output.
+
+Each LLM task ("evaluator", "gcse_help") has an ordered ladder of models,
+cheapest first. A task runs its attempt on the first tier; if the output
+fails validation (JSON parsing, schema checks, segment integrity) the
+attempt raises `Escalate` and the next tier is tried. The last tier's
+result is returned whatever it is, so escalation never makes a request fail
+that would have succeeded before.
+
+Ladders come from `<TASK>_MODEL_TIERS` (e.g. EVALUATOR_MODEL_TIERS), then
+OPENAI_MODEL_TIERS, as comma-separated model names — e.g.
+"gpt-4.1-nano,gpt-4.1-mini". Unset, the ladder is just OPENAI_MODEL, which
+is the single-model behaviour we had before.
+
+Per-tier call counts, escalations, tokens and latency go to `metrics`
+under `<task>.tier.<model>.*`; `snapshot()` summarises them.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gpt-4.1-mini"
+TASKS = ("evaluator", "gcse_help")
+
+T = TypeVar("T")
+
+
+class Escalate(Exception):
+    """Raised by a tier attempt whose output isn't usable, to try the next tier."""
+
+
+def parse_tiers(spec: Optional[str]) -> List[str]:
+    return [m.strip() for m in (spec or "").split(",") if m.strip()]
+
+
+def tiers(task: str) -> List[str]:
+    """The model ladder for `task`, cheapest first. Never empty."""
+    for env_var in (f"{task.upper()}_MODEL_TIERS", "OPENAI_MODEL_TIERS"):
+        ladder = parse_tiers(os.getenv(env_var))
+        if ladder:
+            return ladder
+    return [os.getenv("OPENAI_MODEL") or DEFAULT_MODEL]
+
+
+def ladder_key(models: List[str]) -> str:
+    """Stable string for a ladder — part of cache keys, so results produced
+    under one routing policy aren't served under another."""
+    return ",".join(models)
+
+
+def run(task: str, models: List[str], attempt: Callable[[str, bool], T]) -> T:
+    """Call `attempt(model, is_last_tier)` up the ladder until one doesn't escalate.
+
+    `attempt` should raise Escalate only when `is_last_tier` is False; any
+    other exception propagates immediately (provider errors are not a
+    reason to pay for a bigger model).
+    """
+    if not models:
+        raise ValueError(f"no model tiers configured for {task}")
+    for i, model in enumerate(models):
+        last = i == len(models) - 1
+        prefix = f"{task}.tier.{model}"
+        metrics.incr(f"{prefix}.calls")
+        started = time.perf_counter()
+        try:
+            result = attempt(model, last)
+        except Escalate as e:
+            if last:
+                raise RuntimeError(f"{task}: last tier {model} asked to escalate") from e
+            metrics.incr(f"{prefix}.escalated")
+            logger.info(
+                "model_routing: %s escalating %s -> %s reason=%s",
+                task, model, models[i + 1], e,
+            )
+            continue
+        finally:
+            metrics.observe(prefix, (time.perf_counter() - started) * 1000)
+        return result
+    raise AssertionError("unreachable")
+
+
+def record_tokens(task: str, model: str, usage: Any) -> None:
+    """Add a response's token usage (SDK object or dict) to the tier's counters."""
+    if usage is None:
+        return
+    total = usage.get("total_tokens") if isinstance(usage, dict) else getattr(usage, "total_tokens", None)
+    if isinstance(total, int):
+        metrics.incr(f"{task}.tier.{model}.tokens", total)
+
+
+def snapshot() -> Dict[str, Any]:
+    """Per-task ladder and per-tier calls / escalation rate / tokens / latency."""
+    snap = metrics.snapshot()
+    counters, latency = snap["counters"], snap["latencyMs"]
+    out: Dict[str, Any] = {}
+    for task in TASKS:
+        ladder = tiers(task)
+        per_tier = {}
+        for model in ladder:
+            prefix = f"{task}.tier.{model}"
+            calls = counters.get(f"{prefix}.calls", 0)
+            escalated = counters.get(f"{prefix}.escalated", 0)
+            per_tier[model] = {
+                "calls": calls,
+                "escalated": escalated,
+                "escalationRate": round(escalated / calls, 4) if calls else None,
+                "tokens": counters.get(f"{prefix}.tokens", 0),
+                "latencyMs": latency.get(prefix, {"samples": 0}),
+            }
+        out[task] = {"tiers": ladder, "perTier": per_tier}
+    return out
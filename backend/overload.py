@@ -0,0 +1,194 @@
+"""Overload controller: brownout mode when the LLM provider is struggling.
+
+Every live LLM call runs inside `controller().llm_call()`, which counts
+calls in flight and records their latency. The worker enters brownout when
+either
+
+- OVERLOAD_MAX_IN_FLIGHT calls are outstanding at once, or
+- the OVERLOAD_LATENCY_PERCENTILE of recent calls exceeds OVERLOAD_LATENCY_MS
+  (once OVERLOAD_MIN_SAMPLES calls have been seen).
+
+Speculative calls — evaluator drafts, made inside `speculative()` — are
+counted separately and feed neither trigger: drafts only run on spare
+capacity, so letting them trip brownout would shed real work to make room
+for guesses.
+
+In brownout, callers skip the LLM: help generation serves cache hits only
+and evaluation answers from the cheap path or the local milestone matcher.
+Brownout ends on its own OVERLOAD_RECOVER_SECONDS after the last trip; the
+latency window is cleared on each trip so stale spikes can't re-trip it.
+
+Admins can force brownout on (optionally for a fixed time) through
+/api/v1/admin/brownout. Like the metrics, state is per worker: a forced
+brownout applies to the worker that served the request.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional
+
+import metrics
+from metrics import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+_speculative: ContextVar[bool] = ContextVar("overload_speculative", default=False)
+
+
+@contextmanager
+def speculative() -> Iterator[None]:
+    """Mark the LLM calls made in this block as speculative."""
+    reset = _speculative.set(True)
+    try:
+        yield
+    finally:
+        _speculative.reset(reset)
+
+
+class OverloadController:
+    def __init__(
+        self,
+        *,
+        max_in_flight: int,
+        latency_ms: float,
+        latency_percentile: float,
+        min_samples: int,
+        recover_seconds: float,
+    ):
+        self.max_in_flight = max_in_flight
+        self.latency_ms = latency_ms
+        self.latency_percentile = latency_percentile
+        self.min_samples = min_samples
+        self.recover_seconds = recover_seconds
+        self._latency = LatencyWindow(size=100)
+        self._in_flight = 0
+        self._speculative_in_flight = 0
+        self._tripped_until: Optional[float] = None
+        self._trip_reason: Optional[str] = None
+        self._forced_until: Optional[float] = None  # math.inf for "until cleared"
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def llm_call(self) -> Iterator[None]:
+        """Wrap one live LLM request."""
+        if _speculative.get():
+            with self._lock:
+                self._speculative_in_flight += 1
+            try:
+                yield
+            finally:
+                with self._lock:
+                    self._speculative_in_flight -= 1
+            return
+        with self._lock:
+            self._in_flight += 1
+            in_flight = self._in_flight
+        if in_flight >= self.max_in_flight:
+            self._trip(f"{in_flight} LLM calls in flight")
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._latency.observe((time.perf_counter() - started) * 1000)
+            with self._lock:
+                self._in_flight -= 1
+
+    @property
+    def in_flight(self) -> int:
+        """Live LLM calls currently outstanding on this worker."""
+        return self._in_flight
+
+    def brownout_active(self) -> bool:
+        now = time.monotonic()
+        if self._forced_until is not None:
+            if now < self._forced_until:
+                return True
+            self._forced_until = None
+        if len(self._latency) >= self.min_samples:
+            p = self._latency.percentile(self.latency_percentile)
+            if p is not None and p >= self.latency_ms:
+                self._trip(f"p{self.latency_percentile:g} LLM latency {p:.0f}ms")
+        tripped_until = self._tripped_until
+        return tripped_until is not None and now < tripped_until
+
+    def _trip(self, reason: str) -> None:
+        with self._lock:
+            already = self._tripped_until is not None and time.monotonic() < self._tripped_until
+            self._tripped_until = time.monotonic() + self.recover_seconds
+            self._trip_reason = reason
+            self._latency = LatencyWindow(size=100)
+        if not already:
+            metrics.incr("overload.brownout.tripped")
+            logger.warning("overload: entering brownout — %s", reason)
+
+    def force(self, *, enabled: bool, duration_seconds: Optional[float] = None) -> None:
+        """Admin override. enabled=False clears both forced and automatic brownout."""
+        with self._lock:
+            if enabled:
+                self._forced_until = (
+                    time.monotonic() + duration_seconds if duration_seconds else float("inf")
+                )
+            else:
+                self._forced_until = None
+                self._tripped_until = None
+        logger.warning("overload: brownout forced %s duration=%s", "on" if enabled else "off", duration_seconds)
+
+    def record_shed(self, what: str) -> None:
+        """Count LLM work shed: a request refused, or answered without its LLM call."""
+        metrics.incr(f"overload.shed.{what}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        forced = self._forced_until is not None and now < self._forced_until
+
+        def _wall(deadline: Optional[float]) -> Optional[str]:
+            if deadline is None or deadline == float("inf") or deadline <= now:
+                return None
+            return datetime.fromtimestamp(time.time() + (deadline - now), timezone.utc).isoformat()
+
+        return {
+            "active": self.brownout_active(),
+            "forced": forced,
+            "forcedUntil": _wall(self._forced_until) if forced else None,
+            "autoUntil": _wall(self._tripped_until),
+            "reason": "forced by admin" if forced else self._trip_reason,
+            "inFlight": self._in_flight,
+            "speculativeInFlight": self._speculative_in_flight,
+            "recentLatencyMs": self._latency.snapshot(),
+            "thresholds": {
+                "maxInFlight": self.max_in_flight,
+                "latencyMs": self.latency_ms,
+                "latencyPercentile": self.latency_percentile,
+                "recoverSeconds": self.recover_seconds,
+            },
+        }
+
+
+_controller: Optional[OverloadController] = None
+_controller_lock = threading.Lock()
+
+
+def controller() -> OverloadController:
+    """Return the process-wide controller, creating it on first use."""
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = OverloadController(
+                    max_in_flight=int(os.getenv("OVERLOAD_MAX_IN_FLIGHT", "32")),
+                    latency_ms=float(os.getenv("OVERLOAD_LATENCY_MS", "20000")),
+                    latency_percentile=float(os.getenv("OVERLOAD_LATENCY_PERCENTILE", "90")),
+                    min_samples=int(os.getenv("OVERLOAD_MIN_SAMPLES", "10")),
+                    recover_seconds=float(os.getenv("OVERLOAD_RECOVER_SECONDS", "30")),
+                )
+    return _controller
+
+
+def brownout_active() -> bool:
+    return controller().brownout_active()
@@ -0,0 +1,270 @@
+"""Read-through cache for problem records (PROBLEM#<id> items).
+
+Problems are written once, when help-json stores a generated problem, and
+then read on every /problems/{id} and every evaluation — typically 5–10
+times per problem per student. This keeps recently used items in a bounded
+per-worker LRU (PROBLEM_CACHE_MAX_ENTRIES, default 2048; 0 disables), with
+an optional shared Redis tier (PROBLEM_CACHE_REDIS_URL, needs the `redis`
+package) so a fresh worker doesn't go back to DynamoDB either.
+
+db.put_problem / put_problem_projection write through, so the creating
+request warms the cache; anything else that rewrites a problem item must
+call `invalidate(problem_id)`. With the shared tier, that also bumps an
+epoch key in Redis; every worker re-reads it at most every
+PROBLEM_CACHE_EPOCH_CHECK_SECONDS (default 5) and drops its local entries
+when it has moved, so a rewrite by another worker or an out-of-process
+writer such as a backfill script reaches all workers within that
+interval. Entries also expire after PROBLEM_CACHE_TTL_SECONDS (default 1h)
+as a backstop, and the only one without Redis.
+
+Keys are (problem_id, sort key): the full METADATA item and the EVAL
+projection are cached separately. Hits and misses are counted in `metrics`
+as problem_cache.hit / problem_cache.shared_hit / problem_cache.miss.
+"""
+from __future__ import annotations
+
+import copy
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def _encode(value: Any) -> str:
+    def default(o: Any) -> Any:
+        if isinstance(o, Decimal):
+            return {"__decimal__": str(o)}
+        if isinstance(o, set):
+            return {"__set__": sorted(o, key=str)}
+        raise TypeError(f"not cacheable: {type(o).__name__}")
+    return json.dumps(value, default=default, separators=(",", ":"))
+
+
+def _decode(raw: str) -> Any:
+    def hook(obj: Dict[str, Any]) -> Any:
+        if len(obj) == 1:
+            if "__decimal__" in obj:
+                return Decimal(obj["__decimal__"])
+            if "__set__" in obj:
+                return set(obj["__set__"])
+        return obj
+    return json.loads(raw, object_hook=hook)
+
+
+class _RedisTier:
+    """Shared second tier. Failures are logged and treated as misses."""
+
+    def __init__(self, url: str, ttl_seconds: int, prefix: str = "problem:"):
+        import redis  # type: ignore
+
+        self._client = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        self._ttl = ttl_seconds
+        self._prefix = prefix
+
+    def _key(self, key: Tuple[str, str]) -> str:
+        return f"{self._prefix}{key[0]}:{key[1]}"
+
+    def get(self, key: Tuple[str, str]) -> Any:
+        try:
+            raw = self._client.get(self._key(key))
+        except Exception:
+            logger.warning("problem_cache: redis get failed", exc_info=True)
+            return _MISSING
+        return _MISSING if raw is None else _decode(raw)
+
+    def put(self, key: Tuple[str, str], value: Any) -> None:
+        try:
+            self._client.set(self._key(key), _encode(value), ex=self._ttl)
+        except Exception:
+            logger.warning("problem_cache: redis set failed", exc_info=True)
+
+    def delete(self, problem_id: str) -> None:
+        try:
+            self._client.delete(self._key((problem_id, "METADATA")), self._key((problem_id, "EVAL")))
+        except Exception:
+            logger.warning("problem_cache: redis delete failed", exc_info=True)
+
+    def epoch(self) -> Optional[int]:
+        """The invalidation epoch, or None if Redis can't be read."""
+        try:
+            raw = self._client.get(f"{self._prefix}epoch")
+        except Exception:
+            logger.warning("problem_cache: redis epoch read failed", exc_info=True)
+            return None
+        return int(raw or 0)
+
+    def bump_epoch(self) -> Optional[int]:
+        try:
+            return int(self._client.incr(f"{self._prefix}epoch"))
+        except Exception:
+            logger.warning("problem_cache: redis epoch bump failed", exc_info=True)
+            return None
+
+
+class ProblemCache:
+    def __init__(self, *, max_entries: int, ttl_seconds: float, shared: Optional[_RedisTier] = None,
+                 epoch_check_seconds: float = 5.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.epoch_check_seconds = epoch_check_seconds
+        self._shared = shared
+        self._items: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._epoch: Optional[int] = None
+        self._epoch_checked_at: Optional[float] = None
+
+    def get_or_load(self, problem_id: str, sort_key: str, load: Callable[[], Any]) -> Any:
+        """Return the cached item, else `load()` it and cache the result.
+
+        None results (no such item) are not cached — a problem that doesn't
+        exist yet may be written a moment later. Callers get their own copy.
+        """
+        value = self._lookup(problem_id, sort_key)
+        if value is _MISSING:
+            value = load()
+            if value is not None:
+                self.put(problem_id, sort_key, value)
+        return copy.deepcopy(value)
+
+    async def aget_or_load(self, problem_id: str, sort_key: str, load: Callable[[], Awaitable[Any]]) -> Any:
+        """`get_or_load` for an async loader (db_async). With the shared tier
+        the Redis round trips (epoch check, get, set) run in a worker thread
+        so they never block the event loop."""
+        value = await self._off_loop(self._lookup, problem_id, sort_key)
+        if value is _MISSING:
+            value = await load()
+            if value is not None:
+                await self._off_loop(self.put, problem_id, sort_key, value)
+        return copy.deepcopy(value)
+
+    async def _off_loop(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self._shared is None:
+            return fn(*args)  # local tier only: nothing blocks
+        import anyio
+
+        return await anyio.to_thread.run_sync(fn, *args)
+
+    def _lookup(self, problem_id: str, sort_key: str) -> Any:
+        self._check_epoch()
+        key = (problem_id, sort_key)
+        value = self._get_local(key)
+        if value is not _MISSING:
+            metrics.incr("problem_cache.hit")
+            return value
+        if self._shared is not None:
+            value = self._shared.get(key)
+            if value is not _MISSING:
+                metrics.incr("problem_cache.shared_hit")
+                self._put_local(key, value)
+                return value
+        metrics.incr("problem_cache.miss")
+        return _MISSING
+
+    def put(self, problem_id: str, sort_key: str, value: Any) -> None:
+        key = (problem_id, sort_key)
+        value = copy.deepcopy(value)
+        self._put_local(key, value)
+        if self._shared is not None:
+            self._shared.put(key, value)
+
+    def invalidate(self, problem_id: str) -> None:
+        with self._lock:
+            for sort_key in [k for k in self._items if k[0] == problem_id]:
+                del self._items[sort_key]
+        if self._shared is not None:
+            self._shared.delete(problem_id)
+            epoch = self._shared.bump_epoch()
+            if epoch is not None:
+                with self._lock:
+                    self._epoch = epoch
+
+    def _check_epoch(self) -> None:
+        """Drop local entries if another process has invalidated since."""
+        if self._shared is None:
+            return
+        checked_at = self._epoch_checked_at
+        now = time.monotonic()
+        if checked_at is not None and now - checked_at < self.epoch_check_seconds:
+            return
+        epoch = self._shared.epoch()
+        with self._lock:
+            self._epoch_checked_at = now
+            if epoch is None or epoch == self._epoch:
+                return
+            if self._epoch is not None:
+                self._items.clear()
+                metrics.incr("problem_cache.epoch_reset")
+            self._epoch = epoch
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _get_local(self, key: Tuple[str, str]) -> Any:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                return _MISSING
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._items[key]
+                return _MISSING
+            self._items.move_to_end(key)
+            return value
+
+    def _put_local(self, key: Tuple[str, str], value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._items[key] = (time.monotonic(), value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+
+def _from_env() -> ProblemCache:
+    ttl = int(os.getenv("PROBLEM_CACHE_TTL_SECONDS", "3600"))
+    shared = None
+    url = os.getenv("PROBLEM_CACHE_REDIS_URL", "").strip()
+    if url:
+        try:
+            shared = _RedisTier(url, ttl)
+        except ImportError:
+            logger.warning("problem_cache: PROBLEM_CACHE_REDIS_URL set but redis is not installed; local tier only")
+    return ProblemCache(
+        max_entries=int(os.getenv("PROBLEM_CACHE_MAX_ENTRIES", "2048")),
+        ttl_seconds=ttl,
+        shared=shared,
+        epoch_check_seconds=float(os.getenv("PROBLEM_CACHE_EPOCH_CHECK_SECONDS", "5")),
+    )
+
+
+_cache: Optional[ProblemCache] = None
+_cache_lock = threading.Lock()
+
+
+def cache() -> ProblemCache:
+    """Return the process-wide cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = _from_env()
+    return _cache
+
+
+def invalidate(problem_id: str) -> None:
+    cache().invalidate(problem_id)
@@ -0,0 +1,192 @@
+"""Process-wide registry of the active admin-managed prompts.
+
+Every worker keeps the active version of each prompt in `KNOWN_PROMPT_IDS`
+in memory. Instead of two `get_item` calls per evaluation (ACTIVE pointer,
+then the version record), callers read from the registry, which polls the
+ACTIVE pointers for all prompts in one `batch_get_item` at most once per
+`PROMPT_REGISTRY_POLL_SECONDS`. Version records are only fetched when a
+pointer has moved, so a quiet poll costs one small read.
+
+Because every worker polls on its own, a save through `/admin/prompts` is
+picked up by all processes within one poll interval — not just the one
+that served the save (which refreshes immediately).
+
+Reloads build a complete new snapshot and swap it in with a single
+reference assignment, so readers never see a half-updated set of prompts.
+
+Until the first poll succeeds there is nothing to serve, so a failed poll
+is retried with exponential backoff (from PROMPT_REGISTRY_RETRY_SECONDS,
+default 1, doubling up to the poll interval) rather than a whole interval
+later. Failed polls are counted in `metrics` as prompt_registry.poll_failed,
+and callers that fall back to built-in prompts count that themselves.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_SECONDS = float(os.getenv("PROMPT_REGISTRY_POLL_SECONDS", "30"))
+DEFAULT_RETRY_SECONDS = float(os.getenv("PROMPT_REGISTRY_RETRY_SECONDS", "1"))
+
+
+@dataclass(frozen=True)
+class LoadedPrompt:
+    """One active prompt version as held in memory."""
+    prompt_id: str
+    version: int
+    system_prompt: str
+    user_prompt_template: str
+    loaded_at: str
+
+
+class PromptRegistry:
+    """In-memory cache of active prompts, refreshed by polling ACTIVE pointers.
+
+    `get()` never blocks on the database once a snapshot exists: if a poll
+    is due and another thread is already running it, the caller is served
+    the current snapshot. Only the very first load blocks.
+    """
+
+    def __init__(self, poll_seconds: float = DEFAULT_POLL_SECONDS, retry_seconds: float = DEFAULT_RETRY_SECONDS):
+        self._poll_seconds = poll_seconds
+        self._retry_seconds = retry_seconds
+        self._prompts: Dict[str, LoadedPrompt] = {}
+        self._lock = threading.Lock()
+        self._last_poll: Optional[float] = None
+        self._last_poll_at: Optional[str] = None
+        self._last_error: Optional[str] = None
+        self._loaded_once = False
+        self._failures = 0
+        self._reloads = 0
+
+    def get(self, prompt_id: str) -> Optional[LoadedPrompt]:
+        """Return the active version of `prompt_id`, or None if not seeded."""
+        self._maybe_refresh()
+        return self._prompts.get(prompt_id)
+
+    def refresh(self, *, force: bool = False) -> Dict[str, int]:
+        """Poll the ACTIVE pointers now. Returns {prompt_id: version} after the poll.
+
+        With force=False this is a no-op when a poll happened within the
+        interval. Admin saves call it with force=True so the serving worker
+        sees the new version straight away.
+        """
+        with self._lock:
+            if force or self._poll_due():
+                self._refresh_locked()
+        return {pid: p.version for pid, p in self._prompts.items()}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Diagnostics view: loaded versions and poll state. Never touches the DB."""
+        prompts = self._prompts
+        return {
+            "pollSeconds": self._poll_seconds,
+            "lastPollAt": self._last_poll_at,
+            "lastError": self._last_error,
+            "consecutiveFailures": self._failures,
+            "reloads": self._reloads,
+            "loaded": {
+                pid: {"version": p.version, "loadedAt": p.loaded_at}
+                for pid, p in sorted(prompts.items())
+            },
+        }
+
+    def _poll_due(self) -> bool:
+        if self._last_poll is None:
+            return True
+        return (time.monotonic() - self._last_poll) >= self._next_poll_after()
+
+    def _next_poll_after(self) -> float:
+        if self._loaded_once or not self._failures:
+            return self._poll_seconds
+        # Nothing loaded yet: back off 1x, 2x, 4x... the retry delay.
+        return min(self._poll_seconds, self._retry_seconds * 2 ** (self._failures - 1))
+
+    def _maybe_refresh(self) -> None:
+        if not self._poll_due():
+            return
+        # Block only when there is nothing to serve yet; otherwise let
+        # whichever thread got the lock do the poll.
+        if not self._lock.acquire(blocking=self._last_poll is None):
+            return
+        try:
+            if self._poll_due():
+                self._refresh_locked()
+        finally:
+            self._lock.release()
+
+    def _refresh_locked(self) -> None:
+        import db
+        self._last_poll = time.monotonic()
+        self._last_poll_at = datetime.now(timezone.utc).isoformat()
+        try:
+            pointers = db.get_prompt_active_versions(db.KNOWN_PROMPT_IDS)
+            current = self._prompts
+            loaded: Dict[str, LoadedPrompt] = {}
+            for prompt_id, version in pointers.items():
+                existing = current.get(prompt_id)
+                if existing is not None and existing.version == version:
+                    loaded[prompt_id] = existing
+                    continue
+                record = db.get_prompt_version(prompt_id, version)
+                if not record:
+                    logger.warning(
+                        "prompt_registry: %s ACTIVE points at missing version %d — keeping v%s",
+                        prompt_id, version, existing.version if existing else None,
+                    )
+                    if existing is not None:
+                        loaded[prompt_id] = existing
+                    continue
+                loaded[prompt_id] = LoadedPrompt(
+                    prompt_id=prompt_id,
+                    version=version,
+                    system_prompt=record["systemPrompt"],
+                    user_prompt_template=record["userPromptTemplate"],
+                    loaded_at=self._last_poll_at,
+                )
+                logger.info(
+                    "prompt_registry: loaded %s v%d (was v%s)",
+                    prompt_id, version, existing.version if existing else None,
+                )
+        except Exception as e:
+            # Keep serving the last good snapshot; retry on the next interval
+            # (or sooner, with backoff, if there isn't one yet).
+            self._failures += 1
+            self._last_error = str(e)
+            metrics.incr("prompt_registry.poll_failed")
+            logger.exception(
+                "prompt_registry: poll failed — %s; retrying in %.0fs",
+                "keeping previous snapshot" if self._loaded_once else "no prompts loaded yet",
+                self._next_poll_after(),
+            )
+            return
+
+        if loaded != current:
+            self._reloads += 1
+        self._prompts = loaded  # single reference swap: readers see old or new, never a mix
+        self._last_error = None
+        self._loaded_once = True
+        self._failures = 0
+
+
+_registry: Optional[PromptRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> PromptRegistry:
+    """Return the process-wide registry, creating it on first use."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = PromptRegistry()
+    return _registry
@@ -0,0 +1,128 @@
+"""Per-topic index for assembling multiple-choice quizzes.
+
+Quiz questions use a card's front as the stem and its back as the right
+answer; the wrong choices are other cards' backs. Picking those per
+request meant rebuilding and filtering the topic's whole answer list for
+every question, and uniformly random distractors are often obviously
+wrong (a one-word answer next to a paragraph).
+
+A QuizIndex is built once per topic and content version; content_cache
+keeps it next to the cards. It holds:
+
+- the answer pool, de-duplicated (case- and whitespace-insensitive);
+- for each answer, its DISTRACTOR_CANDIDATES nearest answers, scored on
+  token overlap, length ratio and a shared difficultyTag.
+
+Only plausible pairs are scored: up to MAX_TOKEN_CANDIDATES answers
+sharing a token with it (rarest tokens first), plus those within
+LENGTH_WINDOW of it when sorted by length. Building is therefore linear in
+the size of the topic, not quadratic.
+
+Assembling a quiz then costs O(questions). Each question samples its
+distractors from its answer's candidates. If a small topic has too few
+candidates, the rest are topped up at random from the pool.
+"""
+from __future__ import annotations
+
+import random
+import re
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+NUM_DISTRACTORS = 3
+DISTRACTOR_CANDIDATES = 8
+LENGTH_WINDOW = 12
+MAX_TOKEN_CANDIDATES = 48
+
+_TOKEN = re.compile(r"\w+")
+
+
+def _normalise(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+def _tokens(text: str) -> Set[str]:
+    return set(_TOKEN.findall(text.casefold()))
+
+
+class QuizIndex:
+    def __init__(self, cards: Sequence[Dict[str, Any]]):
+        self.cards: List[Dict[str, Any]] = list(cards)
+        self.answers: List[str] = []
+        self._answer_of_card: List[int] = []
+        tags: List[Optional[str]] = []
+        seen: Dict[str, int] = {}
+        for card in self.cards:
+            key = _normalise(card.get("back", ""))
+            if key not in seen:
+                seen[key] = len(self.answers)
+                self.answers.append(card.get("back", ""))
+                tags.append(card.get("tag"))
+            self._answer_of_card.append(seen[key])
+        self.neighbours: List[List[int]] = self._nearest(tags)
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def _nearest(self, tags: List[Optional[str]]) -> List[List[int]]:
+        n = len(self.answers)
+        tokens = [_tokens(a) for a in self.answers]
+        lengths = [len(a) for a in self.answers]
+
+        postings: Dict[str, List[int]] = {}
+        for i, toks in enumerate(tokens):
+            for tok in toks:
+                postings.setdefault(tok, []).append(i)
+
+        by_length = sorted(range(n), key=lambda i: lengths[i])
+        rank = {i: r for r, i in enumerate(by_length)}
+
+        nearest: List[List[int]] = []
+        for i in range(n):
+            candidates: Set[int] = set()
+            # Rarest tokens say the most about similarity ("the" says nothing)
+            for tok in sorted(tokens[i], key=lambda t: len(postings[t])):
+                room = MAX_TOKEN_CANDIDATES + 1 - len(candidates)
+                if room <= 0:
+                    break
+                candidates.update(postings[tok][:room])
+            r = rank[i]
+            candidates.update(by_length[max(0, r - LENGTH_WINDOW):r + LENGTH_WINDOW + 1])
+            candidates.discard(i)
+
+            def score(j: int) -> float:
+                union = len(tokens[i] | tokens[j]) or 1
+                overlap = len(tokens[i] & tokens[j]) / union
+                length = min(lengths[i], lengths[j]) / (max(lengths[i], lengths[j]) or 1)
+                same_tag = 1.0 if tags[i] is not None and tags[i] == tags[j] else 0.0
+                return 0.5 * overlap + 0.3 * length + 0.2 * same_tag
+
+            nearest.append(sorted(candidates, key=lambda j: (-score(j), j))[:DISTRACTOR_CANDIDATES])
+        return nearest
+
+    def distractors(self, answer: int, rng: random.Random, k: int = NUM_DISTRACTORS) -> List[str]:
+        """Up to k other answers for `answer`: from its nearest, topped up at random."""
+        k = min(k, len(self.answers) - 1)
+        picked = rng.sample(self.neighbours[answer], min(k, len(self.neighbours[answer])))
+        chosen = set(picked) | {answer}
+        while len(picked) < k:
+            j = rng.randrange(len(self.answers))
+            if j not in chosen:
+                chosen.add(j)
+                picked.append(j)
+        return [self.answers[j] for j in picked]
+
+    def questions(self, count: int, rng: Optional[random.Random] = None) -> List[Dict[str, Any]]:
+        """`count` questions (fewer if the topic is smaller) as Question dicts."""
+        rng = rng or random.Random()
+        out: List[Dict[str, Any]] = []
+        for c in rng.sample(range(len(self.cards)), min(count, len(self.cards))):
+            card, answer = self.cards[c], self._answer_of_card[c]
+            choices = self.distractors(answer, rng) + [self.answers[answer]]
+            rng.shuffle(choices)
+            out.append({
+                "id": card["id"],
+                "stem": card.get("front", ""),
+                "choices": choices,
+                "correctIndex": choices.index(self.answers[answer]),
+            })
+        return out
@@ -0,0 +1,80 @@
+"""Signed, expiring quiz tokens for stateless quiz sessions.
+
+A stored quiz session costs three DynamoDB operations (put at start, get
+and delete at submit) just to remember which choice is correct. When
+QUIZ_TOKEN_SECRET is set, /quiz/start instead returns `quizToken`: the
+user, quiz and topic ids, an expiry, and each question id with its correct
+choice index, signed with HMAC-SHA256. /quiz/submit grades from the token
+and never reads a session.
+
+Format: base64url(JSON payload) "." base64url(signature), no padding. The
+payload is readable by the client — it reveals the answers, exactly as
+`correctIndex` in QuizStartRes already does — but can't be altered or
+reused for another user or quiz. A token is single-use: the quiz result is
+written with a condition on its key, so a replayed submit gets 409 and
+neither overwrites the result nor reschedules the cards again.
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+
+class QuizTokenError(ValueError):
+    """Token is malformed, tampered with, or for another user/quiz."""
+
+
+class QuizTokenExpired(QuizTokenError):
+    pass
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _signature(secret: str, body: str) -> str:
+    return _b64encode(hmac.new(secret.encode("utf-8"), body.encode("ascii"), hashlib.sha256).digest())
+
+
+def sign(*, secret: str, uid: str, quiz_id: str, topic_id: str, questions: List[Dict[str, Any]],
+         ttl_seconds: int, now: Optional[float] = None) -> str:
+    """Token for a quiz whose questions are dicts with id and correctIndex."""
+    payload = {
+        "u": uid,
+        "q": quiz_id,
+        "t": topic_id,
+        "e": int((time.time() if now is None else now) + ttl_seconds),
+        "a": [[q["id"], q["correctIndex"]] for q in questions],
+    }
+    body = _b64encode(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+    return f"{body}.{_signature(secret, body)}"
+
+
+def verify(token: str, *, secret: str, uid: str, quiz_id: str, now: Optional[float] = None) -> Dict[str, Any]:
+    """Check a token and return {"topicId", "questions": [{"id", "correctIndex"}]}."""
+    try:
+        body, sig = token.split(".")
+    except ValueError:
+        raise QuizTokenError("malformed quiz token") from None
+    if not hmac.compare_digest(sig, _signature(secret, body)):
+        raise QuizTokenError("bad quiz token signature")
+    try:
+        payload = json.loads(_b64decode(body))
+    except ValueError:
+        raise QuizTokenError("malformed quiz token") from None
+    if payload.get("u") != uid or payload.get("q") != quiz_id:
+        raise QuizTokenError("quiz token is for another quiz")
+    if (time.time() if now is None else now) >= payload["e"]:
+        raise QuizTokenExpired("quiz token expired")
+    return {
+        "topicId": payload["t"],
+        "questions": [{"id": qid, "correctIndex": idx} for qid, idx in payload["a"]],
+    }
@@ -54,6 +54,7 @@ class QuizStartRes(BaseModel):
     quizId: str
     topicId: str
     questions: List[Question]
+    quizToken: str | None = None  # signed session, when QUIZ_TOKEN_SECRET is set; send back on submit
 
 class Answer(BaseModel):
     '''An answer to a quiz question'''
@@ -65,6 +66,7 @@ class QuizSubmitReq(BaseModel):
     uid: str
     quizId: str
     answers: List[Answer]
+    quizToken: str | None = None
 
 class BreakdownItem(BaseModel):
     '''Breakdown of a quiz question result'''
@@ -133,6 +135,16 @@ class LogEventRes(BaseModel):
     ok: bool
 
 
+class LogEventBatchReq(BaseModel):
+    '''Several step events in one request (/homework/log-event/batch).'''
+    events: List[LogEventReq]
+
+
+class LogEventBatchRes(BaseModel):
+    ok: bool
+    accepted: int
+
+
 # ── Markup-feedback evaluation (phase 1 of the rebuilt engine) ──────────────
 
 
@@ -189,6 +201,37 @@ class EvaluateRes(BaseModel):
     next_prompt: Optional[str] = None
 
 
+class EvaluateDraftRes(BaseModel):
+    '''Response schema for a speculative draft evaluation.
+
+    `accepted` is False when the draft wasn't queued; `reason` says why:
+    "busy" / "brownout" (no spare LLM capacity), "cached" (this exact text
+    is already marked) or "running" (it's being marked now).
+    '''
+    accepted: bool
+    reason: Optional[str] = None
+
+
+class EvaluateBatchItem(BaseModel):
+    '''One submission in a batch. `item_id` is the caller's label for it
+    (a student or row id) and is echoed back on the matching result.'''
+    item_id: str
+    submission: str
+
+
+class EvaluateBatchReq(BaseModel):
+    '''Request schema for marking a class set of submissions to one problem.
+
+    Results stream back as `result` server-sent events in completion order —
+    each is an EvaluateRes plus item_id, index, duration_ms, elapsed_ms and
+    duplicate_of — followed by a single `done` summary event.
+    '''
+    problem_id: str
+    submissions: List[EvaluateBatchItem]
+    mode: str = "free"  # "free" | "guided"
+    target: str = "main"  # "main" | "simpler"
+
+
 class ProblemRes(BaseModel):
     '''Response schema for fetching a stored problem by id.
 
@@ -240,6 +283,17 @@ class PromptVersion(BaseModel):
     createdBy: str
     notes: str
 
+class PromptVersionSummary(BaseModel):
+    promptId: str
+    version: int
+    createdAt: str
+    createdBy: str
+    notes: str
+
+class PromptVersionPage(BaseModel):
+    items: List[PromptVersionSummary]  # newest first
+    nextBefore: Optional[int] = None  # pass as ?before= for the next page; None on the last
+
 class PromptSaveReq(BaseModel):
     systemPrompt: str
     userPromptTemplate: str
@@ -260,6 +314,12 @@ class PromptTryRes(BaseModel):
     durationMs: int
 
 
+# Admin: overload control
+class BrownoutReq(BaseModel):
+    enabled: bool
+    durationSeconds: Optional[int] = None  # None = until cleared
+
+
 # ── Problems, Attempts, Step Events (Ticket 1.4) ──────────────────────────
 
 class AttemptOutcome(str, Enum):
@@ -346,25 +346,17 @@ Return ONLY valid JSON.\
 # ---------------------------------------------------------------------------
 
 def seed():
-    now = db.now_iso()
-
-    # Ingestion v2 — write the record directly, do NOT update ACTIVE pointer
+    # Ingestion v2 — saved as a draft, do NOT update ACTIVE pointer
     # (v1 stays active until Ticket 1.2 frontend work is complete)
-    existing_ingestion = db.list_prompt_versions("ingestion")
-    if len(existing_ingestion) < 2:
-        version = len(existing_ingestion) + 1
-        db.table().put_item(Item={
-            "PK": "PROMPT#ingestion",
-            "SK": f"VERSION#{version:04d}",
-            "Type": "PromptVersion",
-            "promptId": "ingestion",
-            "version": version,
-            "systemPrompt": INGESTION_SYSTEM_V2,
-            "userPromptTemplate": INGESTION_USER_TEMPLATE_V2,
-            "createdAt": now,
-            "createdBy": "seed",
-            "notes": "New design from problem-ingestion-prompt.md — draft, not yet active. Activate once Ticket 1.2 frontend is complete.",
-        })
+    if db.latest_prompt_version("ingestion") < 2:
+        version = db.put_prompt_version(
+            "ingestion",
+            system_prompt=INGESTION_SYSTEM_V2,
+            user_prompt_template=INGESTION_USER_TEMPLATE_V2,
+            created_by="seed",
+            notes="New design from problem-ingestion-prompt.md — draft, not yet active. Activate once Ticket 1.2 frontend is complete.",
+            activate=False,
+        )
         print(f"Ingestion v{version} written (draft — v1 stays active)")
     else:
         print("Ingestion v2 already present, skipping")
@@ -0,0 +1,59 @@
+"""SM-2 spaced-repetition scheduling for revision cards.
+
+Each (user, card) pair has a review state — ease factor, interval,
+repetition and lapse counts, and when it is next due — updated from every
+quiz answer. A quiz answer is right or wrong, so it maps onto two SM-2
+grades: QUALITY_CORRECT and QUALITY_WRONG.
+
+A correct answer grows the interval: 1 day, then 6, then the previous
+interval times the ease. A wrong answer resets the repetitions and makes
+the card due straight away, so /review/next offers it again immediately,
+as it did before scheduling. The ease factor moves by the SM-2 formula
+either way and never drops below MIN_EASE.
+
+Functions here are pure. db.py stores the state as CardReview items and
+indexes them by due date.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+INITIAL_EASE = 2.5
+MIN_EASE = 1.3
+QUALITY_CORRECT = 4
+QUALITY_WRONG = 1
+
+
+def format_due(when: datetime) -> str:
+    """Fixed-width UTC timestamp, so due dates sort correctly as strings."""
+    return when.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def schedule(state: Optional[Dict[str, Any]], correct: bool, now: datetime) -> Dict[str, Any]:
+    """The card's next review state after one answer. `state` is the
+    previous result of this function, or None for a card never reviewed."""
+    state = state or {}
+    ease = float(state.get("ease", INITIAL_EASE))
+    interval = int(state.get("intervalDays", 0))
+    repetitions = int(state.get("repetitions", 0))
+    lapses = int(state.get("lapses", 0))
+
+    quality = QUALITY_CORRECT if correct else QUALITY_WRONG
+    if correct:
+        interval = 1 if repetitions == 0 else 6 if repetitions == 1 else round(interval * ease)
+        repetitions += 1
+    else:
+        interval = 0
+        repetitions = 0
+        lapses += 1
+    ease = max(MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+
+    return {
+        "ease": round(ease, 2),
+        "intervalDays": interval,
+        "repetitions": repetitions,
+        "lapses": lapses,
+        "lastReviewedAt": format_due(now),
+        "dueAt": format_due(now + timedelta(days=interval)),
+    }
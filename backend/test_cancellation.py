@@ -0,0 +1,154 @@
+"""Tests for cancelling LLM work when the client disconnects.
+
+A fake request reports a disconnect on cue and a fake OpenAI client blocks
+until it is closed, standing in for an in-flight HTTP request.
+"""
+from __future__ import annotations
+
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import anyio
+import pytest
+
+import cancellation
+import gcse_evaluator
+import metrics
+
+
+class _FakeRequest:
+    def __init__(self, disconnect: threading.Event):
+        self._disconnect = disconnect
+
+    async def is_disconnected(self) -> bool:
+        return self._disconnect.is_set()
+
+
+class _BlockingClient:
+    """create() blocks until close() — like an aborted HTTP request."""
+
+    def __init__(self):
+        self.closed = threading.Event()
+        self.started = threading.Event()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **_kwargs):
+        self.started.set()
+        if self.closed.wait(5):
+            raise ConnectionError("client closed")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="{}"))])
+
+    def close(self):
+        self.closed.set()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def _run(fn, *, disconnect: threading.Event, cancel_on_disconnect: bool = True):
+    async def main():
+        return await cancellation.run_until_disconnect(
+            _FakeRequest(disconnect), fn, what="test",
+            cancel_on_disconnect=cancel_on_disconnect, poll_seconds=0.01,
+        )
+    return anyio.run(main)
+
+
+def test_disconnect_closes_in_flight_client():
+    client = _BlockingClient()
+    disconnect = threading.Event()
+
+    def work():
+        with cancellation.guard(client):
+            disconnect.set()
+            client.chat.completions.create(model="m")
+
+    with pytest.raises(cancellation.Cancelled):
+        _run(work, disconnect=disconnect)
+    assert client.closed.is_set()
+    assert metrics.count("cancel.test.disconnected") == 1
+    assert metrics.count("cancel.test.aborted") == 1
+
+
+def test_disconnect_without_cancel_lets_work_finish():
+    disconnect = threading.Event()
+
+    def work():
+        disconnect.set()
+        threading.Event().wait(0.1)
+        cancellation.check()
+        return "cached"
+
+    assert _run(work, disconnect=disconnect, cancel_on_disconnect=False) == "cached"
+    assert metrics.count("cancel.test.disconnected") == 1
+    assert metrics.count("cancel.test.finished") == 1
+
+
+def test_connected_client_is_untouched():
+    assert _run(lambda: 42, disconnect=threading.Event()) == 42
+    assert metrics.count("cancel.test.disconnected") == 0
+
+
+def test_cancelled_evaluation_raises_instead_of_llm_error():
+    token = cancellation.CancelToken()
+    token.cancel("client disconnected")
+    with cancellation.scope(token), \
+         patch.object(gcse_evaluator, "_call_openai", side_effect=AssertionError("LLM should not be called")), \
+         pytest.raises(cancellation.Cancelled):
+        gcse_evaluator.evaluate_submission(
+            submission="2x = 12",
+            ai_response={"normalised_form": "Solve 2x + 5 = 17", "full_solution": "x = 6"},
+            question="Solve 2x + 5 = 17",
+            prompt=("sys", "{{SUBMISSION}}"),
+        )
+
+
+class _BlockingStreamClient:
+    """A streamed completion that sends one delta, then stalls until close()."""
+
+    def __init__(self):
+        self.closed = threading.Event()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **_kwargs):
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content='{"feedback'))])
+        if self.closed.wait(5):
+            raise ConnectionError("client closed")
+
+    def close(self):
+        self.closed.set()
+
+
+def test_disconnect_cancels_upstream_stream():
+    client = _BlockingStreamClient()
+    disconnect = threading.Event()
+    received = []
+
+    async def main():
+        deltas = gcse_evaluator._call_llm_stream(system_prompt="sys", user_prompt="user", model="m")
+        async for delta in cancellation.iterate_until_disconnect(
+            _FakeRequest(disconnect), deltas, what="test", poll_seconds=0.01,
+        ):
+            received.append(delta)
+            disconnect.set()
+
+    with patch.object(gcse_evaluator, "_openai_client", return_value=client):
+        anyio.run(main)
+    assert received == ['{"feedback']
+    assert client.closed.is_set()
+    assert metrics.count("cancel.test.disconnected") == 1
+    assert metrics.count("cancel.test.aborted") == 1
+
+
+def test_connected_stream_runs_to_completion():
+    async def main():
+        return [item async for item in cancellation.iterate_until_disconnect(
+            _FakeRequest(threading.Event()), iter([1, 2, 3]), what="test", poll_seconds=0.01,
+        )]
+    assert anyio.run(main) == [1, 2, 3]
+    assert metrics.count("cancel.test.disconnected") == 0
@@ -0,0 +1,89 @@
+"""Tests for the seeded-content cache (content_cache.py) and the ETag /
+304 handling on /subjects and /topics/{id}/cards."""
+from __future__ import annotations
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import anyio
+import pytest
+from fastapi.testclient import TestClient
+
+import content_cache
+import db
+import db_async
+import main
+import metrics
+
+CARDS = [{"id": "c1", "front": "2 + 2", "back": "4", "tag": None}]
+SUBJECTS = [{"subject": "Maths", "topics": [{"id": "t1", "title": "Algebra", "estMinutes": 10}]}]
+
+
+@pytest.fixture
+def fresh_cache():
+    metrics.reset()
+    cache = content_cache.ContentCache(check_seconds=60)
+    with patch.object(content_cache, "_cache", cache):
+        yield cache
+
+
+def test_entries_are_reused_until_the_version_changes():
+    cache = content_cache.ContentCache(check_seconds=0)
+    load, version = MagicMock(return_value=CARDS), MagicMock(return_value="v1")
+    first = cache.get(("cards", "t1"), load, version)
+    assert cache.get(("cards", "t1"), load, version) is first
+    assert load.call_count == 1
+    version.return_value = "v2"
+    load.return_value = CARDS + [{"id": "c2", "front": "3 + 3", "back": "6", "tag": None}]
+    second = cache.get(("cards", "t1"), load, version)
+    assert load.call_count == 2
+    assert second.etag != first.etag
+    assert metrics.count("content_cache.refresh") == 1
+
+
+def test_version_is_checked_at_most_every_check_seconds():
+    cache = content_cache.ContentCache(check_seconds=60)
+    version = MagicMock(return_value="v1")
+    for _ in range(3):
+        cache.get(("subjects",), lambda: SUBJECTS, version)
+    assert version.call_count == 1
+
+
+def test_empty_results_are_not_cached():
+    cache = content_cache.ContentCache(check_seconds=60)
+    load = MagicMock(return_value=[])
+    cache.get(("cards", "nope"), load, lambda: None)
+    cache.get(("cards", "nope"), load, lambda: None)
+    assert load.call_count == 2
+
+
+def test_etag_depends_only_on_content():
+    assert content_cache.etag_for(CARDS) == content_cache.etag_for([dict(c) for c in CARDS])
+    assert content_cache.etag_for(CARDS).startswith('"')
+
+
+def test_routes_send_etags_and_304(fresh_cache):
+    client = TestClient(main.app)
+    with patch.object(db, "list_topics_grouped", return_value=SUBJECTS) as topics, \
+         patch.object(db, "list_cards_for_topic", return_value=CARDS), \
+         patch.object(db, "get_content_version", return_value="v1"):
+        res = client.get("/api/v1/subjects")
+        etag = res.headers["ETag"]
+        again = client.get("/api/v1/subjects", headers={"If-None-Match": etag})
+        cards = client.get("/api/v1/topics/t1/cards")
+        stale = client.get("/api/v1/topics/t1/cards", headers={"If-None-Match": etag})
+    assert res.json()[0]["topics"][0]["id"] == "t1"
+    assert (again.status_code, again.headers["ETag"], again.content) == (304, etag, b"")
+    assert topics.call_count == 1
+    assert cards.json()["cards"][0]["id"] == "c1"
+    assert stale.status_code == 200
+    assert stale.headers["ETag"] == cards.headers["ETag"] != etag
+
+
+def test_quiz_builder_draws_from_the_same_cache(fresh_cache):
+    with patch.object(db, "list_cards_for_topic", return_value=CARDS), \
+         patch.object(db, "get_content_version", return_value="v1"):
+        sync = content_cache.cards("t1")
+    with patch.object(db_async, "list_cards_for_topic", AsyncMock()) as load, \
+         patch.object(db_async, "get_content_version", AsyncMock(return_value="v1")):
+        assert anyio.run(content_cache.acards, "t1") is sync
+    load.assert_not_called()
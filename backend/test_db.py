@@ -0,0 +1,239 @@
+"""Tests for db.py: lazy clients, botocore config and call stats, and the
+transactional problem + attempt write used by /homework/help-json."""
+from __future__ import annotations
+
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+from botocore.stub import ANY, Stubber
+from fastapi.testclient import TestClient
+
+import db
+import gcse_help_generator
+import main
+import metrics
+import problem_cache
+
+
+@pytest.fixture
+def fresh_clients(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+    metrics.reset()
+    with patch.object(db, "_clients", {}), patch.object(db, "_stats", db._CallStats()):
+        yield
+
+
+def test_import_does_not_connect():
+    assert isinstance(db._table, db._Lazy)
+    assert isinstance(db._dynamodb, db._Lazy)
+
+
+def test_botocore_config_is_tuned():
+    config = db._botocore_config()
+    assert config.max_pool_connections == db.MAX_POOL_CONNECTIONS
+    assert config.tcp_keepalive is True
+    assert config.retries == {"mode": "adaptive", "max_attempts": db.MAX_ATTEMPTS}
+    assert config.connect_timeout == db.CONNECT_TIMEOUT_SECONDS
+    assert config.read_timeout == db.READ_TIMEOUT_SECONDS
+
+
+def test_connect_is_lazy_and_shared(fresh_clients):
+    assert db._clients == {}
+    table = db.table()
+    assert db.table() is table
+    assert db._table.name == db.TABLE_NAME
+    assert table.meta.client.meta.config.max_pool_connections == db.MAX_POOL_CONNECTIONS
+
+
+def test_calls_are_timed_and_counted(fresh_clients):
+    client = db.table().meta.client
+    with Stubber(client) as stub:
+        stub.add_response("get_item", {"Item": {"PK": {"S": "USER#u"}, "SK": {"S": "PROFILE"}}})
+        stub.add_client_error("get_item", service_error_code="ProvisionedThroughputExceededException")
+        assert db.get_user_profile("u")["PK"] == "USER#u"
+        with pytest.raises(client.exceptions.ProvisionedThroughputExceededException):
+            db.get_user_profile("u")
+    stats = db.stats()
+    assert stats["latencyMs"]["GetItem"]["samples"] == 2
+    assert stats["errors"] == {"GetItem": 1}
+    assert stats["pool"]["inFlight"] == 0
+    assert stats["pool"]["peakInFlight"] == 1
+    assert stats["pool"]["maxConnections"] == db.MAX_POOL_CONNECTIONS
+
+
+# ── Problem + attempt creation ────────────────────────────────────────────
+
+
+def _create(**overrides):
+    kwargs = dict(
+        problem_id="p1", attempt_id="a1", user_id="u", raw_input="q", normalised_form="q", topic_tags=["algebra"],
+        difficulty=3, ai_response={"full_solution": "x = 6", "marks": 2.5}, eval_projection={"full_solution": "x = 6"},
+    )
+    kwargs.update(overrides)
+    return db.create_problem_with_attempt(**kwargs)
+
+
+def _transact_stub(stub):
+    stub.add_response("transact_write_items", {}, {
+        "TransactItems": [
+            {"Put": {"TableName": db.TABLE_NAME, "Item": ANY, "ConditionExpression": "attribute_not_exists(PK)"}},
+        ] * 3,
+    })
+
+
+def test_create_problem_with_attempt_is_one_transaction(fresh_clients):
+    with patch.object(problem_cache, "_cache", problem_cache.ProblemCache(max_entries=8, ttl_seconds=60)), \
+         Stubber(db.table().meta.client) as stub:
+        _transact_stub(stub)
+        item = _create(image_s3_key="problem-images/p1.png")
+        stub.assert_no_pending_responses()
+        assert item["image_s3_key"] == "problem-images/p1.png"
+        assert db.get_problem("p1")["ai_response"]["marks"] == Decimal("2.5")
+        assert db.get_problem_projection("p1") == {"full_solution": "x = 6"}
+
+
+def test_deferred_create_failure_drops_cached_problem(fresh_clients):
+    deferred = []
+    with patch.object(problem_cache, "_cache", problem_cache.ProblemCache(max_entries=8, ttl_seconds=60)), \
+         Stubber(db.table().meta.client) as stub:
+        stub.add_client_error("transact_write_items", service_error_code="TransactionCanceledException")
+        _create(defer=deferred.append)
+        assert problem_cache.cache().get_or_load("p1", "METADATA", lambda: None) is not None
+        deferred[0]()
+        assert problem_cache.cache().get_or_load("p1", "METADATA", lambda: None) is None
+    assert metrics.count("db.create_problem.deferred_failed") == 1
+
+
+class _V3Generator:
+    def generate(self, **_kwargs):
+        return {"_schema_version": "3.0.0", "normalised_form": "Solve 2x = 4", "full_solution": "x = 2"}
+
+
+class _BrokenGenerator:
+    def generate(self, **_kwargs):
+        raise RuntimeError("boom")
+
+
+def _help(generator):
+    with patch.object(main, "get_user_profile", return_value={"uid": "demo"}), \
+         patch.object(main, "_safe_import_gcse_help_generator", return_value=(generator, gcse_help_generator.GCSEHelpError)), \
+         patch.object(db, "upload_problem_image", side_effect=lambda pid, _url: f"problem-images/{pid}.png"), \
+         patch.object(db, "delete_problem_image") as delete, \
+         patch.object(db, "create_problem_with_attempt") as create:
+        res = TestClient(main.app).post(
+            "/api/v1/homework/help-json",
+            json={"uid": "demo", "text": "Solve 2x = 4", "image_data_url": "data:image/png;base64,AAAA"},
+        )
+        main._image_upload_pool.shutdown(wait=True)  # let any orphan clean-up run
+        main._image_upload_pool = None
+    return res, create, delete
+
+
+def test_help_json_stores_problem_and_attempt_together():
+    res, create, delete = _help(_V3Generator)
+    body = res.json()
+    kwargs = create.call_args.kwargs
+    assert (kwargs["problem_id"], kwargs["attempt_id"]) == (body["problem_id"], body["attempt_id"])
+    assert kwargs["image_s3_key"] == f"problem-images/{body['problem_id']}.png"
+    assert kwargs["defer"] is None
+    delete.assert_not_called()
+
+
+def test_help_json_can_defer_the_write(monkeypatch):
+    monkeypatch.setattr(main, "_DEFER_PROBLEM_WRITES", True)
+    res, create, _delete = _help(_V3Generator)
+    assert res.status_code == 200
+    assert create.call_args.kwargs["defer"] is not None
+
+
+def test_help_json_failure_discards_uploaded_image():
+    res, create, delete = _help(_BrokenGenerator)
+    assert res.status_code == 500
+    create.assert_not_called()
+    assert delete.call_args.args[0].startswith("problem-images/")
+
+
+# ── Prompt versions ───────────────────────────────────────────────────────
+
+
+def _counter_response(stub, version):
+    stub.add_response("update_item", {"Attributes": {"latestVersion": {"N": str(version)}}}, {
+        "TableName": db.TABLE_NAME, "Key": {"PK": "PROMPT#score", "SK": "COUNTER"},
+        "UpdateExpression": "SET #type = :type, promptId = :pid ADD latestVersion :one",
+        "ExpressionAttributeNames": ANY, "ExpressionAttributeValues": ANY, "ReturnValues": "UPDATED_NEW",
+    })
+
+
+def _save_prompt():
+    return db.put_prompt_version("score", system_prompt="s", user_prompt_template="u", created_by="t", activate=False)
+
+
+def test_prompt_version_comes_from_atomic_counter(fresh_clients):
+    with Stubber(db.table().meta.client) as stub:
+        _counter_response(stub, 4)
+        stub.add_response("put_item", {}, {
+            "TableName": db.TABLE_NAME, "Item": ANY, "ConditionExpression": "attribute_not_exists(PK)",
+        })
+        assert _save_prompt() == 4
+        stub.assert_no_pending_responses()
+
+
+def test_prompt_counter_catches_up_with_existing_versions(fresh_clients):
+    with Stubber(db.table().meta.client) as stub:
+        _counter_response(stub, 1)  # counter is new, but v1..v3 already exist
+        stub.add_client_error("put_item", service_error_code="ConditionalCheckFailedException")
+        stub.add_response("query", {"Items": [{"SK": {"S": "VERSION#0003"}}]}, {
+            "TableName": db.TABLE_NAME, "KeyConditionExpression": ANY, "ScanIndexForward": False,
+            "Limit": 1, "ProjectionExpression": "SK",
+        })
+        stub.add_response("update_item", {}, {
+            "TableName": db.TABLE_NAME, "Key": {"PK": "PROMPT#score", "SK": "COUNTER"},
+            "UpdateExpression": ANY, "ConditionExpression": ANY,
+            "ExpressionAttributeNames": ANY, "ExpressionAttributeValues": ANY,
+        })
+        _counter_response(stub, 4)
+        stub.add_response("put_item", {}, {
+            "TableName": db.TABLE_NAME, "Item": ANY, "ConditionExpression": "attribute_not_exists(PK)",
+        })
+        assert _save_prompt() == 4
+        stub.assert_no_pending_responses()
+
+
+def test_prompt_versions_list_in_metadata_only_pages(fresh_clients):
+    summary = {"promptId": {"S": "score"}, "version": {"N": "7"}, "createdAt": {"S": "t"},
+               "createdBy": {"S": "admin"}, "notes": {"S": ""}}
+    with Stubber(db.table().meta.client) as stub:
+        stub.add_response("query", {"Items": [summary], "LastEvaluatedKey": {"PK": {"S": "x"}, "SK": {"S": "y"}}}, {
+            "TableName": db.TABLE_NAME, "KeyConditionExpression": ANY, "ScanIndexForward": False, "Limit": 1,
+            "ProjectionExpression": "promptId, #v, createdAt, createdBy, notes",
+            "ExpressionAttributeNames": {"#v": "version"},
+        })
+        items, cursor = db.list_prompt_versions("score", limit=1, before=8)
+    assert cursor == 7
+    assert "systemPrompt" not in items[0]
+
+
+def test_admin_versions_route_returns_a_page(monkeypatch):
+    monkeypatch.setattr(main, "_ADMIN_API_KEY", "k")
+    summary = {"promptId": "score", "version": 2, "createdAt": "t", "createdBy": "admin", "notes": "n"}
+    with patch.object(db, "list_prompt_versions", return_value=([summary], 2)) as listing:
+        res = TestClient(main.app).get(
+            "/api/v1/admin/prompts/score/versions", params={"limit": 1, "before": 3}, headers={"X-Admin-Key": "k"},
+        )
+    assert res.json() == {"items": [summary], "nextBefore": 2}
+    assert listing.call_args.kwargs == {"limit": 1, "before": 3}
+
+
+def test_prompt_pointer_poll_returns_what_it_fetched(fresh_clients, monkeypatch):
+    monkeypatch.setattr(db, "BATCH_MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(db, "BATCH_BACKOFF_SECONDS", 0.01)
+    with Stubber(db._dynamodb.meta.client) as stub:
+        for found in ([{"PK": {"S": "PROMPT#evaluation"}, "version": {"N": "3"}}], []):
+            stub.add_response("batch_get_item", {
+                "Responses": {db.TABLE_NAME: found},
+                "UnprocessedKeys": {db.TABLE_NAME: {"Keys": [{"PK": {"S": "PROMPT#help"}, "SK": {"S": "ACTIVE"}}]}},
+            })
+        assert db.get_prompt_active_versions(["evaluation", "help"]) == {"evaluation": 3}
+        stub.assert_no_pending_responses()
@@ -0,0 +1,318 @@
+"""Tests for db_async.py.
+
+Most run over the threaded fallback: db._table / db._dynamodb are replaced
+with in-memory fakes, so these check pagination, batching and that the
+async helpers read and write the same records as db.py. The aioboto3
+backend is checked against a botocore Stubber on its client.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import time
+from unittest.mock import patch
+
+import anyio
+import pytest
+from botocore.exceptions import ClientError
+from botocore.stub import Stubber
+from fastapi.testclient import TestClient
+
+import content_cache
+import db
+import db_async
+import main
+import problem_cache
+
+_open = db_async._open
+
+
+async def _open_threaded():
+    return db_async._open_threaded()
+
+
+class FakeTable:
+    def __init__(self, page_size: int = 2):
+        self.items = {}
+        self.page_size = page_size
+        self.queries = 0
+        self.max_item_events = None  # stands in for DynamoDB's 400 KB item limit
+
+    def put_item(self, Item, ConditionExpression=None, **_kwargs):
+        if ConditionExpression == "attribute_not_exists(PK)" and (Item["PK"], Item["SK"]) in self.items:
+            raise ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "PutItem")
+        self.items[(Item["PK"], Item["SK"])] = dict(Item)
+
+    def get_item(self, Key, ProjectionExpression=None):
+        item = self.items.get((Key["PK"], Key["SK"]))
+        if item is None:
+            return {}
+        if ProjectionExpression:
+            item = {k: item[k] for k in ProjectionExpression.split(", ") if k in item}
+        return {"Item": dict(item)}
+
+    def delete_item(self, Key):
+        self.items.pop((Key["PK"], Key["SK"]), None)
+
+    def update_item(self, Key, ExpressionAttributeValues, **_kwargs):
+        """Models only the event-log append (db._event_log_append)."""
+        values = ExpressionAttributeValues
+        current = self.items.get((Key["PK"], Key["SK"]), {}).get("event_count", 0)
+        if self.max_item_events is not None and current + values[":n"] > self.max_item_events:
+            raise ClientError(
+                {"Error": {"Code": "ValidationException", "Message": "Item size has exceeded the maximum allowed size"}},
+                "UpdateItem",
+            )
+        item = self.items.setdefault((Key["PK"], Key["SK"]), dict(Key))
+        if item.get("event_count", 0) > values[":room"]:
+            raise ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "UpdateItem")
+        item.update({"Type": values[":type"], "attempt_id": values[":aid"]})
+        item["events"] = item.get("events", []) + list(values[":new"])
+        item["event_count"] = item.get("event_count", 0) + values[":n"]
+        return {}
+
+    def query(self, KeyConditionExpression, ExclusiveStartKey=None, ScanIndexForward=True, Limit=None, **_kwargs):
+        """Supports PK = x AND begins_with(SK, y) on the base table only."""
+        self.queries += 1
+        pk_cond, sk_cond = KeyConditionExpression.get_expression()["values"]
+        pk, prefix = pk_cond.get_expression()["values"][1], sk_cond.get_expression()["values"][1]
+        matching = sorted(
+            (it for (p, sk), it in self.items.items() if p == pk and sk.startswith(prefix)),
+            key=lambda it: it["SK"], reverse=not ScanIndexForward,
+        )
+        start = int(ExclusiveStartKey["offset"]) if ExclusiveStartKey else 0
+        page = matching[start:start + (Limit or self.page_size)]
+        resp = {"Items": [dict(it) for it in page]}
+        if start + self.page_size < len(matching):
+            resp["LastEvaluatedKey"] = {"offset": start + self.page_size}
+        return resp
+
+
+class FakeResource:
+    def __init__(self, table: FakeTable, *, unprocessed_calls: int = 0):
+        self.table = table
+        self.batch_calls = []
+        self._unprocessed_calls = unprocessed_calls  # calls that leave their last request unprocessed
+
+    def batch_write_item(self, RequestItems):
+        requests = RequestItems[db.TABLE_NAME]
+        self.batch_calls.append(len(requests))
+        unprocessed = []
+        if self._unprocessed_calls:
+            self._unprocessed_calls -= 1
+            requests, unprocessed = requests[:-1], requests[-1:]
+        for r in requests:
+            if "DeleteRequest" in r:
+                self.table.delete_item(Key=r["DeleteRequest"]["Key"])
+            else:
+                self.table.put_item(Item=r["PutRequest"]["Item"])
+        return {"UnprocessedItems": {db.TABLE_NAME: unprocessed}} if unprocessed else {}
+
+    def batch_get_item(self, RequestItems):
+        keys = RequestItems[db.TABLE_NAME]["Keys"]
+        found = [self.table.items[(k["PK"], k["SK"])] for k in keys if (k["PK"], k["SK"]) in self.table.items]
+        return {"Responses": {db.TABLE_NAME: found}}
+
+
+@pytest.fixture
+def fake():
+    table = FakeTable()
+    resource = FakeResource(table)
+    with patch.object(db, "_table", table), patch.object(db, "_dynamodb", resource), \
+         patch.object(db_async, "_conn", None), patch.object(db_async, "_open", _open_threaded), \
+         patch.object(db, "_event_log_heads", db.OrderedDict()), \
+         patch.object(problem_cache, "_cache", problem_cache.ProblemCache(max_entries=16, ttl_seconds=3600)), \
+         patch.object(content_cache, "_cache", content_cache.ContentCache(check_seconds=60)):
+        yield table, resource
+
+
+def test_falls_back_to_threads_without_aioboto3(fake):
+    with patch.dict(sys.modules, {"aioboto3": None}), patch.object(db_async, "_open", _open):
+        anyio.run(db_async.get_user_profile, "nobody")
+    assert db_async.backend() == "threaded"
+
+
+def test_aioboto3_backend_calls_dynamodb_on_the_event_loop():
+    item = {"PK": {"S": "USER#u1"}, "SK": {"S": "PROFILE"}, "name": {"S": "Ada"}}
+
+    async def run():
+        conn = await db_async._connect()
+        try:
+            with Stubber(conn.dynamodb.meta.client) as stub:
+                stub.add_response("get_item", {"Item": item},
+                                  {"TableName": db.TABLE_NAME, "Key": {"PK": "USER#u1", "SK": "PROFILE"}})
+                profile = await db_async.get_user_profile("u1")
+                stub.assert_no_pending_responses()
+            return conn.backend, profile
+        finally:
+            await db_async.close()
+
+    env = {"AWS_ACCESS_KEY_ID": "test", "AWS_SECRET_ACCESS_KEY": "test"}
+    with patch.dict(os.environ, env), patch.object(db_async, "_conn", None), \
+         patch.object(db, "S3_IMAGES_BUCKET", None):
+        backend, profile = anyio.run(run)
+    assert backend == "aioboto3"
+    assert profile == {"PK": "USER#u1", "SK": "PROFILE", "name": "Ada"}
+
+
+def test_query_all_follows_pages(fake):
+    table, _ = fake
+    for i in range(5):
+        db.save_progress("u", {"topicId": "t", "exerciseId": f"e{i}", "status": "done"})
+
+    async def collect():
+        return [it async for it in db_async.query_all(**db._progress_query("u", "t"))]
+
+    items = anyio.run(collect)
+    assert [it["exerciseId"] for it in items] == [f"e{i}" for i in range(5)]
+    assert table.queries == 3
+
+
+def test_batch_write_chunks_and_retries_unprocessed(fake):
+    table, _ = fake
+    resource = FakeResource(table, unprocessed_calls=1)
+    items = [{"PK": f"X#{i}", "SK": "A"} for i in range(30)]
+    with patch.object(db, "_dynamodb", resource):
+        anyio.run(db_async.batch_write, items)
+        got = anyio.run(db_async.batch_get, [{"PK": f"X#{i}", "SK": "A"} for i in range(31)])
+    assert resource.batch_calls == [25, 1, 5]
+    assert len(table.items) == 30
+    assert len(got) == 30
+
+
+def test_batch_write_gives_up_after_max_attempts(fake, monkeypatch):
+    table, _ = fake
+    monkeypatch.setattr(db, "BATCH_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(db, "BATCH_BACKOFF_SECONDS", 0.01)
+    resource = FakeResource(table, unprocessed_calls=100)
+    with patch.object(db, "_dynamodb", resource), pytest.raises(RuntimeError):
+        anyio.run(db_async.batch_write, [{"PK": "X#0", "SK": "A"}, {"PK": "X#1", "SK": "A"}])
+    assert resource.batch_calls == [2, 1, 1]
+
+
+def test_async_and_sync_helpers_share_records(fake):
+    db.save_quiz_session("u", "q1", "t", [{"id": "c1"}])
+    assert anyio.run(db_async.get_quiz_session, "u", "q1")["questions"] == [{"id": "c1"}]
+    anyio.run(db_async.delete_quiz_session, "u", "q1")
+    assert db.get_quiz_session("u", "q1") is None
+
+    item = anyio.run(lambda: db_async.put_step_event(
+        attempt_id="a1", event_type="hint", step_number=2, payload={"rung": 1},
+    ))
+    assert db.get_step_events_for_attempt("a1") == [item]
+
+
+def _log_event(n, *, use_async=False):
+    kwargs = dict(attempt_id="a1", event_type="step_checked", step_number=n, payload={"n": n})
+    if use_async:
+        return anyio.run(lambda: db_async.put_step_event(**kwargs))
+    return db.put_step_event(**kwargs)
+
+
+def test_event_log_appends_to_chunks_and_rolls_over(fake, monkeypatch):
+    table, _ = fake
+    monkeypatch.setattr(db, "STEP_EVENT_STORAGE", "log")
+    monkeypatch.setattr(db, "EVENT_LOG_CHUNK_EVENTS", 2)
+    written = [_log_event(n, use_async=n % 2 == 0) for n in range(5)]
+    db._event_log_heads.clear()  # a fresh worker finds the head chunk by query
+    written.append(_log_event(5))
+    chunks = sorted(sk for (_pk, sk) in table.items)
+    assert chunks == ["EVENTLOG#00000", "EVENTLOG#00001", "EVENTLOG#00002"]
+    assert [table.items[("ATTEMPT#a1", sk)]["event_count"] for sk in chunks] == [2, 2, 2]
+    assert db.get_step_events_for_attempt("a1") == written
+
+
+def test_event_log_splits_batches_too_large_for_a_chunk(fake, monkeypatch):
+    table, _ = fake
+    monkeypatch.setattr(db, "STEP_EVENT_STORAGE", "log")
+    table.max_item_events = 3
+    items = [db._step_event_item(attempt_id="a1", event_type="e", step_number=n, payload={}) for n in range(8)]
+    db.append_step_events("a1", items[:4])
+    anyio.run(db_async.append_step_events, "a1", items[4:])
+    assert [it["event_count"] for it in table.items.values()] == [3, 3, 2]
+    assert [e["event_id"] for e in db.get_step_events_for_attempt("a1")] == [it["event_id"] for it in items]
+
+
+def test_event_log_raises_when_an_event_never_fits(fake, monkeypatch):
+    table, _ = fake
+    monkeypatch.setattr(db, "STEP_EVENT_STORAGE", "log")
+    table.max_item_events = 0  # every append hits the size limit
+    with pytest.raises(ClientError):
+        db.put_step_event(attempt_id="a1", event_type="e", step_number=0, payload={})
+    items = [db._step_event_item(attempt_id="a1", event_type="e", step_number=n, payload={}) for n in range(3)]
+    with pytest.raises(ClientError):
+        anyio.run(db_async.append_step_events, "a1", items)
+    assert not table.items
+
+
+def test_compaction_moves_items_into_the_log(fake):
+    table, _ = fake
+    written = [_log_event(n) for n in range(3)]
+    assert db.compact_step_events("a1") == 3
+    assert list(table.items) == [("ATTEMPT#a1", "EVENTLOG#00000")]
+    assert db.get_step_events_for_attempt("a1") == written
+    written.append(_log_event(3))  # items written after compaction still merge in
+    assert db.get_step_events_for_attempt("a1") == written
+    assert db.compact_step_events("a1") == 1
+
+
+def test_compaction_gives_up_on_unprocessed_deletes(fake, monkeypatch):
+    table, _ = fake
+    monkeypatch.setattr(db, "BATCH_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(db, "BATCH_BACKOFF_SECONDS", 0.01)
+    written = [_log_event(n) for n in range(3)]
+    resource = FakeResource(table, unprocessed_calls=100)
+    with patch.object(db, "_dynamodb", resource), pytest.raises(RuntimeError):
+        db.compact_step_events("a1")
+    assert resource.batch_calls == [3, 1, 1]
+    assert db.get_step_events_for_attempt("a1") == written  # duplicates collapse
+    assert db.compact_step_events("a1") == 1
+
+
+def test_quiz_results_are_written_once(fake):
+    table, _ = fake
+    assert anyio.run(db_async.save_quiz_result, "u", "q1", "t", [], 2, []) is True
+    assert anyio.run(db_async.save_quiz_result, "u", "q1", "t", [], 0, []) is False
+    assert db.save_quiz_result("u", "q1", "t", [], 1, []) is False
+    assert table.items[("USER#u", "QUIZ#q1")]["score"] == 2
+
+
+def test_expired_quiz_sessions_are_ignored(fake):
+    table, _ = fake
+    db.save_quiz_session("u", "q1", "t", [{"id": "c1"}])
+    item = table.items[("USER#u", "QUIZ#q1#SESSION")]
+    assert item["expiresAt"] > time.time()
+    item["expiresAt"] = int(time.time()) - 1  # DynamoDB TTL deletes lag behind
+    assert db.get_quiz_session("u", "q1") is None
+    assert anyio.run(db_async.get_quiz_session, "u", "q1") is None
+
+
+def test_get_problem_reads_through_the_shared_cache(fake):
+    table, _ = fake
+    db.put_problem(
+        problem_id="p1", user_id="u", raw_input="q", normalised_form="q", topic_tags=[],
+        difficulty=3, ai_response={"full_solution": "x = 1"},
+    )
+    table.items.clear()
+    assert anyio.run(db_async.get_problem, "p1")["problem_id"] == "p1"
+    assert anyio.run(db_async.get_problem_projection, "p1") is None
+
+
+def test_quiz_routes_run_on_db_async(fake):
+    table, _ = fake
+    db.put_user_profile("u1", None)
+
+    async def cards(_topic_id):  # GSI1 queries aren't modelled by FakeTable
+        return [{"id": str(i), "front": f"f{i}", "back": f"b{i}", "tag": None} for i in range(4)]
+
+    client = TestClient(main.app)
+    with patch.object(db_async, "list_cards_for_topic", cards):
+        start = client.post("/api/v1/quiz/start", json={"uid": "u1", "topicId": "t", "numQuestions": 2}).json()
+    answers = [{"questionId": q["id"], "choiceIndex": q["correctIndex"]} for q in start["questions"]]
+    res = client.post("/api/v1/quiz/submit", json={"uid": "u1", "quizId": start["quizId"], "answers": answers})
+    assert res.json()["score"] == 2
+    assert db.get_quiz_session("u1", start["quizId"]) is None
+    assert table.items[("USER#u1", f"QUIZ#{start['quizId']}")]["score"] == 2
+    reviews = [it for it in table.items.values() if it.get("Type") == "CardReview"]
+    assert sorted(it["cardId"] for it in reviews) == sorted(q["id"] for q in start["questions"])
+    assert all(it["repetitions"] == 1 for it in reviews)
@@ -6,15 +6,22 @@ touching DynamoDB or OpenAI: db helpers and the LLM call are stubbed out.
 from __future__ import annotations
 
 import json
+import threading
+import time
 from typing import Any
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 
 import pytest
 from fastapi.testclient import TestClient
 
+import cancellation
 import db
+import db_async
+import event_buffer
 import gcse_evaluator
 import main
+import metrics
+import overload
 
 
 # ── Fixtures ────────────────────────────────────────────────────────────────
@@ -35,9 +42,18 @@ SAMPLE_AI_RESPONSE = {
 }
 
 
+@pytest.fixture(autouse=True)
+def _fresh_incremental_memo():
+    """Every test shares attempt_id "attempt-test"; don't let markup leak between them."""
+    gcse_evaluator._previous_evaluations.clear()
+    yield
+    gcse_evaluator._previous_evaluations.clear()
+
+
 @pytest.fixture
 def client_and_events():
-    """TestClient with db.get_problem and db.put_step_event stubbed."""
+    """TestClient with the problem helpers stubbed in db and db_async, and
+    step events captured from the event buffer."""
     events: list[dict[str, Any]] = []
 
     def fake_get_problem(problem_id: str):
@@ -54,16 +70,16 @@ def client_and_events():
             "created_at": "2026-05-01T00:00:00Z",
         }
 
-    def fake_put_step_event(*, attempt_id, event_type, step_number, payload):
-        events.append({
-            "attempt_id": attempt_id,
-            "event_type": event_type,
-            "step_number": step_number,
-            "payload": payload,
-        })
+    def fake_offer(items):
+        events.extend({k: item[k] for k in ("attempt_id", "event_type", "step_number", "payload")} for item in items)
+        return True
 
+    # Problems stored before EVAL projections: evaluation falls back to get_problem.
     with patch.object(db, "get_problem", side_effect=fake_get_problem), \
-         patch.object(db, "put_step_event", side_effect=fake_put_step_event):
+         patch.object(db, "get_problem_projection", return_value=None), \
+         patch.object(db_async, "get_problem", AsyncMock(side_effect=fake_get_problem)), \
+         patch.object(db_async, "get_problem_projection", AsyncMock(return_value=None)), \
+         patch.object(event_buffer.buffer(), "offer", side_effect=fake_offer):
         yield TestClient(main.app), events
 
 
@@ -115,6 +131,56 @@ def test_cheap_path_handles_normalisation(client_and_events):
     assert res.json()["is_correct"] is True
 
 
+# ── Local pre-check ─────────────────────────────────────────────────────────
+
+
+@pytest.mark.parametrize("submission,rule", [
+    ("?", "junk"),
+    ("  idk  ", "junk"),
+    ("I don't know.", "junk"),
+    ("q", "junk"),
+    ("not really getting this tbh", "non_maths"),
+    ("I don't get it", "non_maths"),
+    ("Differentiate y = (3x^2 + 2)^5 with respect to x", "echo"),
+])
+def test_precheck_marks_junk_unclear_without_llm(client_and_events, submission, rule):
+    metrics.reset()
+    client, _events = client_and_events
+    with patch.object(gcse_evaluator, "_call_llm", side_effect=AssertionError("LLM should not be called")):
+        res = client.post("/api/v1/homework/evaluate", json=_evaluate_payload(submission))
+    body = res.json()
+    assert body["is_correct"] is False
+    assert body["feedback_segments"] == [
+        {"text": submission, "status": "unclear", "comment": gcse_evaluator._PRECHECK_COMMENTS[rule]},
+    ]
+    assert metrics.count(f"evaluator.precheck.{rule}") == 1
+
+
+@pytest.mark.parametrize("submission", [
+    "7", "multiply out the brackets first", "let u be the inside bracket", "u = 3x^2 + 2",
+])
+def test_precheck_lets_maths_through(submission):
+    assert gcse_evaluator.precheck_submission(submission, SAMPLE_AI_RESPONSE["normalised_form"]) is None
+
+
+@pytest.mark.parametrize("submission", [
+    "eleven", "it is twelve", "twenty", "thirty-five", "a million", "three quarters",
+    "negative four", "the sum", "one fifth", "the seventieth", "take the difference",
+])
+def test_precheck_lets_word_form_answers_through(submission):
+    assert gcse_evaluator.precheck_submission(submission, "Solve 2x = 4") is None
+
+
+def test_precheck_rules_configurable(monkeypatch):
+    monkeypatch.setenv("EVALUATOR_PRECHECK_RULES", "echo")
+    assert gcse_evaluator.precheck_submission("idk", "Solve 2x = 4") is None
+    monkeypatch.setenv("EVALUATOR_PRECHECK_RULES", "")
+    assert gcse_evaluator.precheck_submission("Solve 2x = 4", "Solve 2x = 4") is None
+    monkeypatch.setenv("EVALUATOR_PRECHECK_RULES", "junk")
+    monkeypatch.setenv("EVALUATOR_PRECHECK_JUNK_PHRASES", "no clue")
+    assert gcse_evaluator.precheck_submission("No clue!", "Solve 2x = 4") == "junk"
+
+
 # ── LLM path: valid markup ──────────────────────────────────────────────────
 
 
@@ -193,7 +259,7 @@ def test_llm_path_non_json_falls_back_to_generic_prose(client_and_events):
     client, _events = client_and_events
     with patch.object(gcse_evaluator, "_load_active_prompt", return_value=("sys", "user {{SUBMISSION}}")), \
          patch.object(gcse_evaluator, "_call_llm", return_value="this is not json"):
-        res = client.post("/api/v1/homework/evaluate", json=_evaluate_payload("anything"))
+        res = client.post("/api/v1/homework/evaluate", json=_evaluate_payload("u = 3x^2 + 2"))
     body = res.json()
     assert body["is_correct"] is False
     assert body["feedback_segments"] == []
@@ -305,6 +371,54 @@ def test_reconstruct_rejects_segment_text_not_in_original():
     assert gcse_evaluator._reconstruct_with_whitespace(segments, original) is None
 
 
+def test_align_segments_reslices_original_under_small_edits():
+    """Normalised symbols and a dropped period are mapped back onto the student's text."""
+    original = "dy/dx = 5u^4 × 6x\nso dy/dx = 30x(3x^2 + 2)^4."
+    segments = [
+        {"text": "dy/dx = 5u^4 * 6x", "status": "correct", "comment": None},
+        {"text": "\n", "status": "correct", "comment": None},
+        {"text": "so dy/dx = 30x(3x^2 + 2)^4", "status": "correct", "comment": "Nice."},
+    ]
+    assert gcse_evaluator._reconstruct_with_whitespace(segments, original) is None
+    aligned = gcse_evaluator._align_segments(segments, original)
+    assert [s["text"] for s in aligned] == [
+        "dy/dx = 5u^4 × 6x", "\n", "so dy/dx = 30x(3x^2 + 2)^4.",
+    ]
+    assert aligned[2]["comment"] == "Nice."
+
+
+def test_align_segments_rejects_rewritten_output():
+    segments = [{"text": "y equals u to the fifth", "status": "correct", "comment": None}]
+    assert gcse_evaluator._align_segments(segments, "y = u^5") is None
+
+
+def test_align_segments_rejects_segment_drifting_onto_other_text():
+    """Close overall, but one segment's feedback would land on text it wasn't about."""
+    original = "let u = 3x^2 + 2 and then y = u^5 so dy/dx = 5u^4 times du/dx"
+    segments = [
+        {"text": "let u = 3x^2 + 2 and then y = u^5 so dy/dx = 5u^4 times du/dx", "status": "correct", "comment": None},
+        {"text": "= 30x", "status": "wrong", "comment": "Invented line."},
+    ]
+    assert gcse_evaluator._align_segments(segments, original) is None
+
+
+def test_llm_path_edited_text_aligned_instead_of_prose(client_and_events):
+    client, _events = client_and_events
+    submission = "du/dx = 6x\ndy/dx = 5(3x²+2)^4 × 6x"
+    fake_llm_response = json.dumps({"feedback_segments": [
+        {"text": "du/dx = 6x", "status": "correct", "comment": None},
+        {"text": "dy/dx = 5(3x^2+2)^4 * 6x", "status": "incomplete", "comment": "Now simplify."},
+    ]})
+    with patch.object(gcse_evaluator, "_load_active_prompt", return_value=("sys", "user {{SUBMISSION}}")), \
+         patch.object(gcse_evaluator, "_call_llm", return_value=fake_llm_response):
+        res = client.post("/api/v1/homework/evaluate", json=_evaluate_payload(submission))
+
+    body = res.json()
+    assert body["prose_feedback"] is None
+    assert "".join(s["text"] for s in body["feedback_segments"]) == submission
+    assert body["feedback_segments"][-1]["comment"] == "Now simplify."
+
+
 def test_llm_path_dropped_newline_recovered_into_segments(client_and_events):
     """End-to-end: LLM drops a newline, reconstruction recovers it, markup is rendered."""
     client, _events = client_and_events
@@ -507,7 +621,7 @@ def test_evaluate_target_simpler_uses_simpler_solution(client_and_events):
     client, _events = client_and_events
 
     # Augment the fixture's problem with a simpler_version. We need to
-    # override db.get_problem just for this test to inject the v3 field.
+    # override db_async.get_problem just for this test to inject the v3 field.
     def _get_with_simpler(_pid):
         return {
             "problem_id": "p1",
@@ -527,7 +641,7 @@ def test_evaluate_target_simpler_uses_simpler_solution(client_and_events):
             "created_at": "2026-05-02T00:00:00Z",
         }
 
-    with patch.object(db, "get_problem", side_effect=_get_with_simpler), \
+    with patch.object(db_async, "get_problem", AsyncMock(side_effect=_get_with_simpler)), \
          patch.object(gcse_evaluator, "_call_llm", side_effect=AssertionError("LLM should not be called")):
         # Submitting the simpler-version's final answer with target=simpler
         # should cheap-path through to is_correct=True.
@@ -540,6 +654,94 @@ def test_evaluate_target_simpler_uses_simpler_solution(client_and_events):
     assert body["is_correct"] is True
 
 
+@pytest.mark.parametrize("solution,expected", [
+    ("2x = 8, so x = 4.", "x = 4"),
+    ("Subtract 3 from both sides: 2x = 8. Divide by 2: x = 4.", "x = 4"),
+    ("Area = 5 × 3 = 15 cm²", "15 cm²"),
+    ("dy/dx = 2(x + 1)", "dy/dx = 2(x + 1)"),
+    ("6 × 7 = 42.\nSo the answer is 42", "42"),
+    ("The answer is 12.", "12"),
+    ("Use the chain rule.", None),
+    ("x = 2 or x = -3", None),
+    ("(x - 2)(x + 3) = 0\nx = 2, x = -3", None),
+    ("x = 4 and y = -1", None),
+    ("Check: 4 + 3 = 7", None),
+    ("2x = 8, so x = 4. Check: 2 × 4 = 8", None),
+])
+def test_extract_final_answer(solution, expected):
+    assert gcse_evaluator.extract_final_answer(solution) == expected
+
+
+def test_build_simpler_payload_prefers_stored_milestones():
+    sv = {"question": "Solve 2x + 3 = 11", "solution": "2x = 8, so x = 4."}
+    assert gcse_evaluator._build_simpler_payload({"simpler_version": sv})["milestone_answers"] == ["x = 4"]
+    stored = {**sv, "milestone_answers": ["2x = 8", "x = 4"]}
+    assert gcse_evaluator._build_simpler_payload({"simpler_version": stored})["milestone_answers"] == ["2x = 8", "x = 4"]
+
+
+def test_simpler_final_answer_is_marked_locally():
+    ai_response = {
+        **SAMPLE_AI_RESPONSE,
+        "simpler_version": {"question": "Solve 2x + 3 = 11", "solution": "2x = 8, so x = 4."},
+    }
+    with patch.object(gcse_evaluator, "_call_llm", side_effect=AssertionError("LLM should not be called")):
+        outcome = gcse_evaluator.evaluate_submission(
+            submission="x=4", ai_response=ai_response, question="", target="simpler",
+        )
+    assert outcome.is_correct and outcome.path == "cheap_path"
+
+
+def test_generator_attaches_simpler_milestones():
+    from gcse_help_generator import attach_simpler_milestones
+
+    obj = {"simpler_version": {"question": "Solve 2x = 10", "solution": "Divide by 2: x = 5"}}
+    assert attach_simpler_milestones(obj) is True
+    assert obj["simpler_version"]["milestone_answers"] == ["x = 5"]
+    assert attach_simpler_milestones(obj) is False  # already there
+    assert attach_simpler_milestones({}) is False
+
+
+def test_evaluation_projection_matches_full_payload():
+    ai_response = {
+        **SAMPLE_AI_RESPONSE,
+        "hints": ["a", "b"],  # the kind of bulk the projection leaves out
+        "simpler_version": {"question": "Solve 2x + 3 = 11", "solution": "2x = 8, so x = 4."},
+    }
+    projection = gcse_evaluator.evaluation_projection(ai_response)
+    assert "hints" not in projection
+    assert projection["final_answers_normalised"] == ["dy/dx=30x(3x^2+2)^4"]
+    assert projection["simpler_version"]["final_answers_normalised"] == ["x=4"]
+    for submission, target in [("dy/dx = 30x(3x^2 + 2)^4", "main"), ("x = 4", "simpler"), ("x = 5", "simpler")]:
+        assert gcse_evaluator.cheap_match_final_answer(
+            submission, gcse_evaluator._build_simpler_payload(projection) if target == "simpler" else projection,
+        ) == gcse_evaluator.cheap_match_final_answer(
+            submission, gcse_evaluator._build_simpler_payload(ai_response) if target == "simpler" else ai_response,
+        )
+    assert gcse_evaluator._milestone_candidates(projection) == gcse_evaluator._milestone_candidates(ai_response)
+
+
+def test_evaluate_reads_projection_not_full_problem(client_and_events):
+    client, _events = client_and_events
+    projection = gcse_evaluator.evaluation_projection(SAMPLE_AI_RESPONSE)
+    with patch.object(db_async, "get_problem_projection", AsyncMock(return_value=projection)), \
+         patch.object(db_async, "get_problem", AsyncMock(side_effect=AssertionError("full problem should not be read"))):
+        res = client.post("/api/v1/homework/evaluate", json=_evaluate_payload("dy/dx = 30x(3x^2 + 2)^4"))
+    assert res.json()["is_correct"] is True
+
+
+def test_put_problem_writes_eval_projection():
+    written = []
+    fake_table = type("T", (), {"put_item": lambda self, Item: written.append(Item)})()
+    with patch.object(db, "_table", fake_table):
+        db.put_problem(
+            problem_id="p9", user_id="u", raw_input="q", normalised_form="q", topic_tags=[],
+            difficulty=3, ai_response=SAMPLE_AI_RESPONSE,
+            eval_projection=gcse_evaluator.evaluation_projection(SAMPLE_AI_RESPONSE),
+        )
+    assert [item["SK"] for item in written] == ["METADATA", "EVAL"]
+    assert written[1]["projection"]["full_solution"] == SAMPLE_AI_RESPONSE["full_solution"]
+
+
 def test_evaluate_target_simpler_without_simpler_version(client_and_events):
     """If the problem has no simpler_version, target=simpler returns prose, not error."""
     client, _events = client_and_events
@@ -682,3 +884,374 @@ def test_validate_v3_response_rejects_malformed_simpler_version():
     # simpler_version is the wrong type
     with pytest.raises(GCSEHelpError, match="simpler_version"):
         gen._validate_v3_response({**obj_base, "simpler_version": "a string"})
+
+
+# ── Streaming (SSE) ─────────────────────────────────────────────────────────
+
+
+def _sse_events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_segment_stream_parser_emits_segments_as_they_complete():
+    response = json.dumps({
+        "feedback_segments": [
+            {"text": "y = u^5", "status": "correct", "comment": "Braces {in} a comment."},
+            {"text": "\n", "status": "correct", "comment": None},
+            {"text": "dy/dx = 5u^4", "status": "incomplete", "comment": "Need du/dx."},
+        ],
+        "next_prompt": "What is du/dx?",
+    })
+    parser = gcse_evaluator._SegmentStreamParser()
+    seen: list[Any] = []
+    # Feed a few characters at a time, like an LLM token stream.
+    for i in range(0, len(response), 7):
+        seen.extend(parser.feed(response[i:i + 7]))
+    assert [s["text"] for s in seen] == ["y = u^5", "\n", "dy/dx = 5u^4"]
+
+
+def test_segment_stream_parser_ignores_other_keys():
+    parser = gcse_evaluator._SegmentStreamParser()
+    assert parser.feed('{"next_prompt": "[{not a segment}]", "feedback_segments": null}') == []
+
+
+def test_evaluate_stream_emits_segments_then_done(client_and_events):
+    client, events = client_and_events
+    submission = "y = u^5\ndy/dx = 5u^4"
+    response = json.dumps({
+        "feedback_segments": [
+            {"text": "y = u^5", "status": "correct", "comment": None},
+            {"text": "dy/dx = 5u^4", "status": "incomplete", "comment": "Need du/dx."},
+        ],
+        "next_prompt": "What is du/dx?",
+    })
+    chunks = [response[i:i + 10] for i in range(0, len(response), 10)]
+
+    with patch.object(gcse_evaluator, "_load_active_prompt", return_value=("sys", "user {{SUBMISSION}}")), \
+         patch.object(gcse_evaluator, "_call_llm_stream", return_value=iter(chunks)):
+        res = client.post(
+            "/api/v1/homework/evaluate/stream",
+            json=_evaluate_payload(submission, mode="guided"),
+        )
+
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/event-stream")
+    stream = _sse_events(res.text)
+    segments = [data for kind, data in stream if kind == "segment"]
+    # The dropped newline is emitted as its own segment, in order.
+    assert [s["text"] for s in segments] == ["y = u^5", "\n", "dy/dx = 5u^4"]
+    kind, done = stream[-1]
+    assert kind == "done"
+    assert done["integrity"] == "reconstructed"
+    assert done["next_prompt"] == "What is du/dx?"
+    assert "".join(s["text"] for s in done["feedback_segments"]) == submission
+    assert [e["event_type"] for e in events] == ["attempt_submitted"]
+
+
+def test_evaluate_stream_rewritten_output_ends_in_prose(client_and_events):
+    client, _events = client_and_events
+    response = json.dumps({
+        "feedback_segments": [{"text": "y equals u to the fifth", "status": "correct", "comment": None}],
+        "prose_feedback": "Outer function identified.",
+    })
+    with patch.object(gcse_evaluator, "_load_active_prompt", return_value=("sys", "user {{SUBMISSION}}")), \
+         patch.object(gcse_evaluator, "_call_llm_stream", return_value=iter([response])):
+        res = client.post("/api/v1/homework/evaluate/stream", json=_evaluate_payload("y = u^5"))
+
+    stream = _sse_events(res.text)
+    assert [kind for kind, _ in stream] == ["done"]
+    assert stream[0][1]["integrity"] == "prose_fallback"
+    assert stream[0][1]["prose_feedback"] == "Outer function identified."
+
+
+def test_evaluate_stream_cheap_path_skips_llm(client_and_events):
+    client, _events = client_and_events
+    with patch.object(gcse_evaluator, "_call_llm_stream", side_effect=AssertionError("LLM should not be called")):
+        res = client.post(
+            "/api/v1/homework/evaluate/stream",
+            json=_evaluate_payload("dy/dx = 30x(3x^2 + 2)^4"),
+        )
+    stream = _sse_events(res.text)
+    assert stream == [("done", {
+        "is_correct": True, "feedback_segments": [], "prose_feedback": None,
+        "next_prompt": None, "integrity": "cheap_path",
+    })]
+
+
+# ── Incremental re-evaluation ───────────────────────────────────────────────
+
+
+def _capture_llm(responses: list[str], prompts: list[str]):
+    def fake_call_llm(*, system_prompt, user_prompt, model):
+        prompts.append(user_prompt)
+        return responses.pop(0)
+    return fake_call_llm
+
+
+def test_resubmission_only_sends_changed_tail(client_and_events):
+    client, _events = client_and_events
+    first = "y = u^5\ndy/dx = 5u^4"
+    second = first + "\ndu/dx = 6x"
+    responses = [
+        json.dumps({"feedback_segments": [
+            {"text": "y = u^5", "status": "correct", "comment": None},
+            {"text": "\n", "status": "correct", "comment": None},
+            {"text": "dy/dx = 5u^4", "status": "incomplete", "comment": "Need du/dx."},
+        ]}),
+        # Only the tail comes back: the edited last line and the new one.
+        json.dumps({"feedback_segments": [
+            {"text": "dy/dx = 5u^4\n", "status": "correct", "comment": None},
+            {"text": "du/dx = 6x", "status": "correct", "comment": "Good."},
+        ]}),
+    ]
+    prompts: list[str] = []
+    with patch.object(gcse_evaluator, "_load_active_prompt", return_value=("sys", "<<<{{SUBMISSION}}>>>")), \
+         patch.object(gcse_evaluator, "_call_llm", side_effect=_capture_llm(responses, prompts)):
+        client.post("/api/v1/homework/evaluate", json=_evaluate_payload(first))
+        res = client.post("/api/v1/homework/evaluate", json=_evaluate_payload(second))
+
+    assert prompts[1].startswith("<<<dy/dx = 5u^4\ndu/dx = 6x>>>")
+    assert "y = u^5\n" in prompts[1]  # earlier line passed as context
+    body = res.json()
+    assert body["prose_feedback"] is None
+    assert "".join(s["text"] for s in body["feedback_segments"]) == second
+    assert [s["status"] for s in body["feedback_segments"]] == ["correct"] * 4
+    assert body["is_correct"] is True
+
+
+def test_identical_resubmission_skips_llm(client_and_events):
+    client, _events = client_and_events
+    submission = "y = u^5"
+    response = json.dumps({"feedback_segments": [
+        {"text": "y = u^5", "status": "incomplete", "comment": "Keep going."},
+    ]})
+    with patch.object(gcse_evaluator, "_load_active_prompt", return_value=("sys", "{{SUBMISSION}}")), \
+         patch.object(gcse_evaluator, "_call_llm", return_value=response) as llm:
+        client.post("/api/v1/homework/evaluate", json=_evaluate_payload(submission))
+        res = client.post("/api/v1/homework/evaluate", json=_evaluate_payload(submission))
+    assert llm.call_count == 1
+    assert res.json()["feedback_segments"][0]["comment"] == "Keep going."
+
+
+def test_reusable_prefix_stops_at_edited_line_and_incomplete_segment():
+    previous = gcse_evaluator._PreviousEvaluation(
+        submission="a = 1\nb = 2\nc = 3",
+        mode="free",
+        segments=[
+            {"text": "a = 1\n", "status": "correct", "comment": None},
+            {"text": "b = 2\n", "status": "incomplete", "comment": None},
+            {"text": "c = 3", "status": "correct", "comment": None},
+        ],
+        next_prompt=None,
+    )
+    # Second line edited: only the first is reusable.
+    segs, end = gcse_evaluator._reusable_prefix(previous, "a = 1\nb = 5\nc = 3")
+    assert [s["text"] for s in segs] == ["a = 1\n"] and end == 6
+    # Nothing edited, but the incomplete segment must be re-marked.
+    segs, end = gcse_evaluator._reusable_prefix(previous, "a = 1\nb = 2\nc = 3\nd = 4")
+    assert end == 6
+
+
+# ── Batch marking ───────────────────────────────────────────────────────────
+
+
+def test_evaluate_batch_dedupes_and_streams_cheap_path_first(client_and_events, monkeypatch):
+    client, events = client_and_events
+    monkeypatch.setattr(main, "_ADMIN_API_KEY", "k")
+    response = json.dumps({"feedback_segments": [
+        {"text": "y = u^5", "status": "incomplete", "comment": "Keep going."},
+    ]})
+    payload = {
+        "problem_id": "p1",
+        "submissions": [
+            {"item_id": "ana", "submission": "y = u^5"},
+            {"item_id": "ben", "submission": "dy/dx = 30x(3x^2 + 2)^4"},
+            {"item_id": "cat", "submission": "y = u^5"},
+        ],
+    }
+    with patch.object(gcse_evaluator, "_load_active_prompt", return_value=("sys", "{{SUBMISSION}}")) as load, \
+         patch.object(gcse_evaluator, "_call_llm", return_value=response) as llm:
+        res = client.post("/api/v1/homework/evaluate/batch", json=payload, headers={"X-Admin-Key": "k"})
+
+    assert res.status_code == 200
+    stream = _sse_events(res.text)
+    results = [data for kind, data in stream if kind == "result"]
+    # Cheap-path match first, then the one LLM call fanned out to both copies.
+    assert [r["item_id"] for r in results] == ["ben", "ana", "cat"]
+    assert results[0]["is_correct"] is True
+    assert results[2]["duplicate_of"] == "ana"
+    assert results[2]["feedback_segments"][0]["comment"] == "Keep going."
+    assert all("duration_ms" in r and "elapsed_ms" in r for r in results)
+    assert llm.call_count == 1
+    assert load.call_count == 1
+    assert stream[-1] == ("done", {**stream[-1][1], "total": 3, "unique": 2, "cheap_path": 1})
+    assert events == []  # batch marking isn't tied to a student attempt
+
+
+def test_evaluate_batch_rejects_empty_submission(client_and_events, monkeypatch):
+    client, _events = client_and_events
+    monkeypatch.setattr(main, "_ADMIN_API_KEY", "k")
+    res = client.post("/api/v1/homework/evaluate/batch", json={
+        "problem_id": "p1",
+        "submissions": [{"item_id": "ana", "submission": "  "}],
+    }, headers={"X-Admin-Key": "k"})
+    assert res.status_code == 400
+
+
+def test_evaluate_batch_requires_admin(client_and_events, monkeypatch):
+    client, _events = client_and_events
+    monkeypatch.setattr(main, "_ADMIN_API_KEY", "k")
+    payload = {"problem_id": "p1", "submissions": [{"item_id": "ana", "submission": "y = u^5"}]}
+    with patch.object(gcse_evaluator, "_call_llm", side_effect=AssertionError("LLM should not be called")):
+        assert client.post("/api/v1/homework/evaluate/batch", json=payload).status_code == 403
+
+
+def test_evaluate_batch_close_cancels_queued_calls():
+    started = []
+    release = threading.Event()
+
+    def slow_llm(**_kwargs):
+        started.append(1)
+        if len(started) > 1:
+            release.wait(5)
+        return json.dumps({"feedback_segments": [{"text": "x", "status": "incomplete", "comment": "."}]})
+
+    with patch.object(gcse_evaluator, "_load_active_prompt", return_value=("sys", "{{SUBMISSION}}")), \
+         patch.object(gcse_evaluator, "_call_llm", side_effect=slow_llm):
+        results = gcse_evaluator.evaluate_batch(
+            submissions=[f"y = u^{n}" for n in range(10)], ai_response=SAMPLE_AI_RESPONSE,
+            question="q", concurrency=1,
+        )
+        next(results)
+        t0 = time.monotonic()
+        results.close()  # what iterate_until_disconnect does when the client leaves
+        assert time.monotonic() - t0 < 1
+        release.set()
+        time.sleep(0.1)
+    assert len(started) <= 2  # the rest were never started
+
+
+# ── Speculative drafts ──────────────────────────────────────────────────────
+
+
+@pytest.fixture
+def draft_runner(monkeypatch):
+    metrics.reset()
+    monkeypatch.setattr(overload, "_controller", overload.OverloadController(
+        max_in_flight=100, latency_ms=60000, latency_percentile=90, min_samples=10, recover_seconds=30,
+    ))
+    runner = gcse_evaluator._DraftRunner(workers=1, max_in_flight=4)
+    monkeypatch.setattr(gcse_evaluator, "drafts", runner)
+    return runner
+
+
+def _wait_for(counter: str) -> None:
+    for _ in range(200):
+        if metrics.count(counter):
+            return
+        threading.Event().wait(0.01)
+
+
+def test_draft_then_submit_reuses_markup(client_and_events, draft_runner):
+    client, events = client_and_events
+    submission = "y = u^5"
+    response = json.dumps({"feedback_segments": [{"text": submission, "status": "correct", "comment": None}]})
+    with patch.object(gcse_evaluator, "_load_active_prompt", return_value=("sys", "{{SUBMISSION}}")), \
+         patch.object(gcse_evaluator, "_call_llm", return_value=response) as llm:
+        res = client.post("/api/v1/homework/evaluate/draft", json=_evaluate_payload(submission, mode="guided"))
+        assert res.status_code == 202
+        assert res.json() == {"accepted": True, "reason": None}
+        _wait_for("evaluator.draft.completed")
+        res = client.post("/api/v1/homework/evaluate", json=_evaluate_payload(submission, mode="guided"))
+
+    assert res.json()["feedback_segments"][0]["text"] == submission
+    assert llm.call_count == 1
+    assert metrics.count("evaluator.draft.completed") == 1
+    assert metrics.count("evaluator.draft.hit") == 1
+    assert len(events) == 1  # only the real submission is logged
+
+
+def test_draft_refused_without_spare_capacity(client_and_events, draft_runner):
+    client, _events = client_and_events
+    overload.controller()._in_flight = 4
+    with patch.object(gcse_evaluator, "_call_llm", side_effect=AssertionError("LLM should not be called")):
+        res = client.post("/api/v1/homework/evaluate/draft", json=_evaluate_payload("y = u^5"))
+    assert res.json() == {"accepted": False, "reason": "busy"}
+    assert metrics.count("evaluator.draft.refused") == 1
+
+
+def test_real_submission_cancels_stale_draft(draft_runner):
+    started = threading.Event()
+
+    def slow_llm(*, system_prompt, user_prompt, model):
+        started.set()
+        token = cancellation.current()
+        while not token.cancelled:
+            token._event.wait(0.01)
+        cancellation.check()
+
+    with patch.object(gcse_evaluator, "_load_active_prompt", return_value=("sys", "{{SUBMISSION}}")), \
+         patch.object(gcse_evaluator, "_call_llm", side_effect=slow_llm):
+        assert draft_runner.submit(
+            attempt_id="a1", submission="y = u^5", ai_response=SAMPLE_AI_RESPONSE, question="q",
+        ) is None
+        assert started.wait(2)
+        draft_runner.settle(attempt_id="a1", target="main", submission="y = u^5 with u = 3x^2 + 2")
+        _wait_for("evaluator.draft.cancelled")
+    assert metrics.count("evaluator.draft.cancelled") == 1
+    assert metrics.count("evaluator.draft.superseded") == 1
+
+
+def test_submission_waits_for_matching_draft_only_within_budget(draft_runner):
+    started = threading.Event()
+
+    def slow_llm(*, system_prompt, user_prompt, model):
+        started.set()
+        token = cancellation.current()
+        while not token.cancelled:
+            token._event.wait(0.01)
+        cancellation.check()
+
+    with patch.object(gcse_evaluator, "_load_active_prompt", return_value=("sys", "{{SUBMISSION}}")), \
+         patch.object(gcse_evaluator, "_call_llm", side_effect=slow_llm):
+        assert draft_runner.submit(
+            attempt_id="a1", submission="y = u^5", ai_response=SAMPLE_AI_RESPONSE, question="q",
+        ) is None
+        assert started.wait(2)
+        waited = time.perf_counter()
+        draft_runner.settle(attempt_id="a1", target="main", submission="y = u^5", timeout=0.1)
+        waited = time.perf_counter() - waited
+        _wait_for("evaluator.draft.cancelled")
+    assert waited < 1
+    assert metrics.count("evaluator.draft.abandoned") == 1
+    assert metrics.count("evaluator.draft.cancelled") == 1
+
+
+def test_settle_budget_follows_llm_latency(draft_runner):
+    assert draft_runner.settle_budget() == draft_runner.max_settle_seconds
+    for ms in (200, 400, 600):
+        metrics.observe("evaluator.llm", ms)
+    assert draft_runner.settle_budget() == pytest.approx(0.4)
+
+
+def test_incremental_prose_tail_falls_back_to_full_evaluation():
+    first, second = "y = u^5\n", "y = u^5\ndy/du = 5u^4"
+    full = [{"text": "y = u^5\n", "status": "correct", "comment": None},
+            {"text": "dy/du = 5u^4", "status": "correct", "comment": None}]
+    responses = [
+        json.dumps({"feedback_segments": [full[0]]}),
+        "not json",
+        json.dumps({"feedback_segments": full}),
+    ]
+    kwargs = dict(ai_response=SAMPLE_AI_RESPONSE, question="q", attempt_id="a1")
+    with patch.object(gcse_evaluator, "_load_active_prompt", return_value=("sys", "{{SUBMISSION}}")), \
+         patch.object(gcse_evaluator, "_call_llm", side_effect=responses) as llm:
+        gcse_evaluator.evaluate_submission(submission=first, **kwargs)
+        outcome = gcse_evaluator.evaluate_submission(submission=second, **kwargs)
+    assert llm.call_count == 3
+    assert outcome.path != "prose_fallback"
+    assert [seg["text"] for seg in outcome.segments] == [seg["text"] for seg in full]
@@ -0,0 +1,142 @@
+"""Tests for the buffered step-event writer (event_buffer.py) and the
+/homework/log-event endpoints that feed it."""
+from __future__ import annotations
+
+import threading
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+import event_buffer
+import main
+import metrics
+
+
+class FakeWriter:
+    """Records batches; `unprocessed` lists how many items to hand back per call."""
+
+    def __init__(self, unprocessed=(), fail=0):
+        self.batches = []
+        self._unprocessed = list(unprocessed)
+        self._fail = fail
+        self.lock = threading.Lock()
+
+    def __call__(self, items):
+        with self.lock:
+            self.batches.append(list(items))
+            if self._fail:
+                self._fail -= 1
+                raise RuntimeError("throttled")
+            n = self._unprocessed.pop(0) if self._unprocessed else 0
+        return items[len(items) - n:] if n else []
+
+    @property
+    def written(self):
+        return [item for batch in self.batches for item in batch]
+
+
+def _buffer(writer, **overrides):
+    kwargs = dict(max_pending=100, flush_seconds=60, max_attempts=3, backoff_seconds=0, write=writer)
+    kwargs.update(overrides)
+    return event_buffer.EventBuffer(**kwargs)
+
+
+def _events(n, start=0):
+    return [{"PK": "ATTEMPT#a", "SK": f"EVENT#{i:03d}"} for i in range(start, start + n)]
+
+
+@pytest.fixture(autouse=True)
+def _reset_metrics():
+    metrics.reset()
+
+
+def test_full_batches_are_written_without_waiting():
+    writer = FakeWriter()
+    buf = _buffer(writer)
+    assert buf.offer(_events(30))
+    assert buf.flush(timeout=5)
+    assert [len(b) for b in writer.batches] == [25, 5]
+    buf.close(timeout=5)
+
+
+def test_partial_batch_is_written_after_flush_seconds():
+    writer = FakeWriter()
+    buf = _buffer(writer, flush_seconds=0.05)
+    buf.offer(_events(3))
+    for _ in range(100):
+        if writer.batches:
+            break
+        threading.Event().wait(0.01)
+    assert writer.written == _events(3)
+    buf.close(timeout=5)
+
+
+def test_unprocessed_items_are_retried():
+    writer = FakeWriter(unprocessed=[2])
+    buf = _buffer(writer)
+    buf.offer(_events(5))
+    buf.flush(timeout=5)
+    assert [len(b) for b in writer.batches] == [5, 2]
+    assert metrics.count("event_buffer.written") == 5
+    assert metrics.count("event_buffer.retried") == 2
+    buf.close(timeout=5)
+
+
+def test_batch_is_dropped_after_max_attempts():
+    writer = FakeWriter(fail=3)
+    buf = _buffer(writer)
+    buf.offer(_events(4))
+    buf.flush(timeout=5)
+    assert len(writer.batches) == 3
+    assert metrics.count("event_buffer.dropped") == 4
+    buf.close(timeout=5)
+
+
+def test_full_buffer_refuses_new_events():
+    gate = threading.Event()
+    writer = FakeWriter()
+    buf = _buffer(lambda items: (gate.wait(5), writer(items))[1], max_pending=10)
+    assert buf.offer(_events(10))
+    assert not buf.offer(_events(1, start=10))
+    assert metrics.count("event_buffer.rejected") == 1
+    gate.set()
+    buf.close(timeout=5)
+
+
+def test_close_writes_out_queued_events():
+    writer = FakeWriter()
+    buf = _buffer(writer)
+    buf.offer(_events(7))
+    assert buf.close(timeout=5)
+    assert writer.written == _events(7)
+    assert not buf.offer(_events(1))
+
+
+def test_log_event_endpoints_queue_and_return_202():
+    writer = FakeWriter()
+    buf = _buffer(writer)
+    client = TestClient(main.app)
+    with patch.object(event_buffer, "_buffer", buf):
+        one = client.post("/api/v1/homework/log-event", json={
+            "attempt_id": "a1", "event_type": "hint_opened", "step_number": 1, "payload": {"rung": 1.5},
+        })
+        many = client.post("/api/v1/homework/log-event/batch", json={"events": [
+            {"attempt_id": "a1", "event_type": "step_checked", "step_number": n} for n in (2, 3)
+        ]})
+        buf.flush(timeout=5)
+    assert (one.status_code, many.status_code) == (202, 202)
+    assert many.json() == {"ok": True, "accepted": 2}
+    assert [item["event_type"] for item in writer.written] == ["hint_opened", "step_checked", "step_checked"]
+    assert all(item["SK"].startswith("EVENT#") for item in writer.written)
+    buf.close(timeout=5)
+
+
+def test_log_event_is_503_when_buffer_is_full():
+    buf = _buffer(FakeWriter(), max_pending=0)
+    with patch.object(event_buffer, "_buffer", buf):
+        res = TestClient(main.app).post("/api/v1/homework/log-event", json={
+            "attempt_id": "a1", "event_type": "hint_opened", "step_number": 1,
+        })
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "2"
@@ -0,0 +1,113 @@
+"""Tests for hedged evaluator LLM calls.
+
+`_openai_client` is patched to hand out fake clients whose requests take a
+scripted time, so no test touches OpenAI.
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+import gcse_evaluator
+import metrics
+
+
+class _FakeClient:
+    """Minimal stand-in for openai.OpenAI: create() sleeps, close() aborts it."""
+
+    def __init__(self, delay: float, content: str):
+        self.delay = delay
+        self.content = content
+        self.closed = threading.Event()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **_kwargs):
+        self.thread = threading.current_thread()
+        if self.closed.wait(self.delay):
+            raise ConnectionError("client closed")
+        message = SimpleNamespace(content=self.content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    def close(self):
+        self.closed.set()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def _hedger(**overrides) -> gcse_evaluator._Hedger:
+    settings = {"enabled": True, "percentile": 95, "max_rate": 1.0, "min_samples": 5}
+    settings.update(overrides)
+    return gcse_evaluator._Hedger(**settings)
+
+
+def _warm(latency_ms: float, n: int = 10) -> None:
+    for _ in range(n):
+        metrics.observe("evaluator.llm", latency_ms)
+
+
+def _call(hedger, clients):
+    with patch.object(gcse_evaluator, "_openai_client", side_effect=clients):
+        return hedger.call(system_prompt="sys", user_prompt="user", model="m")
+
+
+def test_straggler_is_hedged_and_loser_closed():
+    _warm(20)
+    slow = _FakeClient(delay=5, content=json.dumps({"from": "primary"}))
+    fast = _FakeClient(delay=0.01, content=json.dumps({"from": "hedge"}))
+
+    started = time.perf_counter()
+    raw = _call(_hedger(), [slow, fast])
+
+    assert json.loads(raw) == {"from": "hedge"}
+    assert time.perf_counter() - started < 1
+    assert slow.thread is threading.current_thread()
+    assert fast.thread.name.startswith("llm-hedge")
+    assert slow.closed.wait(1)
+    assert metrics.count("evaluator.hedge.fired") == 1
+    assert metrics.count("evaluator.hedge.won") == 1
+
+
+def test_fast_primary_is_not_hedged():
+    _warm(500)
+    primary = _FakeClient(delay=0, content="{}")
+    assert _call(_hedger(), [primary]) == "{}"
+    assert metrics.count("evaluator.hedge.fired") == 0
+
+
+def test_no_hedging_until_enough_samples_or_when_disabled():
+    assert _hedger().delay_seconds() is None
+    _warm(20)
+    assert _hedger().delay_seconds() == pytest.approx(0.02)
+    assert _hedger(enabled=False).delay_seconds() is None
+
+
+def test_no_hedging_without_samples_even_when_min_samples_is_zero():
+    assert _hedger(min_samples=0).delay_seconds() is None
+
+
+def test_fast_hedged_primary_closes_the_hedge():
+    _warm(20)
+    primary = _FakeClient(delay=0.2, content=json.dumps({"from": "primary"}))
+    hedge = _FakeClient(delay=5, content=json.dumps({"from": "hedge"}))
+    assert json.loads(_call(_hedger(), [primary, hedge])) == {"from": "primary"}
+    assert hedge.closed.wait(1)
+    assert metrics.count("evaluator.hedge.lost") == 1
+
+
+def test_hedge_rate_is_capped():
+    _warm(10)
+    hedger = _hedger(max_rate=0.0)
+    slow = _FakeClient(delay=0.1, content="{}")
+    assert _call(hedger, [slow]) == "{}"
+    assert metrics.count("evaluator.hedge.fired") == 0
+    assert metrics.count("evaluator.hedge.capped") == 1
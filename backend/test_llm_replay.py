@@ -0,0 +1,129 @@
+"""Tests for the evaluator's LLM record/replay layer and the benchmark runner.
+
+The live OpenAI call (`gcse_evaluator._call_openai`) is patched; everything
+between it and `evaluate_submission` runs for real.
+"""
+from __future__ import annotations
+
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+import bench_evaluator
+import gcse_evaluator
+import llm_replay
+
+AI_RESPONSE = {
+    "normalised_form": "Solve 2x + 5 = 17",
+    "full_solution": "2x = 12, so x = 6.",
+    "milestone_answers": ["2x = 12", "x = 6"],
+}
+PROMPT = ("sys", "Q: {{QUESTION}}\n<<<{{SUBMISSION}}>>>")
+MARKUP = json.dumps({"feedback_segments": [
+    {"text": "2x = 12", "status": "incomplete", "comment": "Now divide."},
+]})
+
+
+@pytest.fixture(autouse=True)
+def _no_record_or_replay():
+    llm_replay.configure()
+    yield
+    llm_replay.configure()
+
+
+def _evaluate(submission: str):
+    return gcse_evaluator.evaluate_submission(
+        submission=submission,
+        ai_response=AI_RESPONSE,
+        question=AI_RESPONSE["normalised_form"],
+        model="test-model",
+        prompt=PROMPT,
+    )
+
+
+def test_record_then_replay_without_live_calls(tmp_path):
+    corpus = tmp_path / "corpus.jsonl"
+    llm_replay.configure(record_path=str(corpus))
+    with patch.object(gcse_evaluator, "_call_openai", return_value=MARKUP):
+        live = _evaluate("2x = 12")
+        assert _evaluate("x = 6").path == "cheap_path"
+
+    entries = llm_replay.load_corpus(str(corpus))
+    assert len(entries) == 2
+    assert entries[0]["response"] == MARKUP
+    assert entries[0]["evaluation"]["submission"] == "2x = 12"
+    assert entries[1]["response"] is None  # cheap path, recorded for the mix
+
+    llm_replay.configure(replay_path=str(corpus))
+    with patch.object(gcse_evaluator, "_call_openai", side_effect=AssertionError("live call in replay")):
+        replayed = _evaluate("2x = 12")
+        missed = _evaluate("2x = 13")
+    assert replayed.segments == live.segments
+    assert missed.path == "llm_error"
+
+
+def _stream_client(text: str):
+    chunks = [SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text[i:i + 8]))])
+              for i in range(0, len(text), 8)]
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **_kw: iter(chunks))))
+
+
+def _evaluate_stream(submission: str):
+    with patch.object(gcse_evaluator, "_load_active_prompt", return_value=PROMPT):
+        return list(gcse_evaluator.evaluate_submission_stream(
+            submission=submission, ai_response=AI_RESPONSE, question=AI_RESPONSE["normalised_form"],
+            model="test-model",
+        ))[-1]
+
+
+def test_streamed_evaluations_are_recorded_and_replayed(tmp_path):
+    corpus = tmp_path / "corpus.jsonl"
+    llm_replay.configure(record_path=str(corpus))
+    with patch.object(gcse_evaluator, "_openai_client", return_value=_stream_client(MARKUP)):
+        _kind, (live, _integrity) = _evaluate_stream("2x = 12")
+
+    entries = llm_replay.load_corpus(str(corpus))
+    assert [e["response"] for e in entries] == [MARKUP]
+    assert entries[0]["evaluation"]["submission"] == "2x = 12"
+
+    llm_replay.configure(replay_path=str(corpus))
+    with patch.object(gcse_evaluator, "_openai_client", side_effect=AssertionError("live call in replay")):
+        _kind, (replayed, _integrity) = _evaluate_stream("2x = 12")
+    assert replayed.segments == live.segments
+
+
+def test_benchmark_reports_rates_and_percentiles(tmp_path):
+    corpus = tmp_path / "corpus.jsonl"
+    llm_replay.configure(record_path=str(corpus))
+    responses = {
+        "2x = 12": MARKUP,
+        "2x=12\nx = 7": json.dumps({"feedback_segments": [{"text": "rewritten", "status": "wrong"}]}),
+    }
+
+    def fake_openai(*, system_prompt, user_prompt, model, client=None):
+        return next(r for s, r in responses.items() if f"<<<{s}>>>" in user_prompt)
+
+    with patch.object(gcse_evaluator, "_call_openai", side_effect=fake_openai):
+        for submission in ("2x = 12", "2x=12\nx = 7", "x = 6", "X=6"):
+            _evaluate(submission)
+
+    entries = llm_replay.load_corpus(str(corpus))
+    llm_replay.configure(replayer=llm_replay.CorpusReplayer(entries))
+    with patch.object(gcse_evaluator, "_call_openai", side_effect=AssertionError("live call in replay")):
+        report = bench_evaluator.run(bench_evaluator.workload(entries), concurrency=2, repeat=2)
+
+    assert report["evaluations"] == 8
+    assert report["cheap_path_rate"] == 0.5
+    assert report["markup_success_rate"] == 0.5
+    assert report["prose_fallback_rate"] == 0.5
+    assert report["paths"] == {"cheap_path": 4, "exact": 2, "prose_fallback": 2}
+    assert report["latency_ms"]["p50"] <= report["latency_ms"]["p99"]
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert bench_evaluator._percentile(values, 50) == 50.0
+    assert bench_evaluator._percentile(values, 99) == 99.0
+    assert bench_evaluator._percentile([], 95) == 0.0
@@ -0,0 +1,132 @@
+"""Tests for tiered model routing in the evaluator and the help generator.
+
+LLM calls are faked per model name, so each test controls which tier
+produces usable output.
+"""
+from __future__ import annotations
+
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+import gcse_evaluator
+import gcse_help_generator
+import metrics
+import model_routing
+
+AI_RESPONSE = {
+    "normalised_form": "Solve 2x + 5 = 17",
+    "full_solution": "2x = 12, so x = 6.",
+}
+GOOD_MARKUP = json.dumps({"feedback_segments": [
+    {"text": "2x = 12", "status": "incomplete", "comment": "Now divide."},
+]})
+REWRITTEN_MARKUP = json.dumps({"feedback_segments": [
+    {"text": "two x equals twelve", "status": "incomplete", "comment": None},
+]})
+
+
+@pytest.fixture(autouse=True)
+def _fresh_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_tiers_from_env(monkeypatch):
+    monkeypatch.setenv("OPENAI_MODEL_TIERS", "small, big")
+    monkeypatch.setenv("EVALUATOR_MODEL_TIERS", "tiny,small,big")
+    assert model_routing.tiers("evaluator") == ["tiny", "small", "big"]
+    assert model_routing.tiers("gcse_help") == ["small", "big"]
+    monkeypatch.delenv("OPENAI_MODEL_TIERS")
+    monkeypatch.setenv("OPENAI_MODEL", "only")
+    assert model_routing.tiers("gcse_help") == ["only"]
+
+
+def test_run_escalates_and_counts_per_tier():
+    def attempt(model, last):
+        if model == "small":
+            raise model_routing.Escalate("bad json")
+        return model
+
+    assert model_routing.run("evaluator", ["small", "big"], attempt) == "big"
+    assert metrics.count("evaluator.tier.small.calls") == 1
+    assert metrics.count("evaluator.tier.small.escalated") == 1
+    assert metrics.count("evaluator.tier.big.calls") == 1
+
+
+def _evaluate(model: str):
+    return gcse_evaluator.evaluate_submission(
+        submission="2x = 12",
+        ai_response=AI_RESPONSE,
+        question=AI_RESPONSE["normalised_form"],
+        model=model,
+        prompt=("sys", "{{SUBMISSION}}"),
+    )
+
+
+def test_evaluator_escalates_only_when_markup_fails():
+    responses = {"small": REWRITTEN_MARKUP, "big": GOOD_MARKUP}
+    calls = []
+
+    def fake_call_llm(*, system_prompt, user_prompt, model):
+        calls.append(model)
+        return responses[model]
+
+    with patch.object(gcse_evaluator, "_call_llm", side_effect=fake_call_llm):
+        outcome = _evaluate("small,big")
+    assert calls == ["small", "big"]
+    assert outcome.path == "exact"
+
+    calls.clear()
+    responses["small"] = GOOD_MARKUP
+    with patch.object(gcse_evaluator, "_call_llm", side_effect=fake_call_llm):
+        _evaluate("small,big")
+    assert calls == ["small"]
+
+
+def test_evaluator_last_tier_prose_is_returned():
+    with patch.object(gcse_evaluator, "_call_llm", return_value=REWRITTEN_MARKUP):
+        outcome = _evaluate("small,big")
+    assert outcome.path == "prose_fallback"
+    assert metrics.count("evaluator.tier.big.calls") == 1
+
+
+def test_exercise_hash_includes_model_ladder():
+    args = {"schema_version": "3.0.0", "prompt_version": 3}
+    assert gcse_help_generator.exercise_hash("x", model="small", **args) != \
+        gcse_help_generator.exercise_hash("x", model="small,big", **args)
+
+
+def test_help_generator_escalates_on_unparseable_json(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    outputs = {"small": "not json", "big": json.dumps({"ok": True})}
+    calls = []
+
+    def create(*, model, **_kwargs):
+        calls.append(model)
+        message = SimpleNamespace(content=outputs[model])
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage={"total_tokens": 7})
+
+    fake_openai = SimpleNamespace(
+        OpenAI=lambda api_key: SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create))),
+    )
+    config = gcse_help_generator.GCSEHelpGeneratorConfig(
+        model="small", model_tiers=("small", "big"),
+        cache_backend="json", cache_path=tmp_path / "cache.json",
+    )
+
+    def fake_load_prompts(self):
+        self._prompt_cache = (2, "sys", "{{EXERCISE}}")
+
+    with patch.object(gcse_help_generator.GCSEHelpGenerator, "_load_prompts", fake_load_prompts), \
+         patch.object(gcse_help_generator.GCSEHelpGenerator, "_safe_import_openai", return_value=fake_openai), \
+         patch.object(gcse_help_generator.GCSEHelpGenerator, "_light_validate_response"):
+        result = gcse_help_generator.GCSEHelpGenerator(config).generate(raw_text="Solve 2x = 4")
+
+    assert calls == ["small", "big"]
+    assert result["ok"] is True
+    assert metrics.count("gcse_help.tier.small.escalated") == 1
+    assert metrics.count("gcse_help.tier.big.tokens") == 7
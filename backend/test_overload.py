@@ -0,0 +1,172 @@
+"""Tests for brownout mode (overload.py) and how the endpoints degrade in it.
+
+The process-wide controller is replaced per test so forced or tripped
+brownout never leaks between tests.
+"""
+from __future__ import annotations
+
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+import db
+import gcse_evaluator
+import gcse_help_generator
+import main
+import metrics
+import overload
+
+AI_RESPONSE = {
+    "normalised_form": "Solve 2x + 5 = 17",
+    "full_solution": "2x = 12, so x = 6.",
+    "steps": [
+        {"step_number": 1, "expected_answer": "2x = 12"},
+        {"step_number": 2, "expected_answer": "x = 6"},
+    ],
+}
+
+
+def _controller(**overrides) -> overload.OverloadController:
+    settings = {
+        "max_in_flight": 100, "latency_ms": 1000, "latency_percentile": 90,
+        "min_samples": 3, "recover_seconds": 60,
+    }
+    settings.update(overrides)
+    return overload.OverloadController(**settings)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_controller(monkeypatch):
+    metrics.reset()
+    controller = _controller()
+    monkeypatch.setattr(overload, "_controller", controller)
+    yield controller
+    metrics.reset()
+
+
+def test_trips_on_latency_and_recovers():
+    controller = _controller(recover_seconds=0.05)
+    for _ in range(3):
+        controller._latency.observe(5000)
+    assert controller.brownout_active()
+    assert metrics.count("overload.brownout.tripped") == 1
+    # The window was cleared on the trip, so only the timer keeps it on.
+    assert len(controller._latency) == 0
+    with patch.object(overload.time, "monotonic", return_value=overload.time.monotonic() + 1):
+        assert not controller.brownout_active()
+
+
+def test_trips_on_in_flight():
+    controller = _controller(max_in_flight=2)
+    with controller.llm_call():
+        assert not controller.brownout_active()
+        with controller.llm_call():
+            pass
+    assert controller.brownout_active()
+
+
+def test_speculative_calls_do_not_trip_or_count():
+    controller = _controller(max_in_flight=2, min_samples=1, latency_ms=0)
+    with overload.speculative():
+        with controller.llm_call(), controller.llm_call():
+            assert controller.in_flight == 0
+            assert controller.snapshot()["speculativeInFlight"] == 2
+    assert len(controller._latency) == 0
+    assert not controller.brownout_active()
+
+
+def test_forced_brownout_and_clear():
+    controller = _controller()
+    controller.force(enabled=True)
+    assert controller.snapshot()["forced"] is True
+    assert controller.brownout_active()
+    controller.force(enabled=False)
+    assert not controller.brownout_active()
+
+
+def test_evaluate_in_brownout_uses_local_markup(_fresh_controller):
+    _fresh_controller.force(enabled=True)
+    with patch.object(gcse_evaluator, "_call_llm", side_effect=AssertionError("LLM should not be called")):
+        outcome = gcse_evaluator.evaluate_submission(
+            submission="2x = 12\nx = 7",
+            ai_response=AI_RESPONSE,
+            question=AI_RESPONSE["normalised_form"],
+        )
+    assert outcome.path == "brownout"
+    assert "".join(s["text"] for s in outcome.segments) == "2x = 12\nx = 7"
+    assert [s["status"] for s in outcome.segments] == ["correct", "unclear"]
+    assert metrics.count("overload.shed.evaluate") == 1
+
+
+def test_cheap_path_still_wins_in_brownout(_fresh_controller):
+    _fresh_controller.force(enabled=True)
+    outcome = gcse_evaluator.evaluate_submission(
+        submission="x = 6", ai_response=AI_RESPONSE, question=AI_RESPONSE["normalised_form"],
+    )
+    assert outcome.is_correct
+
+
+class _CacheOnlyGenerator:
+    def generate(self, *, cache_only=False, **_kwargs):
+        assert cache_only
+        raise gcse_help_generator.GCSEHelpUnavailable("Help is busy right now — please try again shortly.")
+
+
+def test_help_json_cache_miss_in_brownout_is_503(_fresh_controller):
+    _fresh_controller.force(enabled=True)
+    with patch.object(main, "get_user_profile", return_value={"uid": "demo"}), \
+         patch.object(main, "_safe_import_gcse_help_generator",
+                      return_value=(_CacheOnlyGenerator, gcse_help_generator.GCSEHelpError)), \
+         patch.object(db, "create_problem_with_attempt", side_effect=AssertionError("nothing to store")):
+        res = TestClient(main.app).post("/api/v1/homework/help-json", json={"uid": "demo", "text": "Solve 2x = 4"})
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "30"
+    assert metrics.count("overload.shed.help") == 1
+
+
+class _CachedGenerator:
+    def generate(self, *, cache_only=False, **_kwargs):
+        assert cache_only
+        return {"_schema_version": "1.0.0", "answer": "x = 2"}
+
+
+def test_help_json_cache_hit_in_brownout_is_not_shed(_fresh_controller):
+    _fresh_controller.force(enabled=True)
+    with patch.object(main, "get_user_profile", return_value={"uid": "demo"}), \
+         patch.object(main, "_safe_import_gcse_help_generator",
+                      return_value=(_CachedGenerator, gcse_help_generator.GCSEHelpError)):
+        res = TestClient(main.app).post("/api/v1/homework/help-json", json={"uid": "demo", "text": "Solve 2x = 4"})
+    assert res.status_code == 200
+    assert metrics.count("overload.shed.help") == 0
+
+
+def test_help_json_image_in_brownout_skips_ocr(_fresh_controller):
+    _fresh_controller.force(enabled=True)
+    with patch.object(main, "get_user_profile", return_value={"uid": "demo"}), \
+         patch.object(main, "_extract_text_from_image", side_effect=AssertionError("no OCR in brownout")), \
+         patch.object(main, "_start_image_upload", side_effect=AssertionError("nothing to upload")):
+        res = TestClient(main.app).post("/api/v1/homework/help-json", json={
+            "uid": "demo", "text": "", "image_data_url": "data:image/png;base64,AAAA",
+        })
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "30"
+    assert metrics.count("overload.shed.help") == 1
+
+
+def test_admin_brownout_endpoint(monkeypatch):
+    monkeypatch.setattr(main, "_ADMIN_API_KEY", "secret")
+    client = TestClient(main.app)
+    assert client.post("/api/v1/admin/brownout", json={"enabled": True}).status_code == 403
+
+    res = client.post(
+        "/api/v1/admin/brownout", json={"enabled": True, "durationSeconds": 60},
+        headers={"X-Admin-Key": "secret"},
+    )
+    assert res.status_code == 200
+    assert res.json()["active"] is True
+    assert res.json()["forcedUntil"] is not None
+    assert overload.brownout_active()
+
+    res = client.get("/api/v1/admin/brownout", headers={"X-Admin-Key": "secret"})
+    assert res.json()["forced"] is True
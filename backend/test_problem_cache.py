@@ -0,0 +1,193 @@
+"""Tests for the problem read-through cache (problem_cache.py) and its db.py wiring.
+
+The process-wide cache is replaced per test so entries never leak between
+tests (or into test_evaluate, which stubs db.get_problem directly).
+"""
+from __future__ import annotations
+
+import threading
+from decimal import Decimal
+from unittest.mock import patch
+
+import anyio
+import pytest
+
+import db
+import metrics
+import problem_cache
+
+
+class FakeTable:
+    def __init__(self):
+        self.items = {}
+        self.gets = 0
+
+    def put_item(self, Item, **_kwargs):
+        self.items[(Item["PK"], Item["SK"])] = dict(Item)
+
+    def get_item(self, Key, ProjectionExpression=None):
+        self.gets += 1
+        item = self.items.get((Key["PK"], Key["SK"]))
+        if item is None:
+            return {}
+        if ProjectionExpression:
+            item = {k: item[k] for k in ProjectionExpression.split(", ") if k in item}
+        return {"Item": dict(item)}
+
+
+class FakeShared:
+    def __init__(self):
+        self.store = {}
+        self.current_epoch = 0
+
+    def get(self, key):
+        return self.store.get(key, problem_cache._MISSING)
+
+    def put(self, key, value):
+        self.store[key] = problem_cache._decode(problem_cache._encode(value))
+
+    def delete(self, problem_id):
+        for key in [k for k in self.store if k[0] == problem_id]:
+            del self.store[key]
+
+    def epoch(self):
+        return self.current_epoch
+
+    def bump_epoch(self):
+        self.current_epoch += 1
+        return self.current_epoch
+
+
+@pytest.fixture
+def table():
+    fake = FakeTable()
+    metrics.reset()
+    with patch.object(db, "_table", fake), \
+         patch.object(problem_cache, "_cache", problem_cache.ProblemCache(max_entries=16, ttl_seconds=3600)):
+        yield fake
+
+
+def _put(problem_id="p1", **overrides):
+    kwargs = dict(
+        problem_id=problem_id, user_id="u", raw_input="q", normalised_form="q", topic_tags=["algebra"],
+        difficulty=3, ai_response={"full_solution": "x = 6", "marks": 2.5},
+        eval_projection={"full_solution": "x = 6"},
+    )
+    kwargs.update(overrides)
+    return db.put_problem(**kwargs)
+
+
+def test_put_problem_warms_cache(table):
+    _put()
+    assert db.get_problem("p1")["ai_response"]["full_solution"] == "x = 6"
+    assert db.get_problem_projection("p1") == {"full_solution": "x = 6"}
+    assert table.gets == 0
+    assert metrics.count("problem_cache.hit") == 2
+
+
+def test_get_problem_reads_through_once(table):
+    table.put_item(Item={"PK": "PROBLEM#p2", "SK": "METADATA", "problem_id": "p2"})
+    assert db.get_problem("p2")["problem_id"] == "p2"
+    assert db.get_problem("p2")["problem_id"] == "p2"
+    assert table.gets == 1
+    assert metrics.count("problem_cache.miss") == 1
+
+
+def test_missing_problem_is_not_cached(table):
+    assert db.get_problem("later") is None
+    _put("later")
+    table.items.clear()
+    assert db.get_problem("later")["problem_id"] == "later"
+
+
+def test_callers_get_their_own_copy(table):
+    _put()
+    db.get_problem("p1")["ai_response"]["full_solution"] = "mutated"
+    assert db.get_problem("p1")["ai_response"]["full_solution"] == "x = 6"
+
+
+def test_invalidate_problem_forces_reload(table):
+    _put()
+    table.items[("PROBLEM#p1", "METADATA")]["raw_input"] = "rewritten"
+    assert db.get_problem("p1")["raw_input"] == "q"
+    db.invalidate_problem("p1")
+    assert db.get_problem("p1")["raw_input"] == "rewritten"
+
+
+def test_lru_evicts_least_recently_used():
+    cache = problem_cache.ProblemCache(max_entries=2, ttl_seconds=3600)
+    cache.put("a", "METADATA", {"id": "a"})
+    cache.put("b", "METADATA", {"id": "b"})
+    cache.get_or_load("a", "METADATA", lambda: pytest.fail("a should be cached"))
+    cache.put("c", "METADATA", {"id": "c"})
+    assert cache.get_or_load("b", "METADATA", lambda: {"id": "b2"}) == {"id": "b2"}
+    assert len(cache) == 2
+
+
+def test_entries_expire_after_ttl():
+    cache = problem_cache.ProblemCache(max_entries=4, ttl_seconds=10)
+    with patch.object(problem_cache.time, "monotonic", return_value=100.0):
+        cache.put("a", "METADATA", {"v": 1})
+    with patch.object(problem_cache.time, "monotonic", return_value=111.0):
+        assert cache.get_or_load("a", "METADATA", lambda: {"v": 2}) == {"v": 2}
+
+
+def test_shared_tier_serves_other_workers_and_keeps_decimals():
+    shared = FakeShared()
+    writer = problem_cache.ProblemCache(max_entries=4, ttl_seconds=3600, shared=shared)
+    reader = problem_cache.ProblemCache(max_entries=4, ttl_seconds=3600, shared=shared)
+    metrics.reset()
+    writer.put("a", "METADATA", {"marks": Decimal("2.5"), "tags": ["x"]})
+    got = reader.get_or_load("a", "METADATA", lambda: pytest.fail("should come from the shared tier"))
+    assert got == {"marks": Decimal("2.5"), "tags": ["x"]}
+    assert metrics.count("problem_cache.shared_hit") == 1
+    writer.invalidate("a")
+    reader.clear()
+    assert reader.get_or_load("a", "METADATA", lambda: None) is None
+
+
+def test_disabled_cache_always_loads():
+    cache = problem_cache.ProblemCache(max_entries=0, ttl_seconds=3600)
+    cache.put("a", "METADATA", {"v": 1})
+    assert cache.get_or_load("a", "METADATA", lambda: {"v": 2}) == {"v": 2}
+
+
+def test_invalidation_reaches_other_workers_local_tier():
+    metrics.reset()
+    shared = FakeShared()
+    writer = problem_cache.ProblemCache(max_entries=4, ttl_seconds=3600, shared=shared, epoch_check_seconds=5)
+    reader = problem_cache.ProblemCache(max_entries=4, ttl_seconds=3600, shared=shared, epoch_check_seconds=5)
+    with patch.object(problem_cache.time, "monotonic", return_value=100.0):
+        writer.put("a", "METADATA", {"v": 1})
+        assert reader.get_or_load("a", "METADATA", lambda: pytest.fail("shared hit expected")) == {"v": 1}
+        writer.invalidate("a")
+        # Within the check interval the reader still serves its local copy
+        assert reader.get_or_load("a", "METADATA", lambda: {"v": 2}) == {"v": 1}
+    with patch.object(problem_cache.time, "monotonic", return_value=106.0):
+        assert reader.get_or_load("a", "METADATA", lambda: {"v": 2}) == {"v": 2}
+        assert writer.get_or_load("a", "METADATA", lambda: {"v": 2}) == {"v": 2}
+    assert metrics.count("problem_cache.epoch_reset") == 1
+
+
+def test_async_reads_keep_redis_off_the_event_loop():
+    calls = []
+
+    class RecordingShared(FakeShared):
+        def epoch(self):
+            calls.append(threading.get_ident())
+            return super().epoch()
+
+        def get(self, key):
+            calls.append(threading.get_ident())
+            return super().get(key)
+
+    cache = problem_cache.ProblemCache(max_entries=4, ttl_seconds=3600, shared=RecordingShared())
+
+    async def read():
+        async def load():
+            return {"v": 1}
+        return threading.get_ident(), await cache.aget_or_load("a", "METADATA", load)
+
+    loop_thread, value = anyio.run(read)
+    assert value == {"v": 1}
+    assert calls and loop_thread not in calls
@@ -0,0 +1,108 @@
+"""Tests for the process-wide prompt registry.
+
+DynamoDB is stubbed: the ACTIVE-pointer poll and the version-record read
+are patched on the db module, and each test builds its own registry.
+"""
+from __future__ import annotations
+
+from unittest.mock import patch
+
+import db
+import metrics
+import prompt_registry
+from prompt_registry import PromptRegistry
+
+
+def _record(prompt_id: str, version: int) -> dict:
+    return {
+        "promptId": prompt_id,
+        "version": version,
+        "systemPrompt": f"{prompt_id} system v{version}",
+        "userPromptTemplate": f"{prompt_id} user v{version}",
+    }
+
+
+def test_get_serves_from_memory_within_poll_interval():
+    """Repeated reads inside the interval don't touch DynamoDB."""
+    registry = PromptRegistry(poll_seconds=3600)
+    with patch.object(db, "get_prompt_active_versions", return_value={"evaluation": 2}) as poll, \
+         patch.object(db, "get_prompt_version", side_effect=_record) as fetch:
+        for _ in range(5):
+            prompt = registry.get("evaluation")
+    assert prompt.version == 2
+    assert prompt.system_prompt == "evaluation system v2"
+    assert poll.call_count == 1
+    assert fetch.call_count == 1
+
+
+def test_poll_only_fetches_records_whose_pointer_moved():
+    registry = PromptRegistry(poll_seconds=0)
+    pointers = {"evaluation": 1, "ingestion": 3}
+    with patch.object(db, "get_prompt_active_versions", side_effect=lambda _ids: dict(pointers)), \
+         patch.object(db, "get_prompt_version", side_effect=_record) as fetch:
+        registry.refresh(force=True)
+        assert fetch.call_count == 2
+
+        # Another worker activates evaluation v2 — next poll picks it up,
+        # and ingestion (unchanged) is not re-read.
+        pointers["evaluation"] = 2
+        assert registry.get("evaluation").version == 2
+        assert registry.get("ingestion").version == 3
+        assert fetch.call_count == 3
+
+
+def test_failed_poll_keeps_previous_snapshot():
+    registry = PromptRegistry(poll_seconds=0)
+    with patch.object(db, "get_prompt_active_versions", return_value={"evaluation": 1}), \
+         patch.object(db, "get_prompt_version", side_effect=_record):
+        registry.refresh(force=True)
+
+    with patch.object(db, "get_prompt_active_versions", side_effect=RuntimeError("throttled")):
+        prompt = registry.get("evaluation")
+
+    assert prompt is not None and prompt.version == 1
+    assert registry.snapshot()["lastError"] == "throttled"
+
+
+def test_failed_initial_load_is_retried_with_backoff():
+    metrics.reset()
+    registry = PromptRegistry(poll_seconds=60, retry_seconds=1)
+    clock = [100.0]
+    with patch.object(prompt_registry.time, "monotonic", side_effect=lambda: clock[0]), \
+         patch.object(db, "get_prompt_active_versions", side_effect=RuntimeError("throttled")) as poll:
+        assert registry.get("evaluation") is None
+        clock[0] = 101.0  # 1s backoff elapsed: retry
+        assert registry.get("evaluation") is None
+        clock[0] = 102.5  # next backoff is 2s: not yet
+        registry.get("evaluation")
+        assert poll.call_count == 2
+    assert metrics.count("prompt_registry.poll_failed") == 2
+    assert registry.snapshot()["consecutiveFailures"] == 2
+
+    with patch.object(prompt_registry.time, "monotonic", side_effect=lambda: clock[0]), \
+         patch.object(db, "get_prompt_active_versions", return_value={"evaluation": 1}), \
+         patch.object(db, "get_prompt_version", side_effect=_record):
+        clock[0] = 103.0
+        assert registry.get("evaluation").version == 1
+    assert registry.snapshot()["consecutiveFailures"] == 0
+
+
+def test_missing_version_record_keeps_previous_version():
+    registry = PromptRegistry(poll_seconds=0)
+    with patch.object(db, "get_prompt_active_versions", return_value={"evaluation": 1}), \
+         patch.object(db, "get_prompt_version", side_effect=_record):
+        registry.refresh(force=True)
+    with patch.object(db, "get_prompt_active_versions", return_value={"evaluation": 2}), \
+         patch.object(db, "get_prompt_version", return_value=None):
+        registry.refresh(force=True)
+    assert registry.get("evaluation").version == 1
+
+
+def test_snapshot_reports_loaded_versions():
+    registry = PromptRegistry(poll_seconds=3600)
+    with patch.object(db, "get_prompt_active_versions", return_value={"evaluation": 4}), \
+         patch.object(db, "get_prompt_version", side_effect=_record):
+        registry.refresh(force=True)
+    snap = registry.snapshot()
+    assert snap["loaded"]["evaluation"]["version"] == 4
+    assert snap["reloads"] == 1
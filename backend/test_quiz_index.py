@@ -0,0 +1,64 @@
+"""Tests for per-topic quiz assembly (quiz_index.py)."""
+from __future__ import annotations
+
+import random
+
+from quiz_index import DISTRACTOR_CANDIDATES, NUM_DISTRACTORS, QuizIndex
+
+
+def _card(i, back, tag=None):
+    return {"id": f"c{i}", "front": f"front {i}", "back": back, "tag": tag}
+
+
+CARDS = [
+    _card(0, "Photosynthesis converts light energy into chemical energy", "core"),
+    _card(1, "Respiration converts glucose into usable chemical energy", "core"),
+    _card(2, "Osmosis moves water across a partially permeable membrane", "core"),
+    _card(3, "Diffusion moves particles from high to low concentration", "higher"),
+    _card(4, "42"),
+    _card(5, "17"),
+    _card(6, "9"),
+    _card(7, "  photosynthesis converts LIGHT energy into chemical energy "),  # duplicate answer
+]
+
+
+def test_answer_pool_is_deduplicated():
+    index = QuizIndex(CARDS)
+    assert len(index) == len(CARDS)
+    assert len(index.answers) == len(CARDS) - 1
+
+
+def test_neighbours_prefer_similar_answers():
+    index = QuizIndex(CARDS)
+    sentence = index.neighbours[0][:3]
+    number = index.neighbours[index.answers.index("42")][:2]
+    assert {index.answers[j] for j in sentence} == {CARDS[1]["back"], CARDS[2]["back"], CARDS[3]["back"]}
+    assert {index.answers[j] for j in number} == {"17", "9"}
+    assert all(len(n) <= DISTRACTOR_CANDIDATES for n in index.neighbours)
+
+
+def test_questions_are_well_formed():
+    index = QuizIndex(CARDS)
+    questions = index.questions(5, random.Random(7))
+    assert len({q["id"] for q in questions}) == 5
+    by_id = {c["id"]: c for c in CARDS}
+    for q in questions:
+        answer = q["choices"][q["correctIndex"]]
+        assert " ".join(answer.split()).casefold() == " ".join(by_id[q["id"]]["back"].split()).casefold()
+        assert len(q["choices"]) == NUM_DISTRACTORS + 1
+        assert len(set(q["choices"])) == len(q["choices"])
+
+
+def test_small_topics_top_up_or_shrink():
+    two = QuizIndex([_card(0, "a"), _card(1, "b")])
+    assert [len(q["choices"]) for q in two.questions(5, random.Random(1))] == [2, 2]
+    one = QuizIndex([_card(0, "only")])
+    assert one.questions(3, random.Random(1))[0]["choices"] == ["only"]
+
+
+def test_large_topics_assemble():
+    rng = random.Random(3)
+    words = [f"w{i}" for i in range(400)]
+    cards = [_card(i, " ".join(rng.sample(words, rng.randint(1, 8)))) for i in range(1000)]
+    index = QuizIndex(cards)
+    assert len(index.questions(20, rng)) == 20
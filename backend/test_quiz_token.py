@@ -0,0 +1,89 @@
+"""Tests for signed quiz tokens (quiz_token.py) and stateless /quiz/*."""
+from __future__ import annotations
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+import content_cache
+import db_async
+import main
+import quiz_token
+from quiz_index import QuizIndex
+
+SECRET = "s3cret"
+QUESTIONS = [{"id": "c1", "correctIndex": 2}, {"id": "c2", "correctIndex": 0}]
+
+
+def _sign(**overrides):
+    kwargs = dict(secret=SECRET, uid="u", quiz_id="q", topic_id="t", questions=QUESTIONS, ttl_seconds=60, now=1000)
+    kwargs.update(overrides)
+    return quiz_token.sign(**kwargs)
+
+
+def test_round_trip():
+    sess = quiz_token.verify(_sign(), secret=SECRET, uid="u", quiz_id="q", now=1030)
+    assert sess == {"topicId": "t", "questions": QUESTIONS}
+
+
+@pytest.mark.parametrize("token, uid, quiz_id", [
+    (_sign(secret="other"), "u", "q"),
+    (_sign() + "x", "u", "q"),
+    (_sign().replace(".", ""), "u", "q"),
+    (_sign(), "someone-else", "q"),
+    (_sign(), "u", "another-quiz"),
+])
+def test_rejects_tampered_or_foreign_tokens(token, uid, quiz_id):
+    with pytest.raises(quiz_token.QuizTokenError):
+        quiz_token.verify(token, secret=SECRET, uid=uid, quiz_id=quiz_id, now=1030)
+
+
+def test_rejects_expired_tokens():
+    with pytest.raises(quiz_token.QuizTokenExpired):
+        quiz_token.verify(_sign(), secret=SECRET, uid="u", quiz_id="q", now=1060)
+
+
+def test_stateless_quiz_uses_no_session_storage(monkeypatch):
+    monkeypatch.setattr(main, "_QUIZ_TOKEN_SECRET", SECRET)
+    cards = [{"id": str(i), "front": f"f{i}", "back": f"b{i}", "tag": None} for i in range(4)]
+    client = TestClient(main.app)
+    with patch.object(db_async, "get_user_profile", AsyncMock(return_value={"uid": "u"})), \
+         patch.object(content_cache, "aquiz_index", AsyncMock(return_value=content_cache.Content(QuizIndex(cards), ""))), \
+         patch.object(db_async, "save_quiz_session", AsyncMock()) as save, \
+         patch.object(db_async, "get_quiz_session", AsyncMock()) as get, \
+         patch.object(db_async, "delete_quiz_session", AsyncMock()) as delete, \
+         patch.object(db_async, "save_quiz_result", AsyncMock()) as result, \
+         patch.object(db_async, "record_card_reviews", AsyncMock()):
+        start = client.post("/api/v1/quiz/start", json={"uid": "u", "topicId": "t", "numQuestions": 3}).json()
+        answers = [{"questionId": q["id"], "choiceIndex": q["correctIndex"]} for q in start["questions"]]
+        answers[0]["choiceIndex"] = (answers[0]["choiceIndex"] + 1) % len(start["questions"][0]["choices"])
+        res = client.post("/api/v1/quiz/submit", json={
+            "uid": "u", "quizId": start["quizId"], "answers": answers, "quizToken": start["quizToken"],
+        })
+        forged = client.post("/api/v1/quiz/submit", json={
+            "uid": "u", "quizId": start["quizId"], "answers": answers, "quizToken": start["quizToken"][:-2],
+        })
+    assert res.json()["score"] == 2
+    assert forged.status_code == 400
+    save.assert_not_called()
+    get.assert_not_called()
+    delete.assert_not_called()
+    assert result.await_count == 1
+
+
+def test_token_can_only_be_submitted_once(monkeypatch):
+    monkeypatch.setattr(main, "_QUIZ_TOKEN_SECRET", SECRET)
+    token = quiz_token.sign(secret=SECRET, uid="u", quiz_id="q", topic_id="t", questions=QUESTIONS, ttl_seconds=60)
+    body = {"uid": "u", "quizId": "q", "quizToken": token, "answers": [
+        {"questionId": "c1", "choiceIndex": 2}, {"questionId": "c2", "choiceIndex": 1},
+    ]}
+    client = TestClient(main.app)
+    with patch.object(db_async, "save_quiz_result", AsyncMock(side_effect=[True, False])) as result, \
+         patch.object(db_async, "record_card_reviews", AsyncMock()) as reviews:
+        first = client.post("/api/v1/quiz/submit", json=body)
+        replay = client.post("/api/v1/quiz/submit", json=body)
+    assert first.status_code == 200 and first.json()["score"] == 1
+    assert replay.status_code == 409
+    assert result.await_count == 2
+    reviews.assert_awaited_once()
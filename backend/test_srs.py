@@ -0,0 +1,76 @@
+"""Tests for SM-2 scheduling (srs.py), the review-state items and due-date
+index in db.py, and the review state backfill."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+import backfill_review_state
+import db
+import main
+import srs
+
+NOW = datetime(2026, 3, 1, 9, 30, tzinfo=timezone.utc)
+
+
+def _answers(*results):
+    state, now = None, NOW
+    for correct in results:
+        state = srs.schedule(state, correct, now)
+    return state
+
+
+def test_correct_answers_grow_the_interval():
+    assert [_answers(*[True] * n)["intervalDays"] for n in (1, 2, 3)] == [1, 6, 15]
+    assert _answers(True)["dueAt"] == "2026-03-02T09:30:00Z"
+
+
+def test_wrong_answer_is_due_now_and_lowers_ease():
+    state = _answers(True, True, False)
+    assert (state["intervalDays"], state["repetitions"], state["lapses"]) == (0, 0, 1)
+    assert state["dueAt"] == srs.format_due(NOW)
+    assert state["ease"] < srs.INITIAL_EASE
+
+
+def test_ease_never_drops_below_minimum():
+    assert _answers(*[False] * 20)["ease"] == srs.MIN_EASE
+
+
+def test_review_items_are_indexed_by_due_date():
+    breakdown = [{"questionId": "c1", "correct": True}, {"questionId": "c2", "correct": False}]
+    items = db._card_review_updates("u", "t", breakdown, [], NOW)
+    assert [it["SK"] for it in items] == ["SRS#t#c1", "SRS#t#c2"]
+    assert items[1]["GSI1PK"] == "SRS_DUE#u"
+    assert items[1]["GSI1SK"] == f"{srs.format_due(NOW)}#t#c2"
+    later = db._card_review_updates("u", "t", breakdown[:1], items, NOW + timedelta(days=1))
+    assert later[0]["repetitions"] == 2
+
+
+def test_due_query_is_one_bounded_range_on_gsi1():
+    query = db._due_cards_query("u", NOW, 25)
+    assert (query["IndexName"], query["Limit"], query["ScanIndexForward"]) == (db.GSI1_NAME, 25, True)
+    _pk, sk = query["KeyConditionExpression"].get_expression()["values"]
+    assert sk.get_expression()["values"][1] == "2026-03-01T09:30:00Z~"
+
+
+def test_review_next_returns_due_cards():
+    with patch.object(main, "get_user_profile", return_value={"uid": "u"}), \
+         patch.object(db, "due_cards", return_value={"t": ["c2", "c1"]}) as due:
+        res = TestClient(main.app).get("/api/v1/review/next", params={"uid": "u"})
+    assert res.json() == {"due": [{"topicId": "t", "cardIds": ["c2", "c1"]}]}
+    assert due.call_args.kwargs["limit"] == main.REVIEW_NEXT_MAX_CARDS
+
+
+def test_backfill_replays_results_in_order():
+    results = [
+        {"PK": "USER#u", "topicId": "t", "completedAt": "2026-03-02T10:00:00+00:00",
+         "breakdown": [{"questionId": "c1", "correct": False}]},
+        {"PK": "USER#u", "topicId": "t", "completedAt": "2026-03-01T10:00:00+00:00",
+         "breakdown": [{"questionId": "c1", "correct": True}, {"questionId": "c2", "correct": True}]},
+    ]
+    states = backfill_review_state.replay(results)
+    c1, c2 = states[("USER#u", "SRS#t#c1")], states[("USER#u", "SRS#t#c2")]
+    assert (c1["lapses"], c1["dueAt"]) == (1, "2026-03-02T10:00:00Z")
+    assert (c2["repetitions"], c2["dueAt"]) == (1, "2026-03-02T10:00:00Z")
@@ -1,7 +1,7 @@
 import { useState, useEffect, useCallback } from 'react';
 import {
   adminListPrompts, adminListVersions, adminGetVersion, adminSavePrompt, adminTryPrompt,
-  type PromptSummary, type PromptVersion,
+  type PromptSummary, type PromptVersion, type PromptVersionSummary,
 } from '../lib/api';
 import { Button } from './ui/button';
 import { Input } from './ui/input';
@@ -28,7 +28,8 @@ export function AdminPrompts() {
   const [systemText, setSystemText] = useState('');
   const [userText, setUserText] = useState('');
   const [notes, setNotes] = useState('');
-  const [versions, setVersions] = useState<PromptVersion[]>([]);
+  const [versions, setVersions] = useState<PromptVersionSummary[]>([]);
+  const [olderBefore, setOlderBefore] = useState<number | null>(null);
   const [saving, setSaving] = useState(false);
   const [saveMsg, setSaveMsg] = useState('');
 
@@ -75,10 +76,11 @@ export function AdminPrompts() {
     setSaveMsg('');
     setTestResult(null);
     setTestError('');
-    const vlist = await adminListVersions(adminKey, promptId);
-    setVersions(vlist);
-    if (vlist.length > 0) {
-      const latest = vlist[vlist.length - 1];
+    const page = await adminListVersions(adminKey, promptId);
+    setVersions(page.items);
+    setOlderBefore(page.nextBefore);
+    if (page.items.length > 0) {
+      const latest = await adminGetVersion(adminKey, promptId, page.items[0].version);
       setSystemText(latest.systemPrompt);
       setUserText(latest.userPromptTemplate);
     } else {
@@ -88,12 +90,20 @@ export function AdminPrompts() {
     setNotes('');
   };
 
-  const loadVersion = (v: PromptVersion) => {
-    setSystemText(v.systemPrompt);
-    setUserText(v.userPromptTemplate);
+  const loadVersion = async (v: PromptVersionSummary) => {
+    const full: PromptVersion = await adminGetVersion(adminKey, v.promptId, v.version);
+    setSystemText(full.systemPrompt);
+    setUserText(full.userPromptTemplate);
     setSaveMsg('');
   };
 
+  const loadOlderVersions = async () => {
+    if (!editingId || olderBefore == null) return;
+    const page = await adminListVersions(adminKey, editingId, { before: olderBefore });
+    setVersions(prev => [...prev, ...page.items]);
+    setOlderBefore(page.nextBefore);
+  };
+
   const handleSave = async () => {
     if (!editingId) return;
     setSaving(true);
@@ -106,8 +116,9 @@ export function AdminPrompts() {
       });
       setSaveMsg(`Saved as version ${res.version}`);
       setNotes('');
-      const vlist = await adminListVersions(adminKey, editingId);
-      setVersions(vlist);
+      const page = await adminListVersions(adminKey, editingId);
+      setVersions(page.items);
+      setOlderBefore(page.nextBefore);
       loadPrompts(adminKey);
     } catch (e: any) {
       setSaveMsg(`Error: ${e.message}`);
@@ -207,7 +218,7 @@ export function AdminPrompts() {
           <div className="space-y-2">
             <p className="text-sm font-medium">Version history</p>
             {versions.length === 0 && <p className="text-sm text-gray-400">No versions yet</p>}
-            {[...versions].reverse().map(v => (
+            {versions.map(v => (
               <Card
                 key={v.version}
                 className="cursor-pointer hover:border-blue-400 transition-colors"
@@ -223,6 +234,11 @@ export function AdminPrompts() {
                 </CardContent>
               </Card>
             ))}
+            {olderBefore != null && (
+              <Button variant="outline" size="sm" className="w-full" onClick={loadOlderVersions}>
+                Load older versions
+              </Button>
+            )}
           </div>
         </div>
 
@@ -4,8 +4,12 @@ import { Button } from '@/components/ui/button';
 import { Textarea } from '@/components/ui/textarea';
 import { RawApiResponsePanel } from '@/components/views/HomeworkSubmissionView';
 import {
+  evaluateDraft,
   evaluateSubmission,
+  evaluateSubmissionStream,
+  flushEvents,
   getProblem,
+  queueEvent,
   EvaluateRes,
   EvaluateMode,
   EvaluateTarget,
@@ -43,6 +47,8 @@ const FALLBACK_OPENING_PROMPT =
   'What would you try first? Type whatever comes to mind — partial working is fine.';
 const FALLBACK_SIMPLER_OPENING_PROMPT =
   'Try this simpler version first — same idea, easier numbers.';
+// Pause in typing before the working is sent for speculative marking.
+const DRAFT_DEBOUNCE_MS = 1500;
 
 // ── Component ──────────────────────────────────────────────────────────────
 
@@ -55,6 +61,8 @@ export function ProblemPage({ defaultMode = 'guided' }: Props) {
   const [mode, setMode] = useState<UiMode>(defaultMode);
   const [submission, setSubmission] = useState('');
   const [submitting, setSubmitting] = useState(false);
+  // Provisional segments streamed in while the current submission is marked.
+  const [streamed, setStreamed] = useState<FeedbackSegment[]>([]);
   const [history, setHistory] = useState<SubmissionRecord[]>([]);
   const [showSolution, setShowSolution] = useState(false);
 
@@ -72,21 +80,70 @@ export function ProblemPage({ defaultMode = 'guided' }: Props) {
     return () => { cancelled = true; };
   }, [problemId]);
 
+  // Send any queued UI events when the student leaves the problem.
+  useEffect(() => () => { void flushEvents(); }, []);
+
+  // Help the student asked for, logged through the client-side event batch.
+  function logRungRevealed(rung: 'simpler_version' | 'complete_working') {
+    queueEvent({ attempt_id: attemptId, event_type: 'rung_revealed', step_number: 0, payload: { rung, mode } });
+  }
+
+  function changeMode(next: UiMode) {
+    if (next === 'simpler' && mode !== 'simpler') logRungRevealed('simpler_version');
+    setMode(next);
+  }
+
+  function toggleSolution() {
+    if (!showSolution) logRungRevealed('complete_working');
+    setShowSolution((v) => !v);
+  }
+
+  // Guided modes: while the student types, have the backend mark the draft
+  // in the background so pressing Check returns straight away.
+  useEffect(() => {
+    if (!problemId || mode === 'free' || submitting || !submission.trim()) return;
+    const timer = setTimeout(() => {
+      evaluateDraft({
+        attempt_id: attemptId,
+        problem_id: problemId,
+        submission,
+        mode: 'guided',
+        target: mode === 'simpler' ? 'simpler' : 'main',
+      }).catch(() => { /* best effort */ });
+    }, DRAFT_DEBOUNCE_MS);
+    return () => clearTimeout(timer);
+  }, [problemId, attemptId, mode, submission, submitting]);
+
   async function handleSubmit() {
     if (!problemId || !submission.trim() || submitting) return;
     const text = submission;
     const submittedMode = mode;
     const evaluatorMode: EvaluateMode = submittedMode === 'free' ? 'free' : 'guided';
     const target: EvaluateTarget = submittedMode === 'simpler' ? 'simpler' : 'main';
+    const req = {
+      attempt_id: attemptId,
+      problem_id: problemId,
+      submission: text,
+      mode: evaluatorMode,
+      target,
+    };
     setSubmitting(true);
+    setStreamed([]);
     try {
-      const result = await evaluateSubmission({
-        attempt_id: attemptId,
-        problem_id: problemId,
-        submission: text,
-        mode: evaluatorMode,
-        target,
-      });
+      // Stream segments as they're marked; the final result replaces them.
+      // If the stream fails before showing anything (e.g. a proxy that
+      // buffers event streams), fall back to the plain request.
+      let received = 0;
+      let result: EvaluateRes;
+      try {
+        result = await evaluateSubmissionStream(req, (segment) => {
+          received += 1;
+          setStreamed((prev) => [...prev, segment]);
+        });
+      } catch (e) {
+        if (received > 0) throw e;
+        result = await evaluateSubmission(req);
+      }
       setHistory((prev) => [...prev, { submission: text, result, mode: submittedMode }]);
       setSubmission('');
     } catch (e: any) {
@@ -104,6 +161,7 @@ export function ProblemPage({ defaultMode = 'guided' }: Props) {
       ]);
     } finally {
       setSubmitting(false);
+      setStreamed([]);
     }
   }
 
@@ -182,7 +240,7 @@ export function ProblemPage({ defaultMode = 'guided' }: Props) {
       </div>
 
       {/* Mode toggle */}
-      <ModeToggle mode={mode} onChange={setMode} simplerAvailable={Boolean(hasSimpler)} />
+      <ModeToggle mode={mode} onChange={changeMode} simplerAvailable={Boolean(hasSimpler)} />
 
       {/* Submission history (filtered to current track) */}
       {visibleHistory.length > 0 && (
@@ -204,6 +262,17 @@ export function ProblemPage({ defaultMode = 'guided' }: Props) {
         </div>
       )}
 
+      {/* Provisional feedback while the submission is being marked */}
+      {submitting && streamed.length > 0 && (
+        <div className="rounded-xl border border-dashed border-gray-300 bg-white p-4 opacity-80">
+          <p className="whitespace-pre-wrap text-sm leading-6">
+            {streamed.map((seg, i) => (
+              <SegmentSpan key={i} seg={seg} />
+            ))}
+          </p>
+        </div>
+      )}
+
       {/* Opening prompt — shown only on first arrival into the active track,
           and only when the active track is scaffolded (guided or simpler). */}
       {!allDoneInTrack && visibleHistory.length === 0 && mode !== 'free' && (
@@ -227,7 +296,7 @@ export function ProblemPage({ defaultMode = 'guided' }: Props) {
                 variant="outline"
                 size="sm"
                 className="text-amber-700 border-amber-300 hover:bg-amber-50"
-                onClick={() => setShowSolution((v) => !v)}
+                onClick={toggleSolution}
               >
                 {showSolution ? 'Hide solution' : 'Show complete working'} ↓
               </Button>
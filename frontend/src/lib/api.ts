@@ -85,6 +85,11 @@ export type EvaluateRes = {
   next_prompt?: string | null;
 };
 
+// Integrity verdict carried by the final event of /homework/evaluate/stream.
+export type EvaluateIntegrity = 'cheap_path' | 'exact' | 'reconstructed' | 'aligned' | 'prose_fallback' | 'brownout';
+
+export type EvaluateStreamDone = EvaluateRes & { integrity: EvaluateIntegrity };
+
 export type ProblemRes = {
   problem_id: string;
   user_id: string;
@@ -127,6 +132,13 @@ export type PromptVersion = {
   notes: string;
 };
 
+export type PromptVersionSummary = Omit<PromptVersion, 'systemPrompt' | 'userPromptTemplate'>;
+
+export type PromptVersionPage = {
+  items: PromptVersionSummary[];  // newest first
+  nextBefore: number | null;      // pass as `before` for the next page
+};
+
 export type PromptSaveReq = {
   systemPrompt: string;
   userPromptTemplate: string;
@@ -170,8 +182,16 @@ export async function adminListPrompts(adminKey: string): Promise<PromptSummary[
   return resp.json();
 }
 
-export async function adminListVersions(adminKey: string, promptId: string): Promise<PromptVersion[]> {
-  const resp = await adminFetch(`/api/v1/admin/prompts/${promptId}/versions`, adminKey);
+export async function adminListVersions(
+  adminKey: string,
+  promptId: string,
+  opts: { limit?: number; before?: number } = {},
+): Promise<PromptVersionPage> {
+  const params = new URLSearchParams();
+  if (opts.limit != null) params.set('limit', String(opts.limit));
+  if (opts.before != null) params.set('before', String(opts.before));
+  const query = params.toString() ? `?${params}` : '';
+  const resp = await adminFetch(`/api/v1/admin/prompts/${promptId}/versions${query}`, adminKey);
   return resp.json();
 }
 
@@ -214,6 +234,50 @@ export async function logEvent(req: LogEventReq): Promise<void> {
   });
 }
 
+export async function logEvents(events: LogEventReq[]): Promise<void> {
+  if (events.length === 0) return;
+  await fetch(`${backendBaseUrl()}/api/v1/homework/log-event/batch`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ events }),
+    keepalive: true,
+  });
+}
+
+// Client-side batching for chatty UI events: queued events go out together
+// via /log-event/batch every EVENT_FLUSH_MS, or at EVENT_BATCH_MAX events.
+const EVENT_FLUSH_MS = 2000;
+const EVENT_BATCH_MAX = 50;
+let queuedEvents: LogEventReq[] = [];
+let eventFlushTimer: ReturnType<typeof setTimeout> | null = null;
+
+export function queueEvent(req: LogEventReq): void {
+  queuedEvents.push(req);
+  if (queuedEvents.length >= EVENT_BATCH_MAX) {
+    void flushEvents();
+  } else if (eventFlushTimer === null) {
+    eventFlushTimer = setTimeout(() => { void flushEvents(); }, EVENT_FLUSH_MS);
+  }
+}
+
+export async function flushEvents(): Promise<void> {
+  if (eventFlushTimer !== null) {
+    clearTimeout(eventFlushTimer);
+    eventFlushTimer = null;
+  }
+  const events = queuedEvents;
+  queuedEvents = [];
+  try {
+    await logEvents(events);
+  } catch {
+    // Event logging is best effort; never surface it to the student.
+  }
+}
+
+if (typeof window !== 'undefined') {
+  window.addEventListener('pagehide', () => { void flushEvents(); });
+}
+
 export async function getProblem(problemId: string): Promise<ProblemRes> {
   const resp = await fetch(`${backendBaseUrl()}/api/v1/problems/${encodeURIComponent(problemId)}`);
   if (!resp.ok) throw new Error(`getProblem failed (${resp.status})`);
@@ -237,6 +301,64 @@ export async function evaluateSubmission(req: EvaluateReq): Promise<EvaluateRes>
   return resp.json();
 }
 
+// Speculative evaluation of working the student is still typing. Fire and
+// forget (debounced): the backend marks it in the background when it has
+// spare capacity so a later evaluateSubmission of the same text is instant.
+export async function evaluateDraft(req: EvaluateReq): Promise<void> {
+  await fetch(`${backendBaseUrl()}/api/v1/homework/evaluate/draft`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(req),
+  });
+}
+
+// Streaming variant of evaluateSubmission. `onSegment` fires for each
+// provisional segment as the server emits it; the resolved value is the
+// authoritative final result and should replace whatever was rendered.
+export async function evaluateSubmissionStream(
+  req: EvaluateReq,
+  onSegment: (segment: FeedbackSegment) => void,
+): Promise<EvaluateStreamDone> {
+  const resp = await fetch(`${backendBaseUrl()}/api/v1/homework/evaluate/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+    body: JSON.stringify(req),
+  });
+  if (!resp.ok || !resp.body) {
+    let message = '';
+    try {
+      const data = await resp.json();
+      if (data?.detail) message = String(data.detail);
+    } catch { message = await resp.text().catch(() => ''); }
+    throw new Error(message || `evaluate failed (${resp.status})`);
+  }
+
+  const reader = resp.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary !== -1) {
+      const block = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf('\n\n');
+      let event = 'message';
+      let data = '';
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      }
+      if (event === 'segment') onSegment(JSON.parse(data));
+      else if (event === 'done') return JSON.parse(data);
+      else if (event === 'error') throw new Error(JSON.parse(data)?.detail || 'evaluate failed');
+    }
+  }
+  throw new Error('evaluate stream ended without a result');
+}
+
 export async function postHomeworkHelpJson(req: HomeworkHelpJsonReq): Promise<HomeworkHelpJsonRes> {
   const resp = await fetch(`${backendBaseUrl()}/api/v1/homework/help-json`, {
     method: 'POST',
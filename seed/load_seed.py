@@ -2,6 +2,8 @@
 import os
 import json
 import sys
+import uuid
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
@@ -22,6 +24,8 @@ table = ddb.Table(TABLE_NAME)
 # Schema:
 # TopicMeta: PK=TOPIC#<subject>, SK=TOPIC#<topicId>, Type=TopicMeta, subject, title, estMinutes, GSI1PK=TOPIC_LIST, GSI1SK=<subject>#<sort>
 # RevCard:   PK=CONTENT#<topicId>, SK=CARD#<cardId>, Type=RevCard, front, back, difficultyTag, GSI1PK=TOPIC#<topicId>, GSI1SK=CARD#<cardId>
+# Version:   PK=CONTENT, SK=VERSION, Type=ContentVersion, versionId, updatedAt — rewritten after every load so
+#            the API's content cache (backend/content_cache.py) drops what it holds
 
 def put_item(item: dict[str, Any]):
     table.put_item(Item=item)
@@ -74,6 +78,18 @@ def load_subject_json(path: Path):
             })
 
 
+def stamp_content_version() -> str:
+    version_id = uuid.uuid4().hex
+    put_item({
+        "PK": "CONTENT",
+        "SK": "VERSION",
+        "Type": "ContentVersion",
+        "versionId": version_id,
+        "updatedAt": datetime.now(timezone.utc).isoformat(),
+    })
+    return version_id
+
+
 def main():
     seed_dir = Path(__file__).parent
     files = list(seed_dir.glob("*.json"))
@@ -84,6 +100,7 @@ def main():
     for p in files:
         print(f"- Loading {p.name}")
         load_subject_json(p)
+    print(f"Content version: {stamp_content_version()}")
     print("Done.")
     return 0
 